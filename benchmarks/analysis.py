@@ -0,0 +1,272 @@
+"""
+Benchmark y regresión de las etapas de análisis.
+
+Reproduce los CSV de detecciones incluidos en `data/` y versiones ampliadas de
+`sample_3` (10^4 a 10^6 frames) a través de `assign_marker_roles`, `validate_detection`,
+`interpolate_missing`, `crop_test_window`, `compute_hip_angles` y
+`generate_results_table`. Para cada caso:
+
+- compara la salida con los valores de referencia de `analysis_golden.json`;
+- compara el tiempo de cada etapa con una línea base local y falla si alguna es más
+  lenta que `--tolerance` (proporción) por encima de ella.
+
+Las versiones ampliadas intercalan frames quietos (remuestreados de la misma sesión)
+antes y después de la prueba, así que sus métricas deben coincidir con las de `sample_3`.
+Lo mismo vale para `sample_3` pasado por la trayectoria compacta (float32).
+
+Uso:
+    python -m benchmarks.analysis
+    python -m benchmarks.analysis --rows 10000 100000 1000000 --repeat 5
+    python -m benchmarks.analysis --save-baseline       # en la máquina de referencia
+    python -m benchmarks.analysis --update-golden       # sólo si el cambio de resultados es intencional
+"""
+from dataclasses import dataclass
+from time import perf_counter
+from typing import Dict, Optional
+import argparse
+import json
+import os
+import sys
+
+os.environ.setdefault('MPLBACKEND', 'Agg')
+
+import numpy as np
+import pandas as pd
+
+from core.tools.compact_trajectory import CompactTrajectory
+from core.trendetect import TrendetecT
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+GOLDEN_PATH = os.path.join(ROOT, 'benchmarks', 'analysis_golden.json')
+BASELINE_PATH = os.path.join(ROOT, 'benchmarks', 'results', 'analysis_baseline.json')
+
+DEFAULT_ROWS = [10_000, 100_000, 1_000_000]
+# Por debajo de este tiempo las diferencias son ruido de medición
+MIN_REGRESSION_SECONDS = 0.005
+
+
+@dataclass
+class Fixture:
+    name: str
+    path: str
+    # Ya viene con roles asignados y recortada a la ventana de prueba
+    cropped: bool = False
+    # Sesión cruda de la que toma el offset de postura base (si está recortada)
+    session: Optional[str] = None
+    # Serie de ángulos de referencia guardada por la aplicación
+    angles_path: Optional[str] = None
+
+
+FIXTURES = [
+    Fixture('sample_3', 'data/processed_info/sample_3_output.csv'),
+    Fixture('result', 'data/processed_info/result.csv', cropped=True, session='sample_3'),
+    Fixture('debug', 'data/debug.csv', cropped=True, session='sample_3', angles_path='data/resultado.csv'),
+]
+
+
+def load_fixture(fixture: Fixture) -> pd.DataFrame:
+    return pd.read_csv(os.path.join(ROOT, fixture.path))
+
+
+def upscale_detections(df: pd.DataFrame, n_rows: int, seed: int = 0) -> pd.DataFrame:
+    """
+    Amplía una sesión cruda a `n_rows` frames sin cambiar su prueba.
+
+    Conserva la primera fila (de la que sale el offset) y toda la sesión original, e
+    intercala antes y después frames quietos remuestreados de los tramos con la tibia
+    visible. El tiempo se recalcula con el paso de frames de la sesión.
+    """
+    if n_rows <= len(df):
+        return df.copy()
+
+    tibia_missing = df.filter(like='_x').isna().any(axis=1).to_numpy()
+    first_gap = int(tibia_missing.argmax())
+    last_gap = len(df) - 1 - int(tibia_missing[::-1].argmax())
+
+    rng = np.random.default_rng(seed)
+    pad = n_rows - len(df)
+    before = df.iloc[rng.integers(1, first_gap, pad // 2)]
+    after = df.iloc[rng.integers(last_gap + 1, len(df), pad - pad // 2)]
+
+    upscaled = pd.concat([df.iloc[:1], before, df.iloc[1:], after], ignore_index=True)
+    upscaled['time'] = np.arange(n_rows) * df['time'].diff().median()
+    return upscaled
+
+
+def run_stages(df: pd.DataFrame, cropped: bool, offset: Optional[float], repeat: int):
+    """
+    Corre las etapas `repeat` veces sobre copias de `df`.
+
+    Returns:
+        tuple: (ángulos, tabla de resultados, offset, ventana recortada, mejor tiempo por etapa).
+    """
+    timings: Dict[str, float] = {}
+
+    def timed(name, func, *args):
+        start = perf_counter()
+        out = func(*args)
+        elapsed = perf_counter() - start
+        timings[name] = min(timings.get(name, elapsed), elapsed)
+        return out
+
+    for _ in range(repeat):
+        t = TrendetecT()
+        data = df.copy()
+
+        if not cropped:
+            data = timed('assign_marker_roles', t.assign_marker_roles, data)
+        if not timed('validate_detection', t.validate_detection, data):
+            raise ValueError("Detección insuficiente para procesar la prueba.")
+        data = timed('interpolate_missing', t.interpolate_missing, data)
+
+        if not cropped:
+            offset = t.compute_offset(data)
+            data = timed('crop_test_window', t.crop_test_window, data)
+
+        angles = timed('compute_hip_angles', t.compute_hip_angles, data)
+        angles = t.substract_base_angle(angles, offset)
+        results = timed('generate_results_table', t.generate_results_table, angles)
+
+    return angles, results, offset, data, timings
+
+
+def summarize(angles: pd.Series, results: pd.DataFrame, offset: float, window: pd.DataFrame) -> dict:
+    """Valores de referencia de un caso: tamaño de la ventana, offset, métricas y momentos."""
+    moments = dict(zip(results['Métrica'], results['Momento']))
+    return {
+        'window_rows': len(window),
+        'window_start': float(window['time'].iloc[0]),
+        'offset': float(offset),
+        'angle_sum': float(angles.sum()),
+        'metrics': {metric: _json_float(value) for metric, value in zip(results['Métrica'], results['Valor'])},
+        'moments': {metric: _json_float(value) for metric, value in moments.items() if value is not None},
+    }
+
+
+def _json_float(value) -> Optional[float]:
+    return None if value is None or pd.isna(value) else float(value)
+
+
+def compare_golden(name: str, actual: dict, golden: dict, rtol: float = 1e-7, atol: float = 1e-9) -> list:
+    """Devuelve la lista de diferencias con los valores de referencia (vacía si coincide)."""
+    errors = []
+
+    def check(key, a, g):
+        if a is None or g is None:
+            if a is not g:
+                errors.append(f"{name}: {key} = {a} (esperado {g})")
+        elif not np.isclose(a, g, rtol=rtol, atol=atol):
+            errors.append(f"{name}: {key} = {a!r} (esperado {g!r})")
+
+    for key in ('window_rows', 'window_start', 'offset', 'angle_sum'):
+        check(key, actual[key], golden.get(key))
+    for group in ('metrics', 'moments'):
+        for key, value in golden.get(group, {}).items():
+            check(f"{group}[{key}]", actual[group].get(key), value)
+
+    return errors
+
+
+def run_cases(rows, repeat: int):
+    """Corre todos los casos. Devuelve `{caso: (resumen, tiempos)}` y los errores de series."""
+    cases = {}
+    errors = []
+    offsets = {}
+
+    fixtures = {fixture.name: load_fixture(fixture) for fixture in FIXTURES}
+    for fixture in FIXTURES:
+        offset = offsets.get(fixture.session)
+        angles, results, offset, window, timings = run_stages(fixtures[fixture.name], fixture.cropped,
+                                                              offset, repeat)
+        offsets[fixture.name] = offset
+        cases[fixture.name] = (summarize(angles, results, offset, window), timings)
+
+        if fixture.angles_path:
+            reference = pd.read_csv(os.path.join(ROOT, fixture.angles_path))['hip_angle'].to_numpy()
+            if len(reference) != len(angles) or not np.allclose(angles.to_numpy(), reference, atol=1e-9):
+                errors.append(f"{fixture.name}: la serie de ángulos no coincide con {fixture.angles_path}")
+
+    # Ida y vuelta por la representación compacta: mismos valores de referencia que sample_3
+    sample = fixtures['sample_3']
+    compact = CompactTrajectory.from_dataframe(sample, fps=1 / sample['time'].diff().median())
+    angles, results, offset, window, timings = run_stages(compact.to_dataframe(), False, None, repeat)
+    summary = summarize(angles, results, offset, window)
+    errors += compare_golden('sample_3_compacto', summary, load_json(GOLDEN_PATH).get('sample_3', summary))
+
+    for n_rows in rows:
+        name = f"sample_3_x{n_rows}"
+        df = upscale_detections(fixtures['sample_3'], n_rows)
+        angles, results, offset, window, timings = run_stages(df, False, None, repeat)
+        cases[name] = (summarize(angles, results, offset, window), timings)
+
+    return cases, errors
+
+
+def load_json(path: str) -> dict:
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_json(path: str, data: dict):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+        f.write('\n')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, nargs='*', default=DEFAULT_ROWS,
+                        help="Tamaños de las versiones ampliadas de sample_3")
+    parser.add_argument('--repeat', type=int, default=3, help="Repeticiones por caso (se toma el mejor tiempo)")
+    parser.add_argument('--tolerance', type=float, default=0.5,
+                        help="Regresión de tiempo permitida por etapa respecto de la línea base (0.5 = +50%%)")
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--save-baseline', action='store_true', help="Guarda los tiempos como nueva línea base")
+    parser.add_argument('--update-golden', action='store_true', help="Reescribe los valores de referencia")
+    args = parser.parse_args()
+
+    cases, errors = run_cases(args.rows, args.repeat)
+
+    golden = load_json(GOLDEN_PATH)
+    baseline = load_json(args.baseline)
+    regressions = []
+
+    for name, (summary, timings) in cases.items():
+        print(f"\n{name} ({summary['window_rows']} filas en la ventana, "
+              f"máx {summary['metrics']['Ángulo máximo']:.2f}°)")
+        for stage, seconds in timings.items():
+            reference = baseline.get(name, {}).get(stage)
+            line = f"  {stage:<24} {seconds * 1000:10.2f} ms"
+            if reference:
+                change = seconds / reference - 1
+                line += f"  ({change:+.0%} vs. línea base)"
+                if change > args.tolerance and seconds - reference > MIN_REGRESSION_SECONDS:
+                    regressions.append(f"{name}: {stage} {seconds * 1000:.1f} ms "
+                                       f"(línea base {reference * 1000:.1f} ms)")
+            print(line)
+
+        if not args.update_golden:
+            if name in golden:
+                errors += compare_golden(name, summary, golden[name])
+            else:
+                print(f"  (sin valores de referencia para {name})")
+
+    if args.update_golden:
+        save_json(GOLDEN_PATH, {**golden, **{name: summary for name, (summary, _) in cases.items()}})
+        print(f"\nValores de referencia guardados en {GOLDEN_PATH}")
+    if args.save_baseline:
+        save_json(args.baseline, {**baseline, **{name: timings for name, (_, timings) in cases.items()}})
+        print(f"Línea base guardada en {args.baseline}")
+
+    if errors:
+        sys.exit("Resultados distintos a los de referencia:\n" + "\n".join(errors))
+    if regressions and not args.save_baseline:
+        sys.exit(f"Etapas más lentas que la línea base (tolerancia {args.tolerance:.0%}):\n" + "\n".join(regressions))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""
+Benchmark del auto-ajuste de parámetros del detector (`AutoTunedDetector`).
+
+Para cada video corre la detección completa con el `ArucoDetector` de parámetros por
+defecto y con el auto-ajustado, y reporta el tiempo de detección por frame, los
+contornos candidatos que llegan a analizarse por frame, las detecciones con respaldo
+(parámetros por defecto) y los reajustes, la mayor diferencia de centroides y la
+diferencia en el ángulo máximo del análisis.
+
+Sin videos, genera uno sintético (`benchmarks.synthetic.synthetic_video`), en el que la
+tibia sale de cuadro durante la prueba: ejercita la búsqueda periódica de respaldo.
+
+Uso:
+    python -m benchmarks.autotune
+    python -m benchmarks.autotune videos/*.mp4 --frame-step 3
+"""
+import argparse
+import os
+import tempfile
+import time
+
+os.environ.setdefault('MPLBACKEND', 'Agg')
+
+import numpy as np
+
+from core.aruco.aruco_utils import aruco_process
+from core.aruco.detectors import AutoTunedDetector
+from core.marker_layout import get_marker_layout
+from core.tools.profiling import new_frame_stats
+from benchmarks.detection import max_angle
+from benchmarks.synthetic import synthetic_video
+
+
+def timed_detection(video_path: str, detector: AutoTunedDetector, frame_step: int, marker_ids):
+    stats = new_frame_stats()
+    start = time.perf_counter()
+    df = aruco_process(video_path, detector.dictionary_name, frame_step=frame_step, frame_stats=stats,
+                       detector=detector, marker_ids=marker_ids)
+    return df, time.perf_counter() - start, stats
+
+
+def benchmark_video(video_path: str, frame_step: int, marker_ids):
+    print(f"\n{os.path.basename(video_path)}")
+    print(f"  {'detector':>12}  {'total':>7}  {'ms/frame':>8}  {'candidatos':>10}  {'respaldos':>9}  "
+          f"{'reajustes':>9}  {'desvío máx':>10}  {'Δ ángulo':>8}")
+
+    reference = None
+    # tune_frames=None: mismos parámetros por defecto, sin ajuste (referencia)
+    for label, detector in (('por defecto', AutoTunedDetector('DICT_6X6_250', tune_frames=None)),
+                            ('auto', AutoTunedDetector('DICT_6X6_250'))):
+        df, seconds, stats = timed_detection(video_path, detector, frame_step, marker_ids)
+        ms_per_frame = 1000 * stats['detect_seconds'] / max(stats['frames_detected'], 1)
+        candidates = detector.stats['candidates'] / max(detector.stats['frames'], 1)
+
+        if reference is None:
+            reference, reference_angle = df, max_angle(df)
+            deviation, angle_diff = 0.0, 0.0
+        else:
+            columns = [col for col in reference.columns if col.startswith('id_') and col in df.columns]
+            difference = np.abs(df[columns].to_numpy() - reference[columns].to_numpy())
+            deviation = np.nanmax(difference) if np.isfinite(difference).any() else 0.0
+            angle_diff = abs(max_angle(df) - reference_angle)
+
+        print(f"  {label:>12}  {seconds:6.2f}s  {ms_per_frame:8.2f}  {candidates:10.1f}  "
+              f"{detector.stats['fallbacks']:9d}  {detector.stats['retunes']:9d}  {deviation:8.2f}px  "
+              f"{angle_diff:7.3f}°")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('videos', nargs='*', help="Videos a medir (por defecto, uno sintético)")
+    parser.add_argument('--frame-step', type=int, default=3)
+    parser.add_argument('--layout', default='estandar', help="Perfil de marcadores (sus IDs se esperan)")
+    args = parser.parse_args()
+
+    marker_ids = get_marker_layout(args.layout).marker_ids
+    with tempfile.TemporaryDirectory(prefix='trendetect_bench_') as directory:
+        videos = args.videos
+        if not videos:
+            print("Generando video sintético...")
+            videos = [synthetic_video(os.path.join(directory, 'sintetico.mp4'))]
+
+        for video_path in videos:
+            benchmark_video(video_path, args.frame_step, marker_ids)
+
+
+if __name__ == '__main__':
+    main()
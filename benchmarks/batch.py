@@ -0,0 +1,87 @@
+"""
+Prueba de carga del procesamiento por lotes (`core.batch`) en una sola máquina.
+
+Encola `--videos` copias de un video (cada una en su carpeta, como sesiones distintas
+del archivo) y lanza `--nodes` procesos `cli.py batch work` que hacen de nodos. Reporta
+el tiempo total, el ritmo y los trabajos de cada nodo, y verifica que todos terminen con
+una carpeta de sesión por video. La caída de un nodo a mitad de un video (lease vencido,
+trabajo retomado, publicación repetida) se prueba en `tests/test_batch.py`.
+
+Uso:
+    python -m benchmarks.batch
+    python -m benchmarks.batch --videos 12 --nodes 3
+    python -m benchmarks.batch --video videos/sesion.mp4
+"""
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+os.environ.setdefault('MPLBACKEND', 'Agg')
+
+from core.batch import BatchQueue
+from core.jobs import JobStatus
+from benchmarks.synthetic import synthetic_video
+
+
+CLI_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'cli.py')
+
+
+def start_node(queue_path: str, lease: float, poll: float) -> subprocess.Popen:
+    return subprocess.Popen([sys.executable, CLI_PATH, 'batch', 'work', queue_path, '--lease', str(lease),
+                             '--poll', str(poll)], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--video', default=None, help="Video a copiar (default: uno sintético)")
+    parser.add_argument('--videos', type=int, default=6, help="Videos a encolar")
+    parser.add_argument('--nodes', type=int, default=3, help="Procesos trabajadores")
+    parser.add_argument('--lease', type=float, default=30.0, help="Lease de los trabajos (segundos)")
+    parser.add_argument('--frames', type=int, default=300, help="Frames del video sintético")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix='trendetect_batch_') as directory:
+        source = args.video or synthetic_video(os.path.join(directory, 'sintetico.mp4'), n_frames=args.frames)
+        videos = []
+        for i in range(args.videos):
+            os.makedirs(os.path.join(directory, 'archivo', f"paciente_{i:03d}"))
+            videos.append(os.path.join(directory, 'archivo', f"paciente_{i:03d}", 'prueba.mp4'))
+            shutil.copy(source, videos[-1])
+
+        queue_path = os.path.join(directory, 'compartido', 'cola.db')
+        results_dir = os.path.join(directory, 'compartido', 'resultados')
+        queue = BatchQueue.create(queue_path, results_dir)
+        queue.add(videos)
+
+        start = time.perf_counter()
+        nodes = [start_node(queue_path, args.lease, poll=0.5) for _ in range(args.nodes)]
+        while True:
+            summary = queue.summary()
+            counts = summary['counts']
+            print(f"{time.perf_counter() - start:6.1f} s  {summary['progress']:6.1%}  "
+                  + "  ".join(f"{status} {count}" for status, count in counts.items() if count))
+            if all(node.poll() is not None for node in nodes):
+                break
+            time.sleep(1.0)
+        elapsed = time.perf_counter() - start
+
+        summary = queue.summary()
+        sessions = [name for name in os.listdir(results_dir) if not name.startswith('.')]
+        leftovers = [name for name in os.listdir(results_dir) if name.startswith('.')]
+
+    done = summary['counts'][JobStatus.DONE.value]
+    print(f"\n{done}/{args.videos} terminados en {elapsed:.1f} s con {args.nodes} nodos "
+          f"({done / elapsed * 60:.1f} por minuto)")
+    print(f"Carpetas de sesión: {len(sessions)} (temporales sin publicar: {len(leftovers)})")
+    print(f"Trabajos por nodo: {summary['done_per_worker']}")
+
+    ok = done == args.videos and len(sessions) == args.videos and not leftovers
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
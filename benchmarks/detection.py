@@ -0,0 +1,93 @@
+"""
+Benchmark de detección: compuerta de movimiento de `aruco_process`.
+
+Para cada video corre la detección completa y la detección con la compuerta de
+movimiento en cada umbral, y reporta el tiempo, la aceleración, los frames que
+reusaron la detección anterior, la mayor diferencia de centroides respecto de la
+detección completa y la diferencia en el ángulo máximo del análisis.
+
+Sin videos, genera uno sintético (`benchmarks.synthetic.synthetic_video`). Para reportar
+la aceleración en sesiones reales, pasar las grabaciones:
+
+Uso:
+    python -m benchmarks.detection
+    python -m benchmarks.detection videos/*.mp4 --thresholds 1 2 4 --frame-step 3
+"""
+import argparse
+import os
+import tempfile
+import time
+
+os.environ.setdefault('MPLBACKEND', 'Agg')
+
+import numpy as np
+
+from core.aruco.aruco_utils import aruco_process
+from core.tools.profiling import new_frame_stats
+from core.trendetect import TrendetecT
+from benchmarks.synthetic import synthetic_video
+
+
+DEFAULT_THRESHOLDS = [1.0, 2.0, 4.0]
+
+
+def timed_detection(video_path: str, frame_step: int, motion_threshold=None):
+    stats = new_frame_stats()
+    start = time.perf_counter()
+    df = aruco_process(video_path, 'DICT_6X6_250', frame_step=frame_step, frame_stats=stats,
+                       motion_threshold=motion_threshold)
+    return df, time.perf_counter() - start, stats
+
+
+def max_angle(df) -> float:
+    """Ángulo máximo del análisis completo, o NaN si la detección no alcanza para analizar."""
+    try:
+        results_df, _ = TrendetecT().analyze_detections(df.drop(columns='gated', errors='ignore'))
+    except (ValueError, IndexError):
+        return np.nan
+    return results_df.loc[results_df['Métrica'] == 'Ángulo máximo', 'Valor'].iloc[0]
+
+
+def benchmark_video(video_path: str, thresholds, frame_step: int):
+    print(f"\n{os.path.basename(video_path)}")
+    reference, reference_seconds, stats = timed_detection(video_path, frame_step)
+    reference_angle = max_angle(reference)
+    print(f"  {'completa':>10}  {reference_seconds:7.2f} s  {stats['frames_detected']:5d} frames detectados"
+          f"  ángulo máx {reference_angle:.2f}°")
+
+    columns = [col for col in reference.columns if col.startswith('id_')]
+    for threshold in thresholds:
+        gated, seconds, stats = timed_detection(video_path, frame_step, threshold)
+        sampled = stats['frames_detected'] + stats['frames_gated']
+
+        common = [col for col in columns if col in gated.columns]
+        deviation = np.abs(gated[common].to_numpy() - reference[common].to_numpy())
+        deviation = np.nanmax(deviation) if np.isfinite(deviation).any() else 0.0
+        presence = (gated[common].isna() == reference[common].isna()).all().all() and len(common) == len(columns)
+        angle_diff = abs(max_angle(gated) - reference_angle)
+
+        print(f"  {threshold:>10.2f}  {seconds:7.2f} s  x{reference_seconds / seconds:4.2f}  "
+              f"{stats['frames_gated']:5d}/{sampled} reusados  desvío máx {deviation:6.2f} px  "
+              f"{'mismas' if presence else 'distintas'} detecciones  Δ ángulo máx {angle_diff:.3f}°")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('videos', nargs='*', help="Videos a medir (por defecto, uno sintético)")
+    parser.add_argument('--thresholds', type=float, nargs='+', default=DEFAULT_THRESHOLDS,
+                        help="Umbrales de la compuerta de movimiento (niveles de gris)")
+    parser.add_argument('--frame-step', type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix='trendetect_bench_') as directory:
+        videos = args.videos
+        if not videos:
+            print("Generando video sintético...")
+            videos = [synthetic_video(os.path.join(directory, 'sintetico.mp4'))]
+
+        for video_path in videos:
+            benchmark_video(video_path, args.thresholds, args.frame_step)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,166 @@
+"""
+Prueba de resistencia de memoria de la GUI: cientos de trabajos en la ventana principal.
+
+Procesa un video una vez y, en una instancia de Qt sin pantalla (plataforma `offscreen`),
+hace terminar `--sessions` trabajos de la cola en la `MainWindow` (`on_job_result`), como
+en un día de consultorio. Cada trabajo tiene su propio pipeline con una copia de lo
+procesado (trayectoria, ventana de prueba, índice de frames con miniaturas) y una figura
+nueva, como si fuera otro video. Uno de cada `--active-every` es el trabajo activo: recibe
+antes `--partials` resultados aproximados (`on_job_partial`) y se muestra al terminar.
+Cada `--revisit-every` trabajos se vuelve a mostrar uno viejo (`show_job`, que lo recarga)
+y se abre la sesión guardada con "Cargar resultados" (`load_results`).
+
+Mide el RSS del proceso (`/proc/self/statm`) cada `--every` trabajos, le descuenta lo que
+ocupa la caché de sesiones (acotada a `--cache-mb`) y, pasado el calentamiento, exige que
+crezca a lo sumo `--tolerance-kb` KB por trabajo: lo que queda de cada trabajo terminado
+es su fila en la cola (~0.1 MB de widgets de Qt), no su pipeline (~3 MB con el video
+sintético). Al final cuenta los trabajos que conservan su pipeline (sólo puede quedar el
+que está a la vista) y las figuras vivas (la visible más las de las sesiones en la caché).
+Si el RSS crece o quedan datos retenidos, termina con código 1.
+
+Uso:
+    python -m benchmarks.gui_soak
+    python -m benchmarks.gui_soak --sessions 500 --partials 3
+    python -m benchmarks.gui_soak --video videos/sesion.mp4
+"""
+import argparse
+import copy
+import gc
+import os
+import sys
+import tempfile
+import time
+
+os.environ.setdefault('MPLBACKEND', 'Agg')
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+import numpy as np
+from matplotlib.figure import Figure
+from PySide6.QtCore import QCoreApplication, QEvent
+from PySide6.QtWidgets import QApplication
+
+import gui
+from core.jobs import ProcessingJob
+from core.trendetect import CACHED_STATE, TrendetecT
+from gui_modules.right_panel import MplCanvas
+from benchmarks.synthetic import synthetic_video
+
+
+PAGE_SIZE = os.sysconf('SC_PAGE_SIZE')
+
+
+def rss_mb() -> float:
+    # Segundo campo de statm: páginas residentes
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * PAGE_SIZE / 2**20
+
+
+def pump_events(app: QApplication):
+    """Pinta y ejecuta los `deleteLater` pendientes, como una vuelta del bucle de eventos."""
+    app.processEvents()
+    QCoreApplication.sendPostedEvents(None, QEvent.Type.DeferredDelete)
+
+
+def live_objects(kind) -> int:
+    return sum(1 for obj in gc.get_objects() if isinstance(obj, kind))
+
+
+def finished_job(window: gui.MainWindow, source: TrendetecT, video_path: str) -> ProcessingJob:
+    """Trabajo de la cola con su propio pipeline: una copia de `source`, como otro video."""
+    pipeline = window.new_pipeline()
+    for name in CACHED_STATE:
+        setattr(pipeline, name, copy.deepcopy(getattr(source, name)))
+    pipeline.video_path = video_path
+
+    job = ProcessingJob(video_path=video_path, pipeline=pipeline)
+    window.jobs[job.job_id] = job
+    window.job_queue_panel.add_job(job)
+    return job
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--video', default=None, help="Video de la sesión (default: uno sintético)")
+    parser.add_argument('--layout', default='estandar', help="Perfil de marcadores")
+    parser.add_argument('--sessions', type=int, default=200, help="Trabajos que terminan en la ventana")
+    parser.add_argument('--partials', type=int, default=2, help="Resultados aproximados antes de cada final activo")
+    parser.add_argument('--active-every', type=int, default=3, help="Uno de cada N trabajos es el activo")
+    parser.add_argument('--revisit-every', type=int, default=10, help="Trabajos entre cada vuelta a uno viejo")
+    parser.add_argument('--cache-mb', type=float, default=32.0, help="Tope de la caché de sesiones de la ventana")
+    parser.add_argument('--warmup', type=int, default=30, help="Trabajos antes de tomar el RSS de referencia")
+    parser.add_argument('--every', type=int, default=25, help="Trabajos entre mediciones")
+    parser.add_argument('--tolerance-kb', type=float, default=256.0,
+                        help="Crecimiento admitido del RSS por trabajo, sin la caché (KB)")
+    args = parser.parse_args()
+
+    app = QApplication(sys.argv[:1])
+    rng = np.random.default_rng(0)
+
+    with tempfile.TemporaryDirectory(prefix='trendetect_soak_') as directory:
+        video_path = args.video or synthetic_video(os.path.join(directory, 'sintetico.mp4'), n_frames=300)
+        source = TrendetecT(layout=args.layout)
+        source.process_video(video_path)
+        session_path = os.path.join(directory, 'sesion.npz')
+        source.save_results(session_path)
+        # "Cargar resultados" abre siempre la sesión guardada
+        gui.QFileDialog.getOpenFileName = lambda *_, **__: (session_path, '')
+
+        window = gui.MainWindow()
+        window.session_cache.max_bytes = int(args.cache_mb * 2**20)
+        window.resize(1200, 800)
+        window.show()
+
+        gc.collect()
+        samples = []
+        start = time.perf_counter()
+        for i in range(1, args.sessions + 1):
+            job = finished_job(window, source, video_path)
+            results = [job.pipeline.generate_results_table(job.pipeline.angle_series),
+                       job.pipeline.generate_angle_plot(job.pipeline.angle_series)]
+
+            if i % args.active_every == 0:
+                window.active_job_id = job.job_id
+                for step in range(args.partials, 0, -1):
+                    # Aproximación descartable: la misma curva con menos muestras
+                    series = job.pipeline.angle_series.iloc[::2 ** step]
+                    window.on_job_partial(job.job_id, [job.pipeline.generate_results_table(series),
+                                                       job.pipeline.generate_angle_plot(series)])
+                    pump_events(app)
+            window.on_job_result(job.job_id, results)
+            pump_events(app)
+            del job, results
+
+            if i % args.revisit_every == 0:
+                old = list(window.jobs)[int(rng.integers(len(window.jobs)))]
+                window.show_job(old)
+                pump_events(app)
+                window.load_results()
+                pump_events(app)
+
+            if i % args.every == 0 or i == args.warmup:
+                samples.append((i, rss_mb(), window.session_cache.nbytes / 2**20))
+                print(f"{i:5d} trabajos  RSS {samples[-1][1]:7.1f} MB  caché {samples[-1][2]:5.1f} MB")
+        elapsed = time.perf_counter() - start
+
+        gc.collect()
+        retained = sum(job.pipeline is not None for job in window.jobs.values())
+        figures, canvases = live_objects(Figure), live_objects(MplCanvas)
+        cached = len(window.session_cache)
+
+    steady = [sample for sample in samples if sample[0] >= args.warmup]
+    growth = steady[-1][1] - steady[0][1]
+    sessions, rss, cache = np.array(steady).T
+    slope = np.polyfit(sessions, rss - cache, 1)[0] * 1024 if len(steady) > 1 else 0.0
+
+    print(f"\n{args.sessions} trabajos ({args.partials} aproximados en los activos) en {elapsed:.1f} s")
+    print(f"RSS después del calentamiento: {steady[0][1]:.1f} -> {steady[-1][1]:.1f} MB ({growth:+.1f} MB; "
+          f"sin la caché de sesiones, {slope:+.1f} KB por trabajo)")
+    print(f"Trabajos con su pipeline en memoria: {retained} (se espera a lo sumo 1, el que está a la vista)")
+    print(f"Figuras vivas al final: {figures} (a lo sumo {1 + cached}: la visible y {cached} en la caché); "
+          f"lienzos: {canvases}")
+    ok = slope <= args.tolerance_kb and retained <= 1 and figures <= 1 + cached and canvases <= 1
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
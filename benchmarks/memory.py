@@ -0,0 +1,130 @@
+"""
+Benchmark de memoria: procesamiento en memoria vs. por bloques en disco.
+
+Cada combinación (modo, cantidad de frames) corre en un subproceso propio y reporta
+el pico de RSS por encima del RSS base después de importar el pipeline. En modo por
+bloques el pico debe mantenerse plano aunque la grabación crezca. Los resultados de los
+dos modos son idénticos salvo por el float32 del almacén (menos de 2e-4° con estos
+centroides sintéticos en float64); la equivalencia exacta se prueba en `tests/test_trendetect.py`.
+
+El modo `video` procesa de punta a punta videos sintéticos de `--frames` frames (chicos,
+para que la prueba dure poco) con `TrendetecT(chunk_size=...)`: pasa por `aruco_process`
+con el armado del índice de frames, que tampoco debe hacer crecer el pico.
+
+Uso:
+    python -m benchmarks.memory
+    python -m benchmarks.memory --rows 10000 100000 1000000 --modes bloques
+    python -m benchmarks.memory --modes video --frames 2000 8000 20000
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+
+DEFAULT_ROWS = [10_000, 100_000, 300_000]
+DEFAULT_FRAMES = [2_000, 8_000]
+DEFAULT_BLOCK_ROWS = 4096
+# Videos sintéticos del modo `video`: chicos para que generarlos y decodificarlos sea rápido
+VIDEO_SIZE = (360, 640)
+VIDEO_MARKER_PX = 45
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss está en KB en Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_child(mode: str, n_rows: int, block_rows: int, video_path: str = None) -> dict:
+    """Corre un caso dentro del subproceso actual y devuelve sus métricas."""
+    os.environ.setdefault('MPLBACKEND', 'Agg')
+
+    import pandas as pd
+    from core.trendetect import TrendetecT
+    from core.tools.trajectory_store import TrajectoryStore
+    from benchmarks.synthetic import synthetic_detections
+
+    base_rss = peak_rss_mb()
+    start = time.perf_counter()
+
+    if mode == 'memoria':
+        # Igual que aruco_process: una lista de filas que se convierte en DataFrame
+        rows = []
+        for _, time_, ids, centers in synthetic_detections(n_rows):
+            row = {'time': time_}
+            for id_, (x, y) in zip(ids, centers):
+                row[f"id_{id_}_x"] = x
+                row[f"id_{id_}_y"] = y
+            rows.append(row)
+        df = pd.DataFrame(rows)
+        del rows
+        TrendetecT().analyze_detections(df)
+    elif mode == 'video':
+        with tempfile.TemporaryDirectory(prefix='trendetect_bench_') as directory:
+            pipeline = TrendetecT(layout='estandar', chunk_size=block_rows, spill_dir=directory, index_dir=directory)
+            pipeline.process_video(video_path)
+    else:
+        with tempfile.TemporaryDirectory(prefix='trendetect_bench_') as directory:
+            store = TrajectoryStore(directory, block_rows=block_rows, fps=30.0)
+            for frame_index, _, ids, centers in synthetic_detections(n_rows):
+                store.append(frame_index, ids, centers)
+            TrendetecT().analyze_store(store.close())
+
+    return {
+        'mode': mode,
+        'rows': n_rows,
+        'peak_mb': peak_rss_mb() - base_rss,
+        'seconds': time.perf_counter() - start,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, nargs='+', default=DEFAULT_ROWS)
+    parser.add_argument('--modes', nargs='+', default=['memoria', 'bloques', 'video'],
+                        choices=['memoria', 'bloques', 'video'])
+    parser.add_argument('--frames', type=int, nargs='+', default=DEFAULT_FRAMES, help="Frames de los videos (modo video)")
+    parser.add_argument('--block-rows', type=int, default=DEFAULT_BLOCK_ROWS)
+    parser.add_argument('--tolerance-mb', type=float, default=25.0,
+                        help="Crecimiento máximo permitido del pico en modo por bloques")
+    parser.add_argument('--child', nargs=2, metavar=('MODE', 'ROWS'), help=argparse.SUPPRESS)
+    parser.add_argument('--video', default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_child(args.child[0], int(args.child[1]), args.block_rows, args.video)))
+        return
+
+    results = []
+    with tempfile.TemporaryDirectory(prefix='trendetect_bench_') as directory:
+        for mode in args.modes:
+            for n_rows in (args.frames if mode == 'video' else args.rows):
+                command = [sys.executable, '-m', 'benchmarks.memory', '--child', mode, str(n_rows),
+                           '--block-rows', str(args.block_rows)]
+                if mode == 'video':
+                    # El video se genera acá, para que no cuente en el pico del subproceso
+                    from benchmarks.synthetic import synthetic_video
+                    video_path = synthetic_video(os.path.join(directory, f"sintetico_{n_rows}.mp4"), n_frames=n_rows,
+                                                 size=VIDEO_SIZE, marker_px=VIDEO_MARKER_PX)
+                    command += ['--video', video_path]
+                output = subprocess.run(command, check=True, capture_output=True, text=True).stdout
+                result = json.loads(output.strip().splitlines()[-1])
+                results.append(result)
+                print(f"{result['mode']:>8}  {result['rows']:>9} {'frames' if mode == 'video' else 'filas':6}  "
+                      f"pico {result['peak_mb']:8.1f} MB  {result['seconds']:7.2f} s")
+
+    for mode, label in (('bloques', 'por bloques'), ('video', 'del video por bloques')):
+        cases = [r for r in results if r['mode'] == mode]
+        if len(cases) > 1:
+            growth = max(r['peak_mb'] for r in cases) - min(r['peak_mb'] for r in cases)
+            print(f"Crecimiento del pico {label}: {growth:.1f} MB")
+            if growth > args.tolerance_mb:
+                sys.exit(f"El pico de memoria {label} crece {growth:.1f} MB (> {args.tolerance_mb} MB)")
+
+
+if __name__ == '__main__':
+    main()
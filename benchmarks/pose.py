@@ -0,0 +1,123 @@
+"""
+Benchmark del modo 3D: oblicuidad en el plano frontal frente al ángulo 2D.
+
+Proyecta con `cv2.projectPoints` los dos marcadores de cadera de una pelvis que se
+inclina hasta `--tilt` grados en su plano frontal, vista por una cámara girada cada
+uno de los ángulos de `--yaws` alrededor de la vertical y con ruido gaussiano en las
+esquinas. Para cada giro reporta el error medio respecto de la inclinación real del
+ángulo 2D (pendiente de los centroides) y del 3D (`frontal_obliquity`), y el tiempo
+de la pose de la sesión completa.
+
+Con videos, corre además el pipeline en modo 3D y reporta qué fracción del tiempo de
+detección se lleva la pose y la diferencia entre las series 2D y 3D.
+
+Uso:
+    python -m benchmarks.pose
+    python -m benchmarks.pose --yaws 0 15 30 45 --noise 0.5
+    python -m benchmarks.pose videos/*.mp4 --camera celular_1080p
+"""
+import argparse
+import os
+import time
+
+os.environ.setdefault('MPLBACKEND', 'Agg')
+
+import cv2
+import numpy as np
+
+from core.camera_profile import CameraProfile
+from core.tools.marker_pose import frontal_obliquity
+from core.trendetect import TrendetecT
+
+
+DEFAULT_YAWS = [0.0, 20.0, 40.0]
+
+
+def projected_session(profile: CameraProfile, yaw: float, tilt: float, n_rows: int, noise: float,
+                      marker: float = 0.1, hip_width: float = 0.3, distance: float = 3.0, seed: int = 0):
+    """
+    Esquinas en portrait (como las entrega `aruco_process`) de la cadera base y la test.
+
+    Returns:
+        tuple: `(base_corners, test_corners, tilt_degrees)`, con (n_rows, 4, 2) esquinas.
+    """
+    rng = np.random.default_rng(seed)
+    height = profile.image_size[1]
+    tilts = tilt * np.sin(np.linspace(0, np.pi, n_rows))
+    yaw = np.radians(yaw)
+    rotate_yaw = np.array([[np.cos(yaw), 0, np.sin(yaw)], [0, 1, 0], [-np.sin(yaw), 0, np.cos(yaw)]])
+
+    # Marcador en su plano, orden de ArUco en la imagen (y hacia abajo)
+    square = marker / 2 * np.array([[-1, -1, 0], [1, -1, 0], [1, 1, 0], [-1, 1, 0]])
+    corners = {}
+    for name, x in (('base', hip_width / 2), ('test', -hip_width / 2)):
+        rows = []
+        for angle in np.radians(tilts):
+            rotate_tilt = np.array([[np.cos(angle), -np.sin(angle), 0], [np.sin(angle), np.cos(angle), 0], [0, 0, 1]])
+            points = (rotate_yaw @ rotate_tilt @ (square + [x, 0, 0]).T).T + [0, 0, distance]
+            # Cámara en portrait -> orientación original del video: x = y', y = -x'
+            raw = np.stack([points[:, 1], -points[:, 0], points[:, 2]], axis=1)
+            image, _ = cv2.projectPoints(raw, np.zeros(3), np.zeros(3), profile.K, profile.distortion)
+            image = image.reshape(4, 2)
+            rows.append(np.stack([(height - 1) - image[:, 1], image[:, 0]], axis=1))
+        corners[name] = np.array(rows) + rng.normal(0, noise, (n_rows, 4, 2))
+    return corners['base'], corners['test'], tilts
+
+
+def angles_2d(base: np.ndarray, test: np.ndarray) -> np.ndarray:
+    delta = test.mean(axis=1) - base.mean(axis=1)
+    return np.degrees(np.arctan(delta[:, 1] / delta[:, 0]))
+
+
+def benchmark_projection(profile: CameraProfile, yaws, tilt: float, n_rows: int, noise: float):
+    print(f"\nProyección sintética: inclinación máx {tilt:.1f}°, {n_rows} filas, ruido {noise:.2f} px")
+    print(f"  {'giro':>6}  {'error 2D':>9}  {'error 3D':>9}  {'máx 2D':>7}  {'máx 3D':>7}  {'pose':>8}")
+    for yaw in yaws:
+        base, test, truth = projected_session(profile, yaw, tilt, n_rows, noise)
+
+        start = time.perf_counter()
+        pose = frontal_obliquity(base, test, profile)
+        seconds = time.perf_counter() - start
+
+        # Como en el pipeline: se resta la postura inicial
+        flat = angles_2d(base, test)
+        flat, pose = flat - flat[0], pose - pose[0]
+        print(f"  {yaw:5.0f}°  {np.abs(flat - truth).mean():8.3f}°  {np.abs(pose - truth).mean():8.3f}°  "
+              f"{flat.max():6.2f}°  {pose.max():6.2f}°  {seconds * 1000:6.2f} ms")
+
+
+def benchmark_video(video_path: str, camera: str):
+    pipeline = TrendetecT(camera=camera)
+    start = time.perf_counter()
+    df = pipeline.detect_data(video_path, frame_step=3)
+    detect_seconds = time.perf_counter() - start
+
+    pipeline.analyze_detections(df)
+    start = time.perf_counter()
+    pipeline.compute_pose_angles(pipeline.df)
+    pose_seconds = time.perf_counter() - start
+
+    comparison = pipeline.pose_comparison
+    print(f"\n{os.path.basename(video_path)}: pose {pose_seconds * 1000:.1f} ms "
+          f"({pose_seconds / detect_seconds:.2%} de la detección), 2D vs 3D: diferencia media {comparison['mean_abs_diff']:.2f}°, "
+          f"máxima {comparison['max_abs_diff']:.2f}°, máx {comparison['max_2d']:.2f}° / {comparison['max_3d']:.2f}°")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('videos', nargs='*', help="Videos a procesar en modo 3D (opcional)")
+    parser.add_argument('--camera', default='celular_720p', help="Perfil de cámara de los videos")
+    parser.add_argument('--yaws', type=float, nargs='+', default=DEFAULT_YAWS,
+                        help="Giros de la cámara alrededor de la vertical (grados)")
+    parser.add_argument('--tilt', type=float, default=8.0, help="Inclinación pélvica máxima (grados)")
+    parser.add_argument('--rows', type=int, default=300, help="Filas de la sesión sintética")
+    parser.add_argument('--noise', type=float, default=0.3, help="Ruido de las esquinas (px)")
+    args = parser.parse_args()
+
+    benchmark_projection(CameraProfile.approximate(1280, 720), args.yaws, args.tilt, args.rows, args.noise)
+    for video_path in args.videos:
+        benchmark_video(video_path, args.camera)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""
+Benchmark de la detección progresiva (`TrendetecT.detect_data_progressive`).
+
+Para cada video procesa una vez de corrido (`process_video`) y otra por pasadas, y
+reporta el tiempo hasta el primer resultado aproximado, el de cada pasada siguiente y
+el total, con la diferencia de cada resultado aproximado contra el exacto (ángulo
+máximo, promedio y su momento). El resultado final de la detección progresiva tiene
+que ser idéntico al de corrido; si no, termina con código 1.
+
+Sin videos, genera uno sintético (`benchmarks.synthetic.synthetic_video`).
+
+Uso:
+    python -m benchmarks.progressive
+    python -m benchmarks.progressive videos/*.mp4 --levels 4
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+os.environ.setdefault('MPLBACKEND', 'Agg')
+
+from core.trendetect import PROGRESSIVE_LEVELS, TrendetecT, progressive_passes
+from benchmarks.synthetic import synthetic_video
+
+
+class TimedResults:
+    """Sustituto de la señal `partial`: guarda cada resultado aproximado con su tiempo y sus filas."""
+
+    def __init__(self, pipeline: TrendetecT):
+        self.pipeline = pipeline
+        self.start = time.perf_counter()
+        self.items = []
+
+    def emit(self, results):
+        self.items.append((time.perf_counter() - self.start, self.pipeline.trajectory.n_rows, results))
+
+
+def metric(results, name: str, column: str = 'Valor') -> float:
+    table = results[0]
+    return float(table.loc[table['Métrica'] == name, column].iloc[0])
+
+
+def benchmark_video(video_path: str, layout: str, levels: int) -> bool:
+    print(f"\n{os.path.basename(video_path)}")
+
+    exact = TrendetecT(layout=layout)
+    start = time.perf_counter()
+    expected = exact.process_video(video_path)
+    full_seconds = time.perf_counter() - start
+
+    progressive = TrendetecT(layout=layout)
+    partials = TimedResults(progressive)
+    # Lo mismo que `process_video(video_path, partial_callback=...)`, con `levels` elegible
+    df = progressive.detect_data_progressive(video_path, 3, partials, levels=levels)
+    results = progressive.analyze_detections(df)
+    total_seconds = time.perf_counter() - partials.start
+
+    n_passes = len(progressive_passes(3, levels))
+    print(f"  {'frames':>7}  {'tiempo':>7}  {'Δ máximo':>8}  {'Δ promedio':>10}  {'Δ momento':>9}")
+    for seconds, rows, partial in partials.items + [(total_seconds, progressive.trajectory.n_rows, results)]:
+        print(f"  {rows:7d}  {seconds:6.2f}s  "
+              f"{abs(metric(partial, 'Ángulo máximo') - metric(expected, 'Ángulo máximo')):7.3f}°  "
+              f"{abs(metric(partial, 'Ángulo promedio') - metric(expected, 'Ángulo promedio')):9.3f}°  "
+              f"{abs(metric(partial, 'Ángulo máximo', 'Momento') - metric(expected, 'Ángulo máximo', 'Momento')):8.2f}s")
+
+    identical = (results[0].equals(expected[0]) and progressive.angle_series.equals(exact.angle_series)
+                 and progressive.df.equals(exact.df))
+    print(f"  de corrido {full_seconds:.2f} s; progresivo {total_seconds:.2f} s en {n_passes} pasadas "
+          f"({len(partials.items)} resultados aproximados); final idéntico: {'sí' if identical else 'no'}")
+    return identical
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('videos', nargs='*', help="Videos a medir (por defecto, uno sintético)")
+    parser.add_argument('--layout', default='estandar', help="Perfil de marcadores")
+    parser.add_argument('--levels', type=int, default=PROGRESSIVE_LEVELS,
+                        help="La primera pasada detecta un frame de cada 2**levels de la completa")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix='trendetect_bench_') as directory:
+        videos = args.videos
+        if not videos:
+            print("Generando video sintético...")
+            videos = [synthetic_video(os.path.join(directory, 'sintetico.mp4'))]
+
+        ok = all([benchmark_video(video_path, args.layout, args.levels) for video_path in videos])
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
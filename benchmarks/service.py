@@ -0,0 +1,156 @@
+"""
+Benchmark del servicio HTTP de análisis (`core.service`) con un cliente local.
+
+Levanta el servicio en un puerto libre y mide:
+
+- latencia de los pedidos livianos (`/health` y estado de un trabajo) con el pool ocupado;
+- una ráfaga de `--jobs` trabajos enviados a la vez: cuántos se aceptan y cuántos
+  reciben 429 (contrapresión con `--max-pending`). Los rechazados se reenvían después
+  del `Retry-After`, como haría un cliente;
+- por trabajo, la latencia desde el envío hasta tener los resultados, y el throughput
+  total (trabajos por minuto). Un trabajo se envía subiendo el video en lugar de la ruta.
+
+Todos los trabajos procesan el mismo video, así que sus métricas deben coincidir; si no,
+o si alguno falla, termina con código 1.
+
+Uso:
+    python -m benchmarks.service
+    python -m benchmarks.service --jobs 12 --workers 2 --max-pending 4
+    python -m benchmarks.service videos/sesion.mp4 --jobs 8
+"""
+from concurrent.futures import ThreadPoolExecutor
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+os.environ.setdefault('MPLBACKEND', 'Agg')
+
+from benchmarks.synthetic import synthetic_video
+from core.service import AnalysisService
+
+
+def call(url: str, method: str = 'GET', body: bytes = None, content_type: str = 'application/json'):
+    """Pedido HTTP: `(status, headers, cuerpo)` (el cuerpo decodificado si es JSON)."""
+    request = Request(url, data=body, method=method, headers={'Content-Type': content_type} if body else {})
+    try:
+        with urlopen(request, timeout=60) as response:
+            status, headers, data = response.status, response.headers, response.read()
+    except HTTPError as e:
+        status, headers, data = e.code, e.headers, e.read()
+    if headers.get_content_type() == 'application/json':
+        data = json.loads(data)
+    return status, headers, data
+
+
+def percentiles(values) -> str:
+    values = sorted(values)
+    p95 = values[min(len(values) - 1, int(round(0.95 * (len(values) - 1))))]
+    return f"p50 {statistics.median(values) * 1000:7.1f} ms  p95 {p95 * 1000:7.1f} ms  máx {values[-1] * 1000:7.1f} ms"
+
+
+def run_job(base_url: str, video_path: str, upload: bool, poll: float) -> dict:
+    """Envía un trabajo (reintenta ante 429) y espera sus resultados."""
+    start = time.perf_counter()
+    rejected = 0
+    while True:
+        if upload:
+            with open(video_path, 'rb') as f:
+                status, headers, data = call(f"{base_url}/jobs?name={os.path.basename(video_path)}", 'POST',
+                                             f.read(), 'video/mp4')
+        else:
+            status, headers, data = call(f"{base_url}/jobs", 'POST', json.dumps({'path': video_path}).encode())
+        if status != 429:
+            break
+        rejected += 1
+        time.sleep(float(headers.get('Retry-After', 1)))
+
+    if status != 202:
+        return {'error': data, 'rejected': rejected}
+    accepted = time.perf_counter()
+
+    job_url = f"{base_url}/jobs/{data['job_id']}"
+    polls = []
+    while True:
+        poll_start = time.perf_counter()
+        status, _, data = call(job_url)
+        polls.append(time.perf_counter() - poll_start)
+        if data['status'] in ('terminado', 'error', 'cancelado'):
+            break
+        time.sleep(poll)
+
+    if data['status'] != 'terminado':
+        return {'error': data, 'rejected': rejected, 'polls': polls}
+    _, _, results = call(f"{job_url}/results")
+    return {
+        'rejected': rejected,
+        'submit': accepted - start,
+        'latency': time.perf_counter() - start,
+        'polls': polls,
+        'max_angle': next(row['Valor'] for row in results['metrics'] if row['Métrica'] == 'Ángulo máximo'),
+        'samples': len(results['angles']['angle']),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('video', nargs='?', default=None, help="Video a procesar (default: uno sintético)")
+    parser.add_argument('--jobs', type=int, default=6, help="Trabajos de la ráfaga")
+    parser.add_argument('--workers', type=int, default=2, help="Procesos del servicio")
+    parser.add_argument('--max-pending', type=int, default=3, help="Trabajos sin terminar aceptados")
+    parser.add_argument('--frames', type=int, default=300, help="Frames del video sintético")
+    parser.add_argument('--poll', type=float, default=0.2, help="Segundos entre consultas de estado")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix='trendetect_service_') as directory:
+        video_path = args.video or synthetic_video(os.path.join(directory, 'sintetico.mp4'), n_frames=args.frames)
+        service = AnalysisService(os.path.join(directory, 'servicio'), port=0, workers=args.workers,
+                                  max_pending=args.max_pending)
+        with service:
+            base_url = service.url
+            print(f"Servicio en {base_url}: {args.workers} procesos, hasta {args.max_pending} trabajos sin terminar")
+
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=args.jobs + 1) as clients:
+                futures = [clients.submit(run_job, base_url, os.path.abspath(video_path), i == 0, args.poll)
+                           for i in range(args.jobs)]
+
+                # Pedidos livianos mientras el pool está ocupado
+                time.sleep(0.5)
+                health = []
+                for _ in range(50):
+                    request_start = time.perf_counter()
+                    call(f"{base_url}/health")
+                    health.append(time.perf_counter() - request_start)
+
+                jobs = [future.result() for future in futures]
+            elapsed = time.perf_counter() - start
+
+    failed = [job for job in jobs if 'error' in job]
+    done = [job for job in jobs if 'error' not in job]
+    print(f"\n/health con el pool ocupado:  {percentiles(health)}")
+    if done:
+        print(f"Estado de un trabajo:         {percentiles([t for job in done for t in job['polls']])}")
+        print(f"Envío (hasta 202):            {percentiles([job['submit'] for job in done])}")
+        print(f"Envío -> resultados:          {percentiles([job['latency'] for job in done])}")
+    print(f"\n{len(done)}/{args.jobs} trabajos en {elapsed:.1f} s ({len(done) / elapsed * 60:.1f} por minuto); "
+          f"{sum(job['rejected'] for job in jobs)} respuestas 429 reintentadas")
+
+    angles = {round(job['max_angle'], 9) for job in done}
+    if failed or len(angles) > 1:
+        for job in failed:
+            print(f"Error: {job['error']}")
+        if len(angles) > 1:
+            print(f"Los trabajos dieron resultados distintos: {sorted(angles)}")
+        return 1
+    print(f"Ángulo máximo de todos los trabajos: {angles.pop():.3f}° ({done[0]['samples']} muestras)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
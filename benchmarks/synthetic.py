@@ -0,0 +1,124 @@
+"""
+Datos sintéticos para los benchmarks.
+
+Simulan una grabación larga de la prueba de Trendelenburg: el paciente quieto con
+los tres marcadores visibles, una ventana de prueba de duración fija en la que la
+tibia deja de detectarse y la pelvis se inclina, y otra vez quieto hasta el final.
+"""
+from typing import Iterator, Tuple
+import cv2
+import numpy as np
+import pandas as pd
+
+
+# IDs del perfil 'estandar': tibia 0, cadera test 2, cadera base 3
+TIBIA_ID, HIP_TEST_ID, HIP_BASE_ID = 0, 2, 3
+
+
+def synthetic_detections(n_rows: int, fps: float = 30.0, frame_step: int = 3,
+                         test_seconds: float = 10.0, seed: int = 0) -> Iterator[Tuple[int, float, list, list]]:
+    """
+    Genera filas `(frame_index, time, ids, centers)` como las que produce `aruco_process`.
+
+    Args:
+        n_rows (int): Cantidad de frames procesados.
+        fps (float): FPS del video simulado.
+        frame_step (int): Frames salteados entre frames procesados.
+        test_seconds (float): Duración de la ventana de prueba, centrada en la grabación.
+        seed (int): Semilla del ruido de detección.
+    """
+    rng = np.random.default_rng(seed)
+    step = frame_step + 1
+    test_rows = int(test_seconds * fps / step)
+    test_start = max((n_rows - test_rows) // 2, 1)
+    test_end = test_start + test_rows
+
+    for row in range(n_rows):
+        frame_index = row * step
+        time = frame_index / fps
+        in_test = test_start <= row < test_end
+
+        angle = 8 * np.sin(np.pi * (row - test_start) / max(test_rows, 1)) if in_test else 0.0
+        slope = np.tan(np.radians(angle))
+        noise = rng.normal(0, 0.3, 6)
+
+        ids = [HIP_TEST_ID, HIP_BASE_ID]
+        centers = [
+            (350.0 + noise[0], 1115.0 - 110 * slope + noise[1]),
+            (570.0 + noise[2], 1125.0 + 110 * slope + noise[3]),
+        ]
+        if not in_test:
+            ids.append(TIBIA_ID)
+            centers.append((325.0 + noise[4], 1675.0 + noise[5]))
+
+        yield frame_index, time, ids, centers
+
+
+def synthetic_dataframe(n_rows: int, **kwargs) -> pd.DataFrame:
+    """Las mismas filas de `synthetic_detections`, armadas como el DataFrame de `aruco_process`."""
+    rows = []
+    for _, time, ids, centers in synthetic_detections(n_rows, **kwargs):
+        row = {'time': time}
+        for id_, (x, y) in zip(ids, centers):
+            row[f"id_{id_}_x"] = x
+            row[f"id_{id_}_y"] = y
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+
+def synthetic_video(path: str, n_frames: int = 900, fps: float = 30.0, size: Tuple[int, int] = (720, 1280),
+                    still_fraction: float = 0.35, noise: float = 2.0, marker_px: int = 90, seed: int = 0) -> str:
+    """
+    Escribe un video de la prueba con marcadores ArUco reales (DICT_6X6_250).
+
+    El paciente está quieto durante `still_fraction` del video al principio y al final
+    (sólo ruido de sensor de desvío `noise`); en el medio la pelvis se inclina y la tibia
+    sale de cuadro. Se graba en landscape, como el celular, para que `aruco_process` lo rote.
+
+    Args:
+        path (str): Ruta del `.mp4` a escribir.
+        size (Tuple[int, int]): (ancho, alto) del video en portrait.
+
+    Returns:
+        str: `path`.
+    """
+    width, height = size
+    dictionary = cv2.aruco.getPredefinedDictionary(cv2.aruco.DICT_6X6_250)
+    markers = {id_: cv2.cvtColor(cv2.aruco.generateImageMarker(dictionary, id_, marker_px), cv2.COLOR_GRAY2BGR)
+               for id_ in (TIBIA_ID, HIP_TEST_ID, HIP_BASE_ID)}
+
+    # Fondo con algo de textura, fijo durante todo el video
+    rng = np.random.default_rng(seed)
+    background = cv2.GaussianBlur(rng.integers(120, 200, (height, width, 3), dtype=np.uint8), (0, 0), 8)
+
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'mp4v'), fps, (height, width))
+    test_start, test_end = int(n_frames * still_fraction), int(n_frames * (1 - still_fraction))
+    half = marker_px // 2
+    noise_frame = np.empty((height, width, 3), np.int16)
+
+    for f in range(n_frames):
+        frame = background.copy()
+        in_test = test_start <= f < test_end
+        angle = 8 * np.sin(np.pi * (f - test_start) / (test_end - test_start)) if in_test else 0.0
+        sway = 6 * np.sin(2 * np.pi * f / fps) if in_test else 0.0
+
+        cx, cy = width / 2 + sway, height * 0.42
+        positions = {HIP_TEST_ID: (cx - width * 0.2, cy), HIP_BASE_ID: (cx + width * 0.2, cy)}
+        for id_, (x, y) in list(positions.items()):
+            positions[id_] = (x, y + (x - cx) * np.tan(np.radians(angle)))
+        if not in_test:
+            positions[TIBIA_ID] = (cx - width * 0.22, height * 0.72)
+
+        for id_, (x, y) in positions.items():
+            x, y = int(round(x)), int(round(y))
+            frame[y - half - 10:y + half + 10, x - half - 10:x + half + 10] = 255
+            frame[y - half:y - half + marker_px, x - half:x - half + marker_px] = markers[id_]
+
+        if noise:
+            cv2.randn(noise_frame, 0, noise)
+            frame = cv2.add(frame, noise_frame, dtype=cv2.CV_8U)
+
+        writer.write(cv2.rotate(frame, cv2.ROTATE_90_COUNTERCLOCKWISE))
+
+    writer.release()
+    return path
@@ -0,0 +1,270 @@
+"""
+Línea de comandos de TrendetecT (sin interfaz gráfica).
+
+Uso:
+    python cli.py watch CARPETA --results RESULTADOS [--workers 2] [--once]
+    python cli.py calibrate VIDEO [--frames 30] [--min-rate 0.98] [--no-save]
+    python cli.py multiview frontal=FRONTAL.mp4 lateral=LATERAL.mp4 [--offset lateral=1.2] [--output DIR]
+    python cli.py sweep SESIONES... [--max-gap 3 5 8] [--min-len 3 5] [--n-frames 10] [--order 1 2 3]
+    python cli.py serve [--port 8765] [--workers 2] [--max-pending 8] [--results servicio]
+    python cli.py batch add COLA.db VIDEOS_O_CARPETAS... --results RESULTADOS
+    python cli.py batch work COLA.db [--processes 4] [--lease 600]
+    python cli.py batch status COLA.db
+"""
+import argparse
+import asyncio
+import os
+import sys
+
+from core.tools.profiling import enable_profiling
+
+
+def cmd_watch(args):
+    from core.watcher import WatchFolderService
+
+    service = WatchFolderService(args.folder, args.results, workers=args.workers,
+                                 poll_interval=args.poll, settle_seconds=args.settle,
+                                 max_retries=args.retries, retry_delay=args.retry_delay,
+                                 layout=args.layout, annotate=args.annotate, camera=args.camera)
+    print(f"Vigilando {os.path.abspath(args.folder)} -> {os.path.abspath(args.results)} "
+          f"({args.workers} simultáneos). Ctrl+C para salir.")
+    try:
+        asyncio.run(service.run(once=args.once))
+    except KeyboardInterrupt:
+        pass
+
+    failed = [job for job in service.jobs.values() if job.error and not job.results]
+    for job in service.jobs.values():
+        print(f"{job.name}: {job.status.value}" + (f" ({job.error})" if job.error else ""))
+    return 1 if failed else 0
+
+
+def cmd_calibrate(args):
+    from core.aruco.detectors import DETECTOR_BACKENDS, calibrate_detectors, choose_detector
+    from core.config import save_config
+    from core.marker_layout import get_marker_layout
+
+    marker_ids = get_marker_layout(args.layout).marker_ids if args.layout else None
+    results = calibrate_detectors(args.video, backends=args.backends or list(DETECTOR_BACKENDS),
+                                  sample_frames=args.frames, marker_ids=marker_ids)
+
+    print(f"{'Detector':<22}{'Diccionario':<22}{'ms/frame':>10}{'Detección':>11}")
+    for result in results:
+        print(f"{result.name:<22}{result.dictionary_name:<22}{result.ms_per_frame:>10.1f}"
+              f"{result.detection_rate:>11.1%}")
+
+    try:
+        best = choose_detector(results, args.min_rate)
+    except ValueError as e:
+        print(e)
+        return 1
+
+    print(f"Elegido: {best.name} ({best.ms_per_frame:.1f} ms/frame, {best.detection_rate:.1%} de detección)")
+    if not args.no_save:
+        print(f"Guardado como detector por defecto en {save_config(detector=best.name)}")
+    return 0
+
+
+def parse_pairs(values, convert=str) -> dict:
+    """`['a=1', 'b=2']` -> `{'a': convert('1'), 'b': convert('2')}`."""
+    pairs = {}
+    for value in values or []:
+        name, sep, item = value.partition('=')
+        if not sep or not name:
+            raise SystemExit(f"Se esperaba NOMBRE=VALOR: {value}")
+        pairs[name] = convert(item)
+    return pairs
+
+
+def cmd_multiview(args):
+    from core.multiview import MultiViewSession
+
+    session = MultiViewSession(parse_pairs(args.views), layout=args.layout, reference=args.reference,
+                               offsets=parse_pairs(args.offset, float), max_offset=args.max_offset)
+    result = session.process()
+    session.save(result, args.output)
+
+    print(f"Ventana de prueba: {result.window[0]:.2f} - {result.window[1]:.2f} s ({result.reference})")
+    for name, view in result.views.items():
+        status = view.error or f"ángulo máximo {view.angles.max():.2f}°"
+        print(f"{name}: desfase {view.time_offset:+.3f} s (correlación {view.sync_score:.2f}) - {status}")
+    print(f"Resultados en {os.path.abspath(args.output)}")
+    return 0
+
+
+def cmd_sweep(args):
+    from time import perf_counter
+
+    from core.sweep import load_sessions, parameter_grid, run_sweep
+
+    start = perf_counter()
+    sessions = load_sessions(args.sessions, cache_dir=args.cache, layout=args.layout, workers=args.workers)
+    grid = parameter_grid(args.max_gap, args.min_len, args.n_frames, args.order)
+    table = run_sweep(sessions, grid, workers=args.workers, layout=args.layout)
+
+    table.to_csv(args.output, index=False)
+    summary = table.groupby(['max_allowed_gap', 'min_len', 'n_frames', 'interpolation_order']).agg(
+        validas=('valid', 'sum'), angulo_maximo=('max_angle', 'mean'))
+    print(summary.to_string())
+    print(f"{len(sessions)} sesiones x {len(grid)} combinaciones en {perf_counter() - start:.1f} s -> {args.output}")
+    return 0
+
+
+def cmd_serve(args):
+    from core.service import AnalysisService
+
+    service = AnalysisService(args.results, host=args.host, port=args.port, workers=args.workers,
+                              max_pending=args.max_pending, max_upload_mb=args.max_upload_mb,
+                              layout=args.layout, camera=args.camera, keep_uploads=args.keep_uploads)
+    print(f"Servicio de análisis en {service.url} ({args.workers} simultáneos, hasta {args.max_pending} "
+          f"en cola). Ctrl+C para salir.")
+    try:
+        service.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+def cmd_batch(args):
+    from core.batch import BatchQueue, find_videos, run_worker
+
+    if args.action == 'add':
+        if args.results is None and not os.path.isfile(args.queue):
+            raise SystemExit("Para crear la cola hace falta --results")
+        queue = (BatchQueue.create(args.queue, args.results, layout=args.layout, camera=args.camera,
+                                   max_attempts=args.max_attempts)
+                 if not os.path.isfile(args.queue) else BatchQueue(args.queue))
+        videos = find_videos(args.paths)
+        print(f"{queue.add(videos)} de {len(videos)} videos encolados en {args.queue} -> {queue.results_dir}")
+        return 0
+
+    if args.action == 'retry':
+        print(f"{BatchQueue(args.queue).retry_errors()} trabajos con error vueltos a encolar")
+        return 0
+
+    if args.action == 'work':
+        if args.processes > 1:
+            from concurrent.futures import ProcessPoolExecutor
+
+            # Un trabajador independiente por proceso, como si fueran nodos distintos
+            with ProcessPoolExecutor(max_workers=args.processes) as pool:
+                futures = [pool.submit(run_worker, args.queue, lease_seconds=args.lease, poll_interval=args.poll,
+                                       wait=not args.no_wait) for _ in range(args.processes)]
+                totals = [future.result() for future in futures]
+        else:
+            totals = [run_worker(args.queue, lease_seconds=args.lease, poll_interval=args.poll,
+                                 wait=not args.no_wait)]
+        print(f"Terminados {sum(t['done'] for t in totals)}, con error {sum(t['failed'] for t in totals)}")
+
+    summary = BatchQueue(args.queue).summary()
+    counts = summary['counts']
+    eta = f", faltan ~{summary['eta_minutes']:.0f} min" if summary['eta_minutes'] is not None else ""
+    print(f"{summary['progress']:.1%} de {summary['total']}: "
+          + ", ".join(f"{count} {status}" for status, count in counts.items() if count)
+          + f" ({summary['jobs_per_minute']:.1f} por minuto{eta})")
+    for job in summary['running']:
+        print(f"  {job['worker']}: {job['video']} {job['progress']:.0f}% (intento {job['attempt']}"
+              + (", lease vencido)" if job['lease_expired'] else ")"))
+    for job in summary['errors']:
+        print(f"  error {job['video']}: {job['error']}")
+    return 1 if summary['errors'] else 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='trendetect', description="TrendetecT - Prueba de Trendelenburg")
+    parser.add_argument('--profile', action='store_true',
+                        help="Guarda un paquete de perfilado por cada video procesado")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    watch = subparsers.add_parser('watch', help="Procesa automáticamente los videos nuevos de una carpeta")
+    watch.add_argument('folder', help="Carpeta sincronizada con las grabaciones")
+    watch.add_argument('--results', default='resultados', help="Carpeta de resultados (default: resultados)")
+    watch.add_argument('--workers', type=int, default=2, help="Procesamientos simultáneos")
+    watch.add_argument('--poll', type=float, default=2.0, help="Segundos entre revisiones de la carpeta")
+    watch.add_argument('--settle', type=float, default=5.0,
+                       help="Segundos sin cambios para considerar un video completo")
+    watch.add_argument('--retries', type=int, default=2, help="Reintentos de un video que falla")
+    watch.add_argument('--retry-delay', type=float, default=5.0)
+    watch.add_argument('--layout', default=None, help="Perfil de marcadores (nombre o JSON)")
+    watch.add_argument('--annotate', action='store_true', help="Guarda también el video anotado")
+    watch.add_argument('--camera', default=None,
+                       help="Perfil de cámara (nombre o JSON): agrega el ángulo 3D en el plano frontal")
+    watch.add_argument('--once', action='store_true', help="Procesa lo que haya y termina")
+    watch.set_defaults(func=cmd_watch)
+
+    calibrate = subparsers.add_parser('calibrate',
+                                      help="Mide los detectores sobre un video y guarda el más rápido")
+    calibrate.add_argument('video', help="Video de muestra grabado con el montaje habitual")
+    calibrate.add_argument('--frames', type=int, default=30, help="Frames a medir (default: 30)")
+    calibrate.add_argument('--min-rate', type=float, default=0.98,
+                           help="Tasa de detección mínima respecto del mejor detector (default: 0.98)")
+    calibrate.add_argument('--backends', nargs='+', default=None, help="Detectores a medir (default: todos)")
+    calibrate.add_argument('--layout', default=None, help="Perfil de marcadores (sólo cuentan sus IDs)")
+    calibrate.add_argument('--no-save', action='store_true', help="Sólo muestra la tabla")
+    calibrate.set_defaults(func=cmd_calibrate)
+
+    multiview = subparsers.add_parser('multiview', help="Procesa la misma prueba grabada desde varias cámaras")
+    multiview.add_argument('views', nargs='+', help="Vistas como NOMBRE=VIDEO (la primera es la referencia)")
+    multiview.add_argument('--reference', default=None, help="Vista de referencia")
+    multiview.add_argument('--offset', nargs='+', default=None,
+                           help="Desfases conocidos como NOMBRE=SEGUNDOS (no se sincronizan visualmente)")
+    multiview.add_argument('--max-offset', type=float, default=10.0, help="Máximo desfase buscado (segundos)")
+    multiview.add_argument('--layout', default=None, help="Perfil de marcadores (nombre o JSON)")
+    multiview.add_argument('--output', default='multivista', help="Carpeta de resultados (default: multivista)")
+    multiview.set_defaults(func=cmd_multiview)
+
+    sweep = subparsers.add_parser('sweep', help="Evalúa una grilla de parámetros del análisis sobre varias sesiones")
+    sweep.add_argument('sessions', nargs='+', help="CSV de detecciones crudas, trayectorias .npz o videos")
+    sweep.add_argument('--max-gap', type=int, nargs='+', default=[5], help="Valores de max_allowed_gap")
+    sweep.add_argument('--min-len', type=int, nargs='+', default=[5], help="Valores de min_len")
+    sweep.add_argument('--n-frames', type=int, nargs='+', default=[10], help="Valores de n_frames")
+    sweep.add_argument('--order', type=int, nargs='+', default=[2], help="Grados de la interpolación de caderas")
+    sweep.add_argument('--workers', type=int, default=None, help="Procesos (default: uno por CPU)")
+    sweep.add_argument('--cache', default='.trendetect_cache', help="Caché de detecciones de videos")
+    sweep.add_argument('--layout', default=None, help="Perfil de marcadores (nombre o JSON)")
+    sweep.add_argument('--output', default='barrido.csv', help="Tabla de resultados (default: barrido.csv)")
+    sweep.set_defaults(func=cmd_sweep)
+
+    serve = subparsers.add_parser('serve', help="Servicio HTTP local de análisis (API de trabajos)")
+    serve.add_argument('--host', default='127.0.0.1', help="Dirección (default: sólo la máquina local)")
+    serve.add_argument('--port', type=int, default=8765, help="Puerto (default: 8765)")
+    serve.add_argument('--workers', type=int, default=2, help="Procesamientos simultáneos")
+    serve.add_argument('--max-pending', type=int, default=8,
+                       help="Trabajos sin terminar aceptados; el resto recibe 429 (default: 8)")
+    serve.add_argument('--max-upload-mb', type=float, default=2048, help="Tamaño máximo de un video subido")
+    serve.add_argument('--results', default='servicio', help="Carpeta de sesiones (default: servicio)")
+    serve.add_argument('--layout', default=None, help="Perfil de marcadores (nombre o JSON)")
+    serve.add_argument('--camera', default=None,
+                       help="Perfil de cámara (nombre o JSON): agrega el ángulo 3D en el plano frontal")
+    serve.add_argument('--keep-uploads', action='store_true', help="Conserva los videos subidos")
+    serve.set_defaults(func=cmd_serve)
+
+    batch = subparsers.add_parser('batch', help="Procesamiento por lotes en varias máquinas (cola compartida)")
+    batch.add_argument('action', choices=['add', 'work', 'status', 'retry'],
+                       help="add: encolar videos; work: procesar; status: avance; retry: reencolar errores")
+    batch.add_argument('queue', help="Archivo de la cola (SQLite) en la carpeta compartida")
+    batch.add_argument('paths', nargs='*', help="Videos o carpetas a encolar (add)")
+    batch.add_argument('--results', default=None, help="Carpeta compartida de resultados (al crear la cola)")
+    batch.add_argument('--layout', default=None, help="Perfil de marcadores (al crear la cola)")
+    batch.add_argument('--camera', default=None, help="Perfil de cámara (al crear la cola)")
+    batch.add_argument('--max-attempts', type=int, default=3, help="Intentos por video (al crear la cola)")
+    batch.add_argument('--processes', type=int, default=1, help="Trabajadores en esta máquina (work)")
+    batch.add_argument('--lease', type=float, default=600.0,
+                       help="Segundos sin renovar tras los que otro nodo retoma un trabajo (work)")
+    batch.add_argument('--poll', type=float, default=10.0, help="Espera cuando no hay trabajos libres (work)")
+    batch.add_argument('--no-wait', action='store_true',
+                       help="Termina apenas no hay trabajos libres, aunque otros nodos sigan (work)")
+    batch.set_defaults(func=cmd_batch)
+
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    if args.profile:
+        enable_profiling()
+    return args.func(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
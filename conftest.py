@@ -0,0 +1,7 @@
+"""
+Configuración de pytest: la raíz del repo queda en `sys.path` (los paquetes `core`,
+`benchmarks`, ... no tienen `__init__.py`) y matplotlib no abre ventanas.
+"""
+import os
+
+os.environ.setdefault('MPLBACKEND', 'Agg')
@@ -1,7 +1,16 @@
 from cv2 import aruco
+from functools import lru_cache
+from time import perf_counter
+from typing import Optional, Sequence, Tuple
 import cv2
 import numpy as np
-import pandas as pd
+
+from core.jobs import JobControl
+from core.tools.annotated_video import AnnotatedVideoWriter
+from core.tools.compact_trajectory import CompactTrajectory
+from core.tools.frame_index import FrameIndex, FrameIndexBuilder
+from core.tools.gap_tracker import HipGapTracker
+from core.tools.trajectory_store import TrajectoryStore
 
 
 def generate_aruco_markers(dictionary_name, marker_size, marker_count, folder_path:str):
@@ -23,31 +32,126 @@ def generate_aruco_markers(dictionary_name, marker_size, marker_count, folder_pa
 
 
 
-def detect_aruco_markers(image, dictionary_name):
+def detect_aruco_markers(image, dictionary_name, marker_ids: Optional[Sequence[int]] = None):
     """
     Detect ArUco markers in an image.
 
     Args:
         image (numpy.ndarray): The input image.
-        marker_info (MarkerInfo): The marker information object containing dictionary name and marker size.
+        dictionary_name (str): Name of the predefined ArUco dictionary.
+        marker_ids (Sequence[int], optional): If given, the dictionary is restricted to these IDs,
+            so any other marker in the scene is never decoded.
 
     Returns:
         tuple: A tuple containing the corners and ids of the detected markers.
     """
+    marker_ids = tuple(sorted(marker_ids)) if marker_ids is not None else None
+
     # Detect markers
-    dictionary = get_aruco_dictionary(dictionary_name)
+    dictionary = get_aruco_dictionary(dictionary_name, marker_ids)
     corners, ids, rejectedImgPoints = aruco.detectMarkers(image, dictionary)
+
+    # En el diccionario restringido los IDs son posiciones dentro de marker_ids
+    if ids is not None and marker_ids is not None:
+        ids = np.asarray(marker_ids, dtype=ids.dtype)[ids]
+
     return corners, ids
 
 
 
-def aruco_process(video_path:str, dictionary_name, frame_step:int=0, include_steps=False):
+# Compuerta de movimiento: factor de reducción de la miniatura, margen (en píxeles de
+# la miniatura) alrededor de cada marcador y máximo de frames seguidos sin detectar
+MOTION_GATE_SCALE = 8
+MOTION_ROI_MARGIN = 2
+MAX_GATED_FRAMES = 30
+
+
+def motion_thumbnail(frame: np.ndarray, scale: int = MOTION_GATE_SCALE) -> np.ndarray:
+    """Miniatura en grises del frame, en orientación portrait como la detección."""
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    thumb = cv2.resize(gray, (gray.shape[1] // scale, gray.shape[0] // scale), interpolation=cv2.INTER_AREA)
+    return cv2.rotate(thumb, cv2.ROTATE_90_CLOCKWISE)
+
+
+def marker_rois(corners, scale: int = MOTION_GATE_SCALE, margin: int = MOTION_ROI_MARGIN) -> list:
+    """Rectángulos `(x0, y0, x1, y1)` de cada marcador detectado, en coordenadas de la miniatura."""
+    rois = []
+    for corner in corners:
+        points = corner[0] / scale
+        x0, y0 = np.floor(points.min(axis=0)).astype(int) - margin
+        x1, y1 = np.ceil(points.max(axis=0)).astype(int) + margin + 1
+        rois.append((max(x0, 0), max(y0, 0), x1, y1))
+    return rois
+
+
+def motion_score(thumb: np.ndarray, reference: np.ndarray, rois: Sequence[tuple] = ()) -> float:
+    """
+    Cambio entre dos miniaturas: diferencia absoluta media (niveles de gris) de la imagen
+    completa o de la región de algún marcador, la que sea mayor. Las regiones hacen que un
+    marcador que se mueve no quede diluido en el promedio de toda la imagen.
+    """
+    diff = cv2.absdiff(thumb, reference)
+    score = float(diff.mean())
+    for x0, y0, x1, y1 in rois:
+        roi = diff[y0:y1, x0:x1]
+        if roi.size:
+            score = max(score, float(roi.mean()))
+    return score
+
+
+def aruco_process(video_path:str, dictionary_name, frame_step:int=0, include_steps=False,
+                  marker_ids: Optional[Sequence[int]] = None, store: Optional[TrajectoryStore] = None,
+                  frame_stats: Optional[dict] = None, motion_threshold: Optional[float] = None,
+                  gap_tracker: Optional[HipGapTracker] = None,
+                  annotated_video: Optional[AnnotatedVideoWriter] = None, detector=None,
+                  as_trajectory: bool = False, control: Optional[JobControl] = None,
+                  video_index: Optional[FrameIndex] = None, indexer: Optional[FrameIndexBuilder] = None,
+                  frame_range: Optional[Tuple[int, int]] = None, keep_corners: bool = False,
+                  frame_phase: int = 0):
     """
     Process a video file to detect ArUco markers.
 
     Args:
         video_path (str): The path to the video file.
-        marker_info (MarkerInfo): The marker information object containing dictionary name and marker size.
+        dictionary_name (str): Name of the predefined ArUco dictionary.
+        frame_step (int): Number of frames skipped between processed frames.
+        include_steps (bool): Whether skipped frames are kept as rows with only `time`.
+        marker_ids (Sequence[int], optional): Only these IDs are detected and stored;
+            stray markers never become `id_n` columns.
+        store (TrajectoryStore, optional): If given, detections are flushed to this on-disk
+            store in fixed-size blocks instead of being accumulated in memory.
+        frame_stats (dict, optional): Profiling counters (see `profiling.new_frame_stats`),
+            updated only when given.
+        motion_threshold (float, optional): Enables the motion gate. A sampled frame whose
+            downscaled difference to the last detected frame (see `motion_score`) is below
+            this many gray levels reuses that frame's detections instead of running
+            `detectMarkers`; at most `MAX_GATED_FRAMES` in a row. Adds a boolean `gated` column.
+        gap_tracker (HipGapTracker, optional): Receives every processed frame and aborts the
+            detection (`DetectionGapError`) as soon as a hip marker has been lost for too long.
+        annotated_video (AnnotatedVideoWriter, optional): Receives every processed frame with its
+            detections and encodes the annotated copy in a background thread.
+        detector (MarkerDetector, optional): Detection backend (see `core.aruco.detectors`);
+            by default the legacy `detect_aruco_markers`.
+        as_trajectory (bool): Return the `CompactTrajectory` (with the video's fps) instead
+            of expanding it to a DataFrame.
+        control (JobControl, optional): Checked on every frame; cancelling it stops the
+            detection with `JobCancelled`.
+        video_index (FrameIndex, optional): The video's frame index; times come from its
+            real presentation timestamps instead of `frame_index / fps`.
+        indexer (FrameIndexBuilder, optional): Without an index, records one during this same
+            decoding pass (timestamps are then taken from it as well).
+        frame_range (tuple, optional): Only process frames `[start, stop)`. Requires
+            `video_index`, which is used to seek to `start` from the previous keyframe.
+            Raises ValueError if the video ends before `start`.
+        keep_corners (bool): Also keep the four corners of every detection in the returned
+            trajectory (for the 3D pose mode); ignored in chunked mode.
+        frame_phase (int): Offset of the sampled frames: with `frame_step` they are the frames
+            with `(frame_index - frame_phase) % (frame_step + 1) == 0`. Interleaved passes with
+            different phases cover the frames of a denser step (see the progressive detection).
+
+    Returns:
+        pd.DataFrame | CompactTrajectory | TrajectoryStore: The detections, or the closed store
+        in chunked mode.
     """
     cap = cv2.VideoCapture(video_path)
     if not cap.isOpened():
@@ -55,46 +159,184 @@ def aruco_process(video_path:str, dictionary_name, frame_step:int=0, include_ste
 
     fps = cap.get(cv2.CAP_PROP_FPS)
     frame_index = 0
+    stop = None
+    seeked = False
+    if frame_range is not None:
+        if video_index is None:
+            cap.release()
+            raise ValueError("Procesar un tramo del video requiere su índice de frames.")
+        frame_index, stop = frame_range
+        if frame_index:
+            seeked = video_index.seek(cap, frame_index)
+            if not seeked:
+                # Un tramo vacío se perdería sin aviso al unir los de `detect_trajectory`
+                cap.release()
+                raise ValueError(f"No se pudo llegar al frame {frame_index} de {video_path}: "
+                                 f"el video tiene menos frames que su índice.")
+
+    # Tiempo de cada frame: PTS real del índice (o del que se arma en esta pasada)
+    timestamps = video_index.pts if video_index is not None else indexer.pts if indexer is not None else None
+
+    def frame_time(index: int) -> float:
+        if timestamps is not None and index < len(timestamps):
+            return float(timestamps[index])
+        return index / fps
+
+    gate = bool(motion_threshold)
+    if store is not None:
+        store.fps = fps
+        store.motion_gate = gate
+
+    # Filas y detecciones en formato largo; se arman como trayectoria compacta al final
+    frames, gated_rows, row_times = [], [], []
+    # (ancho, alto) del video sin rotar, del primer frame decodificado
+    frame_size = None
+    det_rows, det_ids, det_centers, det_corners = [], [], [], []
+
+    # Estado de la compuerta: miniatura y detecciones del último frame detectado
+    reference = None
+    rois = []
+    last_ids, last_centers, last_corners = None, None, None
+    gated_run = 0
+
+    # Los detectores que se ajustan al video (ver `AutoTunedDetector`) arrancan de cero
+    if detector is not None:
+        detector.reset()
+
+    if annotated_video is not None:
+        annotated_video.start(fps / (frame_step + 1) if frame_step else fps)
     
-    rows = []
-    
-    while cap.isOpened():
-        ret, frame = cap.read()
-        if not ret:
-            break
-
-        # Saltar frames si se indicó
-        if frame_step and (frame_index % (frame_step + 1)) != 0:
-            if include_steps:
-                time = frame_index / fps
-                rows.append({'time': time})
+    try:
+        while cap.isOpened():
+            if control is not None:
+                control.check()
+
+            if frame_stats is not None:
+                decode_start = perf_counter()
+
+            if stop is not None and frame_index >= stop:
+                break
+            # Después de `seek` el primer frame del tramo ya está leído. Los frames que se
+            # saltan sólo se avanzan (`grab`): convertirlos a BGR con `retrieve` cuesta más
+            # que decodificarlos
+            if not seeked and not cap.grab():
+                break
+            seeked = False
+            sampled = not frame_step or (frame_index - frame_phase) % (frame_step + 1) == 0
+            frame = None
+            if sampled:
+                ret, frame = cap.retrieve()
+                if not ret:
+                    break
+                if frame_size is None:
+                    frame_size = (frame.shape[1], frame.shape[0])
+            if indexer is not None:
+                indexer.add(cap, frame)
+
+            if frame_stats is not None:
+                frame_stats['frames_decoded'] += 1
+                frame_stats['decode_seconds'] += perf_counter() - decode_start
+
+            # Saltar frames si se indicó
+            if not sampled:
+                if frame_stats is not None:
+                    frame_stats['frames_skipped'] += 1
+
+                if include_steps:
+                    if store is not None:
+                        store.append(frame_index)
+                    else:
+                        frames.append(frame_index)
+                        gated_rows.append(False)
+                        row_times.append(frame_time(frame_index))
             
-            frame_index += 1
-            continue
-        
-        frame = cv2.rotate(frame, cv2.ROTATE_90_CLOCKWISE)  # rotar a portrait
-        corners, ids = detect_aruco_markers(frame, dictionary_name)
+                frame_index += 1
+                continue
         
-        time = frame_index / fps
-        row = {'time': time}
+            if frame_stats is not None:
+                detect_start = perf_counter()
 
+            gated = False
+            if gate:
+                thumb = motion_thumbnail(frame)
+                gated = (reference is not None and gated_run < MAX_GATED_FRAMES
+                         and motion_score(thumb, reference, rois) < motion_threshold)
 
-        if ids is not None:
-            for id_, corner in zip(ids.flatten(), corners):
-                centro = np.mean(corner[0], axis=0)
-                row[f"id_{int(id_)}_x"] = centro[0]
-                row[f"id_{int(id_)}_y"] = centro[1]
+            if gated:
+                # Sin cambios: se repiten las detecciones del último frame detectado
+                ids, centers, corners = last_ids, last_centers, last_corners
+                gated_run += 1
+            else:
+                portrait = cv2.rotate(frame, cv2.ROTATE_90_CLOCKWISE)  # rotar a portrait
+                if detector is not None:
+                    corners, ids = detector.detect(portrait, marker_ids)
+                else:
+                    corners, ids = detect_aruco_markers(portrait, dictionary_name, marker_ids)
+                ids = ids.flatten() if ids is not None else None
+                centers = [np.mean(corner[0], axis=0) for corner in corners] if ids is not None else None
 
+                if gate:
+                    reference, rois = thumb, marker_rois(corners)
+                    last_ids, last_centers, last_corners = ids, centers, corners
+                    gated_run = 0
 
-        rows.append(row)
-        frame_index += 1
+            if frame_stats is not None:
+                frame_stats['frames_gated' if gated else 'frames_detected'] += 1
+                frame_stats['detect_seconds'] += perf_counter() - detect_start
 
-    cap.release()
-    outcome = pd.DataFrame(rows)
-    #outcome.set_index('time', inplace=True)
+            time = frame_time(frame_index)
+            if annotated_video is not None:
+                annotated_video.submit(frame_index, time, frame, ids, centers)
 
-    return outcome
+            # Corta apenas una cadera se pierde por demasiados frames
+            if gap_tracker is not None:
+                gap_tracker.update(frame_index, time, ids, centers)
 
+            # Modo por bloques: la fila va directo al almacén en disco
+            if store is not None:
+                store.append(frame_index, ids, centers, gated)
+                frame_index += 1
+                continue
+
+            if ids is not None:
+                det_rows += [len(frames)] * len(ids)
+                det_ids += ids.tolist()
+                det_centers += centers
+                if keep_corners:
+                    det_corners += [corner[0] for corner in corners]
+
+            frames.append(frame_index)
+            gated_rows.append(gated)
+            row_times.append(time)
+            frame_index += 1
+    finally:
+        cap.release()
+        if annotated_video is not None:
+            annotated_video.close()
+
+    if store is not None:
+        if timestamps is not None:
+            store.timestamps = np.asarray(timestamps, dtype=np.float64)
+        return store.close()
+
+    trajectory = CompactTrajectory.from_detections(frames, fps, det_rows, det_ids, det_centers,
+                                                   gated=gated_rows if gate else None,
+                                                   timestamps=row_times if timestamps is not None else None,
+                                                   corners=det_corners if keep_corners else None,
+                                                   frame_size=frame_size)
+    return trajectory if as_trajectory else trajectory.to_dataframe()
+
+
+@lru_cache(maxsize=None)
+def get_aruco_dictionary(dictionary_name: str, marker_ids: Optional[tuple] = None):
+    """
+    Devuelve el diccionario predefinido, opcionalmente restringido a `marker_ids`.
+
+    El resultado se cachea para no reconstruir el diccionario en cada frame.
+    """
+    dictionary = cv2.aruco.getPredefinedDictionary(getattr(cv2.aruco, dictionary_name))
+    if marker_ids is None:
+        return dictionary
 
-def get_aruco_dictionary(dictionary_name: str):
-    return cv2.aruco.getPredefinedDictionary(getattr(cv2.aruco, dictionary_name))
\ No newline at end of file
+    bytes_list = dictionary.bytesList[list(marker_ids)]
+    return aruco.Dictionary(bytes_list, dictionary.markerSize, dictionary.maxCorrectionBits)
@@ -0,0 +1,433 @@
+"""
+Backends de detección de marcadores.
+
+Todos cumplen el mismo contrato que `detect_aruco_markers`: `detect(image, marker_ids)`
+devuelve `(corners, ids)`, con `ids` en la numeración del diccionario completo. El
+backend por defecto de la instalación se elige con `python cli.py calibrate`, que mide
+cada uno sobre el video del usuario (ver `calibrate_detectors`).
+
+Los backends con otro diccionario (4x4, AprilTag) sólo sirven si los marcadores se
+imprimieron con ese diccionario; la calibración los descarta solos porque no detectan nada.
+
+Los backends `*_auto` ajustan los parámetros a cada video según el tamaño de los
+marcadores en los primeros frames (ver `AutoTunedDetector`).
+"""
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Set
+import time
+
+import cv2
+import numpy as np
+from cv2 import aruco
+
+from core.aruco.aruco_utils import detect_aruco_markers, get_aruco_dictionary
+from core.config import get_setting
+
+
+DEFAULT_DETECTOR = 'legacy_6x6'
+DETECTOR_SETTING = 'detector'
+
+# Parámetros ajustados para el encuadre de la prueba (cuerpo entero a ~3 m): dos pasadas
+# de umbral adaptativo en lugar de tres y sin candidatos diminutos ni gigantes.
+TUNED_PARAMETERS = {
+    'adaptiveThreshWinSizeMin': 5,
+    'adaptiveThreshWinSizeMax': 25,
+    'adaptiveThreshWinSizeStep': 20,
+    'minMarkerPerimeterRate': 0.05,
+    'maxMarkerPerimeterRate': 1.0,
+}
+
+# Auto-ajuste por video: frames con detecciones que se miden, margen relativo alrededor
+# de los perímetros medidos y cada cuántos frames se vuelve a buscar con los parámetros
+# por defecto un marcador que sigue sin aparecer
+AUTO_TUNE_FRAMES = 5
+AUTO_PERIMETER_MARGIN = 0.5
+AUTO_FALLBACK_INTERVAL = 15
+
+
+class MarkerDetector:
+    """Interfaz de un backend de detección."""
+
+    name = 'base'
+    # La detección de un frame no depende de los anteriores: se puede recorrer el video
+    # por pasadas intercaladas (detección progresiva) sin cambiar el resultado
+    stateless = True
+
+    def __init__(self, dictionary_name: str):
+        self.dictionary_name = dictionary_name
+
+    def reset(self):
+        """Olvida el estado de un video anterior (`aruco_process` lo llama al empezar)."""
+
+    def detect(self, image: np.ndarray, marker_ids: Optional[Sequence[int]] = None):
+        """
+        Args:
+            image (np.ndarray): Imagen BGR.
+            marker_ids (Sequence[int], optional): Sólo estos IDs se pueden detectar.
+
+        Returns:
+            tuple: (corners, ids) como `aruco.detectMarkers`; `ids` es None si no hay marcadores.
+        """
+        raise NotImplementedError
+
+
+class LegacyArucoDetector(MarkerDetector):
+    """La función `aruco.detectMarkers` con los parámetros por defecto (comportamiento original)."""
+
+    name = 'legacy'
+
+    def detect(self, image, marker_ids=None):
+        return detect_aruco_markers(image, self.dictionary_name, marker_ids)
+
+
+class ArucoObjectDetector(MarkerDetector):
+    """
+    `cv2.aruco.ArucoDetector` (API de objetos) con `DetectorParameters` configurables.
+
+    Args:
+        dictionary_name (str): Diccionario (ArUco o AprilTag, p. ej. 'DICT_APRILTAG_36h11').
+        parameters (dict, optional): Atributos de `DetectorParameters` a sobrescribir.
+    """
+
+    name = 'aruco'
+
+    def __init__(self, dictionary_name: str, parameters: Optional[dict] = None):
+        super().__init__(dictionary_name)
+        self.parameters = dict(parameters or {})
+        self._detectors: Dict[Optional[tuple], aruco.ArucoDetector] = {}
+
+    def detector_parameters(self) -> aruco.DetectorParameters:
+        params = aruco.DetectorParameters()
+        for key, value in self.parameters.items():
+            setattr(params, key, value)
+        return params
+
+    def __getstate__(self):
+        # Los ArucoDetector de OpenCV no se serializan; cada proceso arma los suyos
+        return {**self.__dict__, '_detectors': {}}
+
+    def detect(self, image, marker_ids=None):
+        marker_ids = tuple(sorted(marker_ids)) if marker_ids is not None else None
+
+        # Un ArucoDetector por diccionario restringido; construirlo en cada frame es caro
+        detector = self._detectors.get(marker_ids)
+        if detector is None:
+            dictionary = get_aruco_dictionary(self.dictionary_name, marker_ids)
+            detector = aruco.ArucoDetector(dictionary, self.detector_parameters())
+            self._detectors[marker_ids] = detector
+
+        corners, ids, _ = detector.detectMarkers(image)
+        if ids is not None and marker_ids is not None:
+            ids = np.asarray(marker_ids, dtype=ids.dtype)[ids]
+        return corners, ids
+
+
+def tuned_parameters(perimeters: Sequence[float], image_size: Sequence[int], modules: int,
+                     margin: float = AUTO_PERIMETER_MARGIN) -> dict:
+    """
+    Parámetros de `DetectorParameters` para marcadores de los perímetros medidos.
+
+    - `min/maxMarkerPerimeterRate`: el rango medido con `margin` de holgura (son relativos
+      al lado mayor de la imagen), así no se analizan contornos de otros tamaños.
+    - Umbral adaptativo: una sola pasada con una ventana de ~2 módulos del marcador más
+      chico, en lugar de las tres escalas por defecto (3, 13 y 23 px).
+    - Refinamiento subpíxel de las esquinas con una ventana de ~medio módulo.
+
+    Args:
+        perimeters (Sequence[float]): Perímetros medidos (px).
+        image_size (Sequence[int]): (ancho, alto) de la imagen.
+        modules (int): Módulos por lado del marcador, con el borde (8 en 6x6).
+    """
+    longest = max(image_size)
+    low, high = min(perimeters), max(perimeters)
+    module = low / 4 / modules
+    window = max(3, int(round(2 * module)) | 1)
+    return {
+        'minMarkerPerimeterRate': low * (1 - margin) / longest,
+        'maxMarkerPerimeterRate': min(4.0, high * (1 + margin) / longest),
+        'adaptiveThreshWinSizeMin': window,
+        'adaptiveThreshWinSizeMax': window,
+        'adaptiveThreshWinSizeStep': window,
+        'cornerRefinementMethod': aruco.CORNER_REFINE_SUBPIX,
+        'cornerRefinementWinSize': max(2, int(module / 2)),
+    }
+
+
+class AutoTunedDetector(ArucoObjectDetector):
+    """
+    `ArucoDetector` que se ajusta al tamaño de los marcadores de cada video.
+
+    Los marcadores tienen un tamaño físico conocido y el celular está a una distancia
+    más o menos fija, así que su perímetro en la imagen casi no cambia. Los primeros
+    `tune_frames` frames con detecciones se procesan con los parámetros por defecto y se
+    miden los perímetros; el resto del video usa `tuned_parameters` (rango de perímetros
+    acotado, una sola pasada de umbral y refinamiento de esquinas).
+
+    Si falta un marcador esperado (los IDs pedidos o, sin IDs, los vistos al medir), el
+    frame se vuelve a detectar con los parámetros por defecto: si así aparece, se usa esa
+    detección y se reajusta incluyendo su perímetro. Si tampoco aparece (p. ej. la tibia
+    fuera de cuadro) se lo sigue buscando con los parámetros por defecto sólo cada
+    `fallback_interval` frames.
+
+    Args:
+        dictionary_name (str): Diccionario de los marcadores.
+        parameters (dict, optional): Parámetros base (los de la medición y el respaldo).
+        tune_frames (int | None): Frames con detecciones a medir; None no ajusta nunca
+            (se comporta como `ArucoObjectDetector`, sirve de referencia).
+        margin (float): Holgura relativa del rango de perímetros.
+        fallback_interval (int): Frames entre búsquedas con los parámetros por defecto de
+            un marcador que sigue faltando.
+    """
+
+    name = 'aruco_auto'
+    stateless = False
+
+    def __init__(self, dictionary_name: str, parameters: Optional[dict] = None,
+                 tune_frames: Optional[int] = AUTO_TUNE_FRAMES, margin: float = AUTO_PERIMETER_MARGIN,
+                 fallback_interval: int = AUTO_FALLBACK_INTERVAL):
+        super().__init__(dictionary_name, parameters)
+        self.tune_frames = tune_frames
+        self.margin = margin
+        self.fallback_interval = fallback_interval
+        self.modules = get_aruco_dictionary(dictionary_name).markerSize + 2
+        self.reset()
+
+    def reset(self):
+        self.tuned: Optional[dict] = None
+        self.perimeters: Dict[int, List[float]] = {}
+        self.stats = {'frames': 0, 'tuned_frames': 0, 'fallbacks': 0, 'retunes': 0, 'candidates': 0}
+        self._image_size = None
+        self._expected: Set[int] = set()
+        self._measured_frames = 0
+        # ID faltante -> frames desde la última búsqueda con los parámetros por defecto
+        self._missing: Dict[int, int] = {}
+        self._tuned_detectors: Dict[Optional[tuple], aruco.ArucoDetector] = {}
+
+    def __getstate__(self):
+        return {**super().__getstate__(), '_tuned_detectors': {}}
+
+    def detect(self, image, marker_ids=None):
+        self.stats['frames'] += 1
+        if self.tuned is None:
+            corners, ids = self._detect_with(self._detectors, self.detector_parameters, image, marker_ids)
+            if ids is not None and self.tune_frames is not None:
+                self._measure(image, corners, ids)
+                self._measured_frames += 1
+                if self._measured_frames >= self.tune_frames:
+                    self._expected = set(marker_ids) if marker_ids is not None else set(self.perimeters)
+                    self._retune()
+            return corners, ids
+
+        self.stats['tuned_frames'] += 1
+        corners, ids = self._detect_with(self._tuned_detectors, self.tuned_detector_parameters, image, marker_ids)
+        found = set(ids.flatten().tolist()) if ids is not None else set()
+        missing = self._expected - found
+        for marker_id in list(self._missing):
+            if marker_id not in missing:
+                del self._missing[marker_id]
+        if not missing:
+            return corners, ids
+
+        # Recién perdido o sin buscar hace `fallback_interval` frames: respaldo con los parámetros por defecto
+        due = any(self._missing.get(marker_id, self.fallback_interval) >= self.fallback_interval
+                  for marker_id in missing)
+        for marker_id in missing:
+            self._missing[marker_id] = 0 if due else self._missing.get(marker_id, 0) + 1
+        if not due:
+            return corners, ids
+
+        self.stats['fallbacks'] += 1
+        fallback_corners, fallback_ids = self._detect_with(self._detectors, self.detector_parameters,
+                                                           image, marker_ids)
+        recovered = missing & (set(fallback_ids.flatten().tolist()) if fallback_ids is not None else set())
+        if not recovered:
+            return corners, ids
+
+        # Los parámetros ajustados lo perdieron (cambió de tamaño): se amplía el rango
+        self._measure(image, fallback_corners, fallback_ids)
+        self._retune()
+        for marker_id in recovered:
+            self._missing.pop(marker_id, None)
+        return fallback_corners, fallback_ids
+
+    def tuned_detector_parameters(self) -> aruco.DetectorParameters:
+        params = self.detector_parameters()
+        for key, value in self.tuned.items():
+            setattr(params, key, value)
+        return params
+
+    def _detect_with(self, detectors: dict, make_parameters, image, marker_ids):
+        marker_ids = tuple(sorted(marker_ids)) if marker_ids is not None else None
+        detector = detectors.get(marker_ids)
+        if detector is None:
+            dictionary = get_aruco_dictionary(self.dictionary_name, marker_ids)
+            detector = aruco.ArucoDetector(dictionary, make_parameters())
+            detectors[marker_ids] = detector
+
+        corners, ids, rejected = detector.detectMarkers(image)
+        self.stats['candidates'] += len(corners) + len(rejected)
+        if ids is not None and marker_ids is not None:
+            ids = np.asarray(marker_ids, dtype=ids.dtype)[ids]
+        return corners, ids
+
+    def _measure(self, image, corners, ids):
+        self._image_size = (image.shape[1], image.shape[0])
+        for corner, marker_id in zip(corners, ids.flatten()):
+            perimeter = cv2.arcLength(np.asarray(corner, dtype=np.float32).reshape(-1, 1, 2), True)
+            self.perimeters.setdefault(int(marker_id), []).append(perimeter)
+
+    def _retune(self):
+        perimeters = [value for values in self.perimeters.values() for value in values]
+        if self.tuned is not None:
+            self.stats['retunes'] += 1
+        self.tuned = tuned_parameters(perimeters, self._image_size, self.modules, self.margin)
+        self._tuned_detectors = {}
+
+
+# Backends disponibles: nombre -> (clase, diccionario, parámetros)
+DETECTOR_BACKENDS = {
+    'legacy_6x6': (LegacyArucoDetector, 'DICT_6X6_250', None),
+    'aruco_6x6': (ArucoObjectDetector, 'DICT_6X6_250', None),
+    'aruco_6x6_tuned': (ArucoObjectDetector, 'DICT_6X6_250', TUNED_PARAMETERS),
+    'aruco_4x4_tuned': (ArucoObjectDetector, 'DICT_4X4_50', TUNED_PARAMETERS),
+    'aruco_6x6_auto': (AutoTunedDetector, 'DICT_6X6_250', None),
+    'aruco_4x4_auto': (AutoTunedDetector, 'DICT_4X4_50', None),
+    'apriltag_36h11': (ArucoObjectDetector, 'DICT_APRILTAG_36h11', None),
+    'apriltag_36h11_tuned': (ArucoObjectDetector, 'DICT_APRILTAG_36h11', TUNED_PARAMETERS),
+}
+
+
+def create_detector(name: str) -> MarkerDetector:
+    if name not in DETECTOR_BACKENDS:
+        raise ValueError(f"Detector desconocido: {name}. Opciones: {', '.join(DETECTOR_BACKENDS)}")
+
+    cls, dictionary_name, parameters = DETECTOR_BACKENDS[name]
+    detector = cls(dictionary_name, parameters) if parameters is not None else cls(dictionary_name)
+    detector.name = name
+    return detector
+
+
+def get_detector(name: Optional[str] = None, dictionary_name: Optional[str] = None) -> MarkerDetector:
+    """
+    Devuelve el detector pedido o, sin nombre, el elegido para la instalación.
+
+    Args:
+        name (str, optional): Backend de `DETECTOR_BACKENDS`.
+        dictionary_name (str, optional): Diccionario de los marcadores impresos (del perfil).
+            Si el detector por defecto usa otro diccionario, se usa el `ArucoDetector`
+            ajustado para este.
+
+    Raises:
+        ValueError: Si el detector pedido explícitamente no usa `dictionary_name`.
+    """
+    if name is not None:
+        detector = create_detector(name)
+        if dictionary_name is not None and detector.dictionary_name != dictionary_name:
+            raise ValueError(f"El detector {name} usa {detector.dictionary_name}, "
+                             f"pero los marcadores son {dictionary_name}.")
+        return detector
+
+    detector = create_detector(get_setting(DETECTOR_SETTING, DEFAULT_DETECTOR))
+    if dictionary_name is not None and detector.dictionary_name != dictionary_name:
+        detector = ArucoObjectDetector(dictionary_name, TUNED_PARAMETERS)
+    return detector
+
+
+# ==========================
+# Calibración
+# ==========================
+@dataclass
+class CalibrationResult:
+    name: str
+    dictionary_name: str
+    frames: int
+    ms_per_frame: float
+    detections: int
+    # Fracción de los marcadores que encuentra el mejor backend en cada frame
+    detection_rate: float = 0.0
+
+
+def calibrate_detectors(video_path: str, backends: Optional[Sequence[str]] = None, sample_frames: int = 30,
+                        marker_ids: Optional[Sequence[int]] = None) -> List[CalibrationResult]:
+    """
+    Mide cada backend sobre `sample_frames` frames repartidos a lo largo del video.
+
+    El video se decodifica una sola vez y todos los backends procesan el mismo frame.
+    La tasa de detección de un backend es la fracción de los marcadores que encuentra
+    respecto del backend que más encuentra en cada frame, así los momentos en que la
+    tibia no está en cuadro no penalizan a nadie.
+
+    Args:
+        video_path (str): Video de muestra del usuario.
+        backends (Sequence[str], optional): Backends a medir (por defecto, todos).
+        sample_frames (int): Frames a medir.
+        marker_ids (Sequence[int], optional): Sólo cuentan estos IDs (los del perfil).
+
+    Returns:
+        List[CalibrationResult]: Un resultado por backend, en el orden de `backends`.
+    """
+    detectors = [create_detector(name) for name in (backends or DETECTOR_BACKENDS)]
+
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise ValueError(f"No se pudo abrir el video en {video_path}")
+
+    total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    step = max(total // sample_frames, 1)
+
+    seconds = np.zeros(len(detectors))
+    found = []      # (frames, backends): marcadores encontrados por frame
+    frame_index = 0
+    warmed_up = False
+
+    try:
+        while len(found) < sample_frames:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            if frame_index % step:
+                frame_index += 1
+                continue
+            frame_index += 1
+
+            frame = cv2.rotate(frame, cv2.ROTATE_90_CLOCKWISE)  # misma orientación que la detección
+            if not warmed_up:
+                # La primera llamada construye diccionarios y detectores; no se mide
+                for detector in detectors:
+                    detector.detect(frame, marker_ids)
+                warmed_up = True
+
+            counts = []
+            for i, detector in enumerate(detectors):
+                start = time.perf_counter()
+                _, ids = detector.detect(frame, marker_ids)
+                seconds[i] += time.perf_counter() - start
+                counts.append(0 if ids is None else len(np.unique(ids)))
+            found.append(counts)
+    finally:
+        cap.release()
+
+    if not found:
+        raise ValueError(f"No se pudieron leer frames de {video_path}")
+
+    found = np.array(found)
+    reference = found.max(axis=1).sum()
+    return [
+        CalibrationResult(
+            name=detector.name,
+            dictionary_name=detector.dictionary_name,
+            frames=len(found),
+            ms_per_frame=1000 * seconds[i] / len(found),
+            detections=int(found[:, i].sum()),
+            detection_rate=float(found[:, i].sum() / reference) if reference else 0.0,
+        )
+        for i, detector in enumerate(detectors)
+    ]
+
+
+def choose_detector(results: Sequence[CalibrationResult], min_detection_rate: float = 0.98) -> CalibrationResult:
+    """El backend más rápido con tasa de detección >= `min_detection_rate`."""
+    eligible = [result for result in results if result.detection_rate >= min_detection_rate]
+    if not eligible:
+        raise ValueError(f"Ningún detector alcanzó una tasa de detección de {min_detection_rate:.0%}.")
+    return min(eligible, key=lambda result: result.ms_per_frame)
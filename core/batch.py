@@ -0,0 +1,426 @@
+"""
+Procesamiento por lotes en varias máquinas con una cola en un sistema de archivos compartido.
+
+Para reprocesar archivos grandes de grabaciones (estudios retrospectivos): la cola es un
+archivo SQLite en la carpeta compartida y cualquier cantidad de nodos corre
+`run_worker` (`python cli.py batch work COLA`) contra ella.
+
+- Un trabajador toma un trabajo con un *lease* (`lease_seconds`) y lo renueva mientras
+  procesa. Si el nodo se cae, el lease vence y otro trabajador lo retoma; después de
+  `max_attempts` intentos el trabajo queda con error en lugar de tirar abajo a todos.
+- Los resultados se escriben en una carpeta temporal propia del intento y se publican
+  con un único `rename` a `results_dir/<video>-<hash>/`. Si otro intento ya publicó la
+  misma sesión (p. ej. un nodo lento cuyo lease venció), el resultado repetido se
+  descarta: la carpeta final existe sólo completa y una sola vez. El temporal de un
+  intento cuyo lease venció lo borra quien retoma el trabajo (o quien lo da por perdido).
+- `BatchQueue.summary` resume el avance (por estado, ritmo de los últimos minutos,
+  tiempo restante estimado y qué procesa cada trabajador).
+
+SQLite sobre un sistema de archivos de red depende de que sus bloqueos funcionen (NFSv4
+o SMB con bloqueos habilitados); por eso se usa el journal clásico y no WAL, y cada
+operación es una transacción corta. Las rutas de los videos y de `results_dir` tienen
+que ser las mismas en todos los nodos, y los leases asumen relojes sincronizados (NTP)
+con un error mucho menor que `lease_seconds`.
+"""
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional
+import hashlib
+import json
+import os
+import shutil
+import socket
+import sqlite3
+import threading
+import time
+
+from core.jobs import VIDEO_EXTENSIONS, JobStatus
+from core.watcher import process_recording, source_key
+
+
+DEFAULT_LEASE_SECONDS = 600.0
+DEFAULT_MAX_ATTEMPTS = 3
+# Ventana para el ritmo (trabajos por minuto) del resumen
+RATE_WINDOW_SECONDS = 600.0
+# Cada cuánto se publica el progreso de un trabajo en la cola (segundos)
+PROGRESS_INTERVAL = 2.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS config (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY,
+    video TEXT UNIQUE NOT NULL,
+    status TEXT NOT NULL,
+    worker TEXT,
+    lease_until REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    progress REAL NOT NULL DEFAULT 0,
+    error TEXT,
+    session TEXT,
+    max_angle REAL,
+    created REAL NOT NULL,
+    started REAL,
+    finished REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, lease_until);
+"""
+
+
+@dataclass
+class BatchJob:
+    """Trabajo tomado por un trabajador (fila de la cola)."""
+    job_id: int
+    video_path: str
+    attempts: int
+    worker: str
+
+
+def session_name(video_path: str) -> str:
+    """Carpeta de la sesión: nombre del video más un hash de su ruta (hay nombres repetidos en el archivo)."""
+    digest = hashlib.sha1(os.path.abspath(video_path).encode('utf-8')).hexdigest()[:8]
+    return f"{os.path.splitext(os.path.basename(video_path))[0]}-{digest}"
+
+
+def staging_path(results_dir: str, video_path: str, worker: str, attempt: int) -> str:
+    """Temporal de un intento: en `results_dir`, para que la publicación sea un rename."""
+    return os.path.join(results_dir, f".{session_name(video_path)}.{worker.replace(':', '_')}.{attempt}.tmp")
+
+
+def find_videos(paths: Iterable[str]) -> List[str]:
+    """Videos de `paths`: archivos sueltos y, en las carpetas, todos los videos recursivamente."""
+    videos = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, files in os.walk(path):
+                videos += [os.path.join(root, name) for name in sorted(files)
+                           if name.lower().endswith(VIDEO_EXTENSIONS) and not name.startswith('.')]
+        else:
+            videos.append(path)
+    return [os.path.abspath(video) for video in videos]
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class BatchQueue:
+    """
+    Cola de trabajos en un archivo SQLite compartido.
+
+    Args:
+        path (str): Archivo de la cola. Tiene que existir (ver `create`).
+        timeout (float): Segundos de espera por el bloqueo de otro nodo.
+    """
+
+    def __init__(self, path: str, timeout: float = 60.0):
+        if not os.path.isfile(path):
+            raise ValueError(f"No existe la cola {path}; crearla con `batch add`.")
+        self.path = path
+        self.timeout = timeout
+        config = dict(self._read("SELECT key, value FROM config"))
+        self.results_dir = config['results_dir']
+        self.layout = config.get('layout')
+        self.camera = config.get('camera')
+        self.max_attempts = int(config.get('max_attempts', DEFAULT_MAX_ATTEMPTS))
+
+    @classmethod
+    def create(cls, path: str, results_dir: str, layout: Optional[str] = None, camera: Optional[str] = None,
+               max_attempts: int = DEFAULT_MAX_ATTEMPTS) -> "BatchQueue":
+        """Crea la cola (o abre la existente: la configuración no se cambia)."""
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        os.makedirs(results_dir, exist_ok=True)
+        conn = _connect(path)
+        try:
+            conn.executescript(_SCHEMA)
+            config = {'results_dir': os.path.abspath(results_dir), 'layout': layout, 'camera': camera,
+                      'max_attempts': str(max_attempts)}
+            conn.executemany("INSERT OR IGNORE INTO config (key, value) VALUES (?, ?)",
+                             [(key, value) for key, value in config.items() if value is not None])
+        finally:
+            conn.close()
+        return cls(path)
+
+    # ==========================
+    # Acceso a la base
+    # ==========================
+    def _connection(self) -> sqlite3.Connection:
+        return _connect(self.path, self.timeout)
+
+    def _read(self, query: str, params=()) -> list:
+        conn = self._connection()
+        try:
+            return conn.execute(query, params).fetchall()
+        finally:
+            conn.close()
+
+    def _write(self, query: str, params=()) -> int:
+        """Una escritura (atómica por sí sola); devuelve las filas afectadas."""
+        conn = self._connection()
+        try:
+            return conn.execute(query, params).rowcount
+        finally:
+            conn.close()
+
+    # ==========================
+    # Operaciones
+    # ==========================
+    def add(self, videos: Iterable[str]) -> int:
+        """Encola videos (los ya encolados se ignoran). Devuelve cuántos se agregaron."""
+        now = time.time()
+        rows = [(os.path.abspath(video), JobStatus.PENDING.value, now) for video in videos]
+        conn = self._connection()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            before = conn.total_changes
+            conn.executemany("INSERT OR IGNORE INTO jobs (video, status, created) VALUES (?, ?, ?)", rows)
+            conn.execute("COMMIT")
+            return conn.total_changes - before
+        except BaseException:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def claim(self, worker: str, lease_seconds: float = DEFAULT_LEASE_SECONDS) -> Optional[BatchJob]:
+        """
+        Toma el próximo trabajo pendiente o con el lease vencido, o None si no hay.
+        La toma es atómica (`BEGIN IMMEDIATE`): dos nodos nunca toman el mismo trabajo.
+
+        Los intentos con el lease vencido (el que se retoma y los que se dan por perdidos)
+        no van a publicar: se borran sus temporales, que un nodo caído dejaría para siempre.
+        """
+        abandoned = []
+        conn = self._connection()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            now = time.time()
+            # Trabajos cuyo trabajador se cayó en cada uno de sus intentos
+            abandoned += conn.execute("SELECT video, worker, attempts FROM jobs "
+                                      "WHERE status = ? AND lease_until < ? AND attempts >= ?",
+                                      (JobStatus.RUNNING.value, now, self.max_attempts)).fetchall()
+            conn.execute("UPDATE jobs SET status = ?, finished = ?, error = ? "
+                         "WHERE status = ? AND lease_until < ? AND attempts >= ?",
+                         (JobStatus.ERROR.value, now, "El trabajador dejó de responder en todos los intentos.",
+                          JobStatus.RUNNING.value, now, self.max_attempts))
+            row = conn.execute("SELECT id, video, attempts, status, worker FROM jobs "
+                               "WHERE status = ? OR (status = ? AND lease_until < ?) ORDER BY id LIMIT 1",
+                               (JobStatus.PENDING.value, JobStatus.RUNNING.value, now)).fetchone()
+            job = None
+            if row is not None:
+                job_id, video, attempts, status, previous_worker = row
+                if status == JobStatus.RUNNING.value:
+                    abandoned.append((video, previous_worker, attempts))
+                conn.execute("UPDATE jobs SET status = ?, worker = ?, lease_until = ?, attempts = ?, progress = 0, "
+                             "started = ? WHERE id = ?",
+                             (JobStatus.RUNNING.value, worker, now + lease_seconds, attempts + 1, now, job_id))
+                job = BatchJob(job_id, video, attempts + 1, worker)
+            conn.execute("COMMIT")
+        except BaseException:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+        for video, previous_worker, attempt in abandoned:
+            shutil.rmtree(staging_path(self.results_dir, video, previous_worker, attempt), ignore_errors=True)
+        return job
+
+    def renew(self, job: BatchJob, lease_seconds: float = DEFAULT_LEASE_SECONDS,
+              progress: Optional[float] = None) -> bool:
+        """Extiende el lease (y guarda el progreso). False si el trabajo ya no es de este trabajador."""
+        return self._write("UPDATE jobs SET lease_until = ?, progress = COALESCE(?, progress) "
+                           "WHERE id = ? AND worker = ? AND status = ?",
+                           (time.time() + lease_seconds, progress, job.job_id, job.worker,
+                            JobStatus.RUNNING.value)) == 1
+
+    def complete(self, job: BatchJob, session: str, max_angle: Optional[float]):
+        """Marca el trabajo terminado. Repetirlo (otro intento del mismo video) no cambia nada."""
+        self._write("UPDATE jobs SET status = ?, progress = 100, error = NULL, session = ?, max_angle = ?, "
+                    "finished = ?, lease_until = NULL WHERE id = ? AND status != ?",
+                    (JobStatus.DONE.value, session, max_angle, time.time(), job.job_id, JobStatus.DONE.value))
+
+    def fail(self, job: BatchJob, error: str):
+        """Devuelve el trabajo a la cola o, sin intentos restantes, lo deja con error."""
+        status = JobStatus.ERROR if job.attempts >= self.max_attempts else JobStatus.PENDING
+        self._write("UPDATE jobs SET status = ?, error = ?, lease_until = NULL, finished = ? "
+                    "WHERE id = ? AND worker = ? AND status = ?",
+                    (status.value, error, time.time() if status == JobStatus.ERROR else None,
+                     job.job_id, job.worker, JobStatus.RUNNING.value))
+
+    def retry_errors(self) -> int:
+        """Vuelve a encolar los trabajos con error (con los intentos en cero)."""
+        return self._write("UPDATE jobs SET status = ?, attempts = 0, error = NULL, finished = NULL "
+                           "WHERE status = ?", (JobStatus.PENDING.value, JobStatus.ERROR.value))
+
+    def unfinished(self) -> int:
+        return self._read("SELECT COUNT(*) FROM jobs WHERE status IN (?, ?)",
+                          (JobStatus.PENDING.value, JobStatus.RUNNING.value))[0][0]
+
+    # ==========================
+    # Resumen
+    # ==========================
+    def summary(self) -> dict:
+        """Avance del lote: cantidades por estado, ritmo, tiempo restante y trabajos en curso."""
+        now = time.time()
+        counts = {status.value: 0 for status in JobStatus}
+        counts.update(dict(self._read("SELECT status, COUNT(*) FROM jobs GROUP BY status")))
+        total = sum(counts.values())
+        finished = counts[JobStatus.DONE.value] + counts[JobStatus.ERROR.value]
+
+        recent = self._read("SELECT COUNT(*) FROM jobs WHERE status = ? AND finished >= ?",
+                            (JobStatus.DONE.value, now - RATE_WINDOW_SECONDS))[0][0]
+        rate = recent / (RATE_WINDOW_SECONDS / 60)
+        running = [
+            {'video': os.path.basename(video), 'worker': worker, 'progress': progress, 'attempt': attempts,
+             'lease_expired': lease_until < now}
+            for video, worker, progress, attempts, lease_until in self._read(
+                "SELECT video, worker, progress, attempts, lease_until FROM jobs WHERE status = ? ORDER BY id",
+                (JobStatus.RUNNING.value,))
+        ]
+        per_worker = dict(self._read("SELECT worker, COUNT(*) FROM jobs WHERE status = ? GROUP BY worker",
+                                     (JobStatus.DONE.value,)))
+        return {
+            'total': total,
+            'counts': counts,
+            'progress': finished / total if total else 1.0,
+            'jobs_per_minute': rate,
+            'eta_minutes': (total - finished) / rate if rate else None,
+            'running': running,
+            'done_per_worker': per_worker,
+            'errors': [{'video': os.path.basename(video), 'error': error} for video, error in self._read(
+                "SELECT video, error FROM jobs WHERE status = ? ORDER BY id", (JobStatus.ERROR.value,))],
+        }
+
+
+def _connect(path: str, timeout: float = 60.0) -> sqlite3.Connection:
+    # Transacciones explícitas (BEGIN IMMEDIATE): la toma de un trabajo bloquea la base de una vez
+    conn = sqlite3.connect(path, timeout=timeout, isolation_level=None)
+    # Sin WAL: su memoria compartida no funciona sobre sistemas de archivos de red
+    conn.execute("PRAGMA journal_mode=DELETE")
+    return conn
+
+
+# ==========================
+# Trabajador
+# ==========================
+class LeaseKeeper:
+    """
+    Renueva el lease de un trabajo en un hilo mientras se procesa. También hace de
+    `progress_callback` del pipeline: el progreso queda en la cola con la renovación.
+    """
+
+    def __init__(self, queue: BatchQueue, job: BatchJob, lease_seconds: float):
+        self.queue = queue
+        self.job = job
+        self.lease_seconds = lease_seconds
+        self.progress = 0.0
+        self.lost = False
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='batch-lease', daemon=True)
+
+    def emit(self, value):
+        self.progress = float(value)
+
+    def _run(self):
+        # Renueva cada un tercio del lease; el progreso se publica antes si cambió
+        interval = self.lease_seconds / 3
+        reported, renewed = self.progress, time.monotonic()
+        while not self._stop.wait(min(interval, PROGRESS_INTERVAL)):
+            if self.progress == reported and time.monotonic() - renewed < interval:
+                continue
+            reported, renewed = self.progress, time.monotonic()
+            try:
+                if not self.queue.renew(self.job, self.lease_seconds, reported):
+                    # Otro trabajador lo retomó: se termina igual, la publicación es idempotente
+                    self.lost = True
+            except sqlite3.Error as e:
+                print(f"No se pudo renovar el lease de {self.job.video_path}: {e}")
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+
+
+def process_job(queue: BatchQueue, job: BatchJob, lease_seconds: float = DEFAULT_LEASE_SECONDS) -> str:
+    """
+    Procesa un trabajo y publica su sesión en `results_dir`.
+
+    Returns:
+        str: Nombre de la carpeta de la sesión.
+    """
+    name = session_name(job.video_path)
+    final_dir = os.path.join(queue.results_dir, name)
+    staging_dir = staging_path(queue.results_dir, job.video_path, job.worker, job.attempts)
+
+    if not os.path.isdir(final_dir):
+        try:
+            with LeaseKeeper(queue, job, lease_seconds) as keeper:
+                process_recording(job.video_path, staging_dir, source_key(job.video_path), layout=queue.layout,
+                                  camera=queue.camera, progress_callback=keeper)
+        except BaseException:
+            # Un intento fallido (o interrumpido) no deja su temporal en `results_dir`
+            shutil.rmtree(staging_dir, ignore_errors=True)
+            raise
+        try:
+            os.rename(staging_dir, final_dir)
+        except OSError:
+            # Ya la publicó otro intento: se descarta esta copia
+            shutil.rmtree(staging_dir, ignore_errors=True)
+            if not os.path.isdir(final_dir):
+                raise
+
+    return name
+
+
+def read_max_angle(session_dir: str) -> Optional[float]:
+    with open(os.path.join(session_dir, 'meta.json'), encoding='utf-8') as f:
+        return json.load(f).get('max_angle')
+
+
+def run_worker(queue_path: str, worker: Optional[str] = None, lease_seconds: float = DEFAULT_LEASE_SECONDS,
+               poll_interval: float = 10.0, wait: bool = True, max_jobs: Optional[int] = None) -> Dict[str, int]:
+    """
+    Toma y procesa trabajos hasta vaciar la cola.
+
+    Args:
+        queue_path (str): Archivo de la cola.
+        worker (str, optional): Identificador del trabajador (por defecto `host:pid`).
+        lease_seconds (float): Duración del lease; se renueva cada un tercio.
+        poll_interval (float): Espera cuando no hay trabajos libres pero sí en curso en otros
+            nodos (pueden vencer y haya que retomarlos).
+        wait (bool): Con False termina apenas no hay trabajos libres.
+        max_jobs (int, optional): Termina después de procesar esta cantidad.
+
+    Returns:
+        Dict[str, int]: Trabajos terminados y fallidos por este trabajador.
+    """
+    queue = BatchQueue(queue_path)
+    worker = worker or default_worker_id()
+    done = failed = 0
+
+    while max_jobs is None or done + failed < max_jobs:
+        job = queue.claim(worker, lease_seconds)
+        if job is None:
+            if not wait or not queue.unfinished():
+                break
+            time.sleep(poll_interval)
+            continue
+
+        try:
+            name = process_job(queue, job, lease_seconds)
+        except Exception as e:
+            queue.fail(job, str(e) or type(e).__name__)
+            failed += 1
+            print(f"[{worker}] {os.path.basename(job.video_path)}: error ({e})")
+            continue
+
+        queue.complete(job, name, read_max_angle(os.path.join(queue.results_dir, name)))
+        done += 1
+        print(f"[{worker}] {os.path.basename(job.video_path)}: terminado")
+
+    return {'done': done, 'failed': failed}
@@ -0,0 +1,137 @@
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+import json
+import math
+
+import numpy as np
+
+
+# Diferencia relativa de relación de aspecto admitida al escalar un perfil (redondeos de
+# resoluciones como 854x480)
+ASPECT_TOLERANCE = 0.01
+
+@dataclass(frozen=True)
+class CameraProfile:
+    """
+    Intrínsecos de la cámara con la que se grabó, para el modo 3D (pose de los marcadores).
+
+    Se expresan en la orientación en la que el celular guarda el video (landscape, antes
+    de la rotación a portrait de `aruco_process`) y a la resolución del video, que es como
+    los entrega la calibración estándar de OpenCV (`cv2.calibrateCamera`).
+
+    Attributes:
+        name (str): Nombre del perfil.
+        image_size (Tuple[int, int]): (ancho, alto) del video, en su orientación original.
+        camera_matrix (Tuple[Tuple[float, ...], ...]): Matriz K de 3x3.
+        dist_coeffs (Tuple[float, ...]): Coeficientes de distorsión de OpenCV (k1, k2, p1, p2[, k3...]).
+    """
+    name: str
+    image_size: Tuple[int, int]
+    camera_matrix: Tuple[Tuple[float, ...], ...]
+    dist_coeffs: Tuple[float, ...] = ()
+
+    @property
+    def K(self) -> np.ndarray:
+        return np.asarray(self.camera_matrix, dtype=np.float64)
+
+    @property
+    def distortion(self) -> np.ndarray:
+        return np.asarray(self.dist_coeffs or (0.0, 0.0, 0.0, 0.0), dtype=np.float64)
+
+    def for_image_size(self, width: int, height: int) -> "CameraProfile":
+        """
+        El perfil llevado a la resolución del video (en su orientación original).
+
+        Una calibración sirve para otra resolución de la misma cámara sólo si la imagen es
+        la misma escalada: se escalan la focal y el centro óptico, y la distorsión (que está
+        en coordenadas normalizadas) no cambia.
+
+        Raises:
+            ValueError: Si la relación de aspecto del video no es la del perfil.
+        """
+        profile_width, profile_height = self.image_size
+        if (width, height) == (profile_width, profile_height):
+            return self
+        if abs(width * profile_height - height * profile_width) > ASPECT_TOLERANCE * width * profile_height:
+            raise ValueError(f"El perfil de cámara '{self.name}' es de {profile_width}x{profile_height} "
+                             f"y el video de {width}x{height}: la relación de aspecto no coincide.")
+
+        sx, sy = width / profile_width, height / profile_height
+        K = self.K
+        # Con píxeles centrados en enteros el centro óptico se escala desde el borde de la imagen
+        camera_matrix = ((K[0, 0] * sx, K[0, 1] * sx, (K[0, 2] + 0.5) * sx - 0.5),
+                         (0.0, K[1, 1] * sy, (K[1, 2] + 0.5) * sy - 0.5),
+                         (0.0, 0.0, 1.0))
+        return CameraProfile(self.name, (width, height), camera_matrix, self.dist_coeffs)
+
+    @classmethod
+    def approximate(cls, width: int, height: int, horizontal_fov: float = 68.0,
+                    name: str = 'aproximado') -> "CameraProfile":
+        """
+        Perfil sin calibrar: centro óptico en el centro de la imagen, sin distorsión y la
+        focal que corresponde al campo de visión horizontal (68° es típico de la cámara
+        principal de un celular). Sirve para comparar, no reemplaza a una calibración.
+        """
+        focal = (width / 2) / math.tan(math.radians(horizontal_fov) / 2)
+        return cls(name, (width, height), ((focal, 0.0, (width - 1) / 2),
+                                           (0.0, focal, (height - 1) / 2),
+                                           (0.0, 0.0, 1.0)))
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "CameraProfile":
+        """
+        Construye un perfil a partir de un diccionario (p. ej. leído de JSON).
+
+        Formato esperado:
+            {"name": "...", "image_size": [1920, 1080],
+             "camera_matrix": [[fx, 0, cx], [0, fy, cy], [0, 0, 1]], "dist_coeffs": [k1, k2, p1, p2, k3]}
+        """
+        try:
+            camera_matrix = tuple(tuple(float(v) for v in row) for row in data['camera_matrix'])
+            image_size = tuple(int(v) for v in data['image_size'])
+        except (KeyError, TypeError, ValueError) as e:
+            raise ValueError(f"Perfil de cámara inválido: {e}") from e
+
+        if len(camera_matrix) != 3 or any(len(row) != 3 for row in camera_matrix) or len(image_size) != 2:
+            raise ValueError("Perfil de cámara inválido: se esperaba una matriz de 3x3 y un tamaño (ancho, alto).")
+
+        return cls(
+            name=data.get('name', 'personalizado'),
+            image_size=image_size,
+            camera_matrix=camera_matrix,
+            dist_coeffs=tuple(float(v) for v in data.get('dist_coeffs', ())),
+        )
+
+
+# Perfiles incluidos: aproximados (sin calibrar) para las resoluciones habituales de celular
+CAMERA_PROFILES: Dict[str, CameraProfile] = {
+    'celular_720p': CameraProfile.approximate(1280, 720, name='celular_720p'),
+    'celular_1080p': CameraProfile.approximate(1920, 1080, name='celular_1080p'),
+}
+
+
+def get_camera_profile(profile: Optional[str]) -> Optional[CameraProfile]:
+    """
+    Devuelve un perfil por nombre o, si `profile` es una ruta a un archivo JSON, lo carga.
+
+    Args:
+        profile (str | None): Nombre de un perfil de `CAMERA_PROFILES` o ruta a un JSON.
+
+    Returns:
+        CameraProfile | None: El perfil, o None si no se indicó ninguno.
+    """
+    if profile is None:
+        return None
+
+    if profile in CAMERA_PROFILES:
+        return CAMERA_PROFILES[profile]
+
+    if profile.endswith('.json'):
+        return load_camera_profile(profile)
+
+    raise ValueError(f"Perfil de cámara desconocido: {profile}")
+
+
+def load_camera_profile(file_path: str) -> CameraProfile:
+    with open(file_path, encoding='utf-8') as f:
+        return CameraProfile.from_dict(json.load(f))
@@ -0,0 +1,43 @@
+"""
+Configuración de la instalación (valores por defecto elegidos en cada equipo).
+
+Se guarda en `trendetect_config.json` junto a la aplicación, o en la ruta de la
+variable de entorno `TRENDETECT_CONFIG`. Hoy guarda el detector elegido por
+`python cli.py calibrate`.
+"""
+from typing import Any
+import json
+import os
+
+
+CONFIG_ENV = 'TRENDETECT_CONFIG'
+DEFAULT_CONFIG_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                   'trendetect_config.json')
+
+
+def config_path() -> str:
+    return os.environ.get(CONFIG_ENV, DEFAULT_CONFIG_PATH)
+
+
+def load_config() -> dict:
+    path = config_path()
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def get_setting(key: str, default: Any = None) -> Any:
+    return load_config().get(key, default)
+
+
+def save_config(**updates) -> str:
+    """Actualiza las claves indicadas y reescribe el archivo de una vez. Devuelve su ruta."""
+    path = config_path()
+    config = {**load_config(), **updates}
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(config, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, path)
+    return path
@@ -0,0 +1,127 @@
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import Any, Callable, List, Optional
+from time import perf_counter
+import os
+import threading
+import uuid
+
+
+# Extensiones de video que acepta la aplicación (mismas que los diálogos de la interfaz)
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mov', '.mkv', '.webm')
+
+# Fracción del tiempo que un trabajo en baja prioridad cede la CPU en cada `check()`
+LOW_PRIORITY_YIELD = 0.5
+
+
+class JobStatus(Enum):
+    PENDING = "pendiente"
+    RUNNING = "procesando"
+    DONE = "terminado"
+    ERROR = "error"
+    CANCELLED = "cancelado"
+
+
+class JobCancelled(Exception):
+    """El trabajo se canceló antes de terminar (ver `JobControl`)."""
+
+
+class JobControl:
+    """
+    Control cooperativo de un trabajo en curso: cancelación y prioridad.
+
+    Otro hilo llama a `cancel()` o `promote()`; el hilo del trabajo llama a `check()` en
+    cada frame (lo hace `aruco_process`), que corta con `JobCancelled` o aplica el cambio
+    de prioridad desde el propio hilo.
+
+    En baja prioridad `check()` además cede la CPU: espera una fracción `low_priority_yield`
+    del tiempo transcurrido desde el `check()` anterior. No depende de la prioridad de
+    hilos del sistema (en Linux Qt no puede cambiarla, y bajar el `nice` de un hilo no se
+    puede revertir sin privilegios), y se deja de aplicar apenas el trabajo se promueve.
+
+    Args:
+        low_priority (bool): El trabajo arranca en baja prioridad (procesamiento especulativo).
+        on_priority_change (Callable[[bool], None], optional): Se llama desde el hilo del
+            trabajo con `low_priority` la primera vez y cada vez que cambia.
+        low_priority_yield (float): Fracción del tiempo que se cede en baja prioridad (0: nada).
+    """
+
+    def __init__(self, low_priority: bool = False, on_priority_change: Optional[Callable[[bool], None]] = None,
+                 low_priority_yield: float = LOW_PRIORITY_YIELD):
+        if not 0 <= low_priority_yield < 1:
+            raise ValueError(f"La fracción cedida debe estar en [0, 1) y es {low_priority_yield}.")
+        self.low_priority = low_priority
+        self.on_priority_change = on_priority_change
+        self.low_priority_yield = low_priority_yield
+        self._cancelled = threading.Event()
+        self._applied = None
+        self._last_check = None
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def promote(self):
+        """Pasa el trabajo a prioridad normal; se aplica en el próximo `check()`."""
+        self.low_priority = False
+
+    def check(self):
+        if self._cancelled.is_set():
+            raise JobCancelled()
+        if self._applied != self.low_priority:
+            self._applied = self.low_priority
+            if self.on_priority_change is not None:
+                self.on_priority_change(self.low_priority)
+
+        if not (self.low_priority and self.low_priority_yield):
+            self._last_check = None
+            return
+        now = perf_counter()
+        if self._last_check is not None:
+            # Se espera en proporción al trabajo hecho desde el check anterior; una
+            # cancelación corta la espera
+            pause = (now - self._last_check) * self.low_priority_yield / (1 - self.low_priority_yield)
+            if self._cancelled.wait(pause):
+                raise JobCancelled()
+        self._last_check = perf_counter()
+
+
+@dataclass
+class ProcessingJob:
+    """
+    Procesamiento de un video con su propio estado de pipeline.
+
+    Attributes:
+        video_path (str): Ruta del video a procesar.
+        job_id (str): Identificador único del trabajo.
+        status (JobStatus): Estado actual.
+        progress (float): Porcentaje de avance (0-100).
+        pipeline (Any): Instancia de `TrendetecT` dedicada a este trabajo.
+        results (List[object] | None): `[results_df, angle_plot]` una vez terminado.
+        error (str | None): Mensaje de error si el trabajo falló.
+        attempts (int): Intentos de procesamiento realizados (para reintentos).
+        control (JobControl | None): Cancelación y prioridad del trabajo en curso.
+        session_path (str | None): Archivo de sesión temporal de un trabajo terminado cuyos
+            datos se liberaron (`pipeline` y `results` quedan en None hasta recargarlo).
+    """
+    video_path: str
+    job_id: str = field(default_factory=lambda: uuid.uuid4().hex[:12])
+    status: JobStatus = JobStatus.PENDING
+    progress: float = 0.0
+    pipeline: Any = None
+    results: Optional[List[object]] = None
+    error: Optional[str] = None
+    attempts: int = 0
+    control: Optional[JobControl] = None
+    session_path: Optional[str] = None
+
+    @property
+    def name(self) -> str:
+        return os.path.basename(self.video_path)
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (JobStatus.DONE, JobStatus.ERROR, JobStatus.CANCELLED)
@@ -0,0 +1,105 @@
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import Dict, Optional, Tuple
+import json
+
+
+class MarkerRole(Enum):
+    HIP_TEST = "hip_test"
+    HIP_BASE = "hip_base"
+    TIBIA = "tibia"
+    SHOULDER_LEFT = "shoulder_left"
+    SHOULDER_RIGHT = "shoulder_right"
+
+
+@dataclass(frozen=True)
+class MarkerLayout:
+    """
+    Perfil declarativo de colocación de marcadores.
+
+    Asocia cada ID ArUco impreso con su rol anatómico, de modo que la detección
+    pueda descartar cualquier otro marcador presente en la escena y la asignación
+    de roles no dependa de la posición de los marcadores.
+
+    Attributes:
+        name (str): Nombre del perfil.
+        dictionary_name (str): Diccionario ArUco con el que se imprimieron los marcadores.
+        roles (Dict[int, MarkerRole]): Mapa ID ArUco -> rol anatómico.
+    """
+    name: str
+    dictionary_name: str = 'DICT_6X6_250'
+    roles: Dict[int, MarkerRole] = field(default_factory=dict)
+
+    @property
+    def marker_ids(self) -> Tuple[int, ...]:
+        """IDs relevantes del perfil, ordenados (útil como clave hashable)."""
+        return tuple(sorted(self.roles))
+
+    def rename_map(self) -> Dict[str, str]:
+        """Mapa de columnas `id_n_x/y` -> `<rol>_x/y` para renombrar el DataFrame de detección."""
+        rename_map = {}
+        for marker_id, role in self.roles.items():
+            rename_map[f"id_{marker_id}_x"] = f"{role.value}_x"
+            rename_map[f"id_{marker_id}_y"] = f"{role.value}_y"
+        return rename_map
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "MarkerLayout":
+        """
+        Construye un perfil a partir de un diccionario (p. ej. leído de JSON).
+
+        Formato esperado:
+            {"name": "...", "dictionary": "DICT_6X6_250", "roles": {"0": "tibia", "2": "hip_test"}}
+        """
+        try:
+            roles = {int(marker_id): MarkerRole(role) for marker_id, role in data['roles'].items()}
+        except (KeyError, ValueError) as e:
+            raise ValueError(f"Perfil de marcadores inválido: {e}") from e
+
+        return cls(
+            name=data.get('name', 'personalizado'),
+            dictionary_name=data.get('dictionary', 'DICT_6X6_250'),
+            roles=roles,
+        )
+
+
+# Perfiles incluidos. Corresponden a los marcadores generados con `generate_markers`
+# (DICT_6X6_250, IDs 0-3): tibia con el ID 0 y caderas con los IDs 2 y 3. La variante
+# invertida se usa cuando se evalúa el otro lado sin volver a imprimir marcadores.
+MARKER_LAYOUTS: Dict[str, MarkerLayout] = {
+    'estandar': MarkerLayout(
+        name='estandar',
+        roles={0: MarkerRole.TIBIA, 2: MarkerRole.HIP_TEST, 3: MarkerRole.HIP_BASE},
+    ),
+    'estandar_invertido': MarkerLayout(
+        name='estandar_invertido',
+        roles={0: MarkerRole.TIBIA, 3: MarkerRole.HIP_TEST, 2: MarkerRole.HIP_BASE},
+    ),
+}
+
+
+def get_marker_layout(layout: Optional[str]) -> Optional[MarkerLayout]:
+    """
+    Devuelve un perfil por nombre o, si `layout` es una ruta a un archivo JSON, lo carga.
+
+    Args:
+        layout (str | None): Nombre de un perfil de `MARKER_LAYOUTS` o ruta a un JSON.
+
+    Returns:
+        MarkerLayout | None: El perfil, o None si no se indicó ninguno.
+    """
+    if layout is None:
+        return None
+
+    if layout in MARKER_LAYOUTS:
+        return MARKER_LAYOUTS[layout]
+
+    if layout.endswith('.json'):
+        return load_marker_layout(layout)
+
+    raise ValueError(f"Perfil de marcadores desconocido: {layout}")
+
+
+def load_marker_layout(file_path: str) -> MarkerLayout:
+    with open(file_path, encoding='utf-8') as f:
+        return MarkerLayout.from_dict(json.load(f))
@@ -0,0 +1,314 @@
+"""
+Sesiones multi-cámara: la misma prueba grabada a la vez desde varios celulares.
+
+Cada video se detecta en su propio proceso, así el tiempo total es el del video más
+largo y no la suma. Después las vistas se alinean en el tiempo respecto de una vista de
+referencia (por defecto, la primera):
+
+- Sincronización visual: el despegue del pie es visible en todas las vistas, así que se
+  correlaciona la señal de movimiento de la tibia (aparición/desaparición del marcador y
+  desplazamiento vertical) de cada vista con la de la referencia y se toma el retardo de
+  máxima correlación (con refinamiento parabólico del pico). La precisión está limitada
+  por el paso entre frames procesados: 4 frames, ~0.13 s a 30 fps.
+- También se puede indicar el desfase de una vista a mano (p. ej. medido con una palmada
+  en el audio, que OpenCV no lee).
+
+Con las vistas alineadas se arma una única tabla de trayectorias sobre los tiempos de la
+referencia y una serie de ángulo pélvico por vista, recortadas a la ventana de prueba
+de la referencia.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+import os
+
+import numpy as np
+import pandas as pd
+from scipy import signal
+from scipy.ndimage import gaussian_filter1d
+
+from core.marker_layout import MarkerLayout, MarkerRole, get_marker_layout
+from core.tools.compact_trajectory import CompactTrajectory
+
+
+# Paso entre frames procesados, como en `TrendetecT.process_video`
+FRAME_STEP = 3
+# Frecuencia de la grilla común sobre la que se correlacionan las vistas
+SYNC_RATE = 30.0
+# Suavizado de la señal de movimiento (segundos)
+SYNC_SMOOTHING = 0.1
+
+
+@dataclass
+class ViewResult:
+    """
+    Resultado de una vista.
+
+    Attributes:
+        name (str): Nombre de la vista (p. ej. 'frontal', 'lateral').
+        video_path (str): Video de la vista.
+        time_offset (float): Segundos sumados a los tiempos de la vista para alinearla con la referencia.
+        sync_score (float): Correlación normalizada en el retardo elegido (1 en la referencia;
+            NaN si el desfase se indicó a mano).
+        detections (pd.DataFrame): Detecciones con roles y tiempos ya alineados.
+        angles (pd.Series, optional): Ángulo pélvico en la ventana de prueba.
+        results (pd.DataFrame, optional): Tabla de métricas de `angles`.
+        error (str, optional): Por qué no se pudo calcular el ángulo de la vista.
+    """
+    name: str
+    video_path: str
+    time_offset: float = 0.0
+    sync_score: float = float('nan')
+    detections: Optional[pd.DataFrame] = None
+    angles: Optional[pd.Series] = None
+    results: Optional[pd.DataFrame] = None
+    error: Optional[str] = None
+
+
+@dataclass
+class MultiViewResult:
+    reference: str
+    views: Dict[str, ViewResult]
+    # Una fila por tiempo de la referencia; columnas `<vista>_<rol>_x/y`
+    trajectories: pd.DataFrame
+    window: Tuple[float, float]
+
+    def angle_table(self) -> pd.DataFrame:
+        """Series de ángulo de todas las vistas alineadas sobre la unión de sus tiempos."""
+        series = [view.angles.rename(name) for name, view in self.views.items() if view.angles is not None]
+        return pd.concat(series, axis=1).sort_index()
+
+
+def _limit_threads(threads: int):
+    """Reparte los núcleos entre los procesos de detección para que OpenCV no los sobresuscriba."""
+    import cv2
+
+    cv2.setNumThreads(threads)
+
+
+def detect_view(video_path: str, layout: Optional[MarkerLayout] = None) -> CompactTrajectory:
+    """Detección de una vista. Corre en el pool de procesos."""
+    from core.trendetect import TrendetecT
+
+    return TrendetecT(layout=layout).detect_trajectory(video_path, frame_step=FRAME_STEP)
+
+
+# ==========================
+# Sincronización
+# ==========================
+def tibia_motion_signal(df: pd.DataFrame, rate: float = SYNC_RATE) -> np.ndarray:
+    """
+    Señal de movimiento de la tibia sobre una grilla uniforme desde t = 0.
+
+    Suma la presencia del marcador (0/1) y su posición vertical normalizada, toma la
+    derivada (los cambios, no los niveles, son lo que comparten las vistas) y la suaviza.
+
+    Args:
+        df (pd.DataFrame): Detecciones con roles asignados (`time`, `tibia_x`, `tibia_y`).
+        rate (float): Muestras por segundo de la grilla.
+    """
+    times = df['time'].to_numpy(np.float64)
+    y = df[f"{MarkerRole.TIBIA.value}_y"].to_numpy(np.float64)
+    present = ~np.isnan(y)
+    if not present.any():
+        raise ValueError("No se detectó la tibia: no hay evento visual para sincronizar.")
+
+    spread = np.nanstd(y) or 1.0
+    level = present + np.where(present, (y - np.nanmedian(y)) / spread, 0.0)
+
+    # Retención de orden cero sobre la grilla (las muestras detectadas van cada 4 frames)
+    grid = np.arange(0.0, times[-1] + 1.0 / rate, 1.0 / rate)
+    index = np.clip(np.searchsorted(times, grid, side='right') - 1, 0, len(times) - 1)
+    motion = gaussian_filter1d(np.gradient(level[index]), sigma=SYNC_SMOOTHING * rate)
+
+    return (motion - motion.mean()) / (motion.std() or 1.0)
+
+
+def estimate_time_offset(reference: pd.DataFrame, view: pd.DataFrame, max_offset: float = 10.0,
+                         rate: float = SYNC_RATE) -> Tuple[float, float]:
+    """
+    Desfase entre dos vistas por correlación cruzada del movimiento de la tibia.
+
+    Args:
+        reference (pd.DataFrame): Detecciones con roles de la vista de referencia.
+        view (pd.DataFrame): Detecciones con roles de la vista a alinear.
+        max_offset (float): Máximo desfase buscado, en segundos.
+        rate (float): Muestras por segundo de la grilla de correlación.
+
+    Returns:
+        tuple: (desfase en segundos a sumar a los tiempos de `view`, correlación normalizada).
+    """
+    ref_signal = tibia_motion_signal(reference, rate)
+    view_signal = tibia_motion_signal(view, rate)
+
+    corr = signal.correlate(ref_signal, view_signal, mode='full', method='fft')
+    lags = signal.correlation_lags(len(ref_signal), len(view_signal), mode='full')
+    corr /= np.sqrt(np.dot(ref_signal, ref_signal) * np.dot(view_signal, view_signal)) or 1.0
+
+    allowed = np.abs(lags) <= max_offset * rate
+    best = np.flatnonzero(allowed)[np.argmax(corr[allowed])]
+
+    # Refinamiento parabólico alrededor del máximo
+    shift = 0.0
+    if 0 < best < len(corr) - 1:
+        left, center, right = corr[best - 1:best + 2]
+        denominator = left - 2 * center + right
+        if denominator < 0:
+            shift = 0.5 * (left - right) / denominator
+
+    return float((lags[best] + shift) / rate), float(corr[best])
+
+
+# ==========================
+# Sesión
+# ==========================
+class MultiViewSession:
+    """
+    Procesa una prueba grabada desde varias cámaras.
+
+    Args:
+        views (Dict[str, str]): Nombre de la vista -> video. La primera es la referencia
+            salvo que se indique `reference`.
+        layout (MarkerLayout | str, optional): Perfil de marcadores. Muy recomendable: en las
+            vistas laterales la asignación de roles por posición no es confiable.
+        reference (str, optional): Vista de referencia (su ventana de prueba y sus tiempos mandan).
+        offsets (Dict[str, float], optional): Desfases conocidos (segundos a sumar a los
+            tiempos de la vista); esas vistas no se sincronizan visualmente.
+        max_offset (float): Máximo desfase buscado por la sincronización visual.
+        workers (int, optional): Procesos de detección (por defecto, uno por vista).
+    """
+
+    def __init__(self, views: Dict[str, str], layout: MarkerLayout | str = None, reference: Optional[str] = None,
+                 offsets: Optional[Dict[str, float]] = None, max_offset: float = 10.0,
+                 workers: Optional[int] = None):
+        if len(views) < 2:
+            raise ValueError("Una sesión multi-cámara necesita al menos dos vistas.")
+        reference = reference or next(iter(views))
+        if reference not in views:
+            raise ValueError(f"La vista de referencia {reference} no está entre las vistas.")
+        unknown = set(offsets or {}) - set(views)
+        if unknown:
+            raise ValueError(f"Desfases para vistas inexistentes: {', '.join(sorted(unknown))}")
+
+        self.views = dict(views)
+        self.layout = get_marker_layout(layout) if isinstance(layout, str) else layout
+        self.reference = reference
+        self.offsets = dict(offsets or {})
+        self.max_offset = max_offset
+        self.workers = workers
+
+
+    def process(self, progress_callback=None) -> MultiViewResult:
+        from core.trendetect import NullProgress, TrendetecT
+
+        progress_callback = progress_callback or NullProgress()
+        trendetect = TrendetecT(layout=self.layout)
+
+        # Detección en paralelo: una vista por proceso
+        progress_callback.emit(10)
+        workers = self.workers or len(self.views)
+        threads = max(1, (os.cpu_count() or 1) // workers)
+        with ProcessPoolExecutor(max_workers=workers, initializer=_limit_threads, initargs=(threads,)) as pool:
+            futures = {name: pool.submit(detect_view, path, self.layout) for name, path in self.views.items()}
+            trajectories = {name: future.result() for name, future in futures.items()}
+
+        progress_callback.emit(60)
+        results = {name: ViewResult(name, path) for name, path in self.views.items()}
+        roles = {}
+        for name, result in results.items():
+            try:
+                roles[name] = trendetect.assign_marker_roles(trajectories[name].to_dataframe())
+            except ValueError as e:
+                if name == self.reference:
+                    raise ValueError(f"Vista {name}: {e}") from e
+                result.error = str(e)
+
+        # Alineación temporal contra la referencia
+        progress_callback.emit(70)
+        reference_df = roles[self.reference]
+        results[self.reference].sync_score = 1.0
+        for name, df in roles.items():
+            if name == self.reference:
+                continue
+            if name in self.offsets:
+                offset = self.offsets[name]
+            else:
+                try:
+                    offset, results[name].sync_score = estimate_time_offset(reference_df, df, self.max_offset)
+                except ValueError as e:
+                    results[name].error = str(e)
+                    continue
+            results[name].time_offset = offset
+            df['time'] = df['time'] + offset
+
+        # La referencia define la ventana de prueba, igual que en el análisis de una sola cámara
+        progress_callback.emit(80)
+        if not trendetect.validate_detection(reference_df):
+            raise ValueError(f"Vista {self.reference}: detección insuficiente para procesar la prueba.")
+        window = self._analyze_view(trendetect, results[self.reference], reference_df, None)
+
+        for name, df in roles.items():
+            if name != self.reference and results[name].error is None:
+                try:
+                    self._analyze_view(trendetect, results[name], df, window)
+                except ValueError as e:
+                    results[name].error = str(e)
+
+        progress_callback.emit(95)
+        merged = self._merge(results, reference_df['time'])
+
+        progress_callback.emit(100)
+        return MultiViewResult(self.reference, results, merged, window)
+
+
+    def _analyze_view(self, trendetect, result: ViewResult, df: pd.DataFrame,
+                      window: Optional[Tuple[float, float]]) -> Tuple[float, float]:
+        """Ángulo de una vista. Sin `window` (referencia) recorta con `crop_test_window`."""
+        result.detections = df
+        df = trendetect.interpolate_missing(df.copy())
+        offset = trendetect.compute_offset(df)
+
+        if window is None:
+            cropped = trendetect.crop_test_window(df)
+            window = (float(cropped['time'].iloc[0]), float(cropped['time'].iloc[-1]))
+        else:
+            cropped = df[(df['time'] >= window[0]) & (df['time'] <= window[1])]
+            if cropped.empty:
+                raise ValueError("La vista no tiene muestras dentro de la ventana de prueba.")
+
+        result.angles = trendetect.substract_base_angle(trendetect.compute_hip_angles(cropped), offset)
+        result.results = trendetect.generate_results_table(result.angles)
+        return window
+
+
+    def _merge(self, results: Dict[str, ViewResult], reference_times: pd.Series) -> pd.DataFrame:
+        """Trayectorias de todas las vistas sobre los tiempos de la referencia (muestra más cercana)."""
+        merged = pd.DataFrame({'time': reference_times.to_numpy()})
+        for name, result in results.items():
+            if result.detections is None:
+                continue
+            df = result.detections.sort_values('time')
+            tolerance = float(np.median(np.diff(df['time'].to_numpy()))) / 2 if len(df) > 1 else None
+            df = df.rename(columns={col: f"{name}_{col}" for col in df.columns if col != 'time'})
+            merged = pd.merge_asof(merged, df, on='time', direction='nearest', tolerance=tolerance)
+        return merged
+
+
+    def save(self, result: MultiViewResult, output_dir: str):
+        """Guarda trayectorias, ángulos, métricas por vista y los desfases usados."""
+        os.makedirs(output_dir, exist_ok=True)
+        result.trajectories.to_csv(os.path.join(output_dir, 'trajectories.csv'), index=False)
+        result.angle_table().to_csv(os.path.join(output_dir, 'angles.csv'), index_label='time')
+
+        rows = []
+        for name, view in result.views.items():
+            if view.results is not None:
+                rows.append(view.results.assign(view=name))
+        if rows:
+            pd.concat(rows, ignore_index=True).to_csv(os.path.join(output_dir, 'results.csv'), index=False)
+
+        pd.DataFrame([
+            {'view': name, 'video': view.video_path, 'time_offset': view.time_offset,
+             'sync_score': view.sync_score, 'error': view.error}
+            for name, view in result.views.items()
+        ]).to_csv(os.path.join(output_dir, 'sync.csv'), index=False)
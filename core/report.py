@@ -0,0 +1,349 @@
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime
+from html import escape
+from io import BytesIO
+from threading import Lock
+from typing import Dict, List, Optional, Sequence, Tuple
+import base64
+import os
+
+import cv2
+import numpy as np
+import pandas as pd
+from matplotlib.backends.backend_pdf import PdfPages
+from matplotlib.figure import Figure
+
+from core.config import get_setting
+from core.tools.frame_index import FrameIndex
+from core.tools.metrics import metric_unit
+from core.tools.overlay import draw_pelvic_overlay
+
+
+ROLES = ('hip_test', 'hip_base', 'tibia')
+
+REPORT_CACHE_SETTING = 'report_cache_mb'
+DEFAULT_REPORT_CACHE_MB = 64
+
+
+@dataclass
+class RenderedSession:
+    """Imágenes ya renderizadas de una sesión, listas para cualquier formato de informe."""
+    plot_png: Optional[bytes] = None
+    plot_image: Optional[np.ndarray] = None
+    # Momento (seg) -> imagen RGB del frame con overlay y su PNG
+    frames: Dict[float, np.ndarray] = field(default_factory=dict)
+    frames_png: Dict[float, bytes] = field(default_factory=dict)
+
+    @property
+    def nbytes(self) -> int:
+        images = [self.plot_image, *self.frames.values()]
+        pngs = [self.plot_png, *self.frames_png.values()]
+        return (sum(image.nbytes for image in images if image is not None)
+                + sum(len(png) for png in pngs if png is not None))
+
+
+class ReportCache:
+    """
+    Cache por sesión de gráficos y frames clave renderizados.
+
+    Re-exportar la misma sesión (o exportar muchas en lote) no vuelve a renderizar el
+    gráfico ni a decodificar el video. La clave identifica el video y la serie de ángulos.
+    Como `SessionCache`, se acota en bytes y descarta primero las sesiones usadas hace más
+    tiempo (LRU).
+
+    Args:
+        max_bytes (int, optional): Tope de memoria; por defecto, `report_cache_mb` de la
+            configuración (64 MB). Una sesión más grande que el tope no se guarda.
+    """
+
+    def __init__(self, max_bytes: Optional[int] = None):
+        if max_bytes is None:
+            max_bytes = int(get_setting(REPORT_CACHE_SETTING, DEFAULT_REPORT_CACHE_MB) * 2 ** 20)
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.evictions = 0
+        self._sessions: "OrderedDict[str, Tuple[RenderedSession, int]]" = OrderedDict()
+        self._lock = Lock()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def get(self, key: str) -> RenderedSession:
+        """La sesión guardada o una vacía, que se guarda al completarla con `put`."""
+        with self._lock:
+            entry = self._sessions.get(key)
+            if entry is None:
+                return RenderedSession()
+            self._sessions.move_to_end(key)
+            return entry[0]
+
+    def put(self, key: str, rendered: RenderedSession) -> bool:
+        """Guarda (o actualiza) la sesión. Devuelve False si no entra."""
+        size = rendered.nbytes
+        with self._lock:
+            self._discard(key)
+            if size > self.max_bytes:
+                return False
+
+            self._sessions[key] = (rendered, size)
+            self.nbytes += size
+            while self.nbytes > self.max_bytes:
+                self._discard(next(iter(self._sessions)))
+                self.evictions += 1
+            return True
+
+    def clear(self):
+        with self._lock:
+            self._sessions.clear()
+            self.nbytes = 0
+
+    def _discard(self, key: str):
+        entry = self._sessions.pop(key, None)
+        if entry is not None:
+            self.nbytes -= entry[1]
+
+
+REPORT_CACHE = ReportCache()
+
+
+def session_key(video_path: Optional[str], angle_series: pd.Series) -> str:
+    """Clave de cache: identidad del archivo de video (ruta, tamaño, mtime) y hash de la serie."""
+    video_id = ''
+    if video_path and os.path.exists(video_path):
+        stat = os.stat(video_path)
+        video_id = f"{os.path.abspath(video_path)}:{stat.st_size}:{stat.st_mtime_ns}"
+
+    series_hash = int(pd.util.hash_pandas_object(angle_series, index=True).sum())
+    return f"{video_id}|{series_hash}"
+
+
+def render_session(trendetect, results_df: pd.DataFrame, cache: ReportCache = REPORT_CACHE) -> RenderedSession:
+    """
+    Renderiza (o recupera del cache) el gráfico de ángulo y los frames clave de una sesión.
+
+    Los frames clave son los momentos de la tabla de resultados (ángulo máximo, mínimo, ...)
+    con los centroides, la línea pélvica y el ángulo dibujados encima.
+    """
+    key = session_key(trendetect.video_path, trendetect.angle_series)
+    rendered = cache.get(key)
+
+    if rendered.plot_png is None:
+        fig = trendetect.generate_angle_plot(trendetect.angle_series)
+        rendered.plot_png = figure_to_png(fig)
+        rendered.plot_image = cv2.cvtColor(cv2.imdecode(np.frombuffer(rendered.plot_png, np.uint8),
+                                                        cv2.IMREAD_COLOR), cv2.COLOR_BGR2RGB)
+
+    moments = [m for m in results_df['Momento'] if m is not None and not pd.isna(m)]
+    missing = [m for m in moments if m not in rendered.frames]
+    if missing and trendetect.video_path and trendetect.df is not None:
+        rendered.frames.update(extract_key_frames(trendetect.video_path, trendetect.df,
+                                                  trendetect.angle_series, missing, trendetect.frame_index))
+        for moment in missing:
+            if moment in rendered.frames:
+                rendered.frames_png[moment] = image_to_png(rendered.frames[moment])
+
+    cache.put(key, rendered)
+    return rendered
+
+
+def extract_key_frames(video_path: str, df: pd.DataFrame, angle_series: pd.Series,
+                       moments: Sequence[float], frame_index: Optional[FrameIndex] = None) -> Dict[float, np.ndarray]:
+    """
+    Decodifica sólo los frames de los momentos indicados y les dibuja el overlay.
+
+    Con el índice de frames del video, cada momento se ubica por su PTS real
+    (`FrameIndex.frame_at` y `FrameIndex.seek`); sin índice, con `momento * fps`, que en
+    video de FPS variable puede caer en otro frame.
+
+    Returns:
+        Dict[float, np.ndarray]: Momento -> imagen RGB en orientación portrait.
+    """
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise ValueError(f"No se pudo abrir el video en {video_path}")
+
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    frames = {}
+    use_index = frame_index is not None and frame_index.n_frames > 0
+    for moment in sorted(moments):
+        if use_index:
+            ret = frame_index.seek(cap, frame_index.frame_at(moment))
+            if ret:
+                ret, frame = cap.retrieve()
+        else:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, int(round(moment * fps)))
+            ret, frame = cap.read()
+        if not ret:
+            continue
+
+        frame = cv2.rotate(frame, cv2.ROTATE_90_CLOCKWISE)  # misma orientación que la detección
+
+        row = df.iloc[(df['time'] - moment).abs().argmin()]
+        points = {role: (row.get(f"{role}_x"), row.get(f"{role}_y")) for role in ROLES}
+        angle = angle_series.iloc[np.abs(angle_series.index.to_numpy() - moment).argmin()]
+
+        draw_pelvic_overlay(frame, points, angle)
+        frames[moment] = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+
+    cap.release()
+    return frames
+
+
+def figure_to_png(fig: Figure, dpi: int = 120) -> bytes:
+    buffer = BytesIO()
+    fig.savefig(buffer, format='png', dpi=dpi)
+    return buffer.getvalue()
+
+
+def image_to_png(image_rgb: np.ndarray, max_height: int = 720) -> bytes:
+    height, width = image_rgb.shape[:2]
+    if height > max_height:
+        image_rgb = cv2.resize(image_rgb, (int(width * max_height / height), max_height),
+                               interpolation=cv2.INTER_AREA)
+    ok, encoded = cv2.imencode('.png', cv2.cvtColor(image_rgb, cv2.COLOR_RGB2BGR))
+    if not ok:
+        raise ValueError("No se pudo codificar la imagen.")
+    return encoded.tobytes()
+
+
+def format_value(metric: str, value) -> str:
+    if value is None or pd.isna(value):
+        return "-"
+    return f"{value:.2f} {metric_unit(metric)}"
+
+
+def format_moment(moment) -> str:
+    return "-" if moment is None or pd.isna(moment) else f"{moment:.2f} seg"
+
+
+def embed_png(png: bytes) -> str:
+    return f'<img src="data:image/png;base64,{base64.b64encode(png).decode("ascii")}">'
+
+
+# ==========================
+# Formatos de salida
+# ==========================
+def write_html_report(file_path: str, title: str, results_df: pd.DataFrame, rendered: RenderedSession):
+    """Informe HTML autocontenido (imágenes embebidas en base64)."""
+    rows = []
+    for _, row in results_df.iterrows():
+        rows.append(f"<tr><td>{escape(row['Métrica'])}</td><td>{format_value(row['Métrica'], row['Valor'])}</td>"
+                    f"<td>{format_moment(row['Momento'])}</td></tr>")
+
+    frames = [f'<figure>{embed_png(png)}<figcaption>Momento: {moment:.2f} seg</figcaption></figure>'
+              for moment, png in sorted(rendered.frames_png.items())]
+
+    html = f"""<!DOCTYPE html>
+<html lang="es">
+<head>
+<meta charset="utf-8">
+<title>{escape(title)}</title>
+<style>
+    body {{ font-family: Intel, Arial, sans-serif; color: #374151; background: #F9FAFB; margin: 32px; }}
+    table {{ border-collapse: collapse; margin-bottom: 24px; }}
+    td, th {{ padding: 6px 14px; border-bottom: 1px solid #E5E7EB; text-align: left; }}
+    img {{ max-width: 100%; }}
+    .frames {{ display: flex; gap: 16px; flex-wrap: wrap; }}
+    .frames img {{ max-height: 480px; }}
+</style>
+</head>
+<body>
+<h1>{escape(title)}</h1>
+<p>Generado el {datetime.now():%d/%m/%Y %H:%M}</p>
+<h2>Resumen</h2>
+<table>
+<tr><th>Métrica</th><th>Valor</th><th>Momento</th></tr>
+{''.join(rows)}
+</table>
+<h2>Evolución del ángulo</h2>
+{embed_png(rendered.plot_png)}
+<h2>Frames clave</h2>
+<div class="frames">{''.join(frames)}</div>
+</body>
+</html>
+"""
+    with open(file_path, 'w', encoding='utf-8') as f:
+        f.write(html)
+
+
+def write_pdf_report(file_path: str, title: str, results_df: pd.DataFrame, rendered: RenderedSession):
+    """Informe PDF de dos páginas: resumen con gráfico, y frames clave."""
+    with PdfPages(file_path) as pdf:
+        # --- Página 1: tabla + gráfico ---
+        page = Figure(figsize=(8.27, 11.69))
+        page.suptitle(title, fontsize=16)
+
+        table_ax = page.add_axes([0.08, 0.62, 0.84, 0.28])
+        table_ax.axis('off')
+        cells = [[row['Métrica'], format_value(row['Métrica'], row['Valor']), format_moment(row['Momento'])]
+                 for _, row in results_df.iterrows()]
+        table = table_ax.table(cellText=cells, colLabels=['Métrica', 'Valor', 'Momento'], loc='upper center')
+        table.scale(1, 1.4)
+
+        plot_ax = page.add_axes([0.05, 0.08, 0.9, 0.5])
+        plot_ax.imshow(rendered.plot_image)
+        plot_ax.axis('off')
+        pdf.savefig(page)
+
+        # --- Página 2: frames clave ---
+        if rendered.frames:
+            page = Figure(figsize=(8.27, 11.69))
+            page.suptitle("Frames clave", fontsize=16)
+            axes = page.subplots(1, len(rendered.frames), squeeze=False)[0]
+            for ax, (moment, image) in zip(axes, sorted(rendered.frames.items())):
+                ax.imshow(image)
+                ax.set_title(f"Momento: {moment:.2f} seg")
+                ax.axis('off')
+            pdf.savefig(page)
+
+
+def export_report(trendetect, results_df: pd.DataFrame, file_path: str,
+                  cache: ReportCache = REPORT_CACHE, progress_callback=None) -> List[str]:
+    """
+    Genera el informe (PDF o HTML según la extensión) de una sesión procesada.
+
+    Pensado para correr en un `Worker`: no toca la interfaz y reporta avance por `progress_callback`.
+
+    Returns:
+        List[str]: Rutas de los archivos escritos.
+    """
+    if trendetect.angle_series is None:
+        raise ValueError("No hay datos para exportar. Procesa un video primero.")
+
+    if progress_callback:
+        progress_callback.emit(10)
+    rendered = render_session(trendetect, results_df, cache)
+
+    if progress_callback:
+        progress_callback.emit(70)
+    title = "Prueba de Trendelenburg"
+    if trendetect.video_path:
+        title += f" - {os.path.basename(trendetect.video_path)}"
+
+    if file_path.lower().endswith('.html'):
+        write_html_report(file_path, title, results_df, rendered)
+    else:
+        write_pdf_report(file_path, title, results_df, rendered)
+
+    if progress_callback:
+        progress_callback.emit(100)
+    return [file_path]
+
+
+def export_reports(sessions: Sequence, folder: str, extension: str = 'pdf',
+                   cache: ReportCache = REPORT_CACHE, progress_callback=None) -> List[str]:
+    """
+    Exporta en lote. `sessions` son pares `(trendetect, results_df)`; cada informe se nombra
+    como su video.
+    """
+    written = []
+    for i, (trendetect, results_df) in enumerate(sessions):
+        name = os.path.splitext(os.path.basename(trendetect.video_path or f"sesion_{i + 1}"))[0]
+        file_path = os.path.join(folder, f"{name}.{extension}")
+        if file_path in written:
+            file_path = os.path.join(folder, f"{name}_{i + 1}.{extension}")
+        written += export_report(trendetect, results_df, file_path, cache)
+        if progress_callback:
+            progress_callback.emit(100 * (i + 1) / len(sessions))
+    return written
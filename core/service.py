@@ -0,0 +1,555 @@
+"""
+Servicio HTTP local de análisis, para integrar TrendetecT con otros sistemas del sitio
+(puente con la historia clínica, visor web) sin pasar por la interfaz.
+
+API (JSON salvo el gráfico):
+
+- `POST /jobs`: encola un video. El cuerpo es `{"path": "..."}` (`Content-Type:
+  application/json`) con un video accesible desde el servidor, o el video mismo
+  (cualquier otro `Content-Type`, p. ej. `video/mp4`; `?name=prueba.mp4` da el nombre).
+  Responde `202` con `job_id`. Con la cola llena responde `429` y `Retry-After`; si el
+  servicio se está cerrando o el pool de procesos se cayó, `503`.
+- `GET /jobs`: estado de todos los trabajos.
+- `GET /jobs/<id>`: estado y progreso (0-100, el de `progress_callback` del pipeline).
+- `GET /jobs/<id>/results`: métricas, serie de ángulo con su tiempo (y la 3D con
+  `camera`) y parámetros; `409` si el trabajo todavía no terminó.
+- `GET /jobs/<id>/plot`: el gráfico en PNG.
+- `DELETE /jobs/<id>`: cancela un trabajo que todavía no empezó.
+- `GET /health`: ocupación del servicio.
+
+Cada trabajo corre `process_recording` (el mismo de la carpeta vigilada) en un pool de
+`workers` procesos y deja su sesión en `results_dir/<id>/`. Se aceptan a lo sumo
+`max_pending` trabajos sin terminar: el resto se rechaza en lugar de acumularse en
+memoria. Al pool pasan sólo los que pueden correr (los demás esperan en la cola del
+servicio, donde se pueden cancelar). El progreso vuelve de los procesos por una cola
+compartida.
+"""
+from concurrent.futures import CancelledError, Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, unquote, urlsplit
+import json
+import math
+import multiprocessing
+import os
+import shutil
+import threading
+import time
+
+import numpy as np
+
+from core.jobs import VIDEO_EXTENSIONS, JobStatus, ProcessingJob
+from core.session_file import SessionFile
+from core.watcher import process_recording, source_key
+
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+COPY_CHUNK = 1 << 20
+# Trabajos terminados que se recuerdan (los más viejos se olvidan; su carpeta queda)
+MAX_FINISHED = 500
+
+# Cola de progreso del proceso del pool (ver `_init_worker`)
+_progress_queue = None
+
+
+def _init_worker(progress_queue):
+    global _progress_queue
+    _progress_queue = progress_queue
+
+
+class QueueProgress:
+    """`progress_callback` que manda el progreso de un trabajo al proceso del servicio."""
+
+    def __init__(self, job_id: str):
+        self.job_id = job_id
+
+    def emit(self, value):
+        _progress_queue.put((self.job_id, float(value)))
+
+
+def run_service_job(job_id: str, video_path: str, session_dir: str, layout: Optional[str],
+                    camera: Optional[str]) -> dict:
+    """Procesa un trabajo dentro del pool de procesos."""
+    return process_recording(video_path, session_dir, source_key(video_path), layout=layout,
+                             camera=camera, progress_callback=QueueProgress(job_id))
+
+
+def _json_list(values: np.ndarray) -> list:
+    # JSON no admite NaN: los huecos de la serie van como null
+    values = np.asarray(values, dtype=np.float64)
+    return [None if not math.isfinite(value) else value for value in values.tolist()]
+
+
+def session_json(session_path: str) -> dict:
+    """Resultados de una sesión guardada, listos para devolver como JSON."""
+    session = SessionFile(session_path)
+    angles = session.angle_series()
+    results = session.meta.get('results') or {}
+    metrics = [
+        {column: (None if isinstance(value, float) and not math.isfinite(value) else value)
+         for column, value in zip(results, row)}
+        for row in zip(*results.values())
+    ]
+
+    data = {
+        'video': session.meta.get('video'),
+        'parameters': session.meta.get('parameters'),
+        'metrics': metrics,
+        'angles': {'time': _json_list(angles.index), 'angle': _json_list(angles.values)},
+    }
+    if 'angle_3d' in session:
+        data['angles_3d'] = _json_list(session.array('angle_3d'))
+        data['pose_comparison'] = session.meta.get('pose_comparison')
+    return data
+
+
+class ServiceBusy(Exception):
+    """El servicio no acepta el trabajo ahora (ver `status` y `retry_after`)."""
+
+    def __init__(self, message: str, status: HTTPStatus, retry_after: Optional[int] = None):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+
+class AnalysisService:
+    """
+    Servicio de análisis: cola de trabajos con un pool de procesos y la API HTTP.
+
+    Args:
+        results_dir (str): Carpeta de las sesiones (una subcarpeta por trabajo) y de los
+            videos subidos.
+        host (str): Dirección en la que escucha; por defecto sólo la máquina local.
+        port (int): Puerto (0 elige uno libre, ver `address`).
+        workers (int): Procesamientos simultáneos (tamaño del pool de procesos).
+        max_pending (int): Trabajos sin terminar (en cola o en curso) aceptados a la vez.
+        max_upload_mb (float): Tamaño máximo de un video subido.
+        layout (str, optional): Perfil de marcadores (ver `core.marker_layout`).
+        camera (str, optional): Perfil de cámara (ver `core.camera_profile`); activa el modo 3D.
+        keep_uploads (bool): Conserva los videos subidos después de procesarlos.
+    """
+
+    def __init__(self, results_dir: str, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT,
+                 workers: int = 2, max_pending: int = 8, max_upload_mb: float = 2048,
+                 layout: Optional[str] = None, camera: Optional[str] = None, keep_uploads: bool = False):
+        if workers < 1 or max_pending < workers:
+            raise ValueError("Se necesita al menos un proceso y max_pending >= workers.")
+
+        self.results_dir = results_dir
+        self.upload_dir = os.path.join(results_dir, 'uploads')
+        self.workers = workers
+        self.max_pending = max_pending
+        self.max_upload_bytes = int(max_upload_mb * 2 ** 20)
+        self.layout = layout
+        self.camera = camera
+        self.keep_uploads = keep_uploads
+
+        self.jobs: Dict[str, ProcessingJob] = {}
+        self._futures: Dict[str, Future] = {}
+        self._uploads: Dict[str, str] = {}
+        # Duración de los últimos trabajos, para estimar `Retry-After`
+        self._started: Dict[str, float] = {}
+        self._durations = []
+        self._results_json: Dict[str, bytes] = {}
+        self._queue: Deque[ProcessingJob] = deque()
+        self._lock = threading.Lock()
+        self._closing = False
+        self._broken = False
+
+        os.makedirs(self.upload_dir, exist_ok=True)
+        context = multiprocessing.get_context()
+        self._progress = context.Queue()
+        self._pool = ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                                         initializer=_init_worker, initargs=(self._progress,))
+        self._progress_thread = threading.Thread(target=self._drain_progress, name='service-progress', daemon=True)
+        self._progress_thread.start()
+
+        self.server = ThreadingHTTPServer((host, port), ServiceRequestHandler)
+        self.server.daemon_threads = True
+        self.server.service = self
+        self._server_thread = None
+
+    @property
+    def address(self) -> Tuple[str, int]:
+        return self.server.server_address[:2]
+
+    @property
+    def url(self) -> str:
+        host, port = self.address
+        return f"http://{host}:{port}"
+
+    # ==========================
+    # Ciclo de vida
+    # ==========================
+    def serve_forever(self):
+        try:
+            self.server.serve_forever()
+        finally:
+            self.close()
+
+    def start(self) -> "AnalysisService":
+        """Atiende pedidos en un hilo de fondo (para usarlo embebido o en pruebas)."""
+        self._server_thread = threading.Thread(target=self.server.serve_forever, name='service-http', daemon=True)
+        self._server_thread.start()
+        return self
+
+    def close(self, wait: bool = True):
+        """Deja de aceptar trabajos, cancela los que no empezaron y cierra el pool."""
+        with self._lock:
+            if self._closing:
+                return
+            self._closing = True
+            for job in self._queue:
+                job.status = JobStatus.CANCELLED
+            self._queue.clear()
+
+        if self._server_thread is not None:
+            self.server.shutdown()
+        self.server.server_close()
+        self._pool.shutdown(wait=wait, cancel_futures=True)
+        self._progress.put(None)
+        self._progress_thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    # ==========================
+    # Trabajos
+    # ==========================
+    def check_capacity(self):
+        """Lanza `ServiceBusy` si no se puede aceptar otro trabajo."""
+        with self._lock:
+            if self._closing:
+                raise ServiceBusy("El servicio se está cerrando.", HTTPStatus.SERVICE_UNAVAILABLE)
+            if self._broken:
+                raise ServiceBusy("El pool de procesos no está disponible.", HTTPStatus.SERVICE_UNAVAILABLE)
+            pending = sum(not job.finished for job in self.jobs.values())
+            if pending >= self.max_pending:
+                raise ServiceBusy(f"Hay {pending} trabajos sin terminar; reintentar más tarde.",
+                                  HTTPStatus.TOO_MANY_REQUESTS, self.retry_after(pending))
+
+    def retry_after(self, pending: int) -> int:
+        """Segundos estimados hasta que se libere un lugar en la cola."""
+        if not self._durations:
+            return 1
+        mean = sum(self._durations) / len(self._durations)
+        return max(1, math.ceil(mean * (pending - self.max_pending + 1) / self.workers))
+
+    def submit(self, video_path: str) -> ProcessingJob:
+        """
+        Encola un video.
+
+        Raises:
+            ValueError: Si el video no existe o no tiene una extensión de video.
+            ServiceBusy: Si la cola está llena o el servicio se está cerrando.
+        """
+        if not os.path.isfile(video_path):
+            raise ValueError(f"No existe el video: {video_path}")
+        if not video_path.lower().endswith(VIDEO_EXTENSIONS):
+            raise ValueError(f"Extensión de video no soportada: {os.path.basename(video_path)}")
+
+        self.check_capacity()
+        job = ProcessingJob(os.path.abspath(video_path))
+        return self._enqueue(job, upload=False)
+
+    def submit_upload(self, stream, length: int, name: str) -> ProcessingJob:
+        """Guarda un video subido (`length` bytes de `stream`) y lo encola."""
+        extension = os.path.splitext(name)[1].lower()
+        if extension not in VIDEO_EXTENSIONS:
+            raise ValueError(f"Extensión de video no soportada: {name}")
+        if length > self.max_upload_bytes:
+            raise ServiceBusy(f"El video supera el máximo de {self.max_upload_bytes // 2 ** 20} MB.",
+                              HTTPStatus.REQUEST_ENTITY_TOO_LARGE)
+
+        # Se rechaza antes de leer el cuerpo: la cola llena no debería costar la subida
+        self.check_capacity()
+        job = ProcessingJob(name)
+        os.makedirs(os.path.join(self.upload_dir, job.job_id))
+        job.video_path = os.path.join(self.upload_dir, job.job_id, name)
+
+        remaining = length
+        with open(job.video_path, 'wb') as f:
+            while remaining > 0:
+                chunk = stream.read(min(COPY_CHUNK, remaining))
+                if not chunk:
+                    break
+                f.write(chunk)
+                remaining -= len(chunk)
+        if remaining:
+            shutil.rmtree(os.path.dirname(job.video_path))
+            raise ValueError("La subida se cortó antes de terminar.")
+
+        return self._enqueue(job, upload=True)
+
+    def _enqueue(self, job: ProcessingJob, upload: bool) -> ProcessingJob:
+        with self._lock:
+            if self._closing:
+                raise ServiceBusy("El servicio se está cerrando.", HTTPStatus.SERVICE_UNAVAILABLE)
+            self.jobs[job.job_id] = job
+            self._queue.append(job)
+            if upload:
+                self._uploads[job.job_id] = job.video_path
+            self._forget_finished()
+            started = self._dispatch()
+        self._watch(started)
+        return job
+
+    def _dispatch(self) -> List[Tuple[ProcessingJob, Future]]:
+        """
+        Pasa trabajos de la cola al pool mientras haya procesos libres (con el lock tomado).
+        El pool recibe sólo lo que puede correr: lo demás espera en `_queue`, donde todavía
+        se puede cancelar.
+
+        Returns:
+            List[Tuple[ProcessingJob, Future]]: Los trabajos que pasaron al pool. Quien llama
+            los entrega a `_watch` después de soltar el lock.
+        """
+        started = []
+        while self._queue and len(self._futures) < self.workers and not self._closing:
+            job = self._queue.popleft()
+            session_dir = os.path.join(self.results_dir, job.job_id)
+            try:
+                future = self._pool.submit(run_service_job, job.job_id, job.video_path, session_dir,
+                                           self.layout, self.camera)
+            except BrokenProcessPool as e:
+                self._broken = True
+                job.error = f"El pool de procesos no está disponible: {e}"
+                job.status = JobStatus.ERROR
+                continue
+
+            job.status = JobStatus.RUNNING
+            job.attempts += 1
+            self._started[job.job_id] = time.monotonic()
+            self._futures[job.job_id] = future
+            started.append((job, future))
+        return started
+
+    def _watch(self, started: List[Tuple[ProcessingJob, Future]]):
+        """
+        Llama a `_finish` cuando termine cada trabajo. Sin el lock tomado: si el future ya
+        terminó, `add_done_callback` llama a `_finish` en el acto y éste toma el lock.
+        """
+        for job, future in started:
+            future.add_done_callback(lambda future, job=job: self._finish(job, future))
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancela un trabajo en cola. Devuelve False si ya empezó o terminó."""
+        with self._lock:
+            job = self.jobs.get(job_id)
+            if job is None or job not in self._queue:
+                return False
+            self._queue.remove(job)
+            job.status = JobStatus.CANCELLED
+            upload = self._uploads.pop(job_id, None)
+        self._remove_upload(upload)
+        return True
+
+    def _finish(self, job: ProcessingJob, future: Future):
+        with self._lock:
+            try:
+                job.results = future.result()
+            except CancelledError:
+                job.status = JobStatus.CANCELLED
+            except BrokenProcessPool as e:
+                # Un proceso del pool murió (p. ej. sin memoria): no se aceptan más trabajos
+                self._broken = True
+                job.error = f"El pool de procesos no está disponible: {e}"
+                job.status = JobStatus.ERROR
+            except Exception as e:
+                job.error = str(e) or type(e).__name__
+                job.status = JobStatus.ERROR
+            else:
+                job.status = JobStatus.DONE
+                job.progress = 100
+
+            started = self._started.pop(job.job_id, None)
+            if started is not None and job.status == JobStatus.DONE:
+                self._durations = (self._durations + [time.monotonic() - started])[-20:]
+            self._futures.pop(job.job_id, None)
+            upload = self._uploads.pop(job.job_id, None)
+            started = self._dispatch()
+
+        self._watch(started)
+        self._remove_upload(upload)
+
+    def _remove_upload(self, upload: Optional[str]):
+        if upload is not None and not self.keep_uploads:
+            # La carpeta del video subido (con el índice de frames que se le haya escrito al lado)
+            shutil.rmtree(os.path.dirname(upload), ignore_errors=True)
+
+    def _forget_finished(self):
+        finished = [job_id for job_id, job in self.jobs.items() if job.finished]
+        for job_id in finished[:max(0, len(finished) - MAX_FINISHED)]:
+            del self.jobs[job_id]
+            self._results_json.pop(job_id, None)
+
+    def _drain_progress(self):
+        while True:
+            try:
+                message = self._progress.get()
+            except (EOFError, OSError):
+                return
+            if message is None:
+                return
+
+            job_id, value = message
+            with self._lock:
+                job = self.jobs.get(job_id)
+                if job is not None and job.status == JobStatus.RUNNING:
+                    job.progress = value
+
+    # ==========================
+    # Respuestas
+    # ==========================
+    def job_status(self, job: ProcessingJob) -> dict:
+        return {
+            'job_id': job.job_id,
+            'video': job.name,
+            'status': job.status.value,
+            'progress': job.progress,
+            'error': job.error,
+        }
+
+    def health(self) -> dict:
+        with self._lock:
+            counts = {status.value: 0 for status in JobStatus}
+            for job in self.jobs.values():
+                counts[job.status.value] += 1
+            return {'closing': self._closing, 'workers': self.workers, 'max_pending': self.max_pending,
+                    'jobs': counts}
+
+    def results_json(self, job: ProcessingJob) -> bytes:
+        """Resultados serializados de un trabajo terminado (se arman una sola vez)."""
+        body = self._results_json.get(job.job_id)
+        if body is None:
+            data = {'job_id': job.job_id, **session_json(self.session_path(job, 'session'))}
+            body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+            self._results_json[job.job_id] = body
+        return body
+
+    def session_path(self, job: ProcessingJob, output: str) -> str:
+        return os.path.join(self.results_dir, job.job_id, job.results['outputs'][output])
+
+
+class ServiceRequestHandler(BaseHTTPRequestHandler):
+    """Rutas de la API (ver el docstring del módulo)."""
+
+    server_version = 'TrendetecT'
+    protocol_version = 'HTTP/1.1'
+
+    @property
+    def service(self) -> AnalysisService:
+        return self.server.service
+
+    def log_message(self, format, *args):
+        # Sin una línea por pedido: los clientes consultan el estado seguido
+        pass
+
+    # ==========================
+    # Métodos HTTP
+    # ==========================
+    def do_GET(self):
+        parts, _ = self._route()
+        if parts == ['health']:
+            return self._send_json(self.service.health())
+        if parts == ['jobs']:
+            with self.service._lock:
+                jobs = list(self.service.jobs.values())
+            return self._send_json({'jobs': [self.service.job_status(job) for job in jobs]})
+
+        job = self._job(parts)
+        if job is None:
+            return
+        if len(parts) == 2:
+            return self._send_json(self.service.job_status(job))
+
+        if parts[2] not in ('results', 'plot') or len(parts) > 3:
+            return self._send_error(HTTPStatus.NOT_FOUND, "Ruta desconocida.")
+        if job.status != JobStatus.DONE:
+            message = f"El trabajo está {job.status.value}" + (f": {job.error}" if job.error else ".")
+            return self._send_error(HTTPStatus.CONFLICT, message, status=job.status.value)
+
+        if parts[2] == 'results':
+            return self._send(HTTPStatus.OK, self.service.results_json(job), 'application/json')
+        with open(self.service.session_path(job, 'plot'), 'rb') as f:
+            return self._send(HTTPStatus.OK, f.read(), 'image/png')
+
+    def do_POST(self):
+        parts, query = self._route()
+        if parts != ['jobs']:
+            return self._send_error(HTTPStatus.NOT_FOUND, "Ruta desconocida.")
+
+        length = self.headers.get('Content-Length')
+        if length is None:
+            return self._send_error(HTTPStatus.LENGTH_REQUIRED, "Falta Content-Length.")
+        length = int(length)
+
+        try:
+            if self.headers.get_content_type() == 'application/json':
+                request = json.loads(self.rfile.read(length) or b'{}')
+                if not isinstance(request, dict) or 'path' not in request:
+                    raise ValueError("Se esperaba {\"path\": \"...\"}.")
+                job = self.service.submit(request['path'])
+            else:
+                name = os.path.basename(query.get('name', ['video.mp4'])[0])
+                job = self.service.submit_upload(self.rfile, length, name)
+        except ServiceBusy as e:
+            # El cuerpo no leído haría que la conexión se desincronice: se cierra
+            self.close_connection = True
+            headers = {'Retry-After': str(e.retry_after)} if e.retry_after else {}
+            return self._send_error(e.status, str(e), headers=headers)
+        except (ValueError, json.JSONDecodeError) as e:
+            self.close_connection = True
+            return self._send_error(HTTPStatus.BAD_REQUEST, str(e))
+
+        self._send_json({**self.service.job_status(job), 'status_url': f"/jobs/{job.job_id}"},
+                        HTTPStatus.ACCEPTED, headers={'Location': f"/jobs/{job.job_id}"})
+
+    def do_DELETE(self):
+        parts, _ = self._route()
+        job = self._job(parts)
+        if job is None:
+            return
+        if len(parts) != 2:
+            return self._send_error(HTTPStatus.NOT_FOUND, "Ruta desconocida.")
+        if not self.service.cancel(job.job_id):
+            return self._send_error(HTTPStatus.CONFLICT, f"El trabajo ya está {job.status.value}.")
+        self._send_json(self.service.job_status(job))
+
+    # ==========================
+    # Auxiliares
+    # ==========================
+    def _route(self):
+        url = urlsplit(self.path)
+        parts = [unquote(part) for part in url.path.split('/') if part]
+        return parts, parse_qs(url.query)
+
+    def _job(self, parts) -> Optional[ProcessingJob]:
+        job = self.service.jobs.get(parts[1]) if len(parts) >= 2 and parts[0] == 'jobs' else None
+        if job is None:
+            self._send_error(HTTPStatus.NOT_FOUND, "No existe el trabajo." if parts[:1] == ['jobs']
+                             else "Ruta desconocida.")
+        return job
+
+    def _send(self, status: HTTPStatus, body: bytes, content_type: str, headers: Optional[dict] = None):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, data: dict, status: HTTPStatus = HTTPStatus.OK, headers: Optional[dict] = None):
+        body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+        self._send(status, body, 'application/json', headers)
+
+    def _send_error(self, code: HTTPStatus, message: str, headers: Optional[dict] = None, **extra):
+        self._send_json({'error': message, **extra}, code, headers)
@@ -0,0 +1,136 @@
+"""
+Caché en memoria de sesiones procesadas, para volver a una sesión reciente al instante.
+
+Guarda, por video y parámetros de procesamiento, todo lo que muestra la interfaz y lo
+que hace falta para reanalizar: la trayectoria compacta, la ventana de prueba, las
+series de ángulo, la tabla resumen y la figura ya armada. El tamaño total se acota en
+bytes y se descartan primero las sesiones usadas hace más tiempo (LRU).
+
+Los objetos se comparten con quien los pide (no se copian): hay que tratarlos como de
+sólo lectura. Es seguro usar la caché desde varios hilos (la cola de la interfaz).
+"""
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional, Tuple
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from core.config import get_setting
+from core.tools.frame_index import video_signature
+
+
+CACHE_SETTING = 'session_cache_mb'
+DEFAULT_CACHE_MB = 256
+# Buffer RGBA de la figura renderizada (lo que ocupa en memoria una vez dibujada)
+FIGURE_BYTES_PER_PIXEL = 4
+
+
+@dataclass
+class CachedSession:
+    """
+    Resultado de procesar un video (o de cargar un archivo de resultados).
+
+    Attributes:
+        key (tuple): Clave de la caché (ver `session_key`).
+        results (list): `[results_df, angle_plot]`, como lo devuelve `process_video`.
+        state (dict): Atributos de `TrendetecT` que se restauran (df, angle_series, ...).
+    """
+    key: Tuple
+    results: list
+    state: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(object_nbytes(value) for value in (*self.results, *self.state.values()))
+
+
+def object_nbytes(value) -> int:
+    """Memoria aproximada de un objeto de la sesión."""
+    if value is None:
+        return 0
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        usage = value.memory_usage(deep=True)
+        return int(usage.sum() if isinstance(usage, pd.Series) else usage)
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if hasattr(value, 'get_size_inches'):   # Figure de matplotlib
+        width, height = value.get_size_inches() * value.dpi
+        return int(width * height * FIGURE_BYTES_PER_PIXEL)
+    if hasattr(value, 'thumbnails'):        # FrameIndex
+        return value.pts.nbytes + value.keyframes.nbytes + value.thumbnails.nbytes
+    return int(getattr(value, 'nbytes', 0))
+
+
+def file_identity(path: str) -> Tuple[str, str]:
+    """Identidad de un archivo: ruta absoluta y tamaño/fecha de modificación."""
+    return os.path.abspath(path), video_signature(path)
+
+
+class SessionCache:
+    """
+    LRU de `CachedSession` acotado por memoria.
+
+    Args:
+        max_bytes (int, optional): Tope de memoria; por defecto, `session_cache_mb` de la
+            configuración (256 MB). Una sesión más grande que el tope no se guarda.
+    """
+
+    def __init__(self, max_bytes: Optional[int] = None):
+        if max_bytes is None:
+            max_bytes = int(get_setting(CACHE_SETTING, DEFAULT_CACHE_MB) * 2 ** 20)
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._sessions: "OrderedDict[tuple, Tuple[CachedSession, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def __contains__(self, key) -> bool:
+        return key in self._sessions
+
+    def get(self, key: Tuple) -> Optional[CachedSession]:
+        with self._lock:
+            entry = self._sessions.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._sessions.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, session: CachedSession) -> bool:
+        """Guarda la sesión (reemplaza la de la misma clave). Devuelve False si no entra."""
+        size = session.nbytes
+        with self._lock:
+            self._discard(session.key)
+            if size > self.max_bytes:
+                return False
+
+            self._sessions[session.key] = (session, size)
+            self.nbytes += size
+            while self.nbytes > self.max_bytes:
+                key = next(iter(self._sessions))
+                self._discard(key)
+                self.evictions += 1
+            return True
+
+    def discard(self, key: Tuple):
+        with self._lock:
+            self._discard(key)
+
+    def clear(self):
+        with self._lock:
+            self._sessions.clear()
+            self.nbytes = 0
+
+    def _discard(self, key: Tuple):
+        entry = self._sessions.pop(key, None)
+        if entry is not None:
+            self.nbytes -= entry[1]
@@ -0,0 +1,173 @@
+"""
+Archivo de sesión binario (`.npz` sin comprimir, versionado).
+
+Guarda una sesión completa para reabrirla sin reprocesar el video:
+
+- `meta.json`: versión, video de origen, parámetros de procesamiento y la tabla resumen
+  (métricas) tal como se mostró;
+- `angle_time` / `angle`: la serie de ángulo con su eje de tiempo (y `angle_3d` en modo 3D);
+- `raw_*`: la trayectoria cruda compacta de la detección (`CompactTrajectory`);
+- `window_*`: la ventana de prueba ya procesada (roles asignados, interpolada y recortada).
+
+Al cargar, `SessionFile` lee sólo el directorio del zip y `meta.json`. Cada arreglo se
+abre recién cuando se pide y con memory-map directo sobre el archivo (`np.savez` guarda
+los miembros sin comprimir, así que los datos están contiguos en el zip). Mostrar una
+sesión lee únicamente la serie de ángulo, sin tocar las trayectorias.
+"""
+from datetime import datetime
+from typing import Dict, List, Optional
+import json
+import os
+import struct
+import zipfile
+
+import numpy as np
+import pandas as pd
+
+from core.tools.compact_trajectory import CompactTrajectory
+
+
+SESSION_VERSION = 1
+SESSION_SUFFIX = '.npz'
+META_NAME = 'meta.json'
+# Largo fijo del encabezado local de cada archivo del zip
+_LOCAL_HEADER = struct.Struct('<4sHHHHHIIIHH')
+
+_TRAJECTORY_FIELDS = ('frames', 'ids', 'coords', 'gated', 'timestamps', 'corners', 'frame_size')
+
+
+def save_session(path: str, arrays: Dict[str, np.ndarray], meta: dict) -> str:
+    """
+    Escribe el archivo de sesión de una vez (temporal + reemplazo).
+
+    Args:
+        path (str): Ruta del `.npz`.
+        arrays (Dict[str, np.ndarray]): Arreglos numéricos de la sesión.
+        meta (dict): Metadatos serializables a JSON; se agrega la versión del formato.
+    """
+    meta = {'version': SESSION_VERSION, 'created': datetime.now().isoformat(timespec='seconds'), **meta}
+    encoded = np.frombuffer(json.dumps(meta, ensure_ascii=False, default=_json_default).encode('utf-8'),
+                            dtype=np.uint8)
+
+    tmp_path = f"{path}.tmp.npz"
+    np.savez(tmp_path, **{META_NAME: encoded}, **arrays)
+    os.replace(tmp_path, path)
+    return path
+
+
+def _json_default(value):
+    # Escalares de numpy (p. ej. en la tabla de métricas)
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"{type(value).__name__} no se puede guardar en la sesión")
+
+
+def trajectory_arrays(trajectory: CompactTrajectory, prefix: str = 'raw_') -> Dict[str, np.ndarray]:
+    arrays = {f"{prefix}fps": np.float64(trajectory.fps)}
+    for name in _TRAJECTORY_FIELDS:
+        value = getattr(trajectory, name)
+        if value is not None:
+            arrays[f"{prefix}{name}"] = value
+    return arrays
+
+
+def window_arrays(df: pd.DataFrame, prefix: str = 'window_') -> Dict[str, np.ndarray]:
+    return {f"{prefix}{column}": df[column].to_numpy() for column in df.columns}
+
+
+class SessionFile:
+    """
+    Lector perezoso de un archivo de sesión.
+
+    Args:
+        path (str): Ruta del `.npz`.
+
+    Raises:
+        ValueError: Si el archivo no es una sesión o es de una versión más nueva.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        try:
+            with zipfile.ZipFile(path) as archive:
+                self._members = {os.path.splitext(info.filename)[0]: info for info in archive.infolist()}
+        except zipfile.BadZipFile as e:
+            raise ValueError(f"{path} no es un archivo de sesión: {e}") from e
+
+        if META_NAME not in self._members:
+            raise ValueError(f"{path} no es un archivo de sesión de TrendetecT.")
+        self._arrays: Dict[str, np.ndarray] = {}
+        self.meta = json.loads(bytes(self.array(META_NAME)).decode('utf-8'))
+        if self.meta.get('version', 0) > SESSION_VERSION:
+            raise ValueError(f"El archivo de sesión es de una versión más nueva ({self.meta['version']}).")
+
+    @property
+    def names(self) -> List[str]:
+        return [name for name in self._members if name != META_NAME]
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._members
+
+    def array(self, name: str) -> np.ndarray:
+        """El arreglo `name`, de sólo lectura y con memory-map (se abre la primera vez que se pide)."""
+        if name not in self._arrays:
+            if name not in self._members:
+                raise KeyError(f"La sesión no tiene '{name}'.")
+            self._arrays[name] = self._open_member(self._members[name])
+        return self._arrays[name]
+
+    def _open_member(self, info: zipfile.ZipInfo) -> np.ndarray:
+        with open(self.path, 'rb') as f:
+            if info.compress_type != zipfile.ZIP_STORED:
+                # Sesión comprimida por otra herramienta: no se puede mapear, se lee entera
+                with zipfile.ZipFile(f) as archive, archive.open(info) as member:
+                    return np.lib.format.read_array(member)
+
+            f.seek(info.header_offset)
+            header = _LOCAL_HEADER.unpack(f.read(_LOCAL_HEADER.size))
+            f.seek(info.header_offset + _LOCAL_HEADER.size + header[-2] + header[-1])
+
+            version = np.lib.format.read_magic(f)
+            if version == (1, 0):
+                shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+            else:
+                shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+            offset = f.tell()
+
+        if dtype.hasobject:
+            raise ValueError("El archivo de sesión contiene objetos de Python; no se carga.")
+        if not int(np.prod(shape)):
+            return np.empty(shape, dtype=dtype)
+        return np.memmap(self.path, dtype=dtype, mode='r', offset=offset, shape=shape,
+                         order='F' if fortran_order else 'C')
+
+    # ==========================
+    # Partes de la sesión
+    # ==========================
+    def angle_series(self, name: str = 'angle') -> Optional[pd.Series]:
+        if name not in self:
+            return None
+        return pd.Series(self.array(name), index=pd.Index(self.array('angle_time'), name='time'),
+                         name='hip_angle_3d' if name == 'angle_3d' else 'hip_angle')
+
+    def results_table(self) -> Optional[pd.DataFrame]:
+        table = self.meta.get('results')
+        return pd.DataFrame(table) if table is not None else None
+
+    def trajectory(self, prefix: str = 'raw_') -> Optional[CompactTrajectory]:
+        if f"{prefix}frames" not in self:
+            return None
+        fields = {name: self.array(f"{prefix}{name}") if f"{prefix}{name}" in self else None
+                  for name in _TRAJECTORY_FIELDS}
+        return CompactTrajectory(fps=float(self.array(f"{prefix}fps")), **fields)
+
+    def window(self, prefix: str = 'window_') -> Optional[pd.DataFrame]:
+        columns = [name for name in self._members if name.startswith(prefix)]
+        if not columns:
+            return None
+        return pd.DataFrame({name[len(prefix):]: self.array(name) for name in columns})
+
+
+def is_session_file(path: str) -> bool:
+    # Un CSV nunca es un zip: no depende de la extensión que haya elegido el usuario
+    return zipfile.is_zipfile(path)
@@ -0,0 +1,307 @@
+"""
+Barrido de parámetros del análisis sobre detecciones ya calculadas.
+
+Evalúa una grilla de parámetros del análisis (`max_allowed_gap`, `min_len`, `n_frames`
+y el grado de la interpolación de caderas) sobre varias sesiones sin volver a detectar:
+
+- Las sesiones se cargan una sola vez: CSV de detecciones crudas (`time`, `id_n_x`, ...),
+  trayectorias compactas `.npz` o videos. Los videos se detectan en el pool de procesos
+  la primera vez y la detección queda en `cache_dir` (identificada por nombre, tamaño y
+  fecha del video, detector y perfil de marcadores); las siguientes corridas la reusan.
+- Las trayectorias se publican en memoria compartida (`multiprocessing.shared_memory`)
+  y cada proceso del pool las ve como arreglos de sólo lectura: una tarea sólo lleva el
+  nombre de la sesión y sus combinaciones de parámetros.
+- El resultado es una tabla con una fila por sesión y combinación: si la sesión pasó la
+  validación, el error si no, y las métricas de `compute_angle_metrics`.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, fields
+from multiprocessing import shared_memory
+from typing import Dict, Iterable, List, Optional, Sequence
+import hashlib
+import itertools
+import math
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+from core.marker_layout import MarkerLayout, get_marker_layout
+from core.tools.compact_trajectory import CompactTrajectory
+from core.tools.metrics import DROP_THRESHOLD_DEG, compute_angle_metrics
+
+
+# Mismo paso entre frames procesados que `TrendetecT.process_video`
+FRAME_STEP = 3
+DEFAULT_CACHE_DIR = '.trendetect_cache'
+
+_ID_COLUMN = re.compile(r"^id_(-?\d+)_x$")
+
+
+@dataclass(frozen=True)
+class AnalysisParams:
+    """Parámetros del análisis que se pueden barrer (los valores por defecto son los del pipeline)."""
+    max_allowed_gap: int = 5
+    min_len: int = 5
+    n_frames: int = 10
+    interpolation_order: int = 2
+
+
+def parameter_grid(max_allowed_gap: Iterable[int] = (5,), min_len: Iterable[int] = (5,),
+                   n_frames: Iterable[int] = (10,), interpolation_order: Iterable[int] = (2,)) -> List[AnalysisParams]:
+    """Producto cartesiano de los valores de cada parámetro."""
+    return [AnalysisParams(*values)
+            for values in itertools.product(max_allowed_gap, min_len, n_frames, interpolation_order)]
+
+
+@dataclass
+class SweepSession:
+    """
+    Detecciones de una sesión, en el formato que se comparte entre procesos.
+
+    Attributes:
+        name (str): Nombre de la sesión en la tabla de resultados.
+        times (np.ndarray): Tiempo de cada fila procesada, float64.
+        ids (np.ndarray): IDs de los marcadores, int32.
+        coords (np.ndarray): Centroides float32 de forma (filas, marcadores, 2).
+    """
+    name: str
+    times: np.ndarray
+    ids: np.ndarray
+    coords: np.ndarray
+
+    @classmethod
+    def from_trajectory(cls, name: str, trajectory: CompactTrajectory) -> "SweepSession":
+        return cls(name, trajectory.times, trajectory.ids, trajectory.coords)
+
+    @classmethod
+    def from_dataframe(cls, name: str, df: pd.DataFrame) -> "SweepSession":
+        """Sesión a partir de un DataFrame ancho de detecciones crudas, como el de `aruco_process`."""
+        ids = [int(m.group(1)) for m in map(_ID_COLUMN.match, df.columns) if m]
+        if not ids:
+            raise ValueError(f"{name}: no tiene columnas de detecciones crudas (id_n_x, id_n_y).")
+
+        coords = np.empty((len(df), len(ids), 2), dtype=np.float32)
+        for slot, id_ in enumerate(ids):
+            coords[:, slot, 0] = df[f"id_{id_}_x"].to_numpy()
+            coords[:, slot, 1] = df[f"id_{id_}_y"].to_numpy()
+        return cls(name, df['time'].to_numpy(dtype=np.float64), np.asarray(ids, dtype=np.int32), coords)
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """Expande a float64 el DataFrame ancho que usan las etapas de análisis."""
+        data: Dict[str, np.ndarray] = {'time': self.times}
+        for slot, id_ in enumerate(self.ids):
+            data[f"id_{id_}_x"] = self.coords[:, slot, 0].astype(np.float64)
+            data[f"id_{id_}_y"] = self.coords[:, slot, 1].astype(np.float64)
+        return pd.DataFrame(data)
+
+
+# ==========================
+# Carga de sesiones
+# ==========================
+def detection_cache_path(video_path: str, cache_dir: str, layout: Optional[MarkerLayout] = None) -> str:
+    """Archivo de caché de la detección de `video_path` con el detector y perfil actuales."""
+    from core.aruco.detectors import get_detector
+    from core.watcher import source_key
+
+    detector = get_detector(dictionary_name=layout.dictionary_name if layout is not None else None)
+    key = f"{source_key(video_path)}|{detector.name}|{layout.name if layout is not None else ''}|{FRAME_STEP}"
+    digest = hashlib.sha1(key.encode('utf-8')).hexdigest()[:12]
+    stem = os.path.splitext(os.path.basename(video_path))[0]
+    return os.path.join(cache_dir, f"{stem}-{digest}.npz")
+
+
+def detect_to_cache(video_path: str, cache_path: str, layout: Optional[MarkerLayout] = None) -> str:
+    """Detecta los marcadores de un video y guarda la trayectoria compacta. Corre en el pool."""
+    from core.trendetect import TrendetecT
+
+    # Sin validación durante la detección: el barrido prueba justamente otros max_allowed_gap
+    trajectory = TrendetecT(layout=layout).detect_trajectory(video_path, frame_step=FRAME_STEP)
+
+    tmp_path = f"{cache_path}.tmp.npz"
+    trajectory.save(tmp_path)
+    os.replace(tmp_path, cache_path)
+    return cache_path
+
+
+def load_sessions(paths: Sequence[str], cache_dir: str = DEFAULT_CACHE_DIR, layout: MarkerLayout | str = None,
+                  workers: Optional[int] = None) -> List[SweepSession]:
+    """
+    Carga las sesiones a barrer. Los videos sin detección en caché se detectan en paralelo.
+
+    Args:
+        paths (Sequence[str]): CSV de detecciones crudas, trayectorias `.npz` o videos.
+        cache_dir (str): Carpeta de la caché de detecciones de videos.
+        layout (MarkerLayout | str, optional): Perfil de marcadores para detectar los videos.
+        workers (int, optional): Procesos para detectar (por defecto, uno por CPU).
+    """
+    from core.jobs import VIDEO_EXTENSIONS
+
+    layout = get_marker_layout(layout) if isinstance(layout, str) else layout
+    cache_paths = {path: detection_cache_path(path, cache_dir, layout)
+                   for path in paths if path.lower().endswith(VIDEO_EXTENSIONS)}
+
+    pending = [path for path, cache_path in cache_paths.items() if not os.path.exists(cache_path)]
+    if pending:
+        os.makedirs(cache_dir, exist_ok=True)
+        with ProcessPoolExecutor(max_workers=min(workers or os.cpu_count(), len(pending))) as pool:
+            list(pool.map(detect_to_cache, pending, [cache_paths[path] for path in pending],
+                          itertools.repeat(layout)))
+
+    sessions = []
+    for path in paths:
+        name = os.path.splitext(os.path.basename(path))[0]
+        if path in cache_paths:
+            sessions.append(SweepSession.from_trajectory(name, CompactTrajectory.load(cache_paths[path])))
+        elif path.lower().endswith('.npz'):
+            sessions.append(SweepSession.from_trajectory(name, CompactTrajectory.load(path)))
+        elif path.lower().endswith('.csv'):
+            sessions.append(SweepSession.from_dataframe(name, pd.read_csv(path)))
+        else:
+            raise ValueError(f"Formato no soportado para el barrido: {path}")
+    return sessions
+
+
+# ==========================
+# Memoria compartida
+# ==========================
+class SharedSessions:
+    """
+    Copia las trayectorias a bloques de memoria compartida una sola vez y los libera al salir.
+    `descriptors` es lo único que viaja a los procesos del pool.
+    """
+
+    def __init__(self, sessions: Sequence[SweepSession]):
+        self._blocks: List[shared_memory.SharedMemory] = []
+        self.descriptors = []
+        try:
+            for session in sessions:
+                arrays = {name: self._share(getattr(session, name)) for name in ('times', 'coords')}
+                self.descriptors.append({'name': session.name, 'ids': session.ids.tolist(), **arrays})
+        except BaseException:
+            self.close()
+            raise
+
+    def _share(self, array: np.ndarray) -> tuple:
+        block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+        self._blocks.append(block)
+        np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+        return block.name, array.shape, array.dtype.str
+
+    def close(self):
+        for block in self._blocks:
+            block.close()
+            block.unlink()
+        self._blocks = []
+
+    def __enter__(self) -> "SharedSessions":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# Estado de cada proceso del pool: sesiones adjuntas y perfil de marcadores
+_worker_sessions: Dict[str, SweepSession] = {}
+_worker_blocks: List[shared_memory.SharedMemory] = []
+_worker_layout: Optional[MarkerLayout] = None
+
+
+def _attach(descriptors: list, layout: Optional[MarkerLayout]):
+    global _worker_layout
+    _worker_layout = layout
+
+    for descriptor in descriptors:
+        views = {}
+        for name in ('times', 'coords'):
+            block_name, shape, dtype = descriptor[name]
+            block = shared_memory.SharedMemory(name=block_name)
+            _worker_blocks.append(block)
+            view = np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)
+            view.flags.writeable = False
+            views[name] = view
+        _worker_sessions[descriptor['name']] = SweepSession(descriptor['name'], views['times'],
+                                                            np.asarray(descriptor['ids'], dtype=np.int32),
+                                                            views['coords'])
+
+
+def _evaluate_task(session_name: str, params_list: List[AnalysisParams], threshold: float) -> List[dict]:
+    from core.trendetect import TrendetecT
+
+    trendetect = TrendetecT(layout=_worker_layout)
+    df = _worker_sessions[session_name].to_dataframe()
+    return [{'session': session_name, **asdict(params), **evaluate_params(trendetect, df, params, threshold)}
+            for params in params_list]
+
+
+# ==========================
+# Barrido
+# ==========================
+def evaluate_params(trendetect, df: pd.DataFrame, params: AnalysisParams,
+                    threshold: float = DROP_THRESHOLD_DEG) -> dict:
+    """
+    Corre las etapas de `TrendetecT.analyze_detections` con `params` (sin gráfico).
+
+    Returns:
+        dict: `valid`, `error`, `offset`, límites de la ventana de prueba y las métricas
+        de `compute_angle_metrics`.
+    """
+    try:
+        data = trendetect.assign_marker_roles(df, n_frames=params.n_frames)
+        if not trendetect.validate_detection(data, max_allowed_gap=params.max_allowed_gap):
+            raise ValueError("Detección insuficiente para procesar la prueba.")
+        data = trendetect.interpolate_missing(data, order=params.interpolation_order)
+        offset = trendetect.compute_offset(data)
+        data = trendetect.crop_test_window(data, min_len=params.min_len)
+        angles = trendetect.substract_base_angle(trendetect.compute_hip_angles(data), offset)
+    except Exception as e:
+        return {'valid': False, 'error': str(e) or type(e).__name__}
+
+    metrics = compute_angle_metrics(angles.to_numpy(), angles.index.to_numpy(), threshold)
+    return {
+        'valid': True,
+        'error': None,
+        'offset': float(offset),
+        'window_start': float(data['time'].iloc[0]),
+        'window_end': float(data['time'].iloc[-1]),
+        **{name: float(values[0]) for name, values in metrics.items()},
+    }
+
+
+def run_sweep(sessions: Sequence[SweepSession], grid: Sequence[AnalysisParams], workers: Optional[int] = None,
+              layout: MarkerLayout | str = None, threshold: float = DROP_THRESHOLD_DEG) -> pd.DataFrame:
+    """
+    Evalúa cada combinación de `grid` sobre cada sesión en un pool de procesos.
+
+    Args:
+        sessions (Sequence[SweepSession]): Sesiones (ver `load_sessions`).
+        grid (Sequence[AnalysisParams]): Combinaciones de parámetros (ver `parameter_grid`).
+        workers (int, optional): Procesos del pool (por defecto, uno por CPU).
+        layout (MarkerLayout | str, optional): Perfil de marcadores para asignar roles.
+        threshold (float): Umbral de caída para las métricas.
+
+    Returns:
+        pd.DataFrame: Una fila por sesión y combinación, en el orden de `sessions` y `grid`.
+    """
+    if not sessions or not grid:
+        raise ValueError("El barrido necesita al menos una sesión y una combinación de parámetros.")
+    layout = get_marker_layout(layout) if isinstance(layout, str) else layout
+    names = [session.name for session in sessions]
+    if len(set(names)) != len(names):
+        raise ValueError("Los nombres de las sesiones del barrido deben ser únicos.")
+
+    workers = workers or os.cpu_count()
+    # Unas cuatro tareas por proceso: reparte bien sin pagar el armado del DataFrame por combinación
+    chunk = max(1, math.ceil(len(sessions) * len(grid) / (4 * workers)))
+    tasks = [(session.name, list(grid[i:i + chunk])) for session in sessions for i in range(0, len(grid), chunk)]
+
+    with SharedSessions(sessions) as shared:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_attach,
+                                 initargs=(shared.descriptors, layout)) as pool:
+            futures = [pool.submit(_evaluate_task, name, params_list, threshold) for name, params_list in tasks]
+            rows = [row for future in futures for row in future.result()]
+
+    columns = ['session', *[field.name for field in fields(AnalysisParams)], 'valid', 'error']
+    table = pd.DataFrame(rows)
+    return table[columns + [col for col in table.columns if col not in columns]]
@@ -0,0 +1,207 @@
+"""
+Video anotado escrito en segundo plano durante la detección.
+
+`aruco_process` entrega cada frame procesado (ya decodificado) a un
+`AnnotatedVideoWriter`. Los frames pasan por una cola acotada a un hilo que los reduce,
+les dibuja el overlay (centroides, línea pélvica y ángulo en vivo) y los codifica con
+`cv2.VideoWriter`, así la codificación se superpone con la detección. Si la cola está
+llena el frame se descarta en lugar de frenar la detección; al escribir, su lugar lo ocupa
+una repetición del frame anterior, para que el video conserve la duración real.
+"""
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional, Sequence
+import queue
+import threading
+
+import cv2
+import numpy as np
+import pandas as pd
+
+from core.marker_layout import MarkerLayout, MarkerRole
+from core.tools.overlay import draw_pelvic_overlay
+from core.tools.role_resolver import RoleResolver
+
+
+@dataclass
+class AnnotationSettings:
+    """
+    Opciones del video anotado.
+
+    Attributes:
+        path (str): Archivo `.mp4` de salida.
+        scale (float): Escala de la resolución de salida respecto del video original.
+        fps (float, optional): FPS de salida; por defecto, el ritmo de los frames procesados.
+            Si es menor, se descartan frames para respetarlo.
+        queue_size (int): Frames que pueden esperar a ser codificados.
+        codec (str): FourCC del códec.
+    """
+    path: str
+    scale: float = 0.5
+    fps: Optional[float] = None
+    queue_size: int = 32
+    codec: str = 'mp4v'
+
+
+class AnnotatedVideoWriter:
+    """
+    Codifica el video anotado en un hilo propio, a partir de los frames de la detección.
+
+    Protocolo (lo sigue `aruco_process`): `start(sample_fps)`, `submit(...)` por cada frame
+    procesado y `close()` al terminar. Los roles se resuelven en el hilo con un
+    `RoleResolver`; los primeros frames esperan (ya reducidos) hasta que estén resueltos.
+    `frames_dropped` cuenta los descartados con la cola llena y `frames_repeated` las
+    repeticiones que los reemplazan en el archivo.
+
+    Args:
+        settings (AnnotationSettings): Opciones de salida.
+        resolve_roles (Callable[[pd.DataFrame], dict]): Normalmente `TrendetecT.resolve_marker_roles`.
+        layout (MarkerLayout, optional): Perfil de marcadores de la detección.
+    """
+
+    def __init__(self, settings: AnnotationSettings, resolve_roles: Callable[[pd.DataFrame], dict],
+                 layout: Optional[MarkerLayout] = None):
+        self.settings = settings
+        self.resolver = RoleResolver(resolve_roles, layout=layout)
+        self.frames_written = 0
+        self.frames_dropped = 0
+        self.frames_repeated = 0
+        self.error: Optional[BaseException] = None
+
+        self._queue: queue.Queue = queue.Queue(maxsize=settings.queue_size)
+        self._thread: Optional[threading.Thread] = None
+        self._writer = None
+        self._fps = None
+        self._last_slot = None
+        self._written_slot = None
+        self._previous = None
+        self._offset = None
+        self._pending = []
+
+
+    def start(self, sample_fps: float):
+        """Arranca el hilo de codificación. `sample_fps` es el ritmo de los frames procesados."""
+        self._fps = min(self.settings.fps or sample_fps, sample_fps)
+        self._thread = threading.Thread(target=self._run, name='annotated-video', daemon=True)
+        self._thread.start()
+
+
+    def submit(self, frame_index: int, time: float, frame: np.ndarray, ids: Optional[Sequence[int]] = None,
+               centers: Optional[Sequence[Sequence[float]]] = None):
+        """
+        Entrega un frame procesado (sin rotar, como sale de `VideoCapture`). Nunca bloquea:
+        si la cola está llena se descarta y cuenta en `frames_dropped`.
+        """
+        # Con FPS de salida menor, sólo un frame por intervalo de salida
+        slot = int(time * self._fps + 1e-6)
+        if slot == self._last_slot:
+            return
+        self._last_slot = slot
+
+        item = (slot, time, frame, list(ids) if ids is not None else [], list(centers) if centers is not None else [])
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            self.frames_dropped += 1
+
+
+    def close(self) -> "AnnotatedVideoWriter":
+        """Espera a que se codifiquen los frames encolados y cierra el archivo."""
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+        return self
+
+
+    # ==========================
+    # Hilo de codificación
+    # ==========================
+    def _run(self):
+        try:
+            while True:
+                item = self._queue.get()
+                if item is None:
+                    break
+                # Tras un error se siguen vaciando la cola: la detección no se entera ni se frena
+                if self.error is None:
+                    try:
+                        self._process(*item)
+                    except Exception as e:
+                        self.error = e
+
+            # Video más corto que los frames de resolución: se resuelve con lo que haya
+            if self.error is None and self._pending:
+                try:
+                    self.resolver.finish()
+                except ValueError:
+                    self.resolver.roles = {}
+                self._flush_pending()
+        except Exception as e:
+            self.error = e
+        finally:
+            if self._writer is not None:
+                self._writer.release()
+
+
+    def _process(self, slot: int, time: float, frame: np.ndarray, ids: list, centers: list):
+        scale = self.settings.scale
+        small = cv2.resize(frame, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA) if scale != 1 else frame
+        small = cv2.rotate(small, cv2.ROTATE_90_CLOCKWISE)  # misma orientación que la detección
+        points = {int(id_): (float(x) * scale, float(y) * scale) for id_, (x, y) in zip(ids, centers)}
+
+        if not self.resolver.resolved:
+            self._pending.append((slot, small, points))
+            try:
+                self.resolver.add(time, ids, centers)
+            except ValueError:
+                # Sin roles no hay línea ni ángulo, pero el video se sigue escribiendo
+                self.resolver.roles = {}
+            if self.resolver.resolved:
+                self._flush_pending()
+            return
+
+        self._write(slot, small, points)
+
+
+    def _flush_pending(self):
+        pending, self._pending = self._pending, []
+        for slot, small, points in pending:
+            self._write(slot, small, points)
+
+
+    def _write(self, slot: int, small: np.ndarray, points: Dict[int, tuple]):
+        roles = self.resolver.roles or {}
+        by_role = {roles[id_].value: point for id_, point in points.items() if id_ in roles}
+
+        draw_pelvic_overlay(small, by_role, self._live_angle(by_role))
+
+        if self._writer is None:
+            height, width = small.shape[:2]
+            self._writer = cv2.VideoWriter(self.settings.path, cv2.VideoWriter_fourcc(*self.settings.codec),
+                                           self._fps, (width, height))
+            if not self._writer.isOpened():
+                raise ValueError(f"No se pudo crear el video anotado en {self.settings.path}")
+
+        # Intervalos sin frame (descartados con la cola llena): se repite el anterior, así
+        # el tiempo del video sigue siendo el de la grabación a `self._fps` constantes
+        if self._written_slot is not None:
+            for _ in range(slot - self._written_slot - 1):
+                self._writer.write(self._previous)
+                self.frames_repeated += 1
+        self._writer.write(small)
+        self.frames_written += 1
+        self._written_slot, self._previous = slot, small
+
+
+    def _live_angle(self, points: Dict[str, tuple]) -> Optional[float]:
+        """Ángulo pélvico del frame menos el del primer frame con ambas caderas (postura base)."""
+        test = points.get(MarkerRole.HIP_TEST.value)
+        base = points.get(MarkerRole.HIP_BASE.value)
+        if test is None or base is None:
+            return None
+
+        # Misma fórmula que compute_hip_angles (la escala no cambia el ángulo)
+        angle = np.degrees(np.arctan((test[1] - base[1]) / (test[0] - base[0])))
+        if self._offset is None:
+            self._offset = angle
+        return angle - self._offset
@@ -0,0 +1,232 @@
+"""
+Representación compacta de las trayectorias de marcadores.
+
+En lugar de columnas float64 con el ID codificado en el nombre (`id_2_x`, ...), una
+trayectoria compacta guarda:
+
+- `frames`: índice de frame int32 por fila procesada, más un único `fps`
+  (el tiempo se recalcula como `frames / fps`, igual que en `aruco_process`);
+- `timestamps` (opcional): tiempo real (PTS) float64 por fila, cuando el video tiene
+  índice de frames (`core.tools.frame_index`); en video de FPS variable reemplaza a
+  `frames / fps`;
+- `corners` (opcional): esquinas float32 de cada marcador, forma (filas, slots, 4, 2),
+  para el modo 3D (`core.tools.marker_pose`);
+- `frame_size` (opcional): (ancho, alto) int32 del video en su orientación original,
+  para llevar los intrínsecos de la cámara a su resolución;
+- `ids`: tabla chica ID -> slot (int32, en orden de primera aparición);
+- `coords`: centroides float32 de forma (filas, slots, 2), NaN donde no hubo detección;
+- `gated` (opcional): filas que repitieron la detección anterior por la compuerta de
+  movimiento de `aruco_process`.
+
+Ocupa la mitad que las columnas float64 equivalentes. Se expande a float64 recién al
+entrar al análisis (`to_dataframe`), y el cálculo de ángulos opera en float64.
+
+Análisis de precisión:
+
+- Coordenadas: OpenCV entrega las esquinas ArUco en float32 y el centroide se promedia
+  en float32, así que guardarlo en float32 no pierde nada: la expansión a float64
+  reproduce exactamente el valor detectado. Para coordenadas que vengan de otra fuente,
+  el error de redondeo de float32 es a lo sumo 2^-24 relativo, es decir <= 1.2e-4 px
+  por debajo de 4096 px. Con las caderas separadas L >= 100 px, el error angular es
+  como mucho 2 * sqrt(2) * 1.2e-4 / L rad ~ 2e-4°, dos órdenes por debajo de la
+  resolución con la que se informan los ángulos (0.01°).
+- Tiempo: `frames / fps` en float64 es bit a bit el mismo valor que calculaba
+  `aruco_process`. int32 alcanza para 2^31 frames (más de dos años a 30 fps).
+"""
+from dataclasses import dataclass
+from typing import Dict, Optional, Sequence
+import re
+
+import numpy as np
+import pandas as pd
+
+
+FRAME_DTYPE = np.int32
+COORD_DTYPE = np.float32
+
+_ID_COLUMN = re.compile(r"^id_(-?\d+)_x$")
+
+
+@dataclass
+class CompactTrajectory:
+    frames: np.ndarray
+    fps: float
+    ids: np.ndarray
+    coords: np.ndarray
+    gated: Optional[np.ndarray] = None
+    timestamps: Optional[np.ndarray] = None
+    corners: Optional[np.ndarray] = None
+    frame_size: Optional[np.ndarray] = None
+
+    @property
+    def n_rows(self) -> int:
+        return len(self.frames)
+
+    @property
+    def times(self) -> np.ndarray:
+        if self.timestamps is not None:
+            return self.timestamps
+        return self.frames.astype(np.float64) / self.fps
+
+    @property
+    def nbytes(self) -> int:
+        optional = sum(array.nbytes for array in (self.gated, self.timestamps, self.corners) if array is not None)
+        return self.frames.nbytes + self.ids.nbytes + self.coords.nbytes + optional
+
+    def slot(self, marker_id: int) -> int:
+        """Slot de `marker_id` en `coords`."""
+        slots = np.flatnonzero(self.ids == marker_id)
+        if not len(slots):
+            raise ValueError(f"El marcador {marker_id} no está en la trayectoria.")
+        return int(slots[0])
+
+
+    @classmethod
+    def from_detections(cls, frames: Sequence[int], fps: float, rows: Sequence[int],
+                        ids: Sequence[int], centers: Sequence[Sequence[float]],
+                        gated: Optional[Sequence[bool]] = None,
+                        timestamps: Optional[Sequence[float]] = None,
+                        corners: Optional[Sequence[np.ndarray]] = None,
+                        frame_size: Optional[Sequence[int]] = None) -> "CompactTrajectory":
+        """
+        Arma la trayectoria a partir de detecciones en formato largo.
+
+        Args:
+            frames (Sequence[int]): Índice de frame de cada fila procesada.
+            fps (float): FPS del video.
+            rows (Sequence[int]): Fila de cada detección.
+            ids (Sequence[int]): ID de cada detección.
+            centers (Sequence[Sequence[float]]): Centroide (x, y) de cada detección.
+            gated (Sequence[bool], optional): Marca de compuerta de movimiento por fila.
+            timestamps (Sequence[float], optional): PTS en segundos de cada fila.
+            corners (Sequence[np.ndarray], optional): Esquinas (4, 2) de cada detección.
+            frame_size (Sequence[int], optional): (ancho, alto) del video.
+        """
+        frames = np.asarray(frames, dtype=FRAME_DTYPE)
+        rows = np.asarray(rows, dtype=np.int64)
+        det_ids = np.asarray(ids, dtype=np.int32)
+
+        # Tabla ID -> slot en orden de primera aparición (el orden de columnas de aruco_process)
+        unique_ids, first_seen, slots = np.unique(det_ids, return_index=True, return_inverse=True)
+        order = np.argsort(first_seen)
+        slot_of_unique = np.empty_like(order)
+        slot_of_unique[order] = np.arange(len(order))
+
+        coords = np.full((len(frames), len(unique_ids), 2), np.nan, dtype=COORD_DTYPE)
+        if len(det_ids):
+            coords[rows, slot_of_unique[slots]] = np.asarray(centers, dtype=COORD_DTYPE).reshape(-1, 2)
+
+        gated = np.asarray(gated, dtype=bool) if gated is not None else None
+        timestamps = np.asarray(timestamps, dtype=np.float64) if timestamps is not None else None
+
+        corner_array = None
+        if corners is not None:
+            corner_array = np.full((len(frames), len(unique_ids), 4, 2), np.nan, dtype=COORD_DTYPE)
+            if len(det_ids):
+                corner_array[rows, slot_of_unique[slots]] = np.asarray(corners, dtype=COORD_DTYPE).reshape(-1, 4, 2)
+
+        frame_size = np.asarray(frame_size, dtype=np.int32) if frame_size is not None else None
+        return cls(frames, float(fps), unique_ids[order].astype(np.int32), coords, gated, timestamps, corner_array,
+                   frame_size)
+
+
+    @classmethod
+    def concatenate(cls, parts: Sequence["CompactTrajectory"]) -> "CompactTrajectory":
+        """Une trayectorias de tramos consecutivos del mismo video (p. ej. la detección por tramos)."""
+        if not parts:
+            raise ValueError("No hay trayectorias para unir.")
+
+        # Slots en orden de primera aparición, como si se hubiera detectado de corrido
+        ids = list(dict.fromkeys(id_ for part in parts for id_ in part.ids.tolist()))
+        n_rows = sum(part.n_rows for part in parts)
+        coords = np.full((n_rows, len(ids), 2), np.nan, dtype=COORD_DTYPE)
+        keep_corners = all(part.corners is not None for part in parts)
+        corners = np.full((n_rows, len(ids), 4, 2), np.nan, dtype=COORD_DTYPE) if keep_corners else None
+        start = 0
+        for part in parts:
+            slots = [ids.index(id_) for id_ in part.ids.tolist()]
+            coords[start:start + part.n_rows, slots] = part.coords
+            if keep_corners:
+                corners[start:start + part.n_rows, slots] = part.corners
+            start += part.n_rows
+
+        def joined(name):
+            arrays = [getattr(part, name) for part in parts]
+            return np.concatenate(arrays) if all(array is not None for array in arrays) else None
+
+        return cls(np.concatenate([part.frames for part in parts]), parts[0].fps,
+                   np.asarray(ids, dtype=np.int32), coords, joined('gated'), joined('timestamps'), corners,
+                   parts[0].frame_size)
+
+
+    @classmethod
+    def merge(cls, parts: Sequence["CompactTrajectory"]) -> "CompactTrajectory":
+        """
+        Une trayectorias del mismo video con frames intercalados (las pasadas de la detección
+        progresiva): las filas quedan ordenadas por frame y los slots en orden de primera
+        aparición, como si se hubiera detectado de corrido.
+        """
+        joined = cls.concatenate(parts)
+        order = np.argsort(joined.frames, kind='stable')
+
+        def rows(array):
+            return array[order] if array is not None else None
+
+        coords, corners = joined.coords[order], rows(joined.corners)
+        seen = ~np.isnan(coords[..., 0])
+        first_row = np.where(seen.any(axis=0), seen.argmax(axis=0), len(order))
+        slots = np.argsort(first_row, kind='stable')
+        return cls(joined.frames[order], joined.fps, joined.ids[slots], coords[:, slots],
+                   rows(joined.gated), rows(joined.timestamps),
+                   corners[:, slots] if corners is not None else None, joined.frame_size)
+
+
+    @classmethod
+    def from_dataframe(cls, df: pd.DataFrame, fps: float) -> "CompactTrajectory":
+        """Compacta un DataFrame ancho (`time`, `id_n_x`, `id_n_y`, ...) como el de `aruco_process`."""
+        ids = [int(m.group(1)) for m in map(_ID_COLUMN.match, df.columns) if m]
+        frames = np.rint(df['time'].to_numpy(dtype=np.float64) * fps).astype(FRAME_DTYPE)
+
+        coords = np.empty((len(df), len(ids), 2), dtype=COORD_DTYPE)
+        for slot, id_ in enumerate(ids):
+            coords[:, slot, 0] = df[f"id_{id_}_x"].to_numpy()
+            coords[:, slot, 1] = df[f"id_{id_}_y"].to_numpy()
+
+        gated = df['gated'].to_numpy(dtype=bool) if 'gated' in df.columns else None
+        return cls(frames, float(fps), np.asarray(ids, dtype=np.int32), coords, gated)
+
+
+    def save(self, path: str):
+        """Guarda la trayectoria en un `.npz` sin comprimir."""
+        arrays = {'frames': self.frames, 'fps': np.float64(self.fps), 'ids': self.ids, 'coords': self.coords}
+        if self.gated is not None:
+            arrays['gated'] = self.gated
+        if self.timestamps is not None:
+            arrays['timestamps'] = self.timestamps
+        if self.corners is not None:
+            arrays['corners'] = self.corners
+        if self.frame_size is not None:
+            arrays['frame_size'] = self.frame_size
+        np.savez(path, **arrays)
+
+
+    @classmethod
+    def load(cls, path: str) -> "CompactTrajectory":
+        with np.load(path) as data:
+            gated = data['gated'] if 'gated' in data.files else None
+            timestamps = data['timestamps'] if 'timestamps' in data.files else None
+            corners = data['corners'] if 'corners' in data.files else None
+            frame_size = data['frame_size'] if 'frame_size' in data.files else None
+            return cls(data['frames'], float(data['fps']), data['ids'], data['coords'], gated, timestamps, corners,
+                       frame_size)
+
+
+    def to_dataframe(self, index: Optional[pd.Index] = None) -> pd.DataFrame:
+        """Expande a float64 el DataFrame ancho que usan las etapas de análisis."""
+        data: Dict[str, np.ndarray] = {'time': self.times}
+        for slot, id_ in enumerate(self.ids):
+            data[f"id_{id_}_x"] = self.coords[:, slot, 0].astype(np.float64)
+            data[f"id_{id_}_y"] = self.coords[:, slot, 1].astype(np.float64)
+        if self.gated is not None:
+            data['gated'] = self.gated
+        return pd.DataFrame(data, index=index)
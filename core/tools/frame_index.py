@@ -0,0 +1,289 @@
+"""
+Índice persistente de los frames de un video.
+
+Se arma en la misma pasada de decodificación de la detección (`FrameIndexBuilder`, que
+`aruco_process` alimenta con cada frame) o con `build_frame_index`, y se guarda al lado
+del video (`<video>.trendetect-index.npz`; si la carpeta no admite escritura, en la
+carpeta temporal). Contiene:
+
+- `pts`: tiempo de presentación real de cada frame decodificado, en segundos. En video
+  de FPS variable (el de los celulares) `frame / fps` se desvía; el PTS no.
+- `keyframes`: frames clave, para saltar a cualquier frame sin decodificar desde el
+  principio (`FrameIndex.seek`). Salen de una pasada sin decodificar sobre los paquetes
+  del contenedor, que tarda milisegundos.
+- Miniaturas cada `THUMB_INTERVAL` segundos, para mostrar un momento al instante. Son a
+  lo sumo `MAX_THUMBNAILS`: en videos largos se espacian más, así la memoria y el archivo
+  (comprimido) quedan acotados.
+
+El índice se invalida solo si el video cambia de tamaño o de fecha de modificación.
+"""
+from array import array
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+import hashlib
+import os
+import tempfile
+
+import cv2
+import numpy as np
+
+
+INDEX_VERSION = 1
+INDEX_SUFFIX = '.trendetect-index.npz'
+# Una miniatura cada medio segundo, de 160 px de ancho
+THUMB_INTERVAL = 0.5
+THUMB_WIDTH = 160
+# Tope de miniaturas por índice (~5 MB en memoria a 160 px y 16:9): al superarlo se
+# descarta una de cada dos y se duplica el intervalo, y siguen cubriendo todo el video
+MAX_THUMBNAILS = 120
+
+
+def video_signature(video_path: str) -> str:
+    stat = os.stat(video_path)
+    return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+
+@dataclass
+class FrameIndex:
+    pts: np.ndarray
+    keyframes: np.ndarray
+    fps: float
+    thumb_frames: np.ndarray
+    thumbnails: np.ndarray
+    source: str = ''
+
+    @property
+    def n_frames(self) -> int:
+        return len(self.pts)
+
+    def frame_time(self, frame: int) -> float:
+        """PTS del frame (más allá del índice, extrapolado con el FPS nominal)."""
+        if frame < len(self.pts):
+            return float(self.pts[frame])
+        return float(self.pts[-1]) + (frame - len(self.pts) + 1) / self.fps if len(self.pts) else frame / self.fps
+
+    def frame_at(self, time: float) -> int:
+        """Frame cuyo PTS es el más cercano a `time`."""
+        pos = int(np.searchsorted(self.pts, time))
+        if pos == 0:
+            return 0
+        if pos >= len(self.pts):
+            return len(self.pts) - 1
+        return pos if self.pts[pos] - time < time - self.pts[pos - 1] else pos - 1
+
+    def keyframe_before(self, frame: int) -> int:
+        pos = int(np.searchsorted(self.keyframes, frame, side='right')) - 1
+        return int(self.keyframes[pos]) if pos >= 0 else 0
+
+    def thumbnail_at(self, time: float) -> Optional[np.ndarray]:
+        """Miniatura (BGR, orientación del video) más cercana a `time`."""
+        if not len(self.thumb_frames):
+            return None
+        thumb_times = self.pts[self.thumb_frames]
+        return self.thumbnails[int(np.abs(thumb_times - time).argmin())]
+
+    def chunks(self, n_chunks: int) -> List[Tuple[int, int]]:
+        """Divide el video en hasta `n_chunks` rangos `[inicio, fin)` que empiezan en frames clave."""
+        targets = np.linspace(0, self.n_frames, n_chunks + 1)[1:-1]
+        starts = sorted({0, *(self.keyframe_before(int(target)) for target in targets)})
+        return list(zip(starts, starts[1:] + [self.n_frames]))
+
+    def seek(self, cap: cv2.VideoCapture, frame: int) -> bool:
+        """
+        Deja `cap` con `frame` ya leído (se obtiene con `cap.retrieve()`).
+
+        Salta al frame clave anterior y avanza decodificando. La posición de llegada se
+        verifica con el PTS, porque OpenCV calcula el salto con el FPS nominal y en video
+        de FPS variable puede caer en otro frame; si se pasó, prueba con el clave anterior.
+
+        Returns:
+            bool: False si el video terminó antes de llegar a `frame`.
+        """
+        candidates = [int(key) for key in self.keyframes[self.keyframes <= frame][::-1]]
+        for key in candidates + [0]:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, key)
+            if not cap.grab():
+                continue
+            current = self.frame_at(cap.get(cv2.CAP_PROP_POS_MSEC) / 1000)
+            if current > frame:
+                continue
+            while current < frame:
+                if not cap.grab():
+                    return False
+                current += 1
+            return True
+        return False
+
+    def save(self, path: str):
+        # Temporal propio del proceso: varios procesos pueden indexar el mismo video a la vez
+        tmp_path = f"{path}.{os.getpid()}.tmp.npz"
+        np.savez_compressed(tmp_path, version=INDEX_VERSION, pts=self.pts, keyframes=self.keyframes, fps=np.float64(self.fps),
+                 thumb_frames=self.thumb_frames, thumbnails=self.thumbnails, source=self.source)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> Optional["FrameIndex"]:
+        with np.load(path) as data:
+            if int(data['version']) != INDEX_VERSION:
+                return None
+            return cls(data['pts'], data['keyframes'], float(data['fps']), data['thumb_frames'],
+                       data['thumbnails'], str(data['source']))
+
+
+class FrameIndexBuilder:
+    """
+    Arma el índice mientras otro recorre el video: `add(cap, frame)` después de cada
+    `cap.read()` (o `add(cap)` después de un `cap.grab()` sin `retrieve`) y
+    `finish(video_path)` al terminar.
+
+    Los PTS se acumulan en un `array('d')` (8 bytes por frame) y las miniaturas no pasan
+    de `max_thumbnails`, así que la memoria no crece con la duración del video más que
+    unos KB por minuto.
+
+    Args:
+        thumbnails (bool): Guarda miniaturas; sin ellas el índice sólo tiene tiempos y
+            frames clave (la detección por bloques, pensada para grabaciones largas).
+    """
+
+    def __init__(self, thumb_interval: float = THUMB_INTERVAL, thumb_width: int = THUMB_WIDTH,
+                 max_thumbnails: int = MAX_THUMBNAILS, thumbnails: bool = True):
+        self.thumb_interval = thumb_interval
+        self.thumb_width = thumb_width
+        self.max_thumbnails = max_thumbnails
+        self.pts = array('d')
+        self.thumb_frames: List[int] = []
+        self.thumbnails: List[np.ndarray] = []
+        self.fps = None
+        self._next_thumb = 0.0 if thumbnails else float('inf')
+
+    def add(self, cap: cv2.VideoCapture, frame: Optional[np.ndarray] = None) -> float:
+        """
+        Registra el frame recién leído y devuelve su PTS en segundos. Sin `frame`, lo
+        recupera de `cap` sólo si le toca miniatura.
+        """
+        if self.fps is None:
+            self.fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+
+        time = cap.get(cv2.CAP_PROP_POS_MSEC) / 1000
+        # Contenedores sin PTS confiable: se sigue con el FPS nominal
+        if self.pts and time <= self.pts[-1]:
+            time = self.pts[-1] + 1 / self.fps
+
+        self.pts.append(time)
+        if time >= self._next_thumb:
+            if frame is None:
+                ret, frame = cap.retrieve()
+            if frame is not None:
+                self._add_thumbnail(frame)
+        return time
+
+    def _add_thumbnail(self, frame: np.ndarray):
+        height, width = frame.shape[:2]
+        size = (self.thumb_width, max(1, round(height * self.thumb_width / width)))
+        self.thumbnails.append(cv2.resize(frame, size, interpolation=cv2.INTER_AREA))
+        self.thumb_frames.append(len(self.pts) - 1)
+
+        if len(self.thumbnails) > self.max_thumbnails:
+            self.thumbnails = self.thumbnails[::2]
+            self.thumb_frames = self.thumb_frames[::2]
+            self.thumb_interval *= 2
+        self._next_thumb = self.pts[self.thumb_frames[-1]] + self.thumb_interval
+
+    def finish(self, video_path: str) -> FrameIndex:
+        pts = np.array(self.pts, dtype=np.float64)
+        thumbnails = (np.stack(self.thumbnails) if self.thumbnails
+                      else np.empty((0, 0, 0, 3), dtype=np.uint8))
+        return FrameIndex(pts, scan_keyframes(video_path, pts), float(self.fps or 30.0),
+                          np.asarray(self.thumb_frames, dtype=np.int32), thumbnails, video_signature(video_path))
+
+
+def scan_keyframes(video_path: str, pts: np.ndarray) -> np.ndarray:
+    """
+    Frames clave a partir de los paquetes del contenedor, sin decodificar.
+    Si el backend no da acceso a los paquetes, el único frame clave conocido es el 0.
+    """
+    keyframes = [0]
+    cap = cv2.VideoCapture(video_path)
+    try:
+        if len(pts) and cap.set(cv2.CAP_PROP_FORMAT, -1):
+            # Los paquetes vienen en orden de decodificación: se ubican por su PTS
+            while cap.grab():
+                if cap.get(cv2.CAP_PROP_LRF_HAS_KEY_FRAME):
+                    time = cap.get(cv2.CAP_PROP_POS_MSEC) / 1000
+                    keyframes.append(int(np.abs(pts - time).argmin()))
+    finally:
+        cap.release()
+    return np.unique(np.asarray(keyframes, dtype=np.int32))
+
+
+# ==========================
+# Archivo del índice
+# ==========================
+def index_path(video_path: str, directory: Optional[str] = None) -> str:
+    """Al lado del video o, con `directory`, en esa carpeta con el nombre del video."""
+    if directory is not None:
+        return os.path.join(directory, f"{os.path.basename(video_path)}{INDEX_SUFFIX}")
+    return f"{video_path}{INDEX_SUFFIX}"
+
+
+def fallback_index_path(video_path: str) -> str:
+    """Ubicación en la carpeta temporal, para videos en carpetas sin permiso de escritura."""
+    digest = hashlib.sha1(os.path.abspath(video_path).encode('utf-8')).hexdigest()[:16]
+    return os.path.join(tempfile.gettempdir(), 'trendetect_index', f"{digest}{INDEX_SUFFIX}")
+
+
+def load_frame_index(video_path: str, directory: Optional[str] = None) -> Optional[FrameIndex]:
+    """El índice guardado del video (ver `save_frame_index`), o None si no existe o el video cambió."""
+    signature = video_signature(video_path)
+    for path in (index_path(video_path, directory), fallback_index_path(video_path)):
+        if not os.path.exists(path):
+            continue
+        try:
+            index = FrameIndex.load(path)
+        except (OSError, ValueError, KeyError):
+            continue
+        if index is not None and index.source == signature:
+            return index
+    return None
+
+
+def save_frame_index(index: FrameIndex, video_path: str, directory: Optional[str] = None) -> str:
+    """
+    Guarda el índice al lado del video (o en `directory`, p. ej. fuera de una carpeta
+    sincronizada) o, si no se puede, en la carpeta temporal.
+    """
+    try:
+        path = index_path(video_path, directory)
+        index.save(path)
+    except OSError:
+        path = fallback_index_path(video_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        index.save(path)
+    return path
+
+
+def build_frame_index(video_path: str, save: bool = True, directory: Optional[str] = None) -> FrameIndex:
+    """
+    Recorre el video una vez y arma (y guarda) su índice. Los frames sólo se avanzan
+    (`grab`); se convierten a imagen únicamente los de las miniaturas.
+    """
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise ValueError(f"No se pudo abrir el video en {video_path}")
+
+    builder = FrameIndexBuilder()
+    try:
+        while cap.grab():
+            builder.add(cap)
+    finally:
+        cap.release()
+
+    index = builder.finish(video_path)
+    if save:
+        save_frame_index(index, video_path, directory)
+    return index
+
+
+def get_frame_index(video_path: str, directory: Optional[str] = None) -> FrameIndex:
+    """El índice guardado o, si no hay, uno nuevo."""
+    return load_frame_index(video_path, directory) or build_frame_index(video_path, directory=directory)
@@ -0,0 +1,107 @@
+from typing import Callable, Dict, List, Optional, Sequence
+
+import pandas as pd
+
+from core.marker_layout import MarkerLayout, MarkerRole
+from core.tools.role_resolver import RoleResolver
+
+
+HIP_ROLES = (MarkerRole.HIP_TEST, MarkerRole.HIP_BASE)
+ROLE_LABELS = {
+    MarkerRole.HIP_TEST: "cadera test",
+    MarkerRole.HIP_BASE: "cadera base",
+}
+
+
+class DetectionGapError(ValueError):
+    """
+    Un marcador de cadera se perdió durante más frames de los permitidos.
+
+    Es un `ValueError`, igual que el "Detección insuficiente" de `validate_detection`,
+    pero lleva qué marcador se perdió y desde qué frame.
+    """
+
+    def __init__(self, role: MarkerRole, marker_id: int, start_frame: int, end_frame: int,
+                 start_time: float, end_time: float, max_allowed_gap: int):
+        self.role = role
+        self.marker_id = marker_id
+        self.start_frame = start_frame
+        self.end_frame = end_frame
+        self.start_time = start_time
+        self.end_time = end_time
+        super().__init__(
+            f"Detección insuficiente: se perdió el marcador de {ROLE_LABELS[role]} (ID {marker_id}) "
+            f"entre los frames {start_frame} y {end_frame} ({start_time:.2f}-{end_time:.2f} seg), "
+            f"más de {max_allowed_gap} frames procesados seguidos."
+        )
+
+
+class HipGapTracker:
+    """
+    Seguimiento incremental de las rachas sin detección de los marcadores de cadera.
+
+    `aruco_process` le pasa cada frame procesado y la detección se corta apenas una
+    cadera supera `max_allowed_gap` frames procesados seguidos sin detectarse, en vez de
+    esperar al final del video para que `validate_detection` dé el mismo resultado.
+
+    Los IDs de cadera se resuelven con un `RoleResolver` sobre los primeros `n_frames`
+    frames, los mismos que usa la asignación de roles, o salen directamente del perfil.
+
+    Args:
+        resolve_roles (Callable[[pd.DataFrame], dict]): Devuelve el mapa `id_n_x/y` -> `<rol>_x/y`
+            (normalmente `TrendetecT.resolve_marker_roles`).
+        max_allowed_gap (int): Máximo de frames procesados seguidos sin una cadera.
+        n_frames (int): Frames con los que se resuelven los roles.
+        layout (MarkerLayout, optional): Perfil de marcadores de la detección.
+    """
+
+    def __init__(self, resolve_roles: Callable[[pd.DataFrame], dict], max_allowed_gap: int = 5,
+                 n_frames: int = 10, layout: Optional[MarkerLayout] = None):
+        self.resolver = RoleResolver(resolve_roles, n_frames, layout)
+        self.max_allowed_gap = max_allowed_gap
+
+        self.hip_ids: Optional[Dict[MarkerRole, int]] = None
+        self._pending: List[tuple] = []
+        # Rol -> (largo de la racha actual, frame y tiempo en que empezó)
+        self._gaps: Dict[MarkerRole, tuple] = {}
+
+
+    def update(self, frame_index: int, time: float, ids: Optional[Sequence[int]] = None,
+               centers: Optional[Sequence[Sequence[float]]] = None):
+        """
+        Registra un frame procesado.
+
+        Raises:
+            DetectionGapError: Si una cadera ya superó el máximo de frames sin detectarse.
+            ValueError: Si no se pueden resolver los roles en los primeros frames.
+        """
+        ids = [int(id_) for id_ in ids] if ids is not None else []
+
+        if self.hip_ids is None:
+            self._pending.append((frame_index, time, ids))
+            roles = self.resolver.add(time, ids, centers)
+            if roles is None:
+                return
+
+            self.hip_ids = {role: id_ for id_, role in roles.items() if role in HIP_ROLES}
+            pending, self._pending = self._pending, []
+            for frame_index, time, ids in pending:
+                self._track(frame_index, time, ids)
+            return
+
+        self._track(frame_index, time, ids)
+
+
+    def _track(self, frame_index: int, time: float, ids: List[int]):
+        for role, marker_id in self.hip_ids.items():
+            if marker_id in ids:
+                self._gaps.pop(role, None)
+                continue
+
+            length, start_frame, start_time = self._gaps.get(role, (0, frame_index, time))
+            length += 1
+            self._gaps[role] = (length, start_frame, start_time)
+
+            if length > self.max_allowed_gap:
+                raise DetectionGapError(role, marker_id, start_frame, frame_index, start_time, time,
+                                        self.max_allowed_gap)
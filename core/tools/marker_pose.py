@@ -0,0 +1,191 @@
+"""
+Pose 3D de los marcadores y oblicuidad pélvica en el plano frontal (modo 3D).
+
+El ángulo 2D de `compute_hip_angles` es la pendiente en la imagen entre los centroides
+de las caderas: si el celular no está de frente al paciente, la perspectiva la deforma
+(con la cámara girada un ángulo `a` alrededor de la vertical, la pendiente se ve
+multiplicada por ~1 / cos(a)). Acá se recupera la pose de cada marcador con sus cuatro
+esquinas y los intrínsecos de la cámara (`core.camera_profile`), y la oblicuidad se mide
+en el plano frontal del paciente en lugar del plano de la imagen.
+
+Todo se resuelve en lote con numpy para la sesión completa, sin un `solvePnP` por frame:
+
+1. Las esquinas se llevan a la orientación original del video y se normalizan (sin
+   distorsión) con un único `cv2.undistortPoints`.
+2. La homografía plano del marcador -> imagen de cada marcador sale de un sistema
+   lineal de 8x8 por marcador (`np.linalg.solve` sobre el lote).
+3. Con coordenadas normalizadas, H = λ [r1 r2 t]: de ahí la rotación (ortonormalizada
+   con una SVD en lote) y la posición del centro del marcador.
+
+Las posiciones quedan en unidades del lado del marcador; la escala no hace falta porque
+sólo se miden ángulos.
+
+El plano frontal se estima con la mediana de las normales de ambos marcadores en toda la
+sesión (la pose de un marcador chico es ruidosa frame a frame, pero su mediana no). Su
+eje horizontal es el perpendicular a la normal y al eje vertical de la imagen, así que,
+como en 2D, se asume el celular derecho (una inclinación constante la resta la postura
+inicial).
+
+La profundidad de cada marcador por separado sale de su tamaño aparente y con 0.3 px de
+ruido en las esquinas ya desvía la oblicuidad varios grados. Por eso los centros se
+ubican cortando su rayo con el plano frontal: la distancia al plano no importa (el
+ángulo no depende de la escala) y el ruido de tamaño desaparece.
+"""
+from typing import Dict, Tuple
+
+import cv2
+import numpy as np
+
+from core.camera_profile import CameraProfile
+
+
+# Esquinas del marcador en su plano (lado 1), en el orden de ArUco:
+# superior izquierda, superior derecha, inferior derecha, inferior izquierda
+MARKER_CORNERS = np.array([[-0.5, 0.5], [0.5, 0.5], [0.5, -0.5], [-0.5, -0.5]])
+
+
+def normalized_corners(corners: np.ndarray, profile: CameraProfile) -> np.ndarray:
+    """
+    Esquinas detectadas (en portrait, como las entrega `aruco_process`) a coordenadas
+    normalizadas de la cámara, sin distorsión, en la orientación original del video.
+
+    Args:
+        corners (np.ndarray): (n, 4, 2) en píxeles; NaN donde no hubo detección.
+
+    Returns:
+        np.ndarray: (n, 4, 2), NaN en las mismas filas.
+    """
+    corners = np.asarray(corners, dtype=np.float64)
+    # Deshace la rotación horaria de la detección: x = y', y = (alto - 1) - x'
+    height = profile.image_size[1]
+    raw = np.stack([corners[..., 1], (height - 1) - corners[..., 0]], axis=-1)
+
+    normalized = np.full(raw.shape, np.nan)
+    valid = np.isfinite(raw).all(axis=(1, 2))
+    if valid.any():
+        points = cv2.undistortPoints(raw[valid].reshape(-1, 1, 2), profile.K, profile.distortion)
+        normalized[valid] = points.reshape(-1, 4, 2)
+    return normalized
+
+
+def batch_homographies(points: np.ndarray) -> np.ndarray:
+    """Homografías (n, 3, 3) de `MARKER_CORNERS` a `points` (n, 4, 2), con h33 = 1."""
+    n = len(points)
+    X, Y = MARKER_CORNERS[:, 0], MARKER_CORNERS[:, 1]
+    u, v = points[..., 0], points[..., 1]
+
+    A = np.zeros((n, 8, 8))
+    A[:, 0::2, 0] = X
+    A[:, 0::2, 1] = Y
+    A[:, 0::2, 2] = 1
+    A[:, 0::2, 6] = -u * X
+    A[:, 0::2, 7] = -u * Y
+    A[:, 1::2, 3] = X
+    A[:, 1::2, 4] = Y
+    A[:, 1::2, 5] = 1
+    A[:, 1::2, 6] = -v * X
+    A[:, 1::2, 7] = -v * Y
+
+    b = np.empty((n, 8))
+    b[:, 0::2] = u
+    b[:, 1::2] = v
+
+    h = np.linalg.solve(A, b[..., None])[..., 0]
+    return np.concatenate([h, np.ones((n, 1))], axis=1).reshape(n, 3, 3)
+
+
+def poses_from_homographies(H: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Rotaciones (n, 3, 3) y posiciones (n, 3) a partir de homografías en coordenadas normalizadas.
+    """
+    h1, h2, h3 = H[..., 0], H[..., 1], H[..., 2]
+    scale = 2 / (np.linalg.norm(h1, axis=1) + np.linalg.norm(h2, axis=1))
+    # El marcador está delante de la cámara (z > 0)
+    scale = np.where(h3[:, 2] < 0, -scale, scale)[:, None]
+
+    r1, r2 = h1 * scale, h2 * scale
+    R = np.stack([r1, r2, np.cross(r1, r2)], axis=-1)
+    # Rotación más cercana (el ruido hace que r1 y r2 no sean ortonormales)
+    U, _, Vt = np.linalg.svd(R)
+    return U @ Vt, h3 * scale
+
+
+def estimate_marker_poses(corners: np.ndarray, profile: CameraProfile) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Posición del centro y normal de cada marcador, en el sistema de la cámara rotado a
+    portrait (x a la derecha y y hacia abajo en la imagen de la detección, z hacia adelante).
+
+    Args:
+        corners (np.ndarray): (n, 4, 2) esquinas en portrait; NaN donde no hubo detección.
+
+    Returns:
+        tuple: `(positions, normals)`, ambos (n, 3) y NaN donde no hubo detección. La
+        normal apunta desde la cara impresa hacia la cámara.
+    """
+    points = normalized_corners(corners, profile)
+    positions = np.full((len(points), 3), np.nan)
+    normals = np.full((len(points), 3), np.nan)
+
+    valid = np.isfinite(points).all(axis=(1, 2))
+    if valid.any():
+        R, t = poses_from_homographies(batch_homographies(points[valid]))
+        # Rotación de la detección: x' = -y, y' = x
+        positions[valid] = np.stack([-t[:, 1], t[:, 0], t[:, 2]], axis=1)
+        normals[valid] = np.stack([-R[:, 1, 2], R[:, 0, 2], R[:, 2, 2]], axis=1)
+    return positions, normals
+
+
+def frontal_axes(normals: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Ejes horizontal y vertical del plano frontal a partir de las normales de la sesión.
+    Con la cámara de frente son los ejes x e y de la imagen.
+    """
+    normal = np.nanmedian(normals, axis=0)
+    if not np.isfinite(normal).all():
+        raise ValueError("No hay detecciones de las caderas para estimar el plano frontal.")
+    normal /= np.linalg.norm(normal)
+
+    horizontal = np.cross(normal, [0.0, 1.0, 0.0])
+    horizontal /= np.linalg.norm(horizontal)
+    return horizontal, np.cross(horizontal, normal)
+
+
+def frontal_obliquity(base_corners: np.ndarray, test_corners: np.ndarray, profile: CameraProfile) -> np.ndarray:
+    """
+    Oblicuidad pélvica (grados) por fila, en el plano frontal, con el mismo signo que
+    `compute_hip_angles` (pendiente cadera base -> cadera test, y hacia abajo).
+
+    Args:
+        base_corners (np.ndarray): (n, 4, 2) esquinas de la cadera base por fila.
+        test_corners (np.ndarray): (n, 4, 2) esquinas de la cadera test por fila.
+        profile (CameraProfile): Intrínsecos de la cámara.
+
+    Returns:
+        np.ndarray: (n,) ángulos, NaN donde falta alguna de las caderas.
+    """
+    n = len(base_corners)
+    positions, normals = estimate_marker_poses(np.concatenate([base_corners, test_corners]), profile)
+    horizontal, vertical = frontal_axes(normals)
+
+    # Centros sobre el plano frontal (a distancia 1): el rayo de cada centro escalado
+    normal = np.cross(vertical, horizontal)
+    on_plane = positions / (positions @ normal)[:, None]
+    pelvis = on_plane[n:] - on_plane[:n]
+    return np.degrees(np.arctan((pelvis @ vertical) / (pelvis @ horizontal)))
+
+
+def compare_angles(angles_2d: np.ndarray, angles_3d: np.ndarray) -> Dict[str, float]:
+    """Diferencias entre las series 2D y 3D de una misma sesión (grados)."""
+    angles_2d = np.asarray(angles_2d, dtype=np.float64)
+    angles_3d = np.asarray(angles_3d, dtype=np.float64)
+    both = np.isfinite(angles_2d) & np.isfinite(angles_3d)
+    if not both.any():
+        return {'mean_abs_diff': np.nan, 'max_abs_diff': np.nan, 'max_2d': np.nan, 'max_3d': np.nan}
+
+    diff = np.abs(angles_2d[both] - angles_3d[both])
+    return {
+        'mean_abs_diff': float(diff.mean()),
+        'max_abs_diff': float(diff.max()),
+        'max_2d': float(angles_2d[both].max()),
+        'max_3d': float(angles_3d[both].max()),
+    }
@@ -0,0 +1,137 @@
+from typing import Dict, Sequence, Tuple
+import numpy as np
+import pandas as pd
+
+
+# Umbral de caída pélvica (grados sobre la postura base) a partir del cual se
+# considera que la caída se sostiene; ajustable por llamada.
+DROP_THRESHOLD_DEG = 2.0
+
+
+def compute_angle_metrics(angles, times, threshold: float = DROP_THRESHOLD_DEG) -> Dict[str, np.ndarray]:
+    """
+    Calcula de forma vectorizada las métricas de una o varias series de ángulo alineadas.
+
+    Todas las métricas salen de las mismas máscaras e índices (máximo, mínimo, primera y
+    última muestra válida), sin recorrer la serie una vez por métrica. Los NaN se ignoran.
+
+    Args:
+        angles (array-like): Ángulos en grados, forma (n,) o (k, n) para k series alineadas.
+        times (array-like): Tiempos en segundos, forma (n,) compartida o (k, n).
+        threshold (float): Umbral de caída en grados.
+
+    Returns:
+        Dict[str, np.ndarray]: Arreglos de forma (k,) con:
+            - 'max_angle', 'max_time', 'min_angle', 'min_time', 'mean_angle', 'duration'
+            - 'time_to_max': tiempo desde el inicio hasta la caída máxima
+            - 'time_above': tiempo total con el ángulo por encima de `threshold`
+            - 'recovery_time': tiempo desde la caída máxima hasta volver a `threshold` o menos
+              (NaN si no se recupera), y 'recovery_moment' en que ocurre
+            - 'drop_rate': velocidad media de caída desde la primera muestra válida hasta el
+              máximo (°/seg)
+    """
+    values = np.atleast_2d(np.asarray(angles, dtype=np.float64))
+    times = np.broadcast_to(np.atleast_2d(np.asarray(times, dtype=np.float64)), values.shape)
+    k, n = values.shape
+    rows = np.arange(k)
+    positions = np.arange(n)
+
+    valid = ~np.isnan(values)
+    n_valid = valid.sum(axis=1)
+    has_data = n_valid > 0
+
+    # Extremos (primera ocurrencia, como idxmax/idxmin)
+    max_idx = np.where(valid, values, -np.inf).argmax(axis=1)
+    min_idx = np.where(valid, values, np.inf).argmin(axis=1)
+    first_idx = valid.argmax(axis=1)
+    last_idx = n - 1 - valid[:, ::-1].argmax(axis=1)
+
+    nan = np.full(k, np.nan)
+    max_angle = np.where(has_data, values[rows, max_idx], nan)
+    max_time = np.where(has_data, times[rows, max_idx], nan)
+    min_angle = np.where(has_data, values[rows, min_idx], nan)
+    min_time = np.where(has_data, times[rows, min_idx], nan)
+    mean_angle = np.where(has_data, np.where(valid, values, 0).sum(axis=1) / np.maximum(n_valid, 1), nan)
+
+    start_time = np.where(has_data, times[rows, first_idx], nan)
+    end_time = np.where(has_data, times[rows, last_idx], nan)
+
+    # Intervalo de cada muestra válida hasta la siguiente válida de la misma serie
+    valid_pos = np.where(valid, positions, n)
+    next_valid = np.minimum.accumulate(valid_pos[:, ::-1], axis=1)[:, ::-1]
+    next_valid = np.concatenate([next_valid[:, 1:], np.full((k, 1), n)], axis=1)
+    padded_times = np.concatenate([times, times[:, -1:]], axis=1)
+    dt = np.where(valid & (next_valid < n), padded_times[rows[:, None], next_valid] - times, 0.0)
+
+    above = valid & (values > threshold)
+    time_above = (dt * above).sum(axis=1)
+
+    # Recuperación: primera muestra posterior al máximo que vuelve al umbral
+    recovered = valid & (values <= threshold) & (positions[None, :] > max_idx[:, None])
+    has_recovery = recovered.any(axis=1) & (max_angle > threshold)
+    recovery_idx = recovered.argmax(axis=1)
+    recovery_moment = np.where(has_recovery, times[rows, recovery_idx], nan)
+
+    time_to_max = max_time - start_time
+    # Lo que sube el ángulo desde el inicio: la serie puede no arrancar en 0
+    drop = max_angle - np.where(has_data, values[rows, first_idx], nan)
+    drop_rate = np.divide(drop, time_to_max, out=nan.copy(), where=time_to_max > 0)
+
+    return {
+        'max_angle': max_angle,
+        'max_time': max_time,
+        'min_angle': min_angle,
+        'min_time': min_time,
+        'mean_angle': mean_angle,
+        'duration': end_time - start_time,
+        'time_to_max': time_to_max,
+        'time_above': np.where(has_data, time_above, nan),
+        'recovery_time': recovery_moment - max_time,
+        'recovery_moment': recovery_moment,
+        'drop_rate': drop_rate,
+    }
+
+
+def align_series(series_list: Sequence[pd.Series]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Alinea varias series de ángulo (índice = tiempo) sobre la unión de sus tiempos.
+
+    Returns:
+        tuple: (ángulos de forma (k, n) con NaN donde una serie no tiene muestra, tiempos (n,)).
+    """
+    aligned = pd.concat([s.rename(i) for i, s in enumerate(series_list)], axis=1).sort_index()
+    return aligned.to_numpy(dtype=np.float64).T, aligned.index.to_numpy(dtype=np.float64)
+
+
+def batch_metrics(series_list: Sequence[pd.Series], threshold: float = DROP_THRESHOLD_DEG) -> pd.DataFrame:
+    """Métricas de una cohorte: una fila por serie y una columna por métrica."""
+    values, times = align_series(series_list)
+    return pd.DataFrame(compute_angle_metrics(values, times, threshold))
+
+
+def metrics_table(metrics: Dict[str, np.ndarray], index: int = 0) -> pd.DataFrame:
+    """
+    Arma la tabla resumen `Métrica / Valor / Momento` que muestra `InfoPanel` para la serie `index`.
+    """
+    m = {key: value[index] for key, value in metrics.items()}
+    recovery_moment = None if np.isnan(m['recovery_moment']) else m['recovery_moment']
+
+    return pd.DataFrame({
+        'Métrica': ['Ángulo máximo', 'Ángulo mínimo', 'Ángulo promedio', 'Duración',
+                    'Tiempo a caída máxima', 'Tiempo sobre umbral', 'Tiempo de recuperación', 'Tasa de caída'],
+        'Valor': [m['max_angle'], m['min_angle'], m['mean_angle'], m['duration'],
+                  m['time_to_max'], m['time_above'], m['recovery_time'], m['drop_rate']],
+        'Momento': [m['max_time'], m['min_time'], None, None,
+                    None, None, recovery_moment, None]
+    })
+
+
+def metric_unit(metric: str) -> str:
+    """Unidad con la que se muestra cada fila de la tabla resumen."""
+    if metric.startswith("Tasa"):
+        return "°/seg"
+    if "Ángulo" in metric:
+        return "°"
+    if metric == "Duración" or metric.startswith("Tiempo"):
+        return "seg"
+    return ""
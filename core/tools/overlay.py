@@ -0,0 +1,50 @@
+from typing import Dict, Optional, Tuple
+import cv2
+import numpy as np
+
+
+# Colores BGR
+HIP_COLOR = (235, 99, 37)       # azul de la interfaz (#2563EB)
+TIBIA_COLOR = (11, 158, 245)    # ámbar
+LINE_COLOR = (255, 255, 255)
+TEXT_COLOR = (255, 255, 255)
+
+
+def draw_pelvic_overlay(frame: np.ndarray, points: Dict[str, Tuple[float, float]],
+                        angle: Optional[float] = None) -> np.ndarray:
+    """
+    Dibuja sobre el frame los centroides de los marcadores, la línea pélvica y el ángulo.
+
+    Args:
+        frame (np.ndarray): Imagen BGR (se modifica en el lugar).
+        points (Dict[str, Tuple[float, float]]): Centroides por rol ('hip_test', 'hip_base', 'tibia').
+            Los valores NaN o ausentes no se dibujan.
+        angle (float, optional): Ángulo a mostrar, en grados.
+
+    Returns:
+        np.ndarray: El mismo frame, con el overlay.
+    """
+    scale = max(frame.shape[:2]) / 1000
+    radius = max(int(8 * scale), 3)
+    thickness = max(int(3 * scale), 1)
+
+    valid = {role: (int(round(x)), int(round(y))) for role, (x, y) in points.items()
+             if x is not None and y is not None and not (np.isnan(x) or np.isnan(y))}
+
+    # Línea pélvica entre ambas caderas
+    if 'hip_test' in valid and 'hip_base' in valid:
+        cv2.line(frame, valid['hip_test'], valid['hip_base'], LINE_COLOR, thickness, cv2.LINE_AA)
+
+    for role, center in valid.items():
+        color = TIBIA_COLOR if role == 'tibia' else HIP_COLOR
+        cv2.circle(frame, center, radius, color, -1, cv2.LINE_AA)
+
+    if angle is not None and not np.isnan(angle):
+        text = f"{angle:.1f} deg"
+        origin = (int(20 * scale) + 5, int(60 * scale) + 15)
+        cv2.putText(frame, text, origin, cv2.FONT_HERSHEY_SIMPLEX, 1.5 * scale + 0.3,
+                    (0, 0, 0), thickness + 3, cv2.LINE_AA)
+        cv2.putText(frame, text, origin, cv2.FONT_HERSHEY_SIMPLEX, 1.5 * scale + 0.3,
+                    TEXT_COLOR, thickness, cv2.LINE_AA)
+
+    return frame
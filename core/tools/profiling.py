@@ -0,0 +1,156 @@
+"""
+Perfilado opcional del pipeline.
+
+Se activa con la variable de entorno `TRENDETECT_PROFILE=1` (o `--profile` en la línea de
+comandos, que la define). Con el modo activo, cada sesión de procesamiento guarda un
+paquete `.zip` con el tiempo y el perfil cProfile de cada etapa y los contadores del loop
+de detección, listo para adjuntar a un reporte. Con el modo apagado no se crea ningún
+perfilador: las etapas corren igual que siempre.
+"""
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+import cProfile
+import io
+import json
+import marshal
+import os
+import platform
+import pstats
+import re
+import time
+import zipfile
+
+import cv2
+import numpy
+import pandas
+
+
+PROFILE_ENV = 'TRENDETECT_PROFILE'
+PROFILE_DIR_ENV = 'TRENDETECT_PROFILE_DIR'
+DEFAULT_PROFILE_DIR = 'profiles'
+
+
+def profiling_enabled() -> bool:
+    return os.environ.get(PROFILE_ENV, '').lower() not in ('', '0', 'false', 'no')
+
+
+def enable_profiling(output_dir: str = None):
+    """Activa el perfilado para este proceso y los que lance (la configuración viaja por entorno)."""
+    os.environ[PROFILE_ENV] = '1'
+    if output_dir:
+        os.environ[PROFILE_DIR_ENV] = output_dir
+
+
+def new_frame_stats() -> Dict[str, float]:
+    """Contadores que `aruco_process` completa cuando se le pasan."""
+    return {
+        'frames_decoded': 0,
+        'frames_detected': 0,
+        'frames_skipped': 0,
+        'frames_gated': 0,
+        'decode_seconds': 0.0,
+        'detect_seconds': 0.0,
+    }
+
+
+class SessionProfiler:
+    """
+    Perfil de una sesión de procesamiento: una entrada por etapa y contadores de frames.
+
+    Args:
+        label (str): Nombre de la sesión (normalmente el video).
+        output_dir (str): Carpeta donde se escribe el paquete.
+    """
+
+    def __init__(self, label: str, output_dir: str):
+        self.label = label
+        self.output_dir = output_dir
+        self.started = datetime.now()
+        self.stages: List[dict] = []
+        self.frame_stats = new_frame_stats()
+        self._profiles: List[Tuple[str, cProfile.Profile]] = []
+
+    @contextmanager
+    def stage(self, name: str):
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Otro perfilador activo (p. ej. otro trabajo en paralelo): sólo se mide el tiempo
+            profile = None
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            if profile is not None:
+                profile.disable()
+                self._profiles.append((name, profile))
+            self.stages.append({'name': name, 'seconds': time.perf_counter() - start})
+
+    def write_bundle(self) -> str:
+        """Escribe el paquete `.zip` (stages.json, summary.txt y un .prof por etapa) y devuelve su ruta."""
+        os.makedirs(self.output_dir, exist_ok=True)
+        safe_label = re.sub(r'[^\w.-]+', '_', os.path.basename(self.label or 'sesion'))
+        bundle_path = os.path.join(self.output_dir, f"trendetect_{safe_label}_{self.started:%Y%m%d_%H%M%S}.zip")
+
+        with zipfile.ZipFile(bundle_path, 'w', compression=zipfile.ZIP_DEFLATED) as bundle:
+            bundle.writestr('stages.json', json.dumps(self.info(), indent=2, ensure_ascii=False))
+            bundle.writestr('summary.txt', self.summary())
+
+            for i, (name, profile) in enumerate(self._profiles):
+                profile.create_stats()
+                bundle.writestr(f"{i:02d}_{name}.prof", _marshal_stats(profile))
+
+        return bundle_path
+
+    def info(self) -> dict:
+        return {
+            'session': self.label,
+            'started': self.started.isoformat(timespec='seconds'),
+            'stages': self.stages,
+            'total_seconds': sum(stage['seconds'] for stage in self.stages),
+            'frames': self.frame_stats,
+            'environment': {
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'opencv': cv2.__version__,
+                'numpy': numpy.__version__,
+                'pandas': pandas.__version__,
+                'cpu_count': os.cpu_count(),
+            },
+        }
+
+    def summary(self, top: int = 25) -> str:
+        out = io.StringIO()
+        out.write(f"Sesión: {self.label}\n")
+        for key, value in self.frame_stats.items():
+            out.write(f"{key}: {value:.3f}\n" if isinstance(value, float) else f"{key}: {value}\n")
+
+        for stage in self.stages:
+            out.write(f"- {stage['name']}: {stage['seconds']:.3f} s\n")
+
+        for name, profile in self._profiles:
+            out.write(f"\n===== {name} =====\n")
+            stats = pstats.Stats(profile, stream=out)
+            stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(top)
+
+        return out.getvalue()
+
+
+def _marshal_stats(profile: cProfile.Profile) -> bytes:
+    # Mismo formato que Profile.dump_stats, sin pasar por un archivo temporal
+    return marshal.dumps(profile.stats)
+
+
+def start_session_profile(label: str) -> Optional[SessionProfiler]:
+    """Devuelve un perfilador nuevo si el modo está activo, o None."""
+    if not profiling_enabled():
+        return None
+    return SessionProfiler(label, os.environ.get(PROFILE_DIR_ENV, DEFAULT_PROFILE_DIR))
+
+
+def profile_stage(profiler: Optional[SessionProfiler], name: str):
+    """Contexto de la etapa `name`; sin perfilador es un contexto vacío."""
+    return profiler.stage(name) if profiler is not None else nullcontext()
@@ -1,4 +1,5 @@
 from PySide6.QtCore import (
+    QCoreApplication,
     QObject,
     QRunnable,
     Signal,
@@ -8,6 +9,8 @@ from PySide6.QtCore import (
 import traceback
 import sys
 
+from core.jobs import JobCancelled
+
 
 class WorkerSignals(QObject):
     """Signals from a running worker thread.
@@ -23,12 +26,16 @@ class WorkerSignals(QObject):
 
     progress
         float indicating % progress
+
+    partial
+        list with an approximate result before the final one (progressive processing)
     """
 
     finished = Signal()
     error = Signal(tuple)
     result = Signal(list)
     progress = Signal(float)
+    partial = Signal(list)
 
 
 
@@ -50,7 +57,10 @@ class Worker(QRunnable):
         self.fn = fn
         self.args = args
         self.kwargs = kwargs
-        self.signals = WorkerSignals()
+        # Las señales cuelgan de la aplicación: el pool destruye el worker al terminar `run`
+        # y, sin dueño, las señales encoladas (result, error) se perderían con él
+        self.signals = WorkerSignals(QCoreApplication.instance())
+        self.signals.finished.connect(self.signals.deleteLater)
         # Add the callback to our kwargs
         self.kwargs["progress_callback"] = self.signals.progress
 
@@ -58,8 +68,10 @@ class Worker(QRunnable):
     def run(self):
         try:
             result = self.fn(*self.args, **self.kwargs)
-        except Exception:
-            traceback.print_exc()
+        except Exception as e:
+            # Una cancelación no es un error: no se imprime
+            if not isinstance(e, JobCancelled):
+                traceback.print_exc()
             exctype, value = sys.exc_info()[:2]
             self.signals.error.emit((exctype, value, traceback.format_exc()))
         else:
@@ -0,0 +1,75 @@
+from typing import Callable, Dict, List, Optional, Sequence
+import re
+
+import pandas as pd
+
+from core.marker_layout import MarkerLayout, MarkerRole
+
+
+_ID_COLUMN = re.compile(r"^id_(-?\d+)_x$")
+
+
+class RoleResolver:
+    """
+    Resuelve los roles de los marcadores durante la detección, frame a frame.
+
+    Junta los primeros `n_frames` frames procesados, arma con ellos el mismo DataFrame que
+    `aruco_process` y aplica `resolve_roles` (normalmente `TrendetecT.resolve_marker_roles`),
+    así el resultado coincide con el de `assign_marker_roles` sobre el video completo.
+
+    Con un perfil de marcadores los roles salen del perfil desde el primer frame: no hace
+    falta esperar a que aparezcan todos sus IDs (la tibia puede entrar en cuadro después
+    de los primeros frames).
+
+    Args:
+        resolve_roles (Callable[[pd.DataFrame], dict]): Devuelve el mapa `id_n_x/y` -> `<rol>_x/y`.
+        n_frames (int): Frames con los que se resuelven los roles.
+        layout (MarkerLayout, optional): Perfil de marcadores de la detección.
+    """
+
+    def __init__(self, resolve_roles: Callable[[pd.DataFrame], dict], n_frames: int = 10,
+                 layout: Optional[MarkerLayout] = None):
+        self.resolve_roles = resolve_roles
+        self.n_frames = n_frames
+        self.roles: Optional[Dict[int, MarkerRole]] = dict(layout.roles) if layout is not None else None
+        self._rows: List[dict] = []
+
+
+    @property
+    def resolved(self) -> bool:
+        return self.roles is not None
+
+
+    def add(self, time: float, ids: Optional[Sequence[int]] = None,
+            centers: Optional[Sequence[Sequence[float]]] = None) -> Optional[Dict[int, MarkerRole]]:
+        """
+        Agrega un frame procesado. Devuelve el mapa ID -> rol en cuanto queda resuelto.
+
+        Raises:
+            ValueError: Si no se pueden resolver los roles con los primeros frames.
+        """
+        if self.roles is not None:
+            return self.roles
+
+        row = {'time': time}
+        for id_, (x, y) in zip(ids if ids is not None else [], centers or []):
+            row[f"id_{int(id_)}_x"] = x
+            row[f"id_{int(id_)}_y"] = y
+        self._rows.append(row)
+
+        if len(self._rows) >= self.n_frames:
+            self.finish()
+        return self.roles
+
+
+    def finish(self) -> Optional[Dict[int, MarkerRole]]:
+        """Resuelve con los frames juntados hasta ahora (por ejemplo, si el video terminó antes)."""
+        if self.roles is None and self._rows:
+            rename_map = self.resolve_roles(pd.DataFrame(self._rows))
+            self.roles = {}
+            for column, role_column in rename_map.items():
+                match = _ID_COLUMN.match(column)
+                if match and role_column.endswith('_x'):
+                    self.roles[int(match.group(1))] = MarkerRole(role_column[:-2])
+            self._rows = []
+        return self.roles
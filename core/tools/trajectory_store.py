@@ -0,0 +1,226 @@
+from typing import Iterator, List, Optional, Sequence
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+
+MANIFEST_NAME = "manifest.json"
+TIMESTAMPS_NAME = "timestamps.npy"
+
+# Una fila por frame procesado (equivale a una fila del DataFrame de aruco_process);
+# el tiempo no se guarda por fila: sale del PTS del video o se recalcula como frame / fps
+ROW_DTYPE = np.dtype([('frame', np.int32), ('gated', np.bool_)])
+
+# Una fila por marcador detectado; `row` es la posición global de la fila del frame.
+# Coordenadas en float32 como en la trayectoria compacta (ver core/tools/compact_trajectory.py)
+DETECTION_DTYPE = np.dtype([('row', np.int32), ('id', np.int32), ('x', np.float32), ('y', np.float32)])
+
+
+class TrajectoryStore:
+    """
+    Almacén en disco de las detecciones de un video, escrito en bloques de tamaño fijo.
+
+    Cada bloque cubre `block_rows` filas (frames procesados) y se guarda como dos
+    archivos `.npy` (filas y detecciones) que se leen con memory-map, de modo que las
+    etapas posteriores sólo cargan los bloques que necesitan. Las lecturas devuelven el
+    mismo DataFrame ancho (`time`, `id_n_x`, `id_n_y`, ...) que `aruco_process`, con el
+    índice igual a la posición global de la fila.
+
+    Args:
+        directory (str): Carpeta donde se escriben los bloques.
+        block_rows (int): Cantidad de filas por bloque.
+        fps (float, optional): FPS del video; `aruco_process` lo completa al abrirlo.
+
+    Si `aruco_process` tiene el índice de frames del video, completa `timestamps` (PTS de
+    cada frame del video) y el tiempo de cada fila sale de ahí en lugar de `frame / fps`.
+    """
+
+    def __init__(self, directory: str, block_rows: int = 4096, fps: Optional[float] = None):
+        self.directory = directory
+        self.block_rows = block_rows
+        self.fps = fps
+        # Si la detección usó la compuerta de movimiento, las lecturas incluyen `gated`
+        self.motion_gate = False
+        self.timestamps: Optional[np.ndarray] = None
+        self.blocks: List[dict] = []
+        self.ids: List[int] = []
+        self.n_rows = 0
+
+        self._rows = []
+        self._detections = []
+        self._closed = False
+        os.makedirs(directory, exist_ok=True)
+
+
+    @classmethod
+    def open(cls, directory: str) -> "TrajectoryStore":
+        """Abre un almacén ya escrito para lectura."""
+        with open(os.path.join(directory, MANIFEST_NAME), encoding='utf-8') as f:
+            manifest = json.load(f)
+
+        store = cls(directory, block_rows=manifest['block_rows'], fps=manifest['fps'])
+        store.blocks = manifest['blocks']
+        store.ids = manifest['ids']
+        store.n_rows = manifest['n_rows']
+        store.motion_gate = manifest.get('motion_gate', False)
+        if manifest.get('timestamps'):
+            store.timestamps = np.load(os.path.join(directory, TIMESTAMPS_NAME), mmap_mode='r')
+        store._closed = True
+        return store
+
+
+    # ==========================
+    # Escritura
+    # ==========================
+    def append(self, frame_index: int, ids: Optional[Sequence[int]] = None,
+               centers: Optional[Sequence[Sequence[float]]] = None, gated: bool = False):
+        """
+        Agrega la fila de un frame procesado con sus detecciones (puede no tener ninguna).
+        """
+        if self._closed:
+            raise ValueError("El almacén de trayectorias ya fue cerrado.")
+
+        row = self.n_rows
+        self._rows.append((frame_index, gated))
+
+        if ids is not None:
+            for id_, (x, y) in zip(ids, centers):
+                id_ = int(id_)
+                if id_ not in self.ids:
+                    self.ids.append(id_)
+                self._detections.append((row, id_, x, y))
+
+        self.n_rows += 1
+        if len(self._rows) >= self.block_rows:
+            self._flush()
+
+
+    def close(self) -> "TrajectoryStore":
+        """Escribe el último bloque parcial y el manifiesto."""
+        if self._closed:
+            return self
+        if not self.fps:
+            raise ValueError("El almacén de trayectorias necesita el FPS del video.")
+
+        self._flush()
+        if self.timestamps is not None:
+            np.save(os.path.join(self.directory, TIMESTAMPS_NAME), np.asarray(self.timestamps, dtype=np.float64))
+        manifest = {
+            'fps': self.fps,
+            'block_rows': self.block_rows,
+            'n_rows': self.n_rows,
+            'motion_gate': self.motion_gate,
+            'timestamps': self.timestamps is not None,
+            'ids': self.ids,
+            'blocks': self.blocks,
+        }
+        with open(os.path.join(self.directory, MANIFEST_NAME), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f)
+
+        self._closed = True
+        return self
+
+
+    def _flush(self):
+        if not self._rows:
+            return
+
+        name = f"block_{len(self.blocks):05d}"
+        first_row = self.n_rows - len(self._rows)
+
+        np.save(os.path.join(self.directory, f"{name}_rows.npy"), np.array(self._rows, dtype=ROW_DTYPE))
+        np.save(os.path.join(self.directory, f"{name}_dets.npy"), np.array(self._detections, dtype=DETECTION_DTYPE))
+
+        self.blocks.append({'name': name, 'first_row': first_row, 'n_rows': len(self._rows)})
+        self._rows = []
+        self._detections = []
+
+
+    # ==========================
+    # Lectura
+    # ==========================
+    @property
+    def columns(self) -> List[str]:
+        columns = ['time']
+        for id_ in self.ids:
+            columns += [f"id_{id_}_x", f"id_{id_}_y"]
+        if self.motion_gate:
+            columns.append('gated')
+        return columns
+
+
+    def iter_blocks(self) -> Iterator[pd.DataFrame]:
+        """Recorre el almacén bloque a bloque, como DataFrames anchos."""
+        for block in self.blocks:
+            yield self._read_block(block)
+
+
+    def head(self, n: int) -> pd.DataFrame:
+        return self.read_rows(0, n)
+
+
+    def read_rows(self, start: int, stop: int) -> pd.DataFrame:
+        """
+        Lee las filas [start, stop) cargando sólo los bloques que se superponen con el rango.
+        """
+        start = max(start, 0)
+        stop = min(stop, self.n_rows)
+
+        parts = []
+        for block in self.blocks:
+            block_start = block['first_row']
+            block_stop = block_start + block['n_rows']
+            if block_stop <= start or block_start >= stop:
+                continue
+            parts.append(self._read_block(block, start, stop))
+
+        if not parts:
+            return pd.DataFrame(columns=self.columns)
+
+        return pd.concat(parts)
+
+
+    def frame_times(self, frames: np.ndarray) -> np.ndarray:
+        """Tiempo en segundos de cada frame: su PTS si se conoce, si no `frame / fps`."""
+        times = np.asarray(frames).astype(np.float64) / self.fps
+        if self.timestamps is not None:
+            known = np.asarray(frames) < len(self.timestamps)
+            times[known] = self.timestamps[np.asarray(frames)[known]]
+        return times
+
+
+    def _read_block(self, block: dict, start: int = 0, stop: Optional[int] = None) -> pd.DataFrame:
+        rows = np.load(os.path.join(self.directory, f"{block['name']}_rows.npy"), mmap_mode='r')
+        detections = np.load(os.path.join(self.directory, f"{block['name']}_dets.npy"), mmap_mode='r')
+
+        first_row = block['first_row']
+        lo = max(start - first_row, 0)
+        hi = block['n_rows'] if stop is None else min(stop - first_row, block['n_rows'])
+        rows = rows[lo:hi]
+
+        index = pd.RangeIndex(first_row + lo, first_row + hi)
+        data = {'time': self.frame_times(rows['frame'])}
+
+        # Pivotear detecciones (formato largo) a columnas id_n_x / id_n_y
+        det_rows = np.asarray(detections['row']) - index.start
+        in_range = (det_rows >= 0) & (det_rows < len(index))
+        det_rows = det_rows[in_range]
+        det_ids = np.asarray(detections['id'])[in_range]
+        det_x = np.asarray(detections['x'])[in_range]
+        det_y = np.asarray(detections['y'])[in_range]
+
+        for id_ in self.ids:
+            mask = det_ids == id_
+            x = np.full(len(index), np.nan)
+            y = np.full(len(index), np.nan)
+            x[det_rows[mask]] = det_x[mask]
+            y[det_rows[mask]] = det_y[mask]
+            data[f"id_{id_}_x"] = x
+            data[f"id_{id_}_y"] = y
+
+        if self.motion_gate:
+            data['gated'] = np.array(rows['gated'])
+
+        return pd.DataFrame(data, index=index)
@@ -1,56 +1,345 @@
-from enum import Enum
 import pandas as pd
-import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
+
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
 
 from core.aruco.aruco_utils import aruco_process
+from core.aruco.detectors import DEFAULT_DETECTOR, DETECTOR_SETTING, MarkerDetector, get_detector
+from core.camera_profile import CameraProfile, get_camera_profile
+from core.config import get_setting
+from core.marker_layout import MarkerLayout, MarkerRole, get_marker_layout
+from core.session_cache import CachedSession, SessionCache, file_identity
+from core.session_file import SessionFile, is_session_file, save_session, trajectory_arrays, window_arrays
+from core.tools.metrics import DROP_THRESHOLD_DEG, compute_angle_metrics, metrics_table
+from core.tools.annotated_video import AnnotatedVideoWriter, AnnotationSettings
+from core.tools.compact_trajectory import CompactTrajectory
+from core.tools.frame_index import FrameIndex, FrameIndexBuilder, get_frame_index, load_frame_index, save_frame_index
+from core.tools.gap_tracker import HipGapTracker
+from core.tools.marker_pose import compare_angles, frontal_obliquity
+from core.tools.profiling import profile_stage, start_session_profile
+from core.tools.trajectory_store import TrajectoryStore
 import numpy as np
+import os
+import tempfile
+
+
+HIP_COLUMNS = [
+    f"{MarkerRole.HIP_BASE.value}_x",
+    f"{MarkerRole.HIP_BASE.value}_y",
+    f"{MarkerRole.HIP_TEST.value}_x",
+    f"{MarkerRole.HIP_TEST.value}_y"
+]
+
+# Filas de contexto que se leen a cada lado de la ventana de prueba en modo por bloques,
+# para que la interpolación de caderas vea los mismos vecinos que en memoria. La influencia
+# de un punto en el spline de grado 2 decae a menos de la resolución de float64 antes de
+# 32 filas; 64 deja el doble de margen (ver `tests/test_trendetect.py`).
+INTERPOLATION_MARGIN = 64
+
+
+# Estado de la instancia que se guarda en la caché de sesiones y se restaura al reusarla
+CACHED_STATE = ('df', 'angle_series', 'trajectory', 'frame_index', 'pose_angle_series', 'pose_comparison',
+                'session_file')
+
+# Argumentos de detección que se pasan a los procesos de la detección por tramos
+CHUNK_DETECTION_ARGS = ('dictionary_name', 'marker_ids', 'detector', 'motion_threshold', 'keep_corners')
+
+# Pasadas de la detección progresiva: la primera detecta un frame de cada 2**niveles de los
+# que procesa la detección completa (con frame_step=3, uno cada 32: ~1 por segundo a 30 fps)
+PROGRESSIVE_LEVELS = 3
+
+
+def detect_chunk(video_path: str, frame_range: tuple, frame_step: int, video_index: FrameIndex,
+                 args: dict) -> CompactTrajectory:
+    """Detecta un tramo `[inicio, fin)` del video (corre en un proceso aparte)."""
+    return aruco_process(video_path, frame_step=frame_step, as_trajectory=True, video_index=video_index,
+                         frame_range=frame_range, **args)
 
 
-class MarkerRole(Enum):
-    HIP_TEST = "hip_test"
-    HIP_BASE = "hip_base"
-    TIBIA = "tibia"
-    SHOULDER_LEFT = "shoulder_left"
-    SHOULDER_RIGHT = "shoulder_right"
+def progressive_passes(frame_step: int, levels: int = PROGRESSIVE_LEVELS) -> list:
+    """
+    Pasadas `(frame_step, frame_phase)` de `aruco_process` para la detección progresiva.
+
+    La primera toma un frame de cada `(frame_step + 1) * 2**levels`; cada una de las
+    siguientes agrega los frames a mitad de camino entre los ya detectados. Entre todas
+    cubren exactamente los frames de `frame_step`, cada uno una sola vez.
+    """
+    stride = (frame_step + 1) * 2 ** levels
+    passes = [(stride - 1, 0)]
+    while stride > frame_step + 1:
+        passes.append((stride - 1, stride // 2))
+        stride //= 2
+    return passes
+
+
+class NullProgress():
+    """Sustituto de la señal de progreso cuando el pipeline corre fuera de la GUI."""
+
+    def emit(self, value):
+        pass
+
 
 class TrendetecT():
 
-    def __init__(self, video_path: str = None):
+    def __init__(self, video_path: str = None, layout: MarkerLayout | str = None,
+                 chunk_size: int = None, spill_dir: str = None, motion_threshold: float = None,
+                 annotation: AnnotationSettings = None, detector: MarkerDetector | str = None,
+                 camera: CameraProfile | str = None, cache: SessionCache = None, index_dir: str = None):
+        """
+        Args:
+            video_path (str, optional): Video asociado.
+            layout (MarkerLayout | str, optional): Perfil de marcadores o su nombre.
+            chunk_size (int, optional): Si se indica, las detecciones se vuelcan a disco en
+                bloques de este tamaño y sólo se carga en memoria la ventana de prueba.
+            spill_dir (str, optional): Carpeta base para los bloques (por defecto, la temporal).
+            motion_threshold (float, optional): Umbral de la compuerta de movimiento de
+                `aruco_process` (niveles de gris); los frames quietos reusan la detección anterior.
+            annotation (AnnotationSettings, optional): Si se indica, durante la detección se
+                escribe una copia anotada del video.
+            detector (MarkerDetector | str, optional): Backend de detección o su nombre (ver
+                `core.aruco.detectors`); por defecto, el elegido con `cli.py calibrate`.
+            camera (CameraProfile | str, optional): Perfil de cámara o su nombre. Activa el
+                modo 3D: además del ángulo 2D se calcula la oblicuidad pélvica en el plano
+                frontal a partir de la pose de los marcadores (`pose_angle_series`). Sólo en
+                memoria (sin `chunk_size`).
+            cache (SessionCache, optional): Caché de sesiones compartida. Un video ya
+                procesado con los mismos parámetros (o un archivo de resultados ya cargado)
+                se devuelve desde ahí sin recalcular nada.
+            index_dir (str, optional): Carpeta del índice de frames de cada video (por
+                defecto, al lado del video; ver `core.tools.frame_index`).
+        """
         super().__init__()
         self.df = None
         self.angle_series = None
         self.video_path = video_path
+        self.layout = get_marker_layout(layout) if isinstance(layout, str) else layout
+        self.chunk_size = chunk_size
+        self.spill_dir = spill_dir
+        self.motion_threshold = motion_threshold
+        self.annotation = annotation
+        self.detector = detector
+        self.camera = get_camera_profile(camera) if isinstance(camera, str) else camera
+        if self.camera is not None and chunk_size:
+            raise ValueError("El modo 3D necesita las esquinas en memoria: no se puede combinar con chunk_size.")
+        # Modo 3D: trayectoria con esquinas, ángulos en el plano frontal y comparación con 2D
+        self.trajectory = None
+        self.pose_angle_series = None
+        self.pose_comparison = None
+        self.cache = cache
+        # Archivo de sesión del que se cargaron los resultados (ver load_session)
+        self.session_file = None
+        self.annotated_video = None
+        # Índice de frames del último video detectado (PTS, frames clave y miniaturas)
+        self.frame_index = None
+        self.index_dir = index_dir
+        self.store = None
+        self._spill = None
+        self._profiler = None
+        self._control = None
 
 
     def process_video(self, *args, **kwargs):
-        kwargs['progress_callback'].emit(10)
-        self.df = self.detect_data(args[0], frame_step=3)
+        progress_callback = kwargs.get('progress_callback') or NullProgress()
+        # JobControl opcional: permite cancelar el trabajo o cambiarle la prioridad
+        self._control = kwargs.get('control')
+        # Con `partial_callback` se detecta por pasadas y se emiten resultados aproximados
+        # antes del final (ver `detect_data_progressive`)
+        partial_callback = kwargs.get('partial_callback')
+
+        self.video_path = args[0]
+        self.session_file = None
+
+        # El video anotado se escribe durante la detección: con anotación no se usa la caché
+        key = None
+        if self.cache is not None and self.annotation is None and os.path.exists(args[0]):
+            key = self.session_key(args[0])
+            session = self.cache.get(key)
+            if session is not None:
+                self.restore_session(session)
+                progress_callback.emit(100)
+                return list(session.results)
+
+        # Sólo existe con TRENDETECT_PROFILE activo; si no, las etapas corren sin instrumentar
+        self._profiler = start_session_profile(args[0])
 
-        kwargs['progress_callback'].emit(25)
-        self.df = self.assign_marker_roles(self.df)
+        try:
+            progress_callback.emit(10)
+            if self.chunk_size:
+                with self._stage('detect_data'):
+                    self.store = self.detect_data_chunked(args[0], frame_step=3)
+                if self._control is not None:
+                    self._control.check()
+                results = self.analyze_store(self.store, progress_callback)
+            elif partial_callback is not None and self.supports_progressive():
+                with self._stage('detect_data'):
+                    self.df = self.detect_data_progressive(args[0], 3, partial_callback, progress_callback)
+                if self._control is not None:
+                    self._control.check()
+                results = self.analyze_detections(self.df, progress_callback)
+            else:
+                with self._stage('detect_data'):
+                    self.df = self.detect_data(args[0], frame_step=3)
+                if self._control is not None:
+                    self._control.check()
+                results = self.analyze_detections(self.df, progress_callback)
+
+            if key is not None:
+                self.cache.put(self.cached_session(key, results))
+            return results
+        finally:
+            self._control = None
+            if self.annotated_video is not None and self.annotated_video.error is not None:
+                print(f"No se pudo escribir el video anotado: {self.annotated_video.error}")
+            elif self.annotated_video is not None and self.annotated_video.frames_dropped:
+                print(f"Video anotado: {self.annotated_video.frames_dropped} frames descartados con la cola "
+                      f"llena (reemplazados por el frame anterior)")
+            if self._profiler is not None:
+                print(f"Perfil guardado en {self._profiler.write_bundle()}")
+                self._profiler = None
+
+
+    def session_key(self, video_path: str) -> tuple:
+        """Clave de caché: identidad del video y parámetros que cambian el resultado."""
+        if isinstance(self.detector, MarkerDetector):
+            detector = (self.detector.name, self.detector.dictionary_name, repr(getattr(self.detector, 'parameters', None)))
+        else:
+            detector = self.detector or get_setting(DETECTOR_SETTING, DEFAULT_DETECTOR)
+        layout = repr(self.layout) if self.layout is not None else None
+        return ('video', *file_identity(video_path), layout, detector, self.motion_threshold, self.camera)
+
+
+    def cached_session(self, key: tuple, results: list) -> CachedSession:
+        return CachedSession(key, list(results), {name: getattr(self, name) for name in CACHED_STATE})
+
+
+    def restore_session(self, session: CachedSession):
+        for name, value in session.state.items():
+            setattr(self, name, value)
 
-        kwargs['progress_callback'].emit(40)
-        if not self.validate_detection(self.df):
-            raise ValueError("Detección insuficiente para procesar la prueba.")
 
-        kwargs['progress_callback'].emit(55)
-        self.df = self.interpolate_missing(self.df)
+    def _stage(self, name: str):
+        return profile_stage(self._profiler, name)
+
+
+    def analyze_detections(self, df: pd.DataFrame, progress_callback=None):
+        """
+        Ejecuta las etapas de análisis sobre un DataFrame de detecciones en memoria.
+
+        Returns:
+            List[object]: `[results_df, angle_plot]`.
+        """
+        progress_callback = progress_callback or NullProgress()
+
+        progress_callback.emit(25)
+        with self._stage('assign_marker_roles'):
+            self.df = self.assign_marker_roles(df)
+
+        progress_callback.emit(40)
+        with self._stage('validate_detection'):
+            if not self.validate_detection(self.df):
+                raise ValueError("Detección insuficiente para procesar la prueba.")
+
+        progress_callback.emit(55)
+        with self._stage('interpolate_missing'):
+            self.df = self.interpolate_missing(self.df)
         
         offset = self.compute_offset(self.df)
         print(f'offset: {offset}')
         
-        kwargs['progress_callback'].emit(70)
-        self.df = self.crop_test_window(self.df)
+        progress_callback.emit(70)
+        with self._stage('crop_test_window'):
+            self.df = self.crop_test_window(self.df)
         
-        kwargs['progress_callback'].emit(85)
-        self.angle_series = self.compute_hip_angles(self.df)
-        self.angle_series = self.substract_base_angle(self.angle_series,offset)
+        return self.finish_analysis(offset, progress_callback)
+
+
+    def analyze_store(self, store: TrajectoryStore, progress_callback=None, n_frames: int = 10,
+                      max_allowed_gap: int = 5, min_len: int = 5):
+        """
+        Ejecuta las etapas de análisis recorriendo un almacén de trayectorias bloque a bloque.
+
+        La validación y la búsqueda de la ventana de prueba se hacen en streaming; sólo la
+        ventana recortada (más `INTERPOLATION_MARGIN` filas de contexto) se carga completa,
+        así que la memoria no crece con la duración del video.
+
+        El resultado es idéntico al de `analyze_detections` sobre las mismas detecciones,
+        aunque haya huecos de caderas junto a los bordes del recorte: la interpolación de la
+        ventana con su margen da los mismos valores que la de la trayectoria completa. La
+        única diferencia posible viene del almacén, que guarda los centroides en float32:
+        es nula para ArUco (ya son float32) y menor a 2e-4° para otras fuentes.
+
+        Returns:
+            List[object]: `[results_df, angle_plot]`.
+        """
+        progress_callback = progress_callback or NullProgress()
+
+        progress_callback.emit(25)
+        with self._stage('assign_marker_roles'):
+            rename_map = self.resolve_marker_roles(store.head(n_frames), n_frames)
+
+        # Validación de caderas y cambios de estado de la tibia en una sola pasada
+        progress_callback.emit(40)
+        with self._stage('validate_detection'):
+            max_gap = 0
+            open_gaps = None
+            windows = []
+            last_state = None
+            for block in store.iter_blocks():
+                block = block.rename(columns=rename_map)
+
+                gaps, open_gaps = self.count_hip_gaps(block, open_gaps)
+                max_gap = max(max_gap, *gaps.values())
+
+                block_windows = self.get_nan_windows(block)
+                if last_state is not None and block_windows['state'].iloc[0] == last_state:
+                    block_windows = block_windows.iloc[1:]
+                windows.append(block_windows)
+                last_state = bool(block[f"{MarkerRole.TIBIA.value}_x"].isna().iloc[-1])
+
+            if max_gap > max_allowed_gap:
+                raise ValueError("Detección insuficiente para procesar la prueba.")
+
+        progress_callback.emit(55)
+        with self._stage('interpolate_missing'):
+            head = self.interpolate_missing(store.head(INTERPOLATION_MARGIN).rename(columns=rename_map))
+        offset = self.compute_offset(head)
+        print(f'offset: {offset}')
+
+        progress_callback.emit(70)
+        with self._stage('crop_test_window'):
+            nan_windows = pd.concat(windows, ignore_index=True)
+            nan_windows = self.collapse_detection_errors(nan_windows, min_len=min_len)
+            start_idx, end_idx = self.test_segment_bounds(nan_windows, store.n_rows - 1)
+
+            window = store.read_rows(start_idx - INTERPOLATION_MARGIN, end_idx + 1 + INTERPOLATION_MARGIN)
+            window = self.interpolate_missing(window.rename(columns=rename_map))
+            self.df = window.loc[start_idx:end_idx].reset_index(drop=True)
+
+        return self.finish_analysis(offset, progress_callback)
+
+
+    def finish_analysis(self, offset: float, progress_callback):
+        """Calcula ángulos, tabla y gráfico a partir de `self.df` ya recortado."""
+        progress_callback.emit(85)
+        with self._stage('compute_hip_angles'):
+            self.angle_series = self.compute_hip_angles(self.df)
+            self.angle_series = self.substract_base_angle(self.angle_series,offset)
+
+        if self.camera is not None and self.trajectory is not None:
+            with self._stage('compute_pose_angles'):
+                self.pose_angle_series = self.compute_pose_angles(self.df)
+                self.pose_comparison = compare_angles(self.angle_series.to_numpy(), self.pose_angle_series.to_numpy())
+            print(f"3D vs 2D: diferencia media {self.pose_comparison['mean_abs_diff']:.2f}°, "
+                  f"máxima {self.pose_comparison['max_abs_diff']:.2f}°")
         
-        kwargs['progress_callback'].emit(95)
-        results_df = self.generate_results_table(self.angle_series)
-        angle_plot = self.generate_angle_plot(self.angle_series)
+        progress_callback.emit(95)
+        with self._stage('generate_results_table'):
+            results_df = self.generate_results_table(self.angle_series)
+        with self._stage('generate_angle_plot'):
+            angle_plot = self.generate_angle_plot(self.angle_series, self.pose_angle_series)
         
-        kwargs['progress_callback'].emit(100)
+        progress_callback.emit(100)
         
         return [results_df, angle_plot]
     
@@ -61,8 +350,168 @@ class TrendetecT():
         Devuelve un DataFrame listo para procesamiento.
         """
 
-        # Process the video to detect ArUco markers
-        return aruco_process(video_path, 'DICT_6X6_250', frame_step)
+        # Process the video to detect ArUco markers. Se conserva la trayectoria compacta
+        # (cruda, con las esquinas en modo 3D): la caché de sesiones y la pose la usan
+        self.trajectory = self.run_detection(video_path, frame_step=frame_step, as_trajectory=True,
+                                             **self.detection_args())
+        return self.trajectory.to_dataframe()
+
+
+    def supports_progressive(self) -> bool:
+        """
+        La detección progresiva converge al resultado de `detect_data` sólo si cada frame se
+        detecta igual sin importar el orden: sin compuerta de movimiento, sin video anotado,
+        sin bloques en disco y con un detector sin estado (no `AutoTunedDetector`).
+        """
+        if self.chunk_size or self.motion_threshold or self.annotation is not None:
+            return False
+        return self.detection_args()['detector'].stateless
+
+
+    def detect_data_progressive(self, video_path: str, frame_step: int, partial_callback,
+                                progress_callback=None, levels: int = PROGRESSIVE_LEVELS) -> pd.DataFrame:
+        """
+        Detecta por pasadas intercaladas (`progressive_passes`). Después de cada pasada menos
+        la última se analiza lo detectado hasta ahí y se emite el resultado aproximado por
+        `partial_callback` (`[results_df, angle_plot]`, como `process_video`). La unión de
+        todas las pasadas son los mismos frames que `detect_data`, así que el DataFrame
+        devuelto (y el análisis posterior) es idéntico.
+
+        Raises:
+            ValueError: Si la configuración no admite la detección progresiva
+                (`supports_progressive`) o la detección es insuficiente.
+        """
+        if not self.supports_progressive():
+            raise ValueError("La detección progresiva no admite compuerta de movimiento, video anotado, "
+                             "detección por bloques ni detectores que se ajustan al video.")
+        progress_callback = progress_callback or NullProgress()
+
+        args = self.detection_args()
+        # Las pasadas ralas tienen huecos de muchos frames por construcción: la validación
+        # de caderas se hace sobre la unión, al terminar
+        gap_tracker = args.pop('gap_tracker')
+        passes = progressive_passes(frame_step, levels)
+        parts = []
+        for number, (step, phase) in enumerate(passes, start=1):
+            # La primera pasada arma el índice de frames si hace falta; las demás toman de él los tiempos
+            if number == 1:
+                part = self.run_detection(video_path, frame_step=step, frame_phase=phase, as_trajectory=True, **args)
+            else:
+                part = aruco_process(video_path, frame_step=step, frame_phase=phase, as_trajectory=True,
+                                     video_index=self.frame_index, **args)
+            parts.append(part)
+            self.trajectory = CompactTrajectory.merge(parts)
+            progress_callback.emit(10 + 15 * number / len(passes))
+            if number == len(passes):
+                break
+
+            try:
+                partial = self.analyze_detections(self.trajectory.to_dataframe())
+            except ValueError as e:
+                print(f"Pasada {number}/{len(passes)} sin resultado aproximado: {e}")
+            else:
+                partial_callback.emit(partial)
+
+        # Mismo corte (y mismo mensaje) que da el seguimiento durante la detección completa
+        times = self.trajectory.times
+        for row, frame in enumerate(self.trajectory.frames):
+            present = ~np.isnan(self.trajectory.coords[row, :, 0])
+            gap_tracker.update(int(frame), float(times[row]), self.trajectory.ids[present],
+                               list(self.trajectory.coords[row, present]))
+        return self.trajectory.to_dataframe()
+
+
+    def detect_data_chunked(self, video_path: str, frame_step: int) -> TrajectoryStore:
+        """
+        Detecta marcadores volcando las filas a un almacén en disco de `chunk_size` filas por bloque.
+        El almacén vive en una carpeta temporal que se libera con la instancia o el siguiente video.
+        """
+        self._spill = tempfile.TemporaryDirectory(prefix='trendetect_', dir=self.spill_dir)
+        store = TrajectoryStore(self._spill.name, block_rows=self.chunk_size)
+
+        return self.run_detection(video_path, frame_step=frame_step, store=store, **self.detection_args())
+
+
+    def detect_trajectory(self, video_path: str, frame_step: int = 3, workers: int = 1) -> CompactTrajectory:
+        """
+        Detecta marcadores sin la validación de caderas durante la detección y devuelve la
+        trayectoria compacta. Para quien valida después con otros criterios (barrido de
+        parámetros, sesiones multi-cámara).
+
+        Con `workers > 1` el video se reparte en tramos que empiezan en frames clave y cada
+        proceso salta directo a su tramo con el índice de frames (que se arma antes si no
+        existe). El resultado es el mismo que de corrido, salvo por la compuerta de
+        movimiento, que arranca de cero en cada tramo.
+        """
+        args = self.detection_args()
+        args.pop('gap_tracker')
+        if workers <= 1:
+            return self.run_detection(video_path, frame_step=frame_step, as_trajectory=True, **args)
+
+        # Sin índice guardado se arma con una pasada que sólo avanza frames (`grab`), mucho
+        # más rápida que la detección, antes de repartir los tramos
+        self.frame_index = get_frame_index(video_path, self.index_dir)
+        args = {key: args[key] for key in CHUNK_DETECTION_ARGS if key in args}
+        # Las miniaturas no hacen falta para detectar: no se copian a cada proceso
+        video_index = FrameIndex(self.frame_index.pts, self.frame_index.keyframes, self.frame_index.fps,
+                                 self.frame_index.thumb_frames[:0], self.frame_index.thumbnails[:0],
+                                 self.frame_index.source)
+        chunks = self.frame_index.chunks(workers)
+        with ProcessPoolExecutor(max_workers=min(workers, len(chunks))) as pool:
+            parts = list(pool.map(detect_chunk, repeat(video_path), chunks, repeat(frame_step),
+                                  repeat(video_index), repeat(args)))
+        return CompactTrajectory.concatenate(parts)
+
+
+    def run_detection(self, video_path: str, **kwargs):
+        """
+        `aruco_process` con el índice de frames del video: usa el guardado si existe y si no
+        lo arma en la misma pasada de decodificación y lo guarda al terminar.
+        """
+        self.frame_index = load_frame_index(video_path, self.index_dir)
+        # En modo por bloques (grabaciones largas) el índice no lleva miniaturas
+        indexer = FrameIndexBuilder(thumbnails=kwargs.get('store') is None) if self.frame_index is None else None
+
+        result = aruco_process(video_path, video_index=self.frame_index, indexer=indexer, **kwargs)
+
+        if indexer is not None and indexer.pts:
+            self.frame_index = indexer.finish(video_path)
+            try:
+                save_frame_index(self.frame_index, video_path, self.index_dir)
+            except OSError as e:
+                print(f"No se pudo guardar el índice de frames: {e}")
+        return result
+
+
+    def detection_args(self) -> dict:
+        """Argumentos de `aruco_process` comunes a todos los modos de detección."""
+        # Con un perfil de marcadores sólo se detectan sus IDs
+        if self.layout is not None:
+            detector = self.detector
+            if not isinstance(detector, MarkerDetector):
+                detector = get_detector(detector, self.layout.dictionary_name)
+            args = {'dictionary_name': self.layout.dictionary_name, 'marker_ids': self.layout.marker_ids}
+        else:
+            detector = self.detector if isinstance(self.detector, MarkerDetector) else get_detector(self.detector)
+            args = {'dictionary_name': detector.dictionary_name}
+        args['detector'] = detector
+
+        # Misma validación que validate_detection, pero durante la detección
+        args['gap_tracker'] = HipGapTracker(self.resolve_marker_roles, layout=self.layout)
+
+        if self.motion_threshold:
+            args['motion_threshold'] = self.motion_threshold
+        if self.annotation is not None:
+            self.annotated_video = AnnotatedVideoWriter(self.annotation, self.resolve_marker_roles, self.layout)
+            args['annotated_video'] = self.annotated_video
+        if self._profiler is not None:
+            args['frame_stats'] = self._profiler.frame_stats
+        if self._control is not None:
+            args['control'] = self._control
+        if self.camera is not None:
+            args['keep_corners'] = True
+
+        return args
     
     
     def validate_detection(self, df: pd.DataFrame, max_allowed_gap: int = 5) -> bool:
@@ -77,53 +526,61 @@ class TrendetecT():
         Returns:
             bool: True si la detección es válida, False si no.
         """
-        # Columnas a evaluar
-        hip_columns = [
-            f"{MarkerRole.HIP_BASE.value}_x",
-            f"{MarkerRole.HIP_BASE.value}_y",
-            f"{MarkerRole.HIP_TEST.value}_x",
-            f"{MarkerRole.HIP_TEST.value}_y"
-        ]
+        max_consec, _ = self.count_hip_gaps(df)
+
+        # Falla la validación si alguna columna supera el límite
+        return max(max_consec.values()) <= max_allowed_gap
 
-        for col in hip_columns:
+
+    def count_hip_gaps(self, df: pd.DataFrame, open_gaps: dict = None):
+        """
+        Cuenta la racha más larga de NaNs consecutivos en cada columna de cadera.
+
+        Args:
+            df (pd.DataFrame): DataFrame (o bloque) con columnas renombradas según roles.
+            open_gaps (dict, optional): Rachas abiertas al final del bloque anterior, para
+                poder recorrer el video por bloques.
+
+        Returns:
+            tuple: (racha máxima por columna, rachas abiertas al final de `df`).
+        """
+        open_gaps = open_gaps or {col: 0 for col in HIP_COLUMNS}
+        max_consec = {}
+        last_gaps = {}
+
+        for col in HIP_COLUMNS:
             # Serie booleana: True si es NaN
-            is_nan = df[col].isna()
+            is_nan = df[col].isna().to_numpy()
+            if len(is_nan) == 0:
+                max_consec[col] = open_gaps[col]
+                last_gaps[col] = open_gaps[col]
+                continue
 
-            # Detectar secuencias consecutivas de NaNs
-            max_consec = 0
-            current = 0
-            for val in is_nan:
-                if val:
-                    current += 1
-                    max_consec = max(max_consec, current)
-                else:
-                    current = 0
+            # Largo de la racha de NaNs que termina en cada posición
+            positions = np.arange(len(is_nan))
+            last_valid = np.maximum.accumulate(np.where(is_nan, -1, positions))
+            runs = np.where(is_nan, positions - last_valid, 0)
+            runs = np.where(is_nan & (last_valid < 0), runs + open_gaps[col], runs)
 
-            if max_consec > max_allowed_gap:
-                return False  # Falla la validación
+            max_consec[col] = max(int(runs.max()), open_gaps[col])
+            last_gaps[col] = int(runs[-1])
 
-        return True  # Todo dentro del límite
+        return max_consec, last_gaps
 
-        
 
 
-    def interpolate_missing(self, df: pd.DataFrame) -> pd.DataFrame:
+    def interpolate_missing(self, df: pd.DataFrame, order: int = 2) -> pd.DataFrame:
         """
-        Interpola datos faltantes en el DataFrame.
+        Interpola datos faltantes en el DataFrame (polinomio de grado `order` en las caderas).
         """
         
-        hip_cols = [
-        f"{MarkerRole.HIP_BASE.value}_x",
-        f"{MarkerRole.HIP_BASE.value}_y",
-        f"{MarkerRole.HIP_TEST.value}_x",
-        f"{MarkerRole.HIP_TEST.value}_y"
-        ]
+        hip_cols = HIP_COLUMNS
 
         # Separar las columnas a interpolar
         hips_df = df[hip_cols]
 
         # Interpolación polinómica solo en caderas
-        interpolated_hips = hips_df.interpolate(method='polynomial', order=2)
+        interpolated_hips = hips_df.interpolate(method='polynomial', order=order)
         
         interpolated_hips = interpolated_hips.dropna()
 
@@ -134,18 +591,51 @@ class TrendetecT():
 
 
     
-    def assign_marker_roles(self, df: pd.DataFrame, n_frames: int = 10) -> pd.DataFrame:
+    def assign_marker_roles(self, df: pd.DataFrame, n_frames: int = 10,
+                            layout: MarkerLayout = None) -> pd.DataFrame:
         """
-        Asigna roles anatómicos a los marcadores según su posición en los primeros N frames.
-        Identifica el marcador de tibia como el más alto en Y, y la cadera test como la más cercana en X a la tibia.
+        Asigna roles anatómicos a los marcadores.
+
+        Si hay un perfil de marcadores (`layout` o el de la instancia) y todos sus IDs están
+        en el DataFrame, los roles se toman directamente del perfil y se descartan las columnas
+        de IDs desconocidos. Si no, se asignan según su posición en los primeros N frames:
+        identifica el marcador de tibia como el más alto en Y, y la cadera test como la más
+        cercana en X a la tibia.
         Renombra las columnas del DataFrame con los roles: hip_base, hip_test, tibia.
         """
+        layout = layout or self.layout
+        rename_map = self.resolve_marker_roles(df, n_frames, layout)
+
+        # Los IDs que no pertenecen al perfil se descartan
+        if layout is not None:
+            df = df[['time', *[col for col in df.columns if col in layout.rename_map()]]]
+
+        df = df.rename(columns=rename_map)
+        return df
+
+
+    def resolve_marker_roles(self, df: pd.DataFrame, n_frames: int = 10,
+                             layout: MarkerLayout = None) -> dict:
+        """
+        Resuelve el mapa de columnas `id_n_x/y` -> `<rol>_x/y` sin tocar el DataFrame.
+        Sólo usa los primeros `n_frames`, así que puede recibir únicamente el comienzo del video.
+        """
+        layout = layout or self.layout
+        if layout is not None:
+            rename_map = layout.rename_map()
+            if all(col in df.columns for col in rename_map):
+                return rename_map
+
         df_sample = df.head(n_frames)
 
         # Extraer columnas de posición
         x_cols = [col for col in df.columns if col.endswith('_x')]
         #y_cols = [col for col in df.columns if col.endswith('_y')]
 
+        # Con perfil incompleto, la heurística sólo considera los IDs del perfil
+        if layout is not None:
+            x_cols = [col for col in x_cols if col in layout.rename_map()]
+
         # Construir lista de marcadores con su primera posición válida
         markers = []
         for x_col in x_cols:
@@ -159,8 +649,8 @@ class TrendetecT():
                 marker_id = x_col.split('_')[1]
                 markers.append({'id': marker_id, 'x': x, 'y': y, 'x_col': x_col, 'y_col': y_col})
 
-        if not markers:
-            raise ValueError("No se detectaron marcadores válidos en los primeros frames.")
+        if len(markers) < 3:
+            raise ValueError(f"Se necesitan 3 marcadores en los primeros frames y se detectaron {len(markers)}.")
 
         # Identificar tibia como el marcador con mayor Y
         tibia = max(markers, key=lambda m: m['y'])
@@ -180,13 +670,13 @@ class TrendetecT():
             tibia['y_col']: f'{MarkerRole.TIBIA.value}_y'
         }
 
-        df = df.rename(columns=rename_map)
-        return df
+        return rename_map
 
     
     def compute_offset(self, df: pd.DataFrame) -> float:
-        dx = df["hip_test_x"].iloc[0] - df["hip_base_x"].iloc[0]
-        dy = df["hip_test_y"].iloc[0] - df["hip_base_y"].iloc[0]
+        # Siempre en float64, aunque las coordenadas vengan en float32
+        dx = np.float64(df["hip_test_x"].iloc[0]) - np.float64(df["hip_base_x"].iloc[0])
+        dy = np.float64(df["hip_test_y"].iloc[0]) - np.float64(df["hip_base_y"].iloc[0])
 
         # inclinación respecto a la horizontal
         slope = dy / dx
@@ -194,17 +684,48 @@ class TrendetecT():
         return angle_deg
     
     
+    def compute_pose_angles(self, df: pd.DataFrame) -> pd.Series:
+        """
+        Modo 3D: oblicuidad pélvica en el plano frontal para las filas de `df` (ya recortado),
+        con la postura inicial restada como en 2D.
+
+        La pose se resuelve para toda la trayectoria (el plano frontal sale de la sesión
+        completa); las filas en las que falta una cadera se interpolan linealmente. Los
+        intrínsecos del perfil de cámara se llevan a la resolución del video.
+
+        Raises:
+            ValueError: Si la relación de aspecto del video no es la del perfil de cámara.
+        """
+        trajectory = self.trajectory
+        camera = self.camera
+        if trajectory.frame_size is not None:
+            camera = camera.for_image_size(*(int(v) for v in trajectory.frame_size))
+        else:
+            print(f"Resolución del video desconocida: se asume la del perfil de cámara '{camera.name}'")
+        rename_map = self.resolve_marker_roles(trajectory.to_dataframe())
+        role_ids = {role[:-2]: int(column.split('_')[1]) for column, role in rename_map.items() if role.endswith('_x')}
+
+        base = trajectory.corners[:, trajectory.slot(role_ids[MarkerRole.HIP_BASE.value])]
+        test = trajectory.corners[:, trajectory.slot(role_ids[MarkerRole.HIP_TEST.value])]
+        angles = pd.Series(frontal_obliquity(base, test, camera), index=trajectory.times)
+        angles = angles.interpolate(method='index', limit_area='inside')
+
+        offset = angles.dropna().iloc[0]
+        return pd.Series(angles.reindex(df['time']).to_numpy() - offset, index=df['time'], name="hip_angle_3d")
+    
+    
     def substract_base_angle(self, angles: pd.Series, offset:float) -> pd.Series:
         result = angles - offset
         return result
 
 
-    def crop_test_window(self, df: pd.DataFrame) -> pd.DataFrame:
+    def crop_test_window(self, df: pd.DataFrame, min_len: int = 5) -> pd.DataFrame:
         """
         Recorta el DataFrame para quedarse solo con el período activo de la prueba.
+        Las ausencias de la tibia más cortas que `min_len` filas se toman como errores de detección.
         """
         nan_windows = self.get_nan_windows(df)
-        nan_windows = self.collapse_detection_errors(nan_windows, min_len=5)
+        nan_windows = self.collapse_detection_errors(nan_windows, min_len=min_len)
         
         # recortar el dataframe
         cropped_df = self.extract_test_segment(df, nan_windows)
@@ -215,61 +736,44 @@ class TrendetecT():
     def compute_hip_angles(self, df: pd.DataFrame) -> pd.Series:
         """
         Calcula el ángulo de cadera por frame. Devuelve una Serie temporal.
+        Las coordenadas se pasan a float64 acá, aunque se hayan guardado compactas en float32.
         """
-        angles = []
-        for _, row in df.iterrows():
-            dx = row["hip_test_x"] - row["hip_base_x"]
-            dy = row["hip_test_y"] - row["hip_base_y"]   # invertimos signo (imagen Y hacia abajo)
+        dx = df["hip_test_x"].to_numpy(np.float64) - df["hip_base_x"].to_numpy(np.float64)
+        dy = df["hip_test_y"].to_numpy(np.float64) - df["hip_base_y"].to_numpy(np.float64)   # invertimos signo (imagen Y hacia abajo)
 
-            # inclinación respecto a la horizontal
-            slope = dy / dx
-            angle_deg = np.degrees(np.arctan(slope))
-
-            angles.append(angle_deg)
+        # inclinación respecto a la horizontal
+        slope = dy / dx
+        angles = np.degrees(np.arctan(slope))
         
         return pd.Series(angles, index=df["time"], name="hip_angle")
 
 
-    def generate_results_table(self, angle_series: pd.Series) -> pd.DataFrame:
+    def generate_results_table(self, angle_series: pd.Series, threshold: float = DROP_THRESHOLD_DEG) -> pd.DataFrame:
         """
-        Genera un DataFrame resumen con métricas clave del ángulo.
+        Genera un DataFrame resumen con métricas clave del ángulo y eventos de la caída
+        (tiempo hasta la caída máxima, tiempo sobre `threshold`, recuperación y tasa de caída).
         """
-        # Filtrar valores válidos
-        valid_angles = angle_series.dropna()
-
-        # Métricas clave
-        max_angle = valid_angles.max()
-        max_time = valid_angles.idxmax()
-
-        min_angle = valid_angles.min()
-        min_time = valid_angles.idxmin()
-
-        mean_angle = valid_angles.mean()
-
-        # Duración de la prueba
-        start_time = valid_angles.index.min()
-        end_time = valid_angles.index.max()
-        duration = end_time - start_time
-
-        # Construcción del DataFrame resumen
-        summary_df = pd.DataFrame({
-            'Métrica': ['Ángulo máximo', 'Ángulo mínimo', 'Ángulo promedio', 'Duración'],
-            'Valor': [max_angle, min_angle, mean_angle, duration],
-            'Momento': [max_time, min_time, None, None]
-        })
+        metrics = compute_angle_metrics(angle_series.to_numpy(), angle_series.index.to_numpy(), threshold)
+        return metrics_table(metrics)
 
-        return summary_df
 
 
-
-    def generate_angle_plot(self, angle_series: pd.Series) -> plt.Figure:
+    def generate_angle_plot(self, angle_series: pd.Series, pose_series: pd.Series = None) -> Figure:
         """
-        Genera un gráfico de evolución del ángulo de cadera.
+        Genera un gráfico de evolución del ángulo de cadera (y, en modo 3D, del ángulo en el
+        plano frontal para compararlos).
+
+        La figura se crea sin pasar por pyplot: varios trabajos pueden generar
+        gráficos en paralelo desde hilos de la cola sin tocar su estado global.
         """
-        fig, ax = plt.subplots()
+        fig = Figure()
+        ax = fig.subplots()
 
         # Plot the angle series
         ax.plot(angle_series.index, angle_series.values, label='Hip Angle', color='royalblue', linewidth=2)
+        if pose_series is not None:
+            ax.plot(pose_series.index, pose_series.values, label='3D', color='darkorange', linewidth=1.5, linestyle='--')
+            ax.legend(loc='upper right')
 
         # Axis labels and title
         ax.set_xlabel("Tiempo (seg)")
@@ -290,26 +794,107 @@ class TrendetecT():
 
     
     def save_results(self, file_path: str):
-        if self.angle_series is not None:
-            self.angle_series.to_csv(file_path, index=False)
-        else:
+        """
+        Guarda la sesión en el archivo binario de `core.session_file` (serie de ángulo con su
+        tiempo, trayectorias, métricas y parámetros). Con extensión `.csv` exporta sólo la
+        serie de ángulo, con la columna `time`.
+        """
+        if self.angle_series is None:
             raise ValueError("No hay datos para guardar. Procesa un video primero.")
+
+        if file_path.lower().endswith('.csv'):
+            self.angle_series.to_csv(file_path, index=True, index_label='time')
+            return
+
+        arrays = {'angle_time': self.angle_series.index.to_numpy(np.float64),
+                  'angle': self.angle_series.to_numpy(np.float64)}
+        if self.pose_angle_series is not None:
+            arrays['angle_3d'] = self.pose_angle_series.to_numpy(np.float64)
+        if self.trajectory is not None:
+            arrays.update(trajectory_arrays(self.trajectory))
+        if self.df is not None:
+            arrays.update(window_arrays(self.df))
+        elif self.session_file is not None:
+            # Sesión cargada de archivo: la ventana se copia tal cual, sin pasar por pandas
+            arrays.update({name: self.session_file.array(name)
+                           for name in self.session_file.names if name.startswith('window_')})
+
+        save_session(file_path, arrays, self.session_meta())
+
+
+    def session_meta(self) -> dict:
+        """Metadatos del archivo de sesión: origen, parámetros y tabla de métricas."""
+        layout = None
+        if self.layout is not None:
+            layout = {'name': self.layout.name, 'dictionary': self.layout.dictionary_name,
+                      'roles': {str(marker_id): role.value for marker_id, role in self.layout.roles.items()}}
+        detector = self.detector.name if isinstance(self.detector, MarkerDetector) else self.detector
+
+        return {
+            'video': self.video_path,
+            'parameters': {
+                'layout': layout,
+                'detector': detector,
+                'motion_threshold': self.motion_threshold,
+                'camera': self.camera.name if self.camera is not None else None,
+                'chunk_size': self.chunk_size,
+                'frame_step': 3,
+            },
+            'results': self.generate_results_table(self.angle_series).to_dict(orient='list'),
+            'pose_comparison': self.pose_comparison,
+        }
     
     
     def load_results(self, file_path: str) -> pd.Series:
-        self.angle_series = pd.read_csv(file_path)
-        if self.angle_series is None:
-            return None
-        
-        if self.angle_series.shape[1] > 1 :
-            return None
-        
-        self.angle_series = self.angle_series.squeeze()
-        
-        results_df = self.generate_results_table(self.angle_series)
-        angle_plot = self.generate_angle_plot(self.angle_series)
-        
-        return [results_df, angle_plot]
+        """
+        Carga un archivo de sesión o un CSV de ángulos (con columna `time` o, el formato
+        anterior, sólo la columna de ángulos).
+
+        Returns:
+            List[object] | None: `[results_df, angle_plot]`, o None si el CSV no es de ángulos.
+        """
+        key = ('results', *file_identity(file_path)) if self.cache is not None else None
+        if key is not None:
+            session = self.cache.get(key)
+            if session is not None:
+                self.restore_session(session)
+                return list(session.results)
+
+        if is_session_file(file_path):
+            results = self.load_session(file_path)
+        else:
+            table = pd.read_csv(file_path)
+            if table.shape[1] == 2 and table.columns[0] == 'time':
+                self.angle_series = table.set_index('time').iloc[:, 0]
+            elif table.shape[1] == 1:
+                self.angle_series = table.iloc[:, 0]
+            else:
+                return None
+            results = [self.generate_results_table(self.angle_series), self.generate_angle_plot(self.angle_series)]
+
+        if key is not None:
+            self.cache.put(self.cached_session(key, results))
+        return results
+
+
+    def load_session(self, file_path: str) -> list:
+        """
+        Abre un archivo de sesión. Sólo se leen la serie de ángulo y la tabla de métricas;
+        la trayectoria queda mapeada del archivo y se lee recién si se usa.
+        """
+        session = SessionFile(file_path)
+        self.session_file = session
+        self.video_path = session.meta.get('video')
+        self.df = None
+        self.trajectory = session.trajectory()
+        self.angle_series = session.angle_series()
+        self.pose_angle_series = session.angle_series('angle_3d')
+        self.pose_comparison = session.meta.get('pose_comparison')
+
+        results_df = session.results_table()
+        if results_df is None:
+            results_df = self.generate_results_table(self.angle_series)
+        return [results_df, self.generate_angle_plot(self.angle_series, self.pose_angle_series)]
             
     
     
@@ -403,6 +988,21 @@ class TrendetecT():
         Returns:
             pd.DataFrame: DataFrame recortado a la ventana principal de prueba.
         """
+        start_idx, end_idx = self.test_segment_bounds(window_df, df.index[-1])
+
+        # Recortar el df original
+        cropped_df = df.iloc[start_idx:end_idx + 1].reset_index(drop=True)
+        return cropped_df
+
+
+    def test_segment_bounds(self, window_df: pd.DataFrame, last_index: int):
+        """
+        Devuelve las posiciones (inicio, fin) inclusive de la primera ventana de prueba.
+
+        Args:
+            window_df (pd.DataFrame): DataFrame con columnas ['index', 'time', 'state'].
+            last_index (int): Última posición válida, usada si la ventana no se cierra.
+        """
         # Filtrar solo las ventanas True
         true_windows = window_df[window_df['state'] == True]
 
@@ -414,8 +1014,6 @@ class TrendetecT():
         try:
             end_idx = window_df.iloc[window_df[window_df['index'] == start_idx].index[0] + 1]['index']
         except IndexError:
-            end_idx = df.index[-1]  # Si no hay cambio posterior, cortar hasta el final
+            end_idx = last_index  # Si no hay cambio posterior, cortar hasta el final
 
-        # Recortar el df original
-        cropped_df = df.iloc[start_idx:end_idx + 1].reset_index(drop=True)
-        return cropped_df
\ No newline at end of file
+        return start_idx, end_idx
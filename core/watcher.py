@@ -0,0 +1,320 @@
+"""
+Servicio de ingesta por carpeta vigilada.
+
+Vigila la carpeta donde las tablets sincronizan las grabaciones y procesa cada video
+nuevo con el pipeline de `TrendetecT`, sin abrir la interfaz:
+
+- Un archivo se considera listo cuando su tamaño y fecha de modificación no cambian
+  durante `settle_seconds` (evita procesar copias a medio escribir). Se ignoran los
+  archivos ocultos y los temporales de sincronización (`.part`, `.tmp`, ...).
+- Los videos listos se encolan a un pool de procesos, con a lo sumo `workers`
+  procesamientos simultáneos; los que fallan se reintentan hasta `max_retries` veces.
+- Cada sesión se guarda en `results_dir/<video>-<hash>/` (serie de ángulos, tabla de
+  resultados, gráfico, `meta.json` y opcionalmente el video anotado; ver `session_name`). Un video ya
+  procesado con el mismo tamaño y fecha no se vuelve a procesar, aunque se reinicie
+  el servicio.
+- `results_dir/status.json` refleja en todo momento el estado del servicio y de cada
+  trabajo, para monitorearlo desde afuera.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+import asyncio
+import hashlib
+import json
+import os
+
+from core.jobs import VIDEO_EXTENSIONS, JobStatus, ProcessingJob
+
+
+STATUS_NAME = 'status.json'
+META_NAME = 'meta.json'
+PARTIAL_SUFFIXES = ('.part', '.partial', '.tmp', '.crdownload', '.download')
+
+
+def source_key(video_path: str) -> str:
+    """Identidad de una grabación: nombre, tamaño y fecha de modificación."""
+    stat = os.stat(video_path)
+    return f"{os.path.basename(video_path)}:{stat.st_size}:{stat.st_mtime_ns}"
+
+
+def session_name(video_path: str, key: str) -> str:
+    """
+    Carpeta de la sesión: nombre completo del video más un hash de su ruta y su
+    `source_key`. Videos con el mismo nombre base (`a.mp4` y `a.mov`), en otra subcarpeta
+    o regrabados con el mismo nombre no se pisan las sesiones.
+    """
+    digest = hashlib.sha1(f"{os.path.abspath(video_path)}|{key}".encode('utf-8')).hexdigest()[:8]
+    return f"{os.path.basename(video_path)}-{digest}"
+
+
+def write_json_atomic(path: str, data: dict):
+    """Escribe el JSON en un temporal y lo reemplaza de una vez (nunca queda a medio escribir)."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def process_recording(video_path: str, session_dir: str, key: str, layout: Optional[str] = None,
+                      annotate: bool = False, camera: Optional[str] = None, progress_callback=None) -> dict:
+    """
+    Procesa un video y guarda la sesión en `session_dir`. Corre dentro del pool de procesos.
+    `progress_callback` (con `emit(porcentaje)`) recibe el progreso del pipeline.
+
+    Returns:
+        dict: Metadatos de la sesión (también guardados en `meta.json`).
+    """
+    from core.tools.annotated_video import AnnotationSettings
+    from core.trendetect import TrendetecT
+
+    os.makedirs(session_dir, exist_ok=True)
+    annotation = AnnotationSettings(os.path.join(session_dir, 'annotated.mp4')) if annotate else None
+
+    # El índice de frames va con la sesión: la carpeta vigilada es de las tablets
+    trendetect = TrendetecT(layout=layout, annotation=annotation, camera=camera, index_dir=session_dir)
+    results_df, angle_plot = trendetect.process_video(video_path, progress_callback=progress_callback)
+
+    outputs = {'session': 'session.npz', 'angles': 'angles.csv', 'results': 'results.csv', 'plot': 'plot.png'}
+    if camera is not None:
+        outputs['angles_3d'] = 'angles_3d.csv'
+
+    # Cada archivo se escribe a un temporal y se reemplaza, para no dejar sesiones a medias
+    # (el temporal conserva la extensión: save_results elige el formato por ella)
+    tmp = {name: os.path.join(session_dir, f".tmp.{file_name}") for name, file_name in outputs.items()}
+    trendetect.save_results(tmp['session'])
+    trendetect.save_results(tmp['angles'])
+    if camera is not None:
+        trendetect.pose_angle_series.to_csv(tmp['angles_3d'], index=True, index_label='time')
+    results_df.to_csv(tmp['results'], index=False)
+    angle_plot.savefig(tmp['plot'], format='png', dpi=120)
+    for name, file_name in outputs.items():
+        os.replace(tmp[name], os.path.join(session_dir, file_name))
+
+    max_angle = results_df.loc[results_df['Métrica'] == 'Ángulo máximo', 'Valor'].iloc[0]
+    meta = {
+        'video': os.path.abspath(video_path),
+        'source_key': key,
+        'processed': datetime.now().isoformat(timespec='seconds'),
+        'layout': layout,
+        'max_angle': float(max_angle),
+        'camera': camera,
+        'pose_comparison': trendetect.pose_comparison,
+        'outputs': {**outputs, 'annotated': 'annotated.mp4'} if annotate else outputs,
+    }
+    if annotate:
+        # Frames del video anotado que la detección no esperó (repetidos en el archivo)
+        meta['annotated_frames_dropped'] = trendetect.annotated_video.frames_dropped
+    write_json_atomic(os.path.join(session_dir, META_NAME), meta)
+    return meta
+
+
+class WatchFolderService:
+    """
+    Vigila `watch_dir` y procesa los videos nuevos en segundo plano.
+
+    Args:
+        watch_dir (str): Carpeta sincronizada con las grabaciones.
+        results_dir (str): Carpeta de resultados (una subcarpeta por sesión y `status.json`).
+        workers (int): Procesamientos simultáneos (tamaño del pool de procesos).
+        poll_interval (float): Segundos entre revisiones de la carpeta.
+        settle_seconds (float): Segundos sin cambios para considerar un archivo completo.
+        max_retries (int): Reintentos de un video que falla antes de marcarlo con error.
+        retry_delay (float): Espera base entre reintentos (crece con cada intento).
+        layout (str, optional): Perfil de marcadores (ver `core.marker_layout`).
+        annotate (bool): Guarda también el video anotado de cada sesión.
+        camera (str, optional): Perfil de cámara (ver `core.camera_profile`); activa el modo 3D.
+    """
+
+    def __init__(self, watch_dir: str, results_dir: str, workers: int = 2, poll_interval: float = 2.0,
+                 settle_seconds: float = 5.0, max_retries: int = 2, retry_delay: float = 5.0,
+                 layout: Optional[str] = None, annotate: bool = False, camera: Optional[str] = None):
+        if not os.path.isdir(watch_dir):
+            raise ValueError(f"No existe la carpeta a vigilar: {watch_dir}")
+
+        self.watch_dir = watch_dir
+        self.results_dir = results_dir
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.settle_seconds = settle_seconds
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.layout = layout
+        self.annotate = annotate
+        self.camera = camera
+
+        self.jobs: Dict[str, ProcessingJob] = {}
+        self.started = datetime.now()
+        # Ruta -> (tamaño, mtime) y momento desde el que no cambia
+        self._seen: Dict[str, Tuple[Tuple[int, int], float]] = {}
+        self._processed = set()
+        # job_id -> carpeta de su sesión dentro de results_dir
+        self._sessions: Dict[str, str] = {}
+        self._tasks = set()
+        self._semaphore = None
+        self._stop = None
+
+        os.makedirs(results_dir, exist_ok=True)
+        self._load_processed()
+
+
+    def _load_processed(self):
+        """Recupera las sesiones ya procesadas en ejecuciones anteriores."""
+        for name in os.listdir(self.results_dir):
+            meta_path = os.path.join(self.results_dir, name, META_NAME)
+            if os.path.isfile(meta_path):
+                with open(meta_path, encoding='utf-8') as f:
+                    self._processed.add(json.load(f).get('source_key'))
+
+
+    # ==========================
+    # Ciclo principal
+    # ==========================
+    async def run(self, once: bool = False):
+        """
+        Vigila la carpeta hasta que se llame a `stop()`. Con `once=True` procesa los videos
+        presentes y termina cuando no queda nada pendiente.
+        """
+        self._semaphore = asyncio.Semaphore(self.workers)
+        self._stop = asyncio.Event()
+
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            self._write_status()
+            while not self._stop.is_set():
+                self._scan(pool)
+
+                if once and not self._tasks and not self._seen:
+                    break
+
+                try:
+                    await asyncio.wait_for(self._stop.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+
+            for task in self._tasks:
+                task.cancel()
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+        self._write_status(running=False)
+
+
+    def stop(self):
+        if self._stop is not None:
+            self._stop.set()
+
+
+    def _scan(self, pool: ProcessPoolExecutor):
+        now = asyncio.get_running_loop().time()
+        present = set()
+
+        for entry in os.scandir(self.watch_dir):
+            if not entry.is_file() or not self._is_candidate(entry.name):
+                continue
+
+            path = entry.path
+            present.add(path)
+            stat = entry.stat()
+            signature = (stat.st_size, stat.st_mtime_ns)
+
+            previous = self._seen.get(path)
+            if previous is None or previous[0] != signature:
+                # Archivo nuevo o todavía escribiéndose: se reinicia la espera
+                if f"{entry.name}:{stat.st_size}:{stat.st_mtime_ns}" not in self._processed:
+                    self._seen[path] = (signature, now)
+                continue
+
+            if stat.st_size > 0 and now - previous[1] >= self.settle_seconds:
+                del self._seen[path]
+                self._enqueue(pool, path)
+
+        # Archivos que desaparecieron antes de estabilizarse
+        for path in set(self._seen) - present:
+            del self._seen[path]
+
+
+    def _is_candidate(self, name: str) -> bool:
+        lower = name.lower()
+        return (not name.startswith('.') and lower.endswith(VIDEO_EXTENSIONS)
+                and not lower.endswith(PARTIAL_SUFFIXES))
+
+
+    def _enqueue(self, pool: ProcessPoolExecutor, video_path: str):
+        key = source_key(video_path)
+        if key in self._processed:
+            return
+        self._processed.add(key)
+
+        job = ProcessingJob(video_path)
+        self.jobs[job.job_id] = job
+        self._sessions[job.job_id] = session_name(video_path, key)
+        self._write_status()
+
+        task = asyncio.create_task(self._run_job(pool, job, key))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+
+    async def _run_job(self, pool: ProcessPoolExecutor, job: ProcessingJob, key: str):
+        session_dir = os.path.join(self.results_dir, self._sessions[job.job_id])
+        loop = asyncio.get_running_loop()
+
+        while True:
+            async with self._semaphore:
+                job.status = JobStatus.RUNNING
+                job.attempts += 1
+                self._write_status()
+                try:
+                    job.results = await loop.run_in_executor(pool, process_recording, job.video_path,
+                                                             session_dir, key, self.layout, self.annotate,
+                                                             self.camera)
+                except asyncio.CancelledError:
+                    job.status = JobStatus.CANCELLED
+                    self._write_status()
+                    raise
+                except Exception as e:
+                    job.error = str(e) or type(e).__name__
+                else:
+                    job.status = JobStatus.DONE
+                    job.progress = 100
+                    job.error = None
+                    self._write_status()
+                    return
+
+            if job.attempts > self.max_retries:
+                job.status = JobStatus.ERROR
+                self._write_status()
+                return
+
+            job.status = JobStatus.PENDING
+            self._write_status()
+            await asyncio.sleep(self.retry_delay * job.attempts)
+
+
+    # ==========================
+    # Estado
+    # ==========================
+    def status(self, running: bool = True) -> dict:
+        return {
+            'running': running,
+            'watch_dir': os.path.abspath(self.watch_dir),
+            'results_dir': os.path.abspath(self.results_dir),
+            'workers': self.workers,
+            'started': self.started.isoformat(timespec='seconds'),
+            'updated': datetime.now().isoformat(timespec='seconds'),
+            'waiting': sorted(os.path.basename(path) for path in self._seen),
+            'jobs': [
+                {
+                    'job_id': job.job_id,
+                    'video': job.name,
+                    'status': job.status.value,
+                    'attempts': job.attempts,
+                    'error': job.error,
+                    'session': self._sessions[job.job_id] if job.status == JobStatus.DONE else None,
+                }
+                for job in self.jobs.values()
+            ],
+        }
+
+
+    def _write_status(self, running: bool = True):
+        write_json_atomic(os.path.join(self.results_dir, STATUS_NAME), self.status(running))
@@ -3,18 +3,59 @@ from PySide6.QtWidgets import (
     QApplication, QMainWindow, QWidget,
     QHBoxLayout, QVBoxLayout, QFileDialog
 )
-from PySide6.QtCore import QThreadPool
+from PySide6.QtCore import QThread, QThreadPool
 
 from gui_modules.up_bar import UpBar
 from gui_modules.left_panel import LeftPanel
 from gui_modules.right_panel import RightPanel
+from gui_modules.job_queue_panel import JobQueuePanel
 
 from core.tools.qt_thread import Worker
+from collections.abc import Sequence
+import os
 import sys
+import tempfile
 
-from typing import List
+from typing import Dict, List, Optional, Tuple
 
+from core.jobs import JobCancelled, JobControl, JobStatus, ProcessingJob
+from core.report import export_report, export_reports
+from core.session_cache import SessionCache
 from core.trendetect import TrendetecT
+from core.tools.frame_index import load_frame_index
+from core.tools.profiling import enable_profiling
+
+
+# Cantidad de videos procesados en simultáneo por defecto
+DEFAULT_CONCURRENCY = 2
+
+
+def set_thread_priority(low_priority: bool):
+    """
+    Prioridad del hilo actual; la aplica el propio hilo del trabajo vía `JobControl`.
+    En Linux Qt no puede cambiar la prioridad de un hilo común y la llamada no tiene efecto:
+    ahí el trabajo en baja prioridad se frena sólo con lo que cede `JobControl.check`.
+    """
+    QThread.currentThread().setPriority(QThread.LowestPriority if low_priority else QThread.NormalPriority)
+
+
+class JobSessions(Sequence):
+    """
+    Pares `(trendetect, results_df)` de trabajos terminados para `export_reports`. Los
+    trabajos liberados se recargan de a uno al recorrerlos (en el hilo de la exportación),
+    así exportar toda la cola no vuelve a cargar todas las sesiones a la vez.
+    """
+
+    def __init__(self, window: "MainWindow", jobs: List[ProcessingJob]):
+        self.window = window
+        self.jobs = jobs
+
+    def __len__(self) -> int:
+        return len(self.jobs)
+
+    def __getitem__(self, i: int):
+        pipeline, results = self.window.job_session(self.jobs[i])
+        return pipeline, results[0]
 
 
 class MainWindow(QMainWindow):
@@ -43,23 +84,49 @@ class MainWindow(QMainWindow):
         left_layout.addWidget(self.left_panel)
         
         self.left_panel.processRequested.connect(self.process_video)
+        self.left_panel.videoLoaded.connect(self.start_speculative)
+
+        # --- Cola de videos ---
+        self.job_queue_panel = JobQueuePanel(concurrency=DEFAULT_CONCURRENCY)
+        left_layout.addWidget(self.job_queue_panel)
+
+        self.job_queue_panel.videosAdded.connect(self.enqueue_videos)
+        self.job_queue_panel.jobSelected.connect(self.show_job)
+        self.job_queue_panel.concurrencyChanged.connect(self.set_concurrency)
+        self.job_queue_panel.exportAllRequested.connect(self.export_all_reports)
 
         # --- Columna derecha ---
         right_layout = QVBoxLayout()
         self.right_panel = RightPanel()
         right_layout.addWidget(self.right_panel)
 
+        self.right_panel.momentRequested.connect(self.seek_video)
+
         # Agregar columnas al layout principal
         main_layout.addLayout(left_layout, 2)   # peso 2 para columna izquierda
         main_layout.addLayout(right_layout, 3)  # peso 3 para columna derecha
         
         # --- Lógica de procesamiento ---
-        self.trendetect = TrendetecT()
+        # Cada trabajo tiene su propio TrendetecT; self.trendetect es el del resultado mostrado.
+        # Todos comparten la caché de sesiones: volver a un video o resultado reciente es instantáneo
+        self.session_cache = SessionCache()
+        # Sesiones de los trabajos terminados que no están a la vista (ver `release_job`)
+        self.session_dir = tempfile.TemporaryDirectory(prefix='trendetect_gui_')
+        self.trendetect = TrendetecT(cache=self.session_cache)
+        self.current_results = None
+        self.jobs: Dict[str, ProcessingJob] = {}
+        self.active_job_id = None
         self.threadpool = QThreadPool()
+        self.set_concurrency(self.job_queue_panel.concurrency_spin.value())
+        # Procesamiento especulativo del video cargado: un solo hilo, aparte de la cola
+        self.speculative_pool = QThreadPool()
+        self.speculative_pool.setMaxThreadCount(1)
+        self.speculative_job = None
         
         # --- Señales de guardado y carga de procesamientos ---
         self.up_bar.saveRequested.connect(self.save_results)
         self.up_bar.loadRequested.connect(self.load_results)
+        self.up_bar.exportRequested.connect(self.export_report)
         
 
 
@@ -67,14 +134,217 @@ class MainWindow(QMainWindow):
         if not self.uploaded_video():
             return
 
-        worker = Worker(self.trendetect.process_video, self.get_video_path())
+        # El video del reproductor es el trabajo "activo": su avance y resultado se muestran a la derecha.
+        # Si ya se está procesando en segundo plano, se promueve ese trabajo en lugar de empezar otro.
+        job = self.speculative_job
+        if job is not None and job.video_path == self.get_video_path() and job.status != JobStatus.ERROR:
+            self.speculative_job = None
+            self.promote_job(job)
+        else:
+            job = self.enqueue_video(self.get_video_path(), progressive=True)
+            self.active_job_id = job.job_id
+    
+    
+    def enqueue_videos(self, paths: List[str]):
+        for path in paths:
+            self.enqueue_video(path)
+    
+    
+    def enqueue_video(self, path: str, progressive: bool = False) -> ProcessingJob:
+        job = ProcessingJob(video_path=path, pipeline=self.new_pipeline())
+        self.jobs[job.job_id] = job
+        self.job_queue_panel.add_job(job)
+        self.start_job(job, self.threadpool, progressive)
+        return job
+
+
+    def new_pipeline(self) -> TrendetecT:
+        return TrendetecT(layout=self.trendetect.layout, cache=self.session_cache)
+
+
+    def start_job(self, job: ProcessingJob, pool: QThreadPool, progressive: bool = False):
+        worker = Worker(job.pipeline.process_video, job.video_path, control=job.control)
+        # Progresivo: resultados aproximados en segundos, refinados hasta el exacto
+        if progressive:
+            worker.kwargs['partial_callback'] = worker.signals.partial
+            worker.signals.partial.connect(lambda results, job_id=job.job_id: self.on_job_partial(job_id, results))
         
-        worker.signals.result.connect(self.on_finished)
-        worker.signals.progress.connect(self.right_panel.update_progress_bar)
-        worker.signals.error.connect(self.on_error)
-        worker.signals.result.connect(self.right_panel.show_results)
+        worker.signals.progress.connect(lambda percent, job_id=job.job_id: self.on_job_progress(job_id, percent))
+        worker.signals.result.connect(lambda results, job_id=job.job_id: self.on_job_result(job_id, results))
+        worker.signals.error.connect(lambda error, job_id=job.job_id: self.on_job_error(job_id, error))
         
-        self.threadpool.start(worker)
+        pool.start(worker)
+
+
+    # ==========================
+    # Procesamiento especulativo
+    # ==========================
+    def start_speculative(self, path: str):
+        """Empieza a detectar en baja prioridad el video recién cargado, antes de que se pida."""
+        self.cancel_speculative()
+
+        # No entra en `self.jobs` (ni en la cola ni en las exportaciones) hasta que se pida
+        control = JobControl(low_priority=True, on_priority_change=set_thread_priority)
+        job = ProcessingJob(video_path=path, pipeline=self.new_pipeline(), control=control)
+        self.speculative_job = job
+        self.start_job(job, self.speculative_pool, progressive=True)
+
+
+    def cancel_speculative(self):
+        """Descarta el trabajo especulativo que no llegó a pedirse (otro video lo reemplaza)."""
+        job, self.speculative_job = self.speculative_job, None
+        if job is None:
+            return
+        if not job.finished:
+            job.control.cancel()
+            job.status = JobStatus.CANCELLED
+
+
+    def promote_job(self, job: ProcessingJob):
+        """Convierte el trabajo especulativo en el trabajo activo, a prioridad normal."""
+        job.control.promote()
+        self.jobs[job.job_id] = job
+        self.job_queue_panel.add_job(job)
+        self.job_queue_panel.update_job(job)
+        self.active_job_id = job.job_id
+
+        if job.status == JobStatus.DONE:
+            self.show_job(job.job_id)
+        else:
+            self.right_panel.update_progress_bar(job.progress)
+    
+    
+    def get_job(self, job_id: str) -> Optional[ProcessingJob]:
+        """Trabajo de la cola o, si todavía no se pidió, el especulativo."""
+        job = self.jobs.get(job_id)
+        if job is None and self.speculative_job is not None and self.speculative_job.job_id == job_id:
+            job = self.speculative_job
+        return job
+
+
+    def set_concurrency(self, value: int):
+        self.threadpool.setMaxThreadCount(value)
+    
+    
+    def on_job_progress(self, job_id: str, percent: float):
+        job = self.get_job(job_id)
+        if job is None:
+            return
+        job.status = JobStatus.RUNNING
+        job.progress = percent
+        self.job_queue_panel.update_job(job)
+
+        if job_id == self.active_job_id:
+            self.right_panel.update_progress_bar(percent)
+    
+    
+    def on_job_partial(self, job_id: str, results: List[object]):
+        """Resultado aproximado de una pasada de la detección progresiva: sólo se muestra."""
+        job = self.get_job(job_id)
+        if job is None or job.status == JobStatus.DONE or job_id != self.active_job_id:
+            return
+        self.right_panel.show_results(results, frame_index=job.pipeline.frame_index, transient=True)
+
+
+    def on_job_result(self, job_id: str, results: List[object]):
+        job = self.get_job(job_id)
+        if job is None:
+            return
+        job.status = JobStatus.DONE
+        job.progress = 100
+        job.results = results
+        self.job_queue_panel.update_job(job)
+
+        if job_id == self.active_job_id:
+            self.on_finished()
+            self.show_job(job_id)
+        else:
+            self.release_job(job)
+    
+    
+    def on_job_error(self, job_id: str, error):
+        job = self.get_job(job_id)
+        if job is None:
+            return
+        if error[0] is JobCancelled:
+            job.status = JobStatus.CANCELLED
+            self.job_queue_panel.update_job(job)
+            return
+
+        job.status = JobStatus.ERROR
+        job.error = str(error[1])
+        self.job_queue_panel.update_job(job)
+
+        if job_id == self.active_job_id:
+            self.on_finished()
+        # El error de un trabajo especulativo se informa recién si se pide procesar el video
+        if job is not self.speculative_job:
+            self.on_error(error)
+    
+    
+    def show_job(self, job_id: str):
+        """Muestra los resultados de un trabajo terminado (recargándolos si se liberaron)."""
+        job = self.jobs.get(job_id)
+        if job is None or job.status != JobStatus.DONE:
+            return
+
+        job.pipeline, job.results = self.job_session(job)
+        self.trendetect = job.pipeline
+        self.current_results = job.results
+        self.right_panel.show_results(job.results, frame_index=job.pipeline.frame_index)
+        self.release_hidden_jobs()
+
+
+    # ==========================
+    # Memoria de los trabajos terminados
+    # ==========================
+    def release_job(self, job: ProcessingJob):
+        """
+        Libera los datos de un trabajo terminado que no está a la vista: trayectoria,
+        ventana, índice de frames y figura. La sesión se guarda antes en un archivo temporal;
+        `job_session` la recupera de la caché de sesiones o de ese archivo.
+        """
+        if job.status != JobStatus.DONE or job.pipeline is None or job.pipeline is self.trendetect:
+            return
+        if job.session_path is None:
+            job.session_path = os.path.join(self.session_dir.name, f"{job.job_id}.npz")
+            job.pipeline.save_results(job.session_path)
+        job.pipeline = None
+        job.results = None
+
+
+    def release_hidden_jobs(self):
+        for job in self.jobs.values():
+            self.release_job(job)
+
+
+    def job_session(self, job: ProcessingJob) -> Tuple[TrendetecT, List[object]]:
+        """Pipeline y resultados de un trabajo terminado, recargados si se liberaron."""
+        if job.pipeline is not None:
+            return job.pipeline, job.results
+
+        pipeline = self.new_pipeline()
+        # Todavía en la caché (el resultado del procesamiento): estado completo, sin leer nada
+        if os.path.exists(job.video_path):
+            session = self.session_cache.get(pipeline.session_key(job.video_path))
+            if session is not None:
+                pipeline.restore_session(session)
+                return pipeline, list(session.results)
+
+        results = pipeline.load_results(job.session_path)
+        if os.path.exists(job.video_path):
+            pipeline.frame_index = load_frame_index(job.video_path)
+        return pipeline, results
+
+
+    def seek_video(self, seconds: float):
+        """Muestra en el reproductor el momento pedido del resultado (p. ej. el ángulo máximo)."""
+        video_frame = self.left_panel.video_frame
+        path = self.trendetect.video_path
+        # El resultado mostrado puede ser de otro video de la cola: se carga sin reprocesarlo
+        if path is not None and path != video_frame.video_path:
+            video_frame.load_video(path, notify=False)
+        video_frame.seek_to(seconds, self.trendetect.frame_index)
     
 
     def on_finished(self):
@@ -101,14 +371,18 @@ class MainWindow(QMainWindow):
         if self.trendetect.angle_series.empty:
             return
         
-        file_path, _ = QFileDialog.getSaveFileName(
+        file_path, selected_filter = QFileDialog.getSaveFileName(
             self, 
             "Guardar resultados", 
             "",     # Initial directory (empty string means current working directory)
-            "Archivos CSV (*.csv);;Todos los archivos (*)"
+            "Sesión TrendetecT (*.npz);;Archivos CSV (*.csv)"
             )
         
         if file_path:
+            # El formato se elige por la extensión: se completa según el filtro elegido
+            extension = '.csv' if 'csv' in selected_filter else '.npz'
+            if not os.path.splitext(file_path)[1]:
+                file_path += extension
             self.trendetect.save_results(file_path)
          
     
@@ -118,19 +392,72 @@ class MainWindow(QMainWindow):
             self, 
             "Cargar resultados", 
             "",     # Initial directory (empty string means current working directory)
-            "Archivos CSV (*.csv);;Todos los archivos (*)"
+            "Resultados (*.npz *.csv);;Sesión TrendetecT (*.npz);;Archivos CSV (*.csv);;Todos los archivos (*)"
             )
         
         if file_path:
-            results = self.trendetect.load_results(file_path)
+            # Pipeline propio: el mostrado puede ser el de un trabajo de la cola, cuyos datos
+            # no se deben pisar (la exportación en lote los usa)
+            pipeline = self.new_pipeline()
+            results = pipeline.load_results(file_path)
             
             if results is not None:
-                self.right_panel.show_results(results)
+                self.trendetect = pipeline
+                self.current_results = results
+                self.right_panel.show_results(results, frame_index=pipeline.frame_index)
+                self.release_hidden_jobs()
+    
+    
+    def export_report(self):
+        """Genera el informe PDF/HTML del resultado mostrado en un hilo de fondo."""
+        if self.current_results is None:
+            return
+
+        file_path, _ = QFileDialog.getSaveFileName(
+            self,
+            "Exportar informe",
+            "",
+            "Informe PDF (*.pdf);;Informe HTML (*.html)"
+            )
+
+        if file_path:
+            worker = Worker(export_report, self.trendetect, self.current_results[0], file_path)
+            self.start_export(worker)
+    
+    
+    def export_all_reports(self):
+        """Exporta en lote los informes de todos los trabajos terminados de la cola."""
+        sessions = JobSessions(self, [job for job in self.jobs.values() if job.status == JobStatus.DONE])
+        if not sessions:
+            return
+
+        folder = QFileDialog.getExistingDirectory(self, "Carpeta de informes")
+        if folder:
+            worker = Worker(export_reports, sessions, folder)
+            self.start_export(worker)
+    
+    
+    def start_export(self, worker: Worker):
+        worker.signals.progress.connect(self.right_panel.update_progress_bar)
+        worker.signals.result.connect(self.on_finished)
+        worker.signals.error.connect(self.on_finished)
+        worker.signals.error.connect(self.on_error)
+        self.threadpool.start(worker)
 
 
 if __name__ == "__main__":
+    import argparse
     import sys
-    app = QApplication(sys.argv)
+
+    parser = argparse.ArgumentParser(description="TrendetecT - Prueba de Trendelenburg")
+    parser.add_argument('--profile', action='store_true',
+                        help="Guarda un paquete de perfilado por cada video procesado")
+    parser.add_argument('--profile-dir', default=None, help="Carpeta de los paquetes de perfilado")
+    args, qt_args = parser.parse_known_args()
+    if args.profile:
+        enable_profiling(args.profile_dir)
+
+    app = QApplication(sys.argv[:1] + qt_args)
 
     window = MainWindow()
     window.show()
@@ -1,11 +1,35 @@
 from PySide6.QtWidgets import QWidget, QLabel, QGridLayout, QFrame, QVBoxLayout
-from PySide6.QtCore import Qt
+from PySide6.QtCore import Qt, Signal
+from PySide6.QtGui import QImage, QPixmap
+import cv2
+import numpy as np
 import pandas as pd
 
+from core.tools.metrics import metric_unit
+
+
+def thumbnail_pixmap(thumbnail: np.ndarray) -> QPixmap:
+    """Miniatura BGR del índice de frames, rotada a portrait como la detección."""
+    rgb = cv2.cvtColor(cv2.rotate(thumbnail, cv2.ROTATE_90_CLOCKWISE), cv2.COLOR_BGR2RGB)
+    height, width = rgb.shape[:2]
+    return QPixmap.fromImage(QImage(rgb.data, width, height, 3 * width, QImage.Format_RGB888).copy())
+
+
 class InfoPanel(QWidget):
-    def __init__(self, summary_df, parent=None):
+
+    # Señal con el momento (segundos del video) en el que se hizo clic
+    momentClicked = Signal(float)
+
+    def __init__(self, summary_df, frame_index=None, parent=None):
+        """
+        Args:
+            summary_df (pd.DataFrame): Tabla `Métrica / Valor / Momento` de `generate_results_table`.
+            frame_index (FrameIndex, optional): Índice de frames del video; si está, cada
+                momento se muestra con su miniatura.
+        """
         super().__init__(parent)
         self.summary_df = summary_df
+        self.frame_index = frame_index
         self.init_ui()
 
     def init_ui(self):
@@ -40,8 +64,8 @@ class InfoPanel(QWidget):
             metric_label.setFont("Intel")
             metric_label.setStyleSheet("font-size: 25px; color: #374151;")
 
-            value_str = f"{value:.2f}" if isinstance(value, (int, float)) else str(value)
-            unit = "°" if "Ángulo" in metric else "seg" if metric == "Duración" else ""
+            value_str = "-" if pd.isna(value) else f"{value:.2f}" if isinstance(value, (int, float)) else str(value)
+            unit = metric_unit(metric) if not pd.isna(value) else ""
             value_label = QLabel(f"{value_str} {unit}")
             value_label.setAlignment(Qt.AlignLeft)
             value_label.setFont("Intel")
@@ -52,11 +76,20 @@ class InfoPanel(QWidget):
 
             if not pd.isna(moment):
                 moment_str = f"{moment:.2f}" if isinstance(moment, (int, float)) else str(moment)
-                moment_label = QLabel(f"Momento: {moment_str} seg")
+                # Al hacer clic, el reproductor salta a ese momento
+                moment_label = QLabel(f'Momento: <a href="{float(moment)}" style="color: #2563EB;">{moment_str} seg</a>')
                 moment_label.setAlignment(Qt.AlignLeft)
+                moment_label.linkActivated.connect(lambda link: self.momentClicked.emit(float(link)))
                 block_layout.addWidget(moment_label)
                 moment_label.setFont("Intel")
                 moment_label.setStyleSheet("font-size: 20px; color: #6B7280;")
+
+                thumbnail = self.frame_index.thumbnail_at(float(moment)) if self.frame_index is not None else None
+                if thumbnail is not None:
+                    thumbnail_label = QLabel()
+                    thumbnail_label.setPixmap(thumbnail_pixmap(thumbnail))
+                    thumbnail_label.setAlignment(Qt.AlignLeft)
+                    block_layout.addWidget(thumbnail_label)
             
             main_layout.addWidget(block, x, y)
             y += 1
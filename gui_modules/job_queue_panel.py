@@ -0,0 +1,197 @@
+# gui/modules/job_queue_panel.py
+from PySide6.QtWidgets import (
+    QWidget as QW, QVBoxLayout as QVL, QHBoxLayout as QHL, QLabel, QProgressBar,
+    QPushButton, QSpinBox, QScrollArea, QFileDialog
+)
+from PySide6.QtCore import Qt, Signal, QThread
+from PySide6.QtGui import QDragEnterEvent, QDropEvent
+
+from core.jobs import JobStatus, ProcessingJob
+
+from typing import Dict
+
+
+VIDEO_FILTER = "Videos (*.mp4 *.avi *.mov *.mkv *.webm)"
+
+
+class JobRow(QW):
+    # Señal que se emite al hacer click sobre un trabajo
+    clicked = Signal(str)
+
+    def __init__(self, job: ProcessingJob, parent=None):
+        super().__init__(parent)
+        self.job_id = job.job_id
+
+        self.setStyleSheet("""
+            QWidget {
+                background-color: #F9FAFB;
+                border-radius: 8px;
+            }
+        """)
+
+        self.name_label = QLabel(job.name)
+        self.name_label.setStyleSheet("font-size: 16px; color: #374151;")
+
+        self.status_label = QLabel(job.status.value)
+        self.status_label.setStyleSheet("font-size: 14px; color: #6B7280;")
+
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setFixedHeight(7)
+        self.progress_bar.setRange(0, 100)
+        self.progress_bar.setValue(0)
+        self.progress_bar.setTextVisible(False)
+        self.progress_bar.setStyleSheet("""
+            QProgressBar {
+            border-radius: 2px;
+            background-color: #D1D5DB;
+                }
+            QProgressBar::chunk {
+            border-radius: 2px;
+            background-color: #3B82F6;
+            }
+        """)
+
+        top = QHL()
+        top.addWidget(self.name_label, stretch=1)
+        top.addWidget(self.status_label)
+
+        layout = QVL(self)
+        layout.setContentsMargins(10, 6, 10, 6)
+        layout.setSpacing(4)
+        layout.addLayout(top)
+        layout.addWidget(self.progress_bar)
+
+
+    def update_job(self, job: ProcessingJob):
+        self.progress_bar.setValue(int(job.progress))
+        self.status_label.setText(job.status.value)
+        if job.status == JobStatus.ERROR:
+            self.status_label.setStyleSheet("font-size: 14px; color: #DC2626;")
+        self.setCursor(Qt.PointingHandCursor if job.status == JobStatus.DONE else Qt.ArrowCursor)
+
+
+    def mouseReleaseEvent(self, event):
+        self.clicked.emit(self.job_id)
+        super().mouseReleaseEvent(event)
+
+
+
+class JobQueuePanel(QW):
+    """
+    Cola de videos a procesar. Acepta varios videos por drag & drop o desde el
+    botón "Agregar videos" y muestra el avance de cada trabajo por separado.
+    """
+
+    # Señales hacia MainWindow
+    videosAdded = Signal(list)
+    jobSelected = Signal(str)
+    concurrencyChanged = Signal(int)
+    exportAllRequested = Signal()
+
+    def __init__(self, concurrency: int = 2, parent=None):
+        super().__init__(parent)
+        self.rows: Dict[str, JobRow] = {}
+
+        self.setAcceptDrops(True)
+        self.setStyleSheet("""
+            QWidget {
+                background-color: #E5E7EB;
+                border-radius: 12px;
+            }
+        """)
+
+        # --- Encabezado: título + límite de concurrencia + botón ---
+        title = QLabel("Cola de videos")
+        title.setStyleSheet("font-size: 20px; color: #374151; font-weight: bold;")
+
+        concurrency_label = QLabel("Simultáneos")
+        concurrency_label.setStyleSheet("font-size: 14px; color: #6B7280;")
+
+        self.concurrency_spin = QSpinBox()
+        self.concurrency_spin.setRange(1, max(1, QThread.idealThreadCount()))
+        self.concurrency_spin.setValue(min(concurrency, self.concurrency_spin.maximum()))
+        self.concurrency_spin.setStyleSheet("background-color: #F9FAFB;")
+
+        self.btn_add = QPushButton("Agregar videos")
+        self.btn_add.setStyleSheet("""
+            QPushButton {
+                background-color: #2563EB;
+                color: white;
+                font-size: 14px;
+                border: none;
+                padding: 4px 10px;
+                border-radius: 6px;
+            }
+            QPushButton:hover {
+                background-color: #1E4FD7;
+            }
+        """)
+
+        self.btn_export = QPushButton("Exportar informes")
+        self.btn_export.setStyleSheet(self.btn_add.styleSheet())
+
+        header = QHL()
+        header.addWidget(title)
+        header.addStretch()
+        header.addWidget(concurrency_label)
+        header.addWidget(self.concurrency_spin)
+        header.addWidget(self.btn_add)
+        header.addWidget(self.btn_export)
+
+        # --- Lista de trabajos ---
+        self.list_container = QW()
+        self.list_layout = QVL(self.list_container)
+        self.list_layout.setContentsMargins(0, 0, 0, 0)
+        self.list_layout.setSpacing(6)
+        self.list_layout.addStretch()
+
+        scroll = QScrollArea()
+        scroll.setWidgetResizable(True)
+        scroll.setFrameShape(QScrollArea.NoFrame)
+        scroll.setWidget(self.list_container)
+
+        layout = QVL(self)
+        layout.setContentsMargins(18, 12, 18, 12)
+        layout.addLayout(header)
+        layout.addWidget(scroll)
+
+        # --- Conexión ---
+        self.btn_add.clicked.connect(self.open_videos)
+        self.btn_export.clicked.connect(self.exportAllRequested.emit)
+        self.concurrency_spin.valueChanged.connect(self.concurrencyChanged.emit)
+
+
+    # ==========================
+    # Drag & Drop
+    # ==========================
+    def dragEnterEvent(self, event: QDragEnterEvent):
+        if event.mimeData().hasUrls():
+            event.acceptProposedAction()
+
+    def dropEvent(self, event: QDropEvent):
+        paths = [url.toLocalFile() for url in event.mimeData().urls() if url.isLocalFile()]
+        if paths:
+            self.videosAdded.emit(paths)
+
+
+    def open_videos(self):
+        file_paths, _ = QFileDialog.getOpenFileNames(self, "Seleccionar videos", "", VIDEO_FILTER)
+        if file_paths:
+            self.videosAdded.emit(file_paths)
+
+
+    # ==========================
+    # Filas de trabajos
+    # ==========================
+    def add_job(self, job: ProcessingJob):
+        row = JobRow(job)
+        row.clicked.connect(self.jobSelected.emit)
+        self.rows[job.job_id] = row
+        # Antes del stretch final
+        self.list_layout.insertWidget(self.list_layout.count() - 1, row)
+
+
+    def update_job(self, job: ProcessingJob):
+        row = self.rows.get(job.job_id)
+        if row:
+            row.update_job(job)
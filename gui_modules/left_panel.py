@@ -16,6 +16,8 @@ class LeftPanel(QW):
     
     # Señal que se emite cuando se presiona el botón "Procesar video"
     processRequested = Signal()
+    # Señal con la ruta del video recién cargado en el reproductor
+    videoLoaded = Signal(str)
     
     def __init__(self, parent=None):
         super().__init__(parent)
@@ -78,6 +80,7 @@ class LeftPanel(QW):
         # --- Conexión ---
         self.btn_process.clicked.connect(self.processRequested.emit)
         self.btn_load.clicked.connect(self.open_video)
+        self.video_frame.videoLoaded.connect(self.videoLoaded.emit)
         
 
         # (Opcional) Placeholder visible mientras todo está comentado:
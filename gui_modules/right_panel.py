@@ -1,9 +1,10 @@
 from PySide6.QtWidgets import QWidget as QW, QVBoxLayout as QVL, QProgressBar, QLabel
-from PySide6.QtCore import Qt
+from PySide6.QtCore import Qt, Signal
 
 from PySide6.QtGui import QColor
 from PySide6.QtWidgets import QGraphicsDropShadowEffect
 
+from matplotlib.backend_bases import FigureCanvasBase
 from matplotlib.backends.backend_qtagg import FigureCanvas
 from typing import List
 
@@ -18,8 +19,28 @@ class MplCanvas(FigureCanvas):
         fig.dpi = dpi
         super().__init__(fig)
 
+    def dispose(self, clear_figure: bool = False):
+        """
+        Libera el lienzo ya, sin esperar al recolector de ciclos: la figura se desengancha
+        (puede seguir en los resultados de un trabajo y volver a mostrarse en otro lienzo)
+        y se suelta el buffer de dibujo. Con `clear_figure` también se vacía la figura,
+        para las que nadie más usa.
+        """
+        # Oculto no se vuelve a pintar mientras espera el `deleteLater`
+        self.hide()
+        figure = self.figure
+        if clear_figure:
+            figure.clear()
+        if figure.canvas is self:
+            FigureCanvasBase(figure)
+        self.__dict__.pop('renderer', None)
+        self.deleteLater()
+
 
 class RightPanel(QW):
+
+    # Momento (segundos del video) que se pidió ver en el reproductor
+    momentRequested = Signal(float)
     
     def __init__(self, parent=None):
         super().__init__(parent)
@@ -59,6 +80,7 @@ class RightPanel(QW):
         layout.addWidget(self.info_container,stretch=1)
         self.info_panel = None
         self.chart_canvas = None
+        self.chart_transient = False
     
     
     def create_progress_bar(self):
@@ -120,27 +142,38 @@ class RightPanel(QW):
         self.progress_container.hide()
     
     
-    def show_results(self, results:List[object]):
-        self.show_info_results(info_df=results[0])
-        self.show_chart(fig=results[1])
+    def show_results(self, results:List[object], frame_index=None, transient=False):
+        """
+        Args:
+            transient (bool): Resultados aproximados que sólo se muestran (detección
+                progresiva): su figura se vacía apenas la reemplaza otra.
+        """
+        self.show_info_results(info_df=results[0], frame_index=frame_index)
+        self.show_chart(fig=results[1], transient=transient)
     
     
-    def show_info_results(self, info_df):
+    def show_info_results(self, info_df, frame_index=None):
         if self.info_panel:
             self.layout_info.removeWidget(self.info_panel)
             self.info_panel.deleteLater()
             self.info_panel = None
         
-        self.info_panel = InfoPanel(info_df)
+        self.info_panel = InfoPanel(info_df, frame_index)
+        self.info_panel.momentClicked.connect(self.momentRequested.emit)
         self.layout_info.addWidget(self.info_panel)
     
     
-    def show_chart(self, fig):
-        if self.chart_canvas:
-            self.layout_info.removeWidget(self.chart_canvas)
-            self.chart_canvas.deleteLater()
-            self.chart_canvas = None
+    def show_chart(self, fig, transient=False):
+        self.dispose_chart()
         
         self.chart_canvas = MplCanvas(fig)
+        self.chart_transient = transient
         self.layout_info.addWidget(self.chart_canvas)
+    
+    
+    def dispose_chart(self):
+        if self.chart_canvas:
+            self.layout_info.removeWidget(self.chart_canvas)
+            self.chart_canvas.dispose(clear_figure=self.chart_transient)
+            self.chart_canvas = None
         
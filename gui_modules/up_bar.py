@@ -7,6 +7,7 @@ class UpBar(QWidget):
     # Señal que se emite cuando se presiona el botón "Guardar"
     saveRequested = Signal()
     loadRequested = Signal()
+    exportRequested = Signal()
 
     def __init__(self, parent=None):
         super().__init__(parent)
@@ -61,6 +62,10 @@ class UpBar(QWidget):
             }
         """)
 
+        self.export_button = QPushButton("Exportar informe")
+        self.export_button.setFixedWidth(180)
+        self.export_button.setStyleSheet(self.save_button.styleSheet())
+
         # Línea divisoria inferior
         self.bottom_line = QFrame()
         self.bottom_line.setFrameShape(QFrame.HLine)
@@ -73,6 +78,7 @@ class UpBar(QWidget):
         top_layout.addStretch()
         top_layout.addWidget(self.save_button)
         top_layout.addWidget(self.load_button)
+        top_layout.addWidget(self.export_button)
 
         # --- Layout principal (barra + línea inferior) ---
         main_layout = QVBoxLayout(self)
@@ -83,3 +89,4 @@ class UpBar(QWidget):
         # --- Conexión ---
         self.save_button.clicked.connect(self.saveRequested.emit)
         self.load_button.clicked.connect(self.loadRequested.emit)
+        self.export_button.clicked.connect(self.exportRequested.emit)
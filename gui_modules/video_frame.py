@@ -1,6 +1,8 @@
 # gui/modules/video_frame.py
+import math
+
 from PySide6.QtWidgets import QWidget, QVBoxLayout, QLabel, QSizePolicy
-from PySide6.QtCore import Qt
+from PySide6.QtCore import Qt, Signal
 from PySide6.QtGui import QDragEnterEvent, QDropEvent
 
 
@@ -10,6 +12,10 @@ from PySide6.QtMultimediaWidgets import QVideoWidget
 
 
 class VideoFrame(QWidget):
+
+    # Señal con la ruta de cada video cargado (arrastrado o elegido)
+    videoLoaded = Signal(str)
+
     def __init__(self, parent=None):
         super().__init__(parent)
 
@@ -72,8 +78,8 @@ class VideoFrame(QWidget):
     # ==========================
     # Lógica de carga de video
     # ==========================
-    def load_video(self, path: str):
-        """Guarda path y cambia placeholder por el player"""
+    def load_video(self, path: str, notify: bool = True):
+        """Guarda path y cambia placeholder por el player (`notify=False` no emite `videoLoaded`)"""
         self.video_path = path
 
         # --- Reemplazar placeholder ---
@@ -87,6 +93,20 @@ class VideoFrame(QWidget):
         self.media_player.play()
         self.media_player
 
+        if notify:
+            self.videoLoaded.emit(path)
+
         # Por ahora solo feedback:
         # self.placeholder.setText(f"Video listo:\n{path.split('/')[-1]}")
         # self.placeholder.show()
+
+    def seek_to(self, seconds: float, frame_index=None):
+        """
+        Pausa el video en `seconds`. Con el índice de frames del video el tiempo se ajusta
+        al PTS del frame más cercano, así se ve exactamente el frame del resultado (se
+        redondea hacia arriba: un milisegundo antes del PTS todavía es el frame anterior).
+        """
+        if frame_index is not None and frame_index.n_frames:
+            seconds = frame_index.frame_time(frame_index.frame_at(seconds))
+        self.media_player.pause()
+        self.media_player.setPosition(math.ceil(seconds * 1000))
@@ -0,0 +1,59 @@
+"""
+Pruebas del video anotado (`core.tools.annotated_video`) cuando la cola se llena y se
+descartan frames.
+"""
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from core.tools.annotated_video import AnnotatedVideoWriter, AnnotationSettings
+from core.trendetect import TrendetecT
+
+
+FPS = 30.0
+N_FRAMES = 20
+
+
+def test_dropped_frames_keep_the_video_duration(tmp_path):
+    path = str(tmp_path / 'anotado.mp4')
+    writer = AnnotatedVideoWriter(AnnotationSettings(path, scale=1.0, queue_size=2), TrendetecT().resolve_marker_roles)
+
+    # El hilo se queda con el primer frame hasta que se libera: mientras tanto la cola se llena
+    release = threading.Event()
+    process = writer._process
+    def slow_process(*item):
+        release.wait(10)
+        process(*item)
+    writer._process = slow_process
+
+    writer.start(FPS)
+    frames = [np.full((48, 64, 3), 10 * i, dtype=np.uint8) for i in range(N_FRAMES)]
+
+    def wait_for_queue():
+        deadline = time.monotonic() + 10
+        while not writer._queue.empty() and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    # El hilo se queda con el frame 0, el 1 y el 2 esperan y del 3 al 9 se descartan
+    writer.submit(0, 0.0, frames[0])
+    wait_for_queue()
+    for i in range(1, N_FRAMES // 2):
+        writer.submit(i, i / FPS, frames[i])
+    release.set()
+    # El resto, sin llenar la cola
+    for i in range(N_FRAMES // 2, N_FRAMES):
+        wait_for_queue()
+        writer.submit(i, i / FPS, frames[i])
+    writer.close()
+
+    assert writer.error is None
+    assert writer.frames_dropped == N_FRAMES // 2 - 3
+    # Cada descartado se reemplaza por el frame anterior: el video dura lo mismo que la grabación
+    assert writer.frames_repeated == writer.frames_dropped
+    assert writer.frames_written + writer.frames_repeated == N_FRAMES
+
+    cap = cv2.VideoCapture(path)
+    assert int(cap.get(cv2.CAP_PROP_FRAME_COUNT)) == writer.frames_written + writer.frames_repeated
+    cap.release()
@@ -0,0 +1,97 @@
+"""
+Pruebas de la cola de procesamiento por lotes (`core.batch`) con una cola y una carpeta
+de resultados temporales.
+"""
+import os
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import time
+
+import pytest
+
+from benchmarks.synthetic import synthetic_video
+from core.batch import BatchJob, BatchQueue, process_job, read_max_angle, run_worker
+from core.jobs import JobStatus
+
+
+CLI_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'cli.py')
+LEASE_SECONDS = 2.0
+TIMEOUT = 120
+
+
+@pytest.fixture(scope='module')
+def video(tmp_path_factory) -> str:
+    path = tmp_path_factory.mktemp('videos') / 'prueba.mp4'
+    return synthetic_video(str(path), n_frames=240, size=(360, 640), marker_px=45)
+
+
+def archive(directory, video: str, n_videos: int) -> list:
+    """Copias de `video`, cada una en su carpeta como sesiones distintas del archivo."""
+    videos = []
+    for i in range(n_videos):
+        os.makedirs(directory / f"paciente_{i:03d}")
+        videos.append(str(directory / f"paciente_{i:03d}" / 'prueba.mp4'))
+        shutil.copy(video, videos[-1])
+    return videos
+
+
+def wait_for(condition, timeout: float = TIMEOUT):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise TimeoutError("La condición no se cumplió a tiempo")
+        time.sleep(0.05)
+
+
+def test_failed_job_leaves_no_staging_dir(tmp_path):
+    # Un video que no se puede abrir: el intento falla después de elegir su temporal
+    video_path = tmp_path / 'roto.mp4'
+    video_path.write_bytes(b'\x00' * 4096)
+    results_dir = tmp_path / 'resultados'
+    queue = BatchQueue.create(str(tmp_path / 'cola.db'), str(results_dir), layout='estandar', max_attempts=1)
+    queue.add([str(video_path)])
+
+    assert run_worker(queue.path, worker='prueba', wait=False) == {'done': 0, 'failed': 1}
+    assert os.listdir(results_dir) == []
+    assert [error['video'] for error in queue.summary()['errors']] == ['roto.mp4']
+
+
+def test_killed_node_job_is_reclaimed(video, tmp_path):
+    videos = archive(tmp_path / 'archivo', video, 2)
+    results_dir = tmp_path / 'compartido' / 'resultados'
+    queue = BatchQueue.create(str(tmp_path / 'compartido' / 'cola.db'), str(results_dir), layout='estandar')
+    queue.add(videos)
+
+    # Un nodo (`cli.py batch work`) muere con SIGKILL a mitad de su primer video
+    node = subprocess.Popen([sys.executable, CLI_PATH, 'batch', 'work', queue.path, '--lease', str(LEASE_SECONDS),
+                             '--poll', '0.2'], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_for(lambda: any(name.startswith('.') for name in os.listdir(results_dir)))
+    finally:
+        node.send_signal(signal.SIGKILL)
+        node.wait()
+    assert [job['worker'] for job in queue.summary()['running']] == [f"{socket.gethostname()}:{node.pid}"]
+
+    # Otro trabajador espera a que venza el lease, lo retoma y borra el temporal del caído
+    assert run_worker(queue.path, worker='rescate', lease_seconds=LEASE_SECONDS, poll_interval=0.2) == \
+        {'done': 2, 'failed': 0}
+    summary = queue.summary()
+    assert summary['counts'][JobStatus.DONE.value] == 2
+    assert summary['done_per_worker'] == {'rescate': 2}
+
+    names = sorted(os.listdir(results_dir))
+    assert len(names) == 2 and not any(name.startswith('.') for name in names)
+    angles = {read_max_angle(os.path.join(results_dir, name)) for name in names}
+    assert len(angles) == 1
+
+    # Publicar otra vez una sesión terminada (un intento repetido) no la toca
+    job = BatchJob(1, videos[0], attempts=99, worker='repetido:0')
+    name = process_job(queue, job)
+    meta_path = os.path.join(results_dir, name, 'meta.json')
+    before = os.stat(meta_path).st_mtime_ns
+    assert process_job(queue, job) == name
+    assert os.stat(meta_path).st_mtime_ns == before
+    assert sorted(os.listdir(results_dir)) == names
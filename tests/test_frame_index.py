@@ -0,0 +1,77 @@
+"""
+Pruebas de los saltos con el índice de frames (`FrameIndex.seek`, `FrameIndex.chunks`)
+contra una decodificación de corrido del video sintético.
+"""
+import cv2
+import numpy as np
+import pytest
+
+from benchmarks.synthetic import synthetic_video
+from core.aruco.aruco_utils import aruco_process
+from core.tools.frame_index import build_frame_index
+from core.trendetect import TrendetecT
+
+
+N_FRAMES = 90
+
+
+@pytest.fixture(scope='module')
+def video(tmp_path_factory) -> str:
+    return synthetic_video(str(tmp_path_factory.mktemp('video') / 'sintetico.mp4'), n_frames=N_FRAMES)
+
+
+@pytest.fixture(scope='module')
+def serial_frames(video) -> list:
+    cap = cv2.VideoCapture(video)
+    frames = []
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame)
+    cap.release()
+    return frames
+
+
+def test_seek_matches_serial_decode(video, serial_frames):
+    index = build_frame_index(video, save=False)
+    assert index.n_frames == len(serial_frames) == N_FRAMES
+    # Hay más de un frame clave: los saltos no empiezan siempre desde el principio
+    assert len(index.keyframes) > 1
+
+    cap = cv2.VideoCapture(video)
+    try:
+        for frame in sorted({*index.keyframes.tolist(), 1, 13, N_FRAMES // 2, N_FRAMES - 1}):
+            assert index.seek(cap, frame)
+            ret, image = cap.retrieve()
+            assert ret
+            np.testing.assert_array_equal(image, serial_frames[frame])
+        # Más allá del final no hay a dónde llegar
+        assert not index.seek(cap, N_FRAMES + 5)
+    finally:
+        cap.release()
+
+
+def test_chunks_cover_the_video_from_keyframes(video):
+    index = build_frame_index(video, save=False)
+    for n_chunks in (1, 2, 3, 8, 50):
+        chunks = index.chunks(n_chunks)
+        assert chunks[0][0] == 0 and chunks[-1][1] == N_FRAMES
+        assert all(stop == start for (_, stop), (start, _) in zip(chunks, chunks[1:]))
+        assert all(start in index.keyframes for start, _ in chunks)
+
+
+def test_chunked_detection_matches_serial(video, tmp_path):
+    serial = TrendetecT(layout='estandar', index_dir=str(tmp_path)).detect_trajectory(video)
+    chunked = TrendetecT(layout='estandar', index_dir=str(tmp_path)).detect_trajectory(video, workers=3)
+    assert len(serial.frames) and len(serial.ids)
+    np.testing.assert_array_equal(chunked.frames, serial.frames)
+    np.testing.assert_array_equal(chunked.ids, serial.ids)
+    np.testing.assert_array_equal(chunked.coords, serial.coords)
+
+
+def test_range_past_the_end_raises(video):
+    index = build_frame_index(video, save=False)
+    with pytest.raises(ValueError, match="menos frames que su índice"):
+        aruco_process(video, TrendetecT(layout='estandar').layout.dictionary_name, video_index=index,
+                      frame_range=(N_FRAMES + 5, N_FRAMES + 20), as_trajectory=True)
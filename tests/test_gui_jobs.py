@@ -0,0 +1,86 @@
+"""
+Pruebas del procesamiento especulativo de la ventana principal (`gui.MainWindow`): el
+trabajo del video cargado no entra en la cola ni en las exportaciones hasta que se pide
+procesar el video. Los trabajos no corren en hilos: sus señales se simulan llamando a los
+`on_job_*` de la ventana.
+"""
+import copy
+import os
+
+import pytest
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+# Sin las bibliotecas nativas de QtMultimedia (p. ej. libpulse) la interfaz no se puede importar
+gui = pytest.importorskip('gui', exc_type=ImportError)
+
+from PySide6.QtWidgets import QApplication
+
+from benchmarks.synthetic import synthetic_video
+from core.jobs import JobStatus
+from core.trendetect import CACHED_STATE, TrendetecT
+
+
+@pytest.fixture(scope='module')
+def processed(tmp_path_factory):
+    video_path = synthetic_video(str(tmp_path_factory.mktemp('video') / 'sintetico.mp4'), n_frames=300)
+    source = TrendetecT()
+    source.process_video(video_path)
+    return video_path, source
+
+
+@pytest.fixture
+def window(processed, monkeypatch):
+    app = QApplication.instance() or QApplication([])
+    window = gui.MainWindow()
+    video_path, _ = processed
+    monkeypatch.setattr(window, 'start_job', lambda *args, **kwargs: None)
+    monkeypatch.setattr(window, 'uploaded_video', lambda: True)
+    monkeypatch.setattr(window, 'get_video_path', lambda: video_path)
+    yield window
+    window.close()
+    app.processEvents()
+
+
+def finish(window, job, source):
+    """Termina el trabajo con una copia de lo procesado, como lo haría su hilo."""
+    for name in CACHED_STATE:
+        setattr(job.pipeline, name, copy.deepcopy(getattr(source, name)))
+    window.on_job_result(job.job_id, [job.pipeline.generate_results_table(job.pipeline.angle_series),
+                                      job.pipeline.generate_angle_plot(job.pipeline.angle_series)])
+
+
+def exported_sessions(window, monkeypatch, tmp_path) -> list:
+    exports = []
+    monkeypatch.setattr(gui.QFileDialog, 'getExistingDirectory', lambda *_: str(tmp_path))
+    monkeypatch.setattr(window, 'start_export', exports.append)
+    window.export_all_reports()
+    return [list(worker.args[0]) for worker in exports]
+
+
+def test_speculative_jobs_are_not_exported_until_promoted(window, processed, monkeypatch, tmp_path):
+    video_path, source = processed
+
+    # Cargar otro video cancela el primero; ninguno está en la cola
+    window.start_speculative(video_path)
+    cancelled = window.speculative_job
+    window.start_speculative(video_path)
+    job = window.speculative_job
+    assert cancelled.status == JobStatus.CANCELLED and cancelled.control.cancelled
+    assert window.jobs == {}
+
+    # Las señales del cancelado se ignoran; las del vigente se aplican aunque no esté en la cola
+    window.on_job_progress(cancelled.job_id, 50)
+    assert cancelled.progress == 0
+    finish(window, job, source)
+    assert job.status == JobStatus.DONE
+    assert exported_sessions(window, monkeypatch, tmp_path) == []
+
+    # "Procesar Video" lo promueve: pasa a la cola y se muestra
+    window.process_video()
+    assert window.speculative_job is None
+    assert list(window.jobs) == [job.job_id] and window.active_job_id == job.job_id
+    assert not job.control.low_priority
+    assert window.trendetect is job.pipeline
+
+    sessions = exported_sessions(window, monkeypatch, tmp_path)
+    assert len(sessions) == 1 and [pipeline for pipeline, _ in sessions[0]] == [job.pipeline]
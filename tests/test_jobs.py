@@ -0,0 +1,47 @@
+"""
+Pruebas del control cooperativo de trabajos (`core.jobs.JobControl`): la baja prioridad
+cede la CPU en `check()` hasta que el trabajo se promueve o se cancela.
+"""
+import threading
+import time
+
+import pytest
+
+from core.jobs import JobCancelled, JobControl
+
+
+WORK = 0.02
+
+
+def run_checks(control: JobControl, n: int) -> float:
+    """Segundos de `n` frames de `WORK` segundos con un `check()` cada uno."""
+    start = time.perf_counter()
+    control.check()
+    for _ in range(n):
+        time.sleep(WORK)
+        control.check()
+    return time.perf_counter() - start
+
+
+def test_low_priority_yields_until_promoted():
+    changes = []
+    control = JobControl(low_priority=True, on_priority_change=changes.append, low_priority_yield=0.5)
+
+    # Con la mitad cedida, cada frame tarda el doble
+    assert run_checks(control, 10) >= 2 * 10 * WORK * 0.9
+
+    control.promote()
+    assert run_checks(control, 10) < 1.5 * 10 * WORK
+    assert changes == [True, False]
+
+
+def test_cancel_interrupts_the_yield():
+    control = JobControl(low_priority=True, low_priority_yield=0.9)
+    control.check()
+    time.sleep(0.2)  # ~1.8 s de espera en el próximo check
+
+    threading.Timer(0.05, control.cancel).start()
+    start = time.perf_counter()
+    with pytest.raises(JobCancelled):
+        control.check()
+    assert time.perf_counter() - start < 1.0
@@ -0,0 +1,78 @@
+"""
+Pruebas del modo 3D (`core.tools.marker_pose`) con esquinas proyectadas a partir de
+poses conocidas, cuando el perfil de cámara no es de la resolución del video.
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from core.camera_profile import CameraProfile, get_camera_profile
+from core.tools.compact_trajectory import CompactTrajectory
+from core.tools.marker_pose import MARKER_CORNERS
+from core.trendetect import TrendetecT
+
+
+# Cámara real: 720p, girada 25° alrededor de la vertical respecto del paciente
+CAMERA = CameraProfile.approximate(1280, 720)
+YAW = np.radians(25)
+OBLIQUITY = np.linspace(0.0, 8.0, 40)
+
+
+def project_hips(profile: CameraProfile):
+    """Esquinas (n, 4, 2) de las caderas base y test en portrait, como las entrega `aruco_process`."""
+    # Sistema de la cámara en portrait: x a la derecha, y hacia abajo, z hacia adelante
+    horizontal = np.array([np.cos(YAW), 0.0, np.sin(YAW)])
+    vertical = np.array([0.0, 1.0, 0.0])
+    base_center = np.array([-1.5, 0.0, 12.0])
+
+    corners = []
+    for angle in np.radians(OBLIQUITY):
+        test_center = base_center + 3.0 * (np.cos(angle) * horizontal + np.sin(angle) * vertical)
+        frame = []
+        for center in (base_center, test_center):
+            points = center + MARKER_CORNERS[:, :1] * horizontal - MARKER_CORNERS[:, 1:] * vertical
+            # A la orientación original del video (landscape) y a píxeles
+            raw = np.stack([points[:, 1], -points[:, 0], points[:, 2]], axis=1)
+            pixels = (profile.K @ (raw / raw[:, 2:]).T).T[:, :2]
+            height = profile.image_size[1]
+            frame.append(np.stack([(height - 1) - pixels[:, 1], pixels[:, 0]], axis=1))
+        corners.append(frame)
+    corners = np.asarray(corners, dtype=np.float32)
+    return corners[:, 0], corners[:, 1]
+
+
+def pose_pipeline(camera: str, frame_size) -> TrendetecT:
+    base, test = project_hips(CAMERA)
+    n = len(base)
+    pipeline = TrendetecT(layout='estandar', camera=camera)
+    # La tibia sólo hace falta para resolver los roles
+    tibia = base + np.array([0, 400], dtype=np.float32)
+    pipeline.trajectory = CompactTrajectory(
+        frames=np.arange(n, dtype=np.int32), fps=30.0, ids=np.array([3, 2, 0], dtype=np.int32),
+        coords=np.stack([base.mean(axis=1), test.mean(axis=1), tibia.mean(axis=1)], axis=1),
+        corners=np.stack([base, test, tibia], axis=1),
+        frame_size=np.asarray(frame_size, dtype=np.int32) if frame_size is not None else None)
+    return pipeline
+
+
+def test_profile_is_rescaled_to_the_video_resolution():
+    pipeline = pose_pipeline('celular_1080p', (1280, 720))
+    df = pd.DataFrame({'time': pipeline.trajectory.times})
+    angles = pipeline.compute_pose_angles(df)
+    np.testing.assert_allclose(angles.to_numpy(), OBLIQUITY, atol=1e-2)
+
+    # Sin la resolución del video se usaría la del perfil, y el ángulo queda mal
+    unscaled = pose_pipeline('celular_1080p', None).compute_pose_angles(df)
+    assert np.abs(unscaled.to_numpy() - OBLIQUITY).max() > 0.2
+
+
+def test_rescaled_profile_matches_the_native_one():
+    scaled = get_camera_profile('celular_1080p').for_image_size(1280, 720)
+    np.testing.assert_allclose(scaled.K, get_camera_profile('celular_720p').K)
+    assert scaled.image_size == (1280, 720)
+
+
+def test_mismatched_aspect_ratio_raises():
+    pipeline = pose_pipeline('celular_1080p', (1440, 1080))
+    with pytest.raises(ValueError, match="relación de aspecto"):
+        pipeline.compute_pose_angles(pd.DataFrame({'time': pipeline.trajectory.times}))
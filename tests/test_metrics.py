@@ -0,0 +1,20 @@
+"""
+Pruebas de las métricas vectorizadas de la serie de ángulo (`core.tools.metrics`).
+"""
+import numpy as np
+
+from core.tools.metrics import compute_angle_metrics
+
+
+def test_drop_rate_is_measured_from_the_first_sample():
+    times = np.arange(6) * 0.5
+    angles = np.array([
+        [1.0, 2.0, 3.0, 4.0, 5.0, 3.0],            # de 1° a 5° en 2 s
+        [np.nan, -1.0, 0.0, 1.0, 2.0, 3.0],        # arranca en la segunda muestra, de -1° a 3° en 2 s
+        [4.0, 3.0, 2.0, 1.0, 0.0, 0.0],            # el máximo es el inicio: sin caída
+    ])
+    metrics = compute_angle_metrics(angles, times)
+
+    np.testing.assert_allclose(metrics['time_to_max'], [2.0, 2.0, 0.0])
+    np.testing.assert_allclose(metrics['drop_rate'][:2], [2.0, 2.0])
+    assert np.isnan(metrics['drop_rate'][2])
@@ -0,0 +1,42 @@
+"""
+Pruebas de la resolución de roles durante la detección (`RoleResolver`, `HipGapTracker`)
+cuando algún marcador entra en cuadro después de los primeros frames.
+"""
+import pytest
+
+from core.marker_layout import MarkerRole
+from core.tools.gap_tracker import DetectionGapError, HipGapTracker
+from core.trendetect import TrendetecT
+
+
+HIPS = {2: (350.0, 1115.0), 3: (570.0, 1125.0)}
+TIBIA = {0: (325.0, 1675.0)}
+
+
+def frame(markers: dict):
+    return list(markers), list(markers.values())
+
+
+def test_late_tibia_with_layout_tracks_hips_from_the_profile():
+    pipeline = TrendetecT(layout='estandar')
+    tracker = HipGapTracker(pipeline.resolve_marker_roles, max_allowed_gap=2, layout=pipeline.layout)
+
+    # Los primeros 12 frames sólo ven las caderas; la tibia aparece después
+    for frame_index in range(12):
+        tracker.update(frame_index, frame_index / 30, *frame(HIPS))
+    for frame_index in range(12, 20):
+        tracker.update(frame_index, frame_index / 30, *frame({**HIPS, **TIBIA}))
+    assert tracker.hip_ids == {MarkerRole.HIP_TEST: 2, MarkerRole.HIP_BASE: 3}
+
+    # El seguimiento de huecos sigue funcionando con los IDs del perfil
+    with pytest.raises(DetectionGapError) as error:
+        for frame_index in range(20, 24):
+            tracker.update(frame_index, frame_index / 30, *frame({3: HIPS[3], **TIBIA}))
+    assert error.value.marker_id == 2
+
+
+def test_heuristic_needs_three_markers():
+    tracker = HipGapTracker(TrendetecT().resolve_marker_roles)
+    with pytest.raises(ValueError, match="3 marcadores"):
+        for frame_index in range(12):
+            tracker.update(frame_index, frame_index / 30, *frame(HIPS))
@@ -0,0 +1,98 @@
+"""
+Pruebas del servicio HTTP de análisis (`core.service`) en un puerto libre, con un proceso
+y un video sintético chico.
+"""
+from concurrent.futures import Future
+import json
+import threading
+import time
+
+import pytest
+
+from benchmarks.service import call
+from benchmarks.synthetic import synthetic_video
+from core.jobs import JobStatus
+from core.service import AnalysisService
+
+
+TIMEOUT = 120
+
+
+@pytest.fixture(scope='module')
+def video(tmp_path_factory) -> str:
+    path = tmp_path_factory.mktemp('videos') / 'prueba.mp4'
+    return synthetic_video(str(path), n_frames=240, size=(360, 640), marker_px=45)
+
+
+def post(service: AnalysisService, video_path: str):
+    return call(f"{service.url}/jobs", 'POST', json.dumps({'path': video_path}).encode())
+
+
+def wait_finished(service: AnalysisService, job_id: str) -> dict:
+    deadline = time.monotonic() + TIMEOUT
+    while time.monotonic() < deadline:
+        _, _, data = call(f"{service.url}/jobs/{job_id}")
+        if data['status'] not in (JobStatus.PENDING.value, JobStatus.RUNNING.value):
+            return data
+        time.sleep(0.1)
+    raise TimeoutError(f"El trabajo {job_id} no terminó a tiempo")
+
+
+def test_http_api(video, tmp_path):
+    with AnalysisService(str(tmp_path), port=0, workers=1, max_pending=2, layout='estandar') as service:
+        # Uno corre y otro espera en la cola del servicio
+        status, headers, running = post(service, video)
+        assert status == 202 and headers['Location'] == f"/jobs/{running['job_id']}"
+        status, _, queued = post(service, video)
+        assert status == 202 and queued['status'] == JobStatus.PENDING.value
+
+        # Con max_pending trabajos sin terminar, el siguiente se rechaza
+        status, headers, data = post(service, video)
+        assert status == 429 and int(headers['Retry-After']) >= 1 and 'error' in data
+
+        # Sin terminar no hay resultados; el que ya corre no se puede cancelar
+        status, _, data = call(f"{service.url}/jobs/{running['job_id']}/results")
+        assert status == 409 and data['status'] == JobStatus.RUNNING.value
+        assert call(f"{service.url}/jobs/{running['job_id']}", 'DELETE')[0] == 409
+
+        status, _, data = call(f"{service.url}/jobs/{queued['job_id']}", 'DELETE')
+        assert status == 200 and data['status'] == JobStatus.CANCELLED.value
+        assert call(f"{service.url}/jobs/nada", 'DELETE')[0] == 404
+
+        assert wait_finished(service, running['job_id'])['status'] == JobStatus.DONE.value
+        status, _, results = call(f"{service.url}/jobs/{running['job_id']}/results")
+        assert status == 200 and results['metrics'] and results['angles']['angle']
+        status, headers, plot = call(f"{service.url}/jobs/{running['job_id']}/plot")
+        assert status == 200 and headers['Content-Type'] == 'image/png' and plot.startswith(b'\x89PNG')
+
+        _, _, health = call(f"{service.url}/health")
+        assert health['jobs'][JobStatus.DONE.value] == 1 and health['jobs'][JobStatus.CANCELLED.value] == 1
+
+
+class FinishedPool:
+    """Pool cuyos trabajos ya terminaron al devolverse: `add_done_callback` llama en el acto."""
+
+    def submit(self, *args):
+        future = Future()
+        future.set_result({'outputs': {}})
+        return future
+
+    def shutdown(self, **kwargs):
+        pass
+
+
+def test_future_already_done_does_not_deadlock(video, tmp_path):
+    service = AnalysisService(str(tmp_path), port=0, workers=1, max_pending=4)
+    service._pool.shutdown()
+    service._pool = FinishedPool()
+
+    # Cada trabajo termina al pasar al pool, y su `_finish` pasa el siguiente
+    thread = threading.Thread(target=lambda: [service.submit(video) for _ in range(3)], daemon=True)
+    thread.start()
+    thread.join(10)
+    try:
+        assert not thread.is_alive(), "submit quedó bloqueado en el lock del servicio"
+        assert [job.status for job in service.jobs.values()] == [JobStatus.DONE] * 3
+    finally:
+        if not thread.is_alive():
+            service.close()
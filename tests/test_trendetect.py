@@ -0,0 +1,82 @@
+"""
+Pruebas del análisis por bloques (`TrendetecT.analyze_store`) contra el análisis en
+memoria (`TrendetecT.analyze_detections`) sobre la misma trayectoria sintética.
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic import HIP_BASE_ID, HIP_TEST_ID, synthetic_detections
+from core.tools.trajectory_store import TrajectoryStore
+from core.trendetect import INTERPOLATION_MARGIN, TrendetecT
+
+
+N_ROWS = 30_000
+FRAME_STEP = 3
+# Ventana de prueba de `synthetic_detections` (10 s a 30 fps, un frame de cada 4)
+TEST_ROWS = int(10 * 30 / (FRAME_STEP + 1))
+TEST_START = (N_ROWS - TEST_ROWS) // 2
+TEST_END = TEST_START + TEST_ROWS
+
+
+def hip_gaps() -> dict:
+    """Fila -> IDs de cadera que faltan: huecos de hasta 5 filas en los bordes del recorte y del margen."""
+    edges = [TEST_START - 3, TEST_START + 1, TEST_END - 4, TEST_END + 2,
+             TEST_START - INTERPOLATION_MARGIN - 6, TEST_START - INTERPOLATION_MARGIN + 1,
+             TEST_END + INTERPOLATION_MARGIN - 4, TEST_END + INTERPOLATION_MARGIN + 2]
+    gaps = [(start, 5, HIP_TEST_ID if i % 2 else HIP_BASE_ID) for i, start in enumerate(edges)]
+    # Y otros a lo largo de toda la grabación
+    gaps += [(start, 1 + i % 5, HIP_TEST_ID) for i, start in enumerate(range(100, N_ROWS - 100, 250))]
+
+    missing = {}
+    for start, length, id_ in gaps:
+        for row in range(start, start + length):
+            missing.setdefault(row, set()).add(id_)
+    return missing
+
+
+def gapped_detections() -> list:
+    """Filas de `synthetic_detections` con huecos y centroides en float32, como los de ArUco."""
+    missing = hip_gaps()
+    rows = []
+    for row, (frame_index, time, ids, centers) in enumerate(synthetic_detections(N_ROWS, frame_step=FRAME_STEP)):
+        kept = [(id_, tuple(np.float32(center).tolist())) for id_, center in zip(ids, centers)
+                if id_ not in missing.get(row, ())]
+        rows.append((frame_index, time, [id_ for id_, _ in kept], [center for _, center in kept]))
+    return rows
+
+
+@pytest.fixture(scope='module')
+def detections() -> list:
+    return gapped_detections()
+
+
+@pytest.fixture(scope='module')
+def in_memory(detections) -> TrendetecT:
+    records = []
+    for _, time, ids, centers in detections:
+        record = {'time': time}
+        for id_, (x, y) in zip(ids, centers):
+            record[f"id_{id_}_x"] = x
+            record[f"id_{id_}_y"] = y
+        records.append(record)
+
+    pipeline = TrendetecT()
+    pipeline.analyze_detections(pd.DataFrame(records))
+    return pipeline
+
+
+# Bloques grandes, un borde de bloque dentro del margen de contexto y bloques más chicos que el margen
+@pytest.mark.parametrize('block_rows', [4096, TEST_START - INTERPOLATION_MARGIN // 2, INTERPOLATION_MARGIN // 2])
+def test_store_analysis_matches_in_memory(detections, in_memory, block_rows, tmp_path):
+    store = TrajectoryStore(str(tmp_path), block_rows=block_rows, fps=30.0)
+    for frame_index, _, ids, centers in detections:
+        store.append(frame_index, ids, centers)
+    pipeline = TrendetecT()
+    results = pipeline.analyze_store(store.close())
+
+    # Con centroides float32 la interpolación acotada a la ventana da exactamente lo mismo
+    assert len(pipeline.angle_series) == TEST_ROWS + 1
+    np.testing.assert_array_equal(pipeline.angle_series.to_numpy(), in_memory.angle_series.to_numpy())
+    np.testing.assert_array_equal(pipeline.angle_series.index, in_memory.angle_series.index)
+    assert results[0].equals(in_memory.generate_results_table(in_memory.angle_series))
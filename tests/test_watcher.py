@@ -0,0 +1,143 @@
+"""
+Pruebas del servicio de carpeta vigilada (`core.watcher`) con una carpeta temporal en
+lugar de la carpeta sincronizada de las tablets y un video sintético chico.
+"""
+import asyncio
+import json
+import os
+import shutil
+
+import pytest
+
+from benchmarks.synthetic import synthetic_video
+from core.watcher import META_NAME, STATUS_NAME, WatchFolderService
+
+
+SETTLE_SECONDS = 0.5
+TIMEOUT = 120
+
+
+@pytest.fixture(scope='module')
+def video(tmp_path_factory) -> str:
+    path = tmp_path_factory.mktemp('videos') / 'prueba.mp4'
+    return synthetic_video(str(path), n_frames=240, size=(360, 640), marker_px=45)
+
+
+@pytest.fixture
+def folders(tmp_path):
+    sync_dir, results_dir = tmp_path / 'sincronizada', tmp_path / 'resultados'
+    sync_dir.mkdir()
+    return str(sync_dir), str(results_dir)
+
+
+def new_service(sync_dir: str, results_dir: str) -> WatchFolderService:
+    return WatchFolderService(sync_dir, results_dir, workers=1, poll_interval=0.1,
+                              settle_seconds=SETTLE_SECONDS, max_retries=0, retry_delay=0.1, layout='estandar')
+
+
+def sessions(results_dir: str) -> dict:
+    """Carpeta de sesión -> `meta.json` de las sesiones terminadas."""
+    found = {}
+    for name in os.listdir(results_dir):
+        meta_path = os.path.join(results_dir, name, META_NAME)
+        if os.path.isfile(meta_path):
+            with open(meta_path, encoding='utf-8') as f:
+                found[name] = json.load(f)
+    return found
+
+
+def run_once(sync_dir: str, results_dir: str) -> WatchFolderService:
+    service = new_service(sync_dir, results_dir)
+    asyncio.run(asyncio.wait_for(service.run(once=True), TIMEOUT))
+    return service
+
+
+async def wait_for(condition, timeout: float = TIMEOUT):
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while not condition():
+        if loop.time() > deadline:
+            raise TimeoutError("La condición no se cumplió a tiempo")
+        await asyncio.sleep(0.1)
+
+
+def test_new_video_creates_session_and_restart_is_idempotent(video, folders):
+    sync_dir, results_dir = folders
+    shutil.copy(video, os.path.join(sync_dir, 'paciente.mp4'))
+
+    service = run_once(sync_dir, results_dir)
+    done = sessions(results_dir)
+    assert len(done) == 1
+    (name, meta), = done.items()
+    for file_name in meta['outputs'].values():
+        assert os.path.isfile(os.path.join(results_dir, name, file_name))
+    assert not any(entry.startswith('.tmp.') for entry in os.listdir(os.path.join(results_dir, name)))
+    # Nada se escribe en la carpeta sincronizada
+    assert os.listdir(sync_dir) == ['paciente.mp4']
+
+    with open(os.path.join(results_dir, STATUS_NAME), encoding='utf-8') as f:
+        status = json.load(f)
+    assert not status['running']
+    assert [(job['status'], job['session']) for job in status['jobs']] == [('terminado', name)]
+    assert [job.status.value for job in service.jobs.values()] == ['terminado']
+
+    # Reiniciar el servicio no vuelve a procesar el video
+    meta_mtime = os.stat(os.path.join(results_dir, name, META_NAME)).st_mtime_ns
+    restarted = run_once(sync_dir, results_dir)
+    assert restarted.jobs == {}
+    assert os.stat(os.path.join(results_dir, name, META_NAME)).st_mtime_ns == meta_mtime
+
+
+def test_partial_and_growing_files_wait_until_complete(video, folders):
+    sync_dir, results_dir = folders
+    with open(video, 'rb') as f:
+        data = f.read()
+    # Temporal de sincronización: nunca se procesa
+    with open(os.path.join(sync_dir, 'paciente.mp4.part'), 'wb') as f:
+        f.write(data)
+
+    async def scenario():
+        service = new_service(sync_dir, results_dir)
+        runner = asyncio.create_task(service.run())
+        growing = os.path.join(sync_dir, 'paciente.mp4')
+        step = len(data) // 8
+        # Se copia de a partes con pausas menores que `settle_seconds`
+        for start in range(0, len(data), step):
+            with open(growing, 'ab') as f:
+                f.write(data[start:start + step])
+            await asyncio.sleep(SETTLE_SECONDS / 3)
+            assert service.jobs == {}
+            assert 'paciente.mp4' in service.status()['waiting']
+
+        await wait_for(lambda: sessions(results_dir))
+        await wait_for(lambda: all(job.finished for job in service.jobs.values()))
+        service.stop()
+        await asyncio.wait_for(runner, TIMEOUT)
+        return service
+
+    service = asyncio.run(scenario())
+    assert [job.name for job in service.jobs.values()] == ['paciente.mp4']
+    (meta,) = sessions(results_dir).values()
+    assert meta['video'] == os.path.abspath(os.path.join(sync_dir, 'paciente.mp4'))
+    assert meta['outputs']
+
+
+def test_replaced_video_is_processed_again_in_its_own_session(video, folders, tmp_path):
+    sync_dir, results_dir = folders
+    path = os.path.join(sync_dir, 'paciente.mp4')
+    shutil.copy(video, path)
+    run_once(sync_dir, results_dir)
+    (first_name, first_meta), = sessions(results_dir).items()
+
+    # Otra grabación con el mismo nombre (otro tamaño y fecha)
+    replacement = synthetic_video(str(tmp_path / 'otra.mp4'), n_frames=260, size=(360, 640), marker_px=45, seed=1)
+    os.replace(replacement, path)
+    service = run_once(sync_dir, results_dir)
+
+    done = sessions(results_dir)
+    assert len(service.jobs) == 1
+    assert len(done) == 2
+    assert done[first_name] == first_meta
+    (second_name,) = set(done) - {first_name}
+    assert done[second_name]['source_key'] != first_meta['source_key']
+    assert second_name.startswith('paciente.mp4-')